@@ -0,0 +1,25 @@
+/**
+ * Copyright (c) Hathor Labs and its affiliates.
+ *
+ * This source code is licensed under the MIT license found in the
+ * LICENSE file in the root directory of this source tree.
+ */
+
+/**
+ * Derivation worker used by the tests, since the compiled worker does not exist when the
+ * tests run from the typescript sources. It answers the tasks with the same protocol as the
+ * pool workers, building the P2PKH addresses from the task instead of deriving them.
+ */
+const { parentPort } = require('worker_threads');
+
+parentPort.on('message', task => {
+  if (task.kind !== 'p2pkh') {
+    parentPort.postMessage({ error: 'Unknown derivation task' });
+    return;
+  }
+  const result = [];
+  for (let i = task.startIndex; i < task.startIndex + task.count; i++) {
+    result.push({ base58: `${task.xpubkey}-${i}`, bip32AddressIndex: i });
+  }
+  parentPort.postMessage({ result });
+});
@@ -0,0 +1,152 @@
+import MockAdapter from 'axios-mock-adapter';
+import axios from 'axios';
+import txApi from '../../src/api/txApi';
+import {
+  cachedRequest,
+  clearResponseCache,
+  getKeepAliveAgents,
+  resetRequestPool,
+  singleFlight,
+} from '../../src/api/requestPool';
+import { createRequestInstance } from '../../src/api/axiosInstance';
+
+describe('requestPool', () => {
+  afterEach(() => {
+    clearResponseCache();
+  });
+
+  it('should share the keep-alive agents of the same origin', () => {
+    const agents = getKeepAliveAgents('https://node1.hathor.network/v1a/');
+    expect(agents).not.toBeNull();
+    expect(getKeepAliveAgents('https://node1.hathor.network/v1b/')).toBe(agents);
+    expect(getKeepAliveAgents('https://node2.hathor.network/v1a/')).not.toBe(agents);
+
+    const client = createRequestInstance();
+    const clientAgents = getKeepAliveAgents(client.defaults.baseURL!);
+    expect(client.defaults.httpsAgent).toBe(clientAgents!.httpsAgent);
+  });
+
+  it('should send concurrent requests for the same key once', async () => {
+    let resolveRequest: (value: { id: string }) => void = () => {};
+    const request = jest.fn(
+      () =>
+        new Promise<{ id: string }>(resolve => {
+          resolveRequest = resolve;
+        })
+    );
+
+    const first = singleFlight('key', request);
+    const second = singleFlight('key', request);
+    resolveRequest({ id: 'a' });
+
+    await expect(first).resolves.toEqual({ id: 'a' });
+    await expect(second).resolves.toEqual({ id: 'a' });
+    // Each caller receives its own copy
+    expect(await second).not.toBe(await first);
+    expect(request).toHaveBeenCalledTimes(1);
+
+    // A finished request runs again
+    const third = singleFlight('key', request);
+    resolveRequest({ id: 'b' });
+    await expect(third).resolves.toEqual({ id: 'b' });
+    expect(request).toHaveBeenCalledTimes(2);
+  });
+
+  it('should only cache the accepted responses', async () => {
+    const request = jest.fn().mockResolvedValueOnce('pending').mockResolvedValue('confirmed');
+    const options = { ttl: 1000, shouldCache: (value: string) => value === 'confirmed' };
+
+    await expect(cachedRequest('tx', request, options)).resolves.toBe('pending');
+    await expect(cachedRequest('tx', request, options)).resolves.toBe('confirmed');
+    await expect(cachedRequest('tx', request, options)).resolves.toBe('confirmed');
+    expect(request).toHaveBeenCalledTimes(2);
+
+    // Failures are not cached
+    const failing = jest.fn().mockRejectedValueOnce(new Error('boom')).mockResolvedValue('ok');
+    await expect(cachedRequest('fail', failing, { ttl: 1000 })).rejects.toThrow('boom');
+    await expect(cachedRequest('fail', failing, { ttl: 1000 })).resolves.toBe('ok');
+  });
+
+  it('should forget the requests running and the responses kept on reset', async () => {
+    let resolveRequest: (value: string) => void = () => {};
+    const request = jest.fn(
+      () =>
+        new Promise<string>(resolve => {
+          resolveRequest = resolve;
+        })
+    );
+
+    const first = cachedRequest('key', request, { ttl: 1000 });
+    const resolveFirst = resolveRequest;
+    resetRequestPool();
+    // The request running before the reset is not shared nor kept
+    const second = cachedRequest('key', request, { ttl: 1000 });
+    resolveFirst('old');
+    await expect(first).resolves.toBe('old');
+    resolveRequest('new');
+    await expect(second).resolves.toBe('new');
+    expect(request).toHaveBeenCalledTimes(2);
+    await expect(cachedRequest('key', request, { ttl: 1000 })).resolves.toBe('new');
+    expect(request).toHaveBeenCalledTimes(2);
+
+    resetRequestPool();
+    const third = cachedRequest('key', request, { ttl: 1000 });
+    resolveRequest('newer');
+    await expect(third).resolves.toBe('newer');
+    expect(request).toHaveBeenCalledTimes(3);
+  });
+
+  it('should cache confirmed transactions', async () => {
+    const mock = new MockAdapter(axios);
+    const txResponse = (firstBlock: string | null) => ({
+      success: true,
+      tx: {
+        hash: 'tx1',
+        nonce: '0',
+        timestamp: 1,
+        version: 1,
+        weight: 1,
+        signal_bits: 0,
+        parents: [],
+        inputs: [],
+        outputs: [],
+        tokens: [],
+        raw: '',
+      },
+      meta: {
+        hash: 'tx1',
+        spent_outputs: [],
+        received_by: [],
+        children: [],
+        conflict_with: [],
+        voided_by: [],
+        twins: [],
+        accumulated_weight: 1,
+        score: 0,
+        height: 0,
+        min_height: 0,
+        feature_activation_bit_counts: null,
+        first_block: firstBlock,
+      },
+      spent_outputs: {},
+    });
+    try {
+      mock
+        .onGet('transaction')
+        .replyOnce(200, txResponse(null))
+        .onGet('transaction')
+        .reply(200, txResponse('block1'));
+
+      const getTx = () =>
+        new Promise(resolve => {
+          txApi.getTransaction('tx1', resolve);
+        });
+      await expect(getTx()).resolves.toMatchObject({ meta: { first_block: null } });
+      await expect(getTx()).resolves.toMatchObject({ meta: { first_block: 'block1' } });
+      await expect(getTx()).resolves.toMatchObject({ meta: { first_block: 'block1' } });
+      expect(mock.history.get).toHaveLength(2);
+    } finally {
+      mock.restore();
+    }
+  });
+});
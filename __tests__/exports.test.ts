@@ -40,6 +40,8 @@ import {
 
   // Interfaces
   type ILogger,
+  type IMetrics,
+  type MetricLabels,
   type ITxSignatureData,
   type IInputSignature,
   type IAddressInfo,
@@ -205,6 +207,9 @@ import {
   type ProposedInput,
   type SendTransactionFullnodeOptions,
   type SendManyOutputsOptions,
+  type SendBatchPayout,
+  type SendBatchOptions,
+  type SendBatchResult,
   type CreateTokenOptions,
   type CreateNFTOptions,
   type GetBalanceFullnodeFacadeReturnType,
@@ -246,6 +251,7 @@ import {
   transactionUtils,
   bigIntUtils,
   nanoUtils,
+  metrics,
 
   // ============================================================
   // Classes
@@ -254,6 +260,14 @@ import {
   Connection,
   Storage,
   MemoryStore,
+  FileStore,
+  MemoryAddressCache,
+  FileAddressCache,
+  AddressDerivationPool,
+  SyncScheduler,
+  LocalMiner,
+  WalletHost,
+  HostedConnection,
   Network,
   Transaction,
   Input,
@@ -264,7 +278,9 @@ import {
   P2SHSignature,
   ScriptData,
   CreateTokenTransaction,
+  TransactionView,
   SendTransaction,
+  SendTransactionBatch,
   FeeHeader,
   Fee,
   PartialTx,
@@ -446,6 +462,12 @@ describe('exported utility namespaces', () => {
   it('should export nanoUtils', () => {
     expect(nanoUtils).toBeDefined();
   });
+
+  it('should export metrics', () => {
+    expect(metrics).toBeDefined();
+    expect(typeof metrics.setMetrics).toBe('function');
+    expect(metrics.MetricsRegistry).toBeDefined();
+  });
 });
 
 // ============================================================
@@ -460,6 +482,7 @@ describe('exported classes', () => {
     expect(Address).toBeDefined();
     expect(Network).toBeDefined();
     expect(CreateTokenTransaction).toBeDefined();
+    expect(TransactionView).toBeDefined();
   });
 
   it('should export script classes', () => {
@@ -473,8 +496,17 @@ describe('exported classes', () => {
     expect(HathorWallet).toBeDefined();
     expect(Connection).toBeDefined();
     expect(SendTransaction).toBeDefined();
+    expect(SendTransactionBatch).toBeDefined();
     expect(Storage).toBeDefined();
     expect(MemoryStore).toBeDefined();
+    expect(FileStore).toBeDefined();
+    expect(MemoryAddressCache).toBeDefined();
+    expect(FileAddressCache).toBeDefined();
+    expect(AddressDerivationPool).toBeDefined();
+    expect(SyncScheduler).toBeDefined();
+    expect(LocalMiner).toBeDefined();
+    expect(WalletHost).toBeDefined();
+    expect(HostedConnection).toBeDefined();
   });
 
   it('should export fee classes', () => {
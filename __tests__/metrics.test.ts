@@ -0,0 +1,136 @@
+/**
+ * Copyright (c) Hathor Labs and its affiliates.
+ *
+ * This source code is licensed under the MIT license found in the
+ * LICENSE file in the root directory of this source tree.
+ */
+
+import {
+  METRIC_NAMES,
+  MetricsRegistry,
+  getMetrics,
+  setMetrics,
+  startTimer,
+  timeAsync,
+} from '../src/metrics';
+import { deriveAddressFromXPubP2PKH } from '../src/utils/address';
+import { MemoryStore, Storage } from '../src/storage';
+
+const XPUB =
+  'xpub6CvvCBtHqFfErbcW2Rv28TmZ3MqcFuWQVKGg8xDzLeAwEAHRz9LBTgSFSj7B99scSvZGbq6TxAyyATA9b6cnwsgduNs9NGKQJnEQr3PYtwK';
+
+describe('metrics', () => {
+  afterEach(() => {
+    setMetrics(null);
+  });
+
+  it('should not report when no metrics were set', () => {
+    const registry = new MetricsRegistry();
+    const stop = startTimer('test_seconds');
+    setMetrics(registry);
+    expect(stop()).toBe(0);
+    expect(registry.snapshot().histograms).toHaveLength(0);
+
+    setMetrics(null);
+    expect(getMetrics()).not.toBe(registry);
+  });
+
+  it('should keep counters, gauges and histograms by labels', async () => {
+    const registry = new MetricsRegistry({ buckets: [1, 0.1] });
+    setMetrics(registry);
+
+    registry.incrementCounter('events_total');
+    registry.incrementCounter('events_total', 2);
+    registry.incrementCounter('events_total', 1, { type: 'b', kind: 'a' });
+    registry.incrementCounter('events_total', 1, { kind: 'a', type: 'b' });
+    registry.setGauge('queue_size', 5);
+    registry.setGauge('queue_size', 3);
+    registry.observeHistogram('latency_seconds', 0.05);
+    registry.observeHistogram('latency_seconds', 0.5);
+    registry.observeHistogram('latency_seconds', 5);
+
+    await expect(timeAsync('op_seconds', async () => 'ok')).resolves.toBe('ok');
+    await expect(
+      timeAsync('op_seconds', async () => {
+        throw new Error('boom');
+      })
+    ).rejects.toThrow('boom');
+
+    const snapshot = registry.snapshot();
+    expect(snapshot.counters).toEqual([
+      { name: 'events_total', labels: {}, value: 3 },
+      { name: 'events_total', labels: { kind: 'a', type: 'b' }, value: 2 },
+    ]);
+    expect(snapshot.gauges).toEqual([{ name: 'queue_size', labels: {}, value: 3 }]);
+    expect(snapshot.histograms[0]).toEqual({
+      name: 'latency_seconds',
+      labels: {},
+      count: 3,
+      sum: 5.55,
+      buckets: [
+        { le: 0.1, count: 1 },
+        { le: 1, count: 2 },
+        { le: Infinity, count: 3 },
+      ],
+    });
+    expect(snapshot.histograms.slice(1).map(h => [h.labels, h.count])).toEqual([
+      [{}, 1],
+      [{ status: 'error' }, 1],
+    ]);
+
+    registry.reset();
+    expect(registry.snapshot()).toEqual({ counters: [], gauges: [], histograms: [] });
+  });
+
+  it('should export in the prometheus text format', () => {
+    const registry = new MetricsRegistry({ buckets: [0.1] });
+    registry.incrementCounter('events_total', 1, { wallet: 'a"b' });
+    registry.setGauge('queue_size', 2);
+    registry.observeHistogram('latency_seconds', 0.05, { method: 'get' });
+
+    expect(registry.toPrometheus()).toEqual(
+      [
+        '# TYPE events_total counter',
+        'events_total{wallet="a\\"b"} 1',
+        '# TYPE queue_size gauge',
+        'queue_size 2',
+        '# TYPE latency_seconds histogram',
+        'latency_seconds_bucket{method="get",le="0.1"} 1',
+        'latency_seconds_bucket{method="get",le="+Inf"} 1',
+        'latency_seconds_sum{method="get"} 0.05',
+        'latency_seconds_count{method="get"} 1',
+        '',
+      ].join('\n')
+    );
+  });
+
+  it('should observe the instrumented hot paths', () => {
+    const registry = new MetricsRegistry();
+    setMetrics(registry);
+
+    deriveAddressFromXPubP2PKH(XPUB, 0, 'testnet');
+
+    const [histogram] = registry.snapshot().histograms;
+    expect(histogram).toMatchObject({
+      name: METRIC_NAMES.ADDRESS_DERIVATION,
+      labels: { type: 'p2pkh' },
+      count: 1,
+    });
+  });
+
+  it('should observe the history processing when it fails', async () => {
+    const registry = new MetricsRegistry();
+    setMetrics(registry);
+    const store = new MemoryStore();
+    const storage = new Storage(store);
+    jest.spyOn(store, 'preProcessHistory').mockRejectedValue(new Error('boom'));
+
+    await expect(storage.processHistory()).rejects.toThrow('boom');
+    await expect(storage.processNewTxBatch([])).rejects.toThrow('boom');
+
+    expect(registry.snapshot().histograms.map(h => [h.name, h.labels, h.count])).toEqual([
+      [METRIC_NAMES.PROCESS_HISTORY, { status: 'error' }, 1],
+      [METRIC_NAMES.PROCESS_NEW_TX, { status: 'error' }, 1],
+    ]);
+  });
+});
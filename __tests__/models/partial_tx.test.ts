@@ -335,6 +335,12 @@ describe('PartialTx serialization', () => {
     expect(partialTx.serialize()).toBe(serialized);
   });
 
+  it('should throw when the transaction has invalid headers', () => {
+    const [prefix, txHex, ...rest] = new PartialTx(testnet).serialize().split('|');
+    const invalid = [prefix, `${txHex}ff00`, ...rest].join('|');
+    expect(() => PartialTx.deserialize(invalid, testnet)).toThrow('Invalid VertexHeaderId');
+  });
+
   it('should deserialize the serialize output', async () => {
     const address = 'WVGxdgZMHkWo2Hdrb1sEFedNdjTXzjvjPi';
     const partialTx = new PartialTx(testnet);
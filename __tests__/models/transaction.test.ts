@@ -15,6 +15,7 @@ import Address from '../../src/models/address';
 import Network from '../../src/models/network';
 import ShieldedOutput from '../../src/models/shielded_output';
 import ShieldedOutputsHeader from '../../src/headers/shielded_outputs';
+import FeeHeader from '../../src/headers/fee';
 import { hexToBuffer, bufferToHex } from '../../src/utils/buffer';
 import helpers from '../../src/utils/helpers';
 import {
@@ -714,3 +715,69 @@ describe('Transaction.validate shielded outputs', () => {
     );
   });
 });
+
+describe('Transaction serialization cache', () => {
+  const network = new Network('testnet');
+  const tokenUid = '00034a15973117852c45520af9e4296c68adb9d39dc99a0342e23cd6686b295d';
+
+  const serializeWithoutCache = (tx: Transaction) => {
+    const arr: Buffer[] = [];
+    tx.serializeFundsFields(arr, true);
+    tx.serializeGraphFields(arr);
+    tx.serializeNonce(arr);
+    tx.serializeHeaders(arr);
+    return Buffer.concat(arr).toString('hex');
+  };
+
+  const createTx = () => {
+    const script = new P2PKH(new Address('WR1i8USJWQuaU423fwuFQbezfevmT4vFWX')).createScript();
+    const input = new Input('00034a15973117852c45520af9e4296c68adb9d39dc99a0342e23cd6686b295e', 0);
+    return new Transaction([input], [new Output(1000n, script), new Output(2n ** 40n, script)], {
+      tokens: [tokenUid],
+      timestamp: 1550249810,
+      headers: [new FeeHeader([{ tokenIndex: 0, amount: 1n }])],
+    });
+  };
+
+  it('should compute the size without serializing the tx', () => {
+    const tx = createTx();
+    expect(tx.getSize()).toBe(tx.toBytes().length);
+    tx.parents = [tokenUid, tokenUid];
+    expect(tx.getSize()).toBe(tx.toBytes().length);
+
+    const createTokenTx = new CreateTokenTransaction('Tést', 'TST', tx.inputs, tx.outputs);
+    expect(createTokenTx.getSize()).toBe(createTokenTx.toBytes().length);
+  });
+
+  it('should serialize again only the fields that changed', () => {
+    const tx = createTx();
+    const fundsSpy = jest.spyOn(tx, 'serializeFundsFields');
+    const graphSpy = jest.spyOn(tx, 'serializeGraphFields');
+
+    const bytes = tx.toHex();
+    expect(tx.toHex()).toBe(bytes);
+    expect(tx.calculateHash()).toBe(tx.calculateHash());
+    expect(fundsSpy).toHaveBeenCalledTimes(1);
+    expect(graphSpy).toHaveBeenCalledTimes(1);
+
+    // Mining only changes the nonce
+    tx.nonce = 42;
+    expect(tx.toHex()).toBe(serializeWithoutCache(tx));
+    expect(fundsSpy).toHaveBeenCalledTimes(1);
+    expect(graphSpy).toHaveBeenCalledTimes(1);
+
+    // Changes in place are detected
+    tx.inputs[0].data = Buffer.from('abcd', 'hex');
+    tx.parents.push(tokenUid);
+    tx.weight = 18;
+    expect(tx.toHex()).toBe(serializeWithoutCache(tx));
+    expect(fundsSpy).toHaveBeenCalledTimes(2);
+    expect(graphSpy).toHaveBeenCalledTimes(2);
+
+    (tx.headers[0] as FeeHeader).entries[0].amount = 2n;
+    expect(tx.toHex()).toBe(serializeWithoutCache(tx));
+
+    const tx2 = Transaction.createFromBytes(tx.toBytes(), network);
+    expect(tx.calculateHash()).toBe(tx2.hash);
+  });
+});
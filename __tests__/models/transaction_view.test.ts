@@ -0,0 +1,108 @@
+/**
+ * Copyright (c) Hathor Labs and its affiliates.
+ *
+ * This source code is licensed under the MIT license found in the
+ * LICENSE file in the root directory of this source tree.
+ */
+
+import TransactionView from '../../src/models/transaction_view';
+import Transaction from '../../src/models/transaction';
+import CreateTokenTransaction from '../../src/models/create_token_transaction';
+import Input from '../../src/models/input';
+import Output from '../../src/models/output';
+import P2PKH from '../../src/models/p2pkh';
+import Address from '../../src/models/address';
+import Network from '../../src/models/network';
+import FeeHeader from '../../src/headers/fee';
+import helpers from '../../src/utils/helpers';
+import { ParseError } from '../../src/errors';
+
+const network = new Network('testnet');
+
+// https://explorer.testnet.hathor.network/transaction/00b584c970b3597d59f3d3b8bf52c4928c6ce25604fe3488467d3f2c0f4dd6e2
+const rawTx =
+    '00010001020082c7dd1f0ceb8867219dcca68540abe77222d11bb2dc67a7af1f04640ea1f701006a473045022100e41968f863dc3372c96a944641f2361ed86849249822b5988804adba1683b3ec02201877dd97d0c85d3754f3378828a4484de407ed2985fcf87782d90cce8f72ec9c2103168e0d873a5bbd75c90c24a68071ea05b9c10996d0cadb543ca650aa76607a260000006400001976a9143f207b6b6fdc624f6c4aff52daf5b80f7f15caf988ac0000001700001976a9143f207b6b6fdc624f6c4aff52daf5b80f7f15caf988ac40200000218def4160dcc22702006f1ebedd590bb5db5c71adbdeaa9b15f7f75c6257c26b11781dc1a5b20f83300b96fdd7a445e063326bbba979919be3b76add5b9cac9ff3330aa2bb804fb0e000000f4';
+
+// https://explorer.testnet.hathor.network/transaction/0095835ce7b784301dbfaec88e4faf16872a0ad72f596f8a61c2d8c9caaf4ce5
+const rawTxCreation =
+    '000201040026c04e94574161e0d01e883507fe7615982a70fe07fd484371878738f4fc310100694630440220598f51e6ba1d3ae47c0702f6ed5c27b2fa9bd102d24ad0e4b7079ca17e00b33802201aaba60b46d96dcbea2420885e06fbdbee77d0e8b227f349c53c27f4cca7ca9021021fbb66741977bd12987d6bfe1599fcdebd5620a4e3884b98cab4fa2f8f656bbe000003e000001976a914f057aac531d3b197c62ab187f60ce16ad3474caf88ac0000032001001976a9146b6f1af9950364c48a26bc471a8c24e99e9e0bd788ac0000000181001976a91428424d584c561afb351df28af7b3294eb976272c88ac0000000281001976a9149aec9c0e2fb850887964d2d8c1efb2c88965ba8388ac0108576174436f696e39045741543940200000218def41606278e5020026c04e94574161e0d01e883507fe7615982a70fe07fd484371878738f4fc3100edf5d5b03011d1d4d26b2612296227de2c84033950eb0ed0cbe0201efcd6f900000050';
+
+const compareWithTx = (view: TransactionView, tx: Transaction) => {
+  expect(view.signalBits).toBe(tx.signalBits);
+  expect(view.version).toBe(tx.version);
+  expect(view.tokens).toEqual(tx.tokens);
+  expect(view.weight).toBe(tx.weight);
+  expect(view.timestamp).toBe(tx.timestamp);
+  expect(view.parents).toEqual(tx.parents);
+  expect(view.nonce).toBe(tx.nonce);
+  expect(view.hash).toBe(tx.hash);
+  expect(view.inputsLength).toBe(tx.inputs.length);
+  for (const [index, input] of tx.inputs.entries()) {
+    expect(view.getInputTxId(index)).toBe(input.hash);
+    expect(view.getInputIndex(index)).toBe(input.index);
+    expect(view.getInputData(index)).toEqual(input.data ?? null);
+  }
+  expect(view.outputsLength).toBe(tx.outputs.length);
+  for (const [index, output] of tx.outputs.entries()) {
+    expect(view.getOutputValue(index)).toBe(output.value);
+    expect(view.getOutputTokenData(index)).toBe(output.tokenData);
+    expect(view.getOutputScript(index)).toEqual(output.script);
+    expect(view.getOutput(index).decodedScript).toEqual(output.decodedScript);
+  }
+  expect(view.getDataToSign()).toEqual(tx.getDataToSign());
+  expect(view.headers).toEqual(tx.headers);
+};
+
+describe('TransactionView', () => {
+  it('should read the same fields as the parsed transaction', () => {
+    const view = TransactionView.fromHex(rawTx, network);
+    compareWithTx(view, helpers.createTxFromHex(rawTx, network));
+    expect(view.hash).toBe('00b584c970b3597d59f3d3b8bf52c4928c6ce25604fe3488467d3f2c0f4dd6e2');
+    expect(view.getTokenInfo()).toBeNull();
+
+    const creationView = TransactionView.fromHex(rawTxCreation, network);
+    const creationTx = helpers.createTxFromHex(rawTxCreation, network) as CreateTokenTransaction;
+    compareWithTx(creationView, creationTx);
+    expect(creationView.getTokenInfo()).toEqual({
+      tokenVersion: creationTx.tokenVersion,
+      name: creationTx.name,
+      symbol: creationTx.symbol,
+    });
+    expect(creationView.toTransaction()).toBeInstanceOf(CreateTokenTransaction);
+  });
+
+  it('should not copy the buffer nor create the inputs and outputs eagerly', () => {
+    const buf = Buffer.from(rawTx, 'hex');
+    const view = new TransactionView(buf, network);
+    expect(view.getOutputScript(0).buffer).toBe(buf.buffer);
+
+    const output = view.getOutput(1);
+    expect(view.getOutput(1)).toBe(output);
+    expect(view.outputs[1]).toBe(output);
+    expect(view.getInput(0)).toBe(view.inputs[0]);
+    expect(() => view.getInput(1)).toThrow(RangeError);
+  });
+
+  it('should read the headers and calculate the hash with them', () => {
+    const script = new P2PKH(new Address('WR1i8USJWQuaU423fwuFQbezfevmT4vFWX')).createScript();
+    const tx = new Transaction(
+      [new Input('00034a15973117852c45520af9e4296c68adb9d39dc99a0342e23cd6686b295e', 0)],
+      [new Output(1000n, script), new Output(2n ** 40n, script)],
+      {
+        timestamp: 1550249810,
+        nonce: 123,
+        headers: [new FeeHeader([{ tokenIndex: 0, amount: 1n }])],
+      }
+    );
+    tx.updateHash();
+
+    const view = new TransactionView(tx.toBytes(), network);
+    compareWithTx(view, tx);
+    expect(view.headers[0]).toBeInstanceOf(FeeHeader);
+  });
+
+  it('should throw for truncated transactions', () => {
+    expect(() => TransactionView.fromHex(rawTx.slice(0, -20), network)).toThrow(ParseError);
+    expect(() => TransactionView.fromHex('0003', network)).toThrow(ParseError);
+  });
+});
@@ -0,0 +1,138 @@
+/**
+ * Copyright (c) Hathor Labs and its affiliates.
+ *
+ * This source code is licensed under the MIT license found in the
+ * LICENSE file in the root directory of this source tree.
+ */
+
+import ncApi from '../../src/api/nano';
+import config from '../../src/config';
+import Network from '../../src/models/network';
+import NanoContractTransactionParser from '../../src/nano_contracts/parser';
+import { BlueprintCache, blueprintCache } from '../../src/nano_contracts/blueprint_cache';
+import { NanoContractTransactionParseError } from '../../src/errors';
+import { NanoContractBlueprintInformationAPIResponse } from '../../src/nano_contracts/types';
+
+const ADDRESS = 'WYLW8ujPemSuLJwbeNvvH6y7nakaJ6cEwT';
+
+const blueprintInfo = (id: string) =>
+  ({
+    id,
+    name: 'Test',
+    attributes: {},
+    public_methods: {
+      initialize: { args: [], return_type: 'null' },
+      bet: {
+        args: [
+          { name: 'flag', type: 'bool' },
+          { name: 'label', type: 'str' },
+        ],
+        return_type: 'null',
+      },
+    },
+    private_methods: {},
+  }) as unknown as NanoContractBlueprintInformationAPIResponse;
+
+describe('NanoContractTransactionParser', () => {
+  const network = new Network('testnet');
+  let infoSpy: jest.SpyInstance;
+
+  beforeEach(() => {
+    blueprintCache.clear();
+    infoSpy = jest
+      .spyOn(ncApi, 'getBlueprintInformation')
+      .mockImplementation(async (id: string) => blueprintInfo(id));
+  });
+
+  afterEach(() => {
+    infoSpy.mockRestore();
+    blueprintCache.clear();
+  });
+
+  it('should parse the arguments with the cached blueprint decoder', async () => {
+    // 2 arguments, true and 'abc'
+    const parser = new NanoContractTransactionParser(
+      'bp1',
+      'bet',
+      ADDRESS,
+      network,
+      '020103616263'
+    );
+    await parser.parseArguments();
+    expect(parser.parsedArgs).toEqual([
+      { name: 'flag', type: 'bool', value: true },
+      { name: 'label', type: 'str', value: 'abc' },
+    ]);
+
+    const other = new NanoContractTransactionParser('bp1', 'bet', ADDRESS, network, '020003646566');
+    await other.parseArguments();
+    expect(other.parsedArgs).toEqual([
+      { name: 'flag', type: 'bool', value: false },
+      { name: 'label', type: 'str', value: 'def' },
+    ]);
+    expect(infoSpy).toHaveBeenCalledTimes(1);
+
+    // Methods without arguments keep the parsed arguments empty
+    const init = new NanoContractTransactionParser('bp1', 'initialize', ADDRESS, network, '00');
+    await init.parseArguments();
+    expect(init.parsedArgs).toBeNull();
+
+    const missing = new NanoContractTransactionParser('bp1', 'missing', ADDRESS, network, '00');
+    await expect(missing.parseArguments()).rejects.toThrow(NanoContractTransactionParseError);
+
+    const wrongCount = new NanoContractTransactionParser('bp1', 'bet', ADDRESS, network, '0101');
+    await expect(wrongCount.parseArguments()).rejects.toThrow(
+      'Number of arguments do not match blueprint.'
+    );
+  });
+
+  it('should request each blueprint once when parsing a batch', async () => {
+    const parsers = [
+      new NanoContractTransactionParser('bp1', 'bet', ADDRESS, network, '020103616263'),
+      new NanoContractTransactionParser('bp2', 'bet', ADDRESS, network, '020103616263'),
+      new NanoContractTransactionParser('bp1', 'bet', ADDRESS, network, '0101'),
+      new NanoContractTransactionParser('bp2', 'initialize', ADDRESS, network, null),
+    ];
+
+    const errors = await NanoContractTransactionParser.parseArgumentsBatch(parsers);
+
+    expect(errors[0]).toBeNull();
+    expect(errors[1]).toBeNull();
+    expect(errors[2]).toBeInstanceOf(NanoContractTransactionParseError);
+    expect(errors[3]).toBeNull();
+    expect(parsers[1].parsedArgs).toHaveLength(2);
+    expect(infoSpy).toHaveBeenCalledTimes(2);
+  });
+
+  it('should evict the least recently used blueprint and retry failed requests', async () => {
+    const cache = new BlueprintCache(2);
+    await cache.getBlueprintInformation('bp1');
+    await cache.getBlueprintInformation('bp2');
+    await cache.getBlueprintInformation('bp1');
+    await cache.getBlueprintInformation('bp3');
+    const server = config.getServerUrl();
+    expect([...cache.entries.keys()]).toEqual([`${server}|bp1`, `${server}|bp3`]);
+    expect(infoSpy).toHaveBeenCalledTimes(3);
+
+    infoSpy.mockRejectedValueOnce(new Error('not found'));
+    await expect(cache.getBlueprintInformation('bp4')).rejects.toThrow('not found');
+    await expect(cache.getBlueprintInformation('bp4')).resolves.toMatchObject({ id: 'bp4' });
+  });
+
+  it('should keep the blueprints of each full node server apart', async () => {
+    const cache = new BlueprintCache();
+    const server = config.getServerUrl();
+    try {
+      await cache.getBlueprintInformation('bp1');
+      config.setServerUrl('https://node2.hathor.network/v1a/');
+      await cache.getBlueprintInformation('bp1');
+      await cache.getBlueprintInformation('bp1');
+      expect(infoSpy).toHaveBeenCalledTimes(2);
+      config.setServerUrl(server);
+      await cache.getBlueprintInformation('bp1');
+      expect(infoSpy).toHaveBeenCalledTimes(2);
+    } finally {
+      config.setServerUrl(server);
+    }
+  });
+});
@@ -10,6 +10,7 @@ import Address from '../../src/models/address';
 import HathorWallet from '../../src/new/wallet';
 import {
   NanoContractTransactionError,
+  SyncCheckpointTooOldError,
   TxNotFoundError,
   WalletFromXPubGuard,
 } from '../../src/errors';
@@ -26,7 +27,7 @@ import {
 } from '../../src/constants';
 import { MemoryStore, Storage } from '../../src/storage';
 import Queue from '../../src/models/queue';
-import { EcdsaTxSign, IHistoryTx, WalletType } from '../../src/types';
+import { EcdsaTxSign, IHistoryTx, TxHistoryProcessingStatus, WalletType } from '../../src/types';
 import { WalletWebSocketData } from '../../src/new/types';
 import txApi from '../../src/api/txApi';
 import * as addressUtils from '../../src/utils/address';
@@ -507,32 +508,175 @@ test('getWalletInputInfo', async () => {
   });
 });
 
+/**
+ * Mock of the storage methods used when processing websocket txs, saving copies of the txs.
+ */
+function mockWsTxStorage(initialTxs: Record<string, unknown>[] = []) {
+  const saved = new Map(initialTxs.map(tx => [tx.tx_id as string, tx]));
+  return {
+    saved,
+    getTx: jest.fn(async (txId: string) => {
+      const tx = saved.get(txId);
+      return tx ? { ...tx } : null;
+    }),
+    addTx: jest.fn(async tx => {
+      saved.set(tx.tx_id, { ...tx });
+    }),
+    addTxs: jest.fn(async txs => {
+      for (const tx of txs) saved.set(tx.tx_id, { ...tx });
+    }),
+    processHistory: jest.fn(),
+    processSyncChanges: jest.fn(),
+    processNewTx: jest.fn(),
+    processNewTxBatch: jest.fn(),
+    reprocessTx: jest.fn(),
+  };
+}
+
 test('processTxQueue', async () => {
   const hWallet = new FakeHathorWallet();
 
-  const processedTxs = [];
-  hWallet.onNewTx.mockImplementation(data => {
-    processedTxs.push(data);
-    return Promise.resolve();
-  });
-  hWallet.storage = {
-    processHistory: jest.fn(),
-  };
+  hWallet.parseWsTx.mockImplementation(data => ({ ...data.history }));
+  hWallet.scanAddressesToLoad.mockResolvedValue(undefined);
+  hWallet.emit = jest.fn();
+  hWallet.walletStopped = false;
+  hWallet.storage = mockWsTxStorage([{ tx_id: 'tx1' }]);
 
   // wsTxQueue is not part of the prototype so it won't be faked on FakeHathorWallet
   hWallet.wsTxQueue = new Queue<WalletWebSocketData>();
-  hWallet.wsTxQueue.enqueue({ type: 'fakeType' });
-  hWallet.wsTxQueue.enqueue({ type: 'fakeType' });
-  hWallet.wsTxQueue.enqueue({ type: 'fakeType' });
+  hWallet.wsTxQueue.enqueue({ type: 'fakeType', history: { tx_id: 'tx1' } });
+  hWallet.wsTxQueue.enqueue({ type: 'fakeType', history: { tx_id: 'tx2' } });
+  hWallet.wsTxQueue.enqueue({ type: 'fakeType', history: { tx_id: 'tx3' } });
 
   await hWallet.processTxQueue();
-  expect(processedTxs).toStrictEqual([
-    { type: 'fakeType' },
-    { type: 'fakeType' },
-    { type: 'fakeType' },
+  // The queued txs are saved and processed once with the rest of the history
+  expect(hWallet.storage.addTx).toHaveBeenCalledTimes(3);
+  expect(hWallet.storage.processNewTx).not.toHaveBeenCalled();
+  expect(hWallet.storage.processSyncChanges).toHaveBeenCalledTimes(1);
+  // The scanning policy is checked once for the whole queue
+  expect(hWallet.scanAddressesToLoad).toHaveBeenCalledTimes(1);
+  for (const txId of ['tx1', 'tx2', 'tx3']) {
+    expect(hWallet.storage.saved.get(txId).processingStatus).toEqual(
+      TxHistoryProcessingStatus.FINISHED
+    );
+  }
+  expect(hWallet.emit.mock.calls.map(([event, tx]) => [event, tx.tx_id])).toEqual([
+    ['update-tx', 'tx1'],
+    ['new-tx', 'tx2'],
+    ['new-tx', 'tx3'],
   ]);
 });
 
+test('onNewTxBatch', async () => {
+  const hWallet = new FakeHathorWallet();
+
+  hWallet.parseWsTx.mockImplementation(data => ({ ...data.history }));
+  hWallet.scanAddressesToLoad.mockResolvedValue(undefined);
+  hWallet.emit = jest.fn();
+  hWallet.logger = { error: jest.fn() };
+  hWallet.walletStopped = false;
+  hWallet.state = HathorWallet.READY;
+  hWallet.storage = mockWsTxStorage([{ tx_id: 'tx1', is_voided: false }]);
+  hWallet.storage.processNewTxBatch.mockImplementation(async (txs, _pin, onTxError) => {
+    onTxError(txs[1], new Error('boom'));
+  });
+  const metadataSpy = jest
+    .spyOn(storageUtils, 'processMetadataChanged')
+    .mockResolvedValue(undefined);
+
+  const msg = (history: Record<string, unknown>) => ({ type: 'wallet:address_history', history });
+  await hWallet.onNewTxBatch([
+    msg({ tx_id: 'tx2', is_voided: false }),
+    msg({ tx_id: 'tx1', is_voided: false }),
+    msg({ tx_id: 'tx3', is_voided: false }),
+    msg({ tx_id: 'tx2', is_voided: false, first_block: 'block1' }),
+  ]);
+
+  // The new txs are processed in a single pass, with the latest data of each tx
+  expect(hWallet.storage.processNewTxBatch).toHaveBeenCalledTimes(1);
+  expect(hWallet.storage.processNewTxBatch.mock.calls[0][0]).toEqual([
+    expect.objectContaining({ tx_id: 'tx2', first_block: 'block1' }),
+    expect.objectContaining({ tx_id: 'tx3' }),
+  ]);
+  expect(metadataSpy).toHaveBeenCalledTimes(1);
+  expect(hWallet.storage.reprocessTx).not.toHaveBeenCalled();
+  expect(hWallet.scanAddressesToLoad).toHaveBeenCalledTimes(1);
+  expect(hWallet.state).toEqual(HathorWallet.READY);
+
+  // A failed tx is not marked as finished
+  expect(hWallet.logger.error).toHaveBeenCalledTimes(1);
+  expect(hWallet.storage.saved.get('tx3').processingStatus).toEqual(
+    TxHistoryProcessingStatus.PROCESSING
+  );
+  expect(hWallet.storage.saved.get('tx2').processingStatus).toEqual(
+    TxHistoryProcessingStatus.FINISHED
+  );
+  expect(hWallet.emit.mock.calls.map(([event, tx]) => [event, tx.tx_id])).toEqual([
+    ['new-tx', 'tx2'],
+    ['update-tx', 'tx1'],
+  ]);
+});
+
+test('handleWebsocketMsg with websocket tx batches', async () => {
+  jest.useFakeTimers();
+  try {
+    const hWallet = new FakeHathorWallet();
+
+    const batches = [];
+    hWallet.onNewTxBatch.mockImplementation(batch => {
+      batches.push(batch.map(data => data.history[0]));
+      return Promise.resolve();
+    });
+    hWallet.emit = jest.fn();
+    hWallet.logger = { error: jest.fn() };
+    hWallet.walletStopped = false;
+    hWallet.newTxPromise = Promise.resolve();
+    hWallet.wsTxQueue = new Queue<WalletWebSocketData>();
+    hWallet.wsTxBatch = { maxSize: 3, maxDelay: 50 };
+    hWallet.wsTxBatchPending = [];
+    hWallet.wsTxBatchTimer = null;
+    hWallet.state = HathorWallet.READY;
+
+    const msg = (n: number) => ({ type: 'wallet:address_history', history: [n] });
+
+    // A full batch is processed right away
+    hWallet.handleWebsocketMsg(msg(1));
+    hWallet.handleWebsocketMsg(msg(2));
+    hWallet.handleWebsocketMsg(msg(3));
+    hWallet.handleWebsocketMsg(msg(4));
+    await hWallet.newTxPromise;
+    expect(batches).toEqual([[1, 2, 3]]);
+    expect(hWallet.wsTxBatchPending).toHaveLength(1);
+
+    // A partial batch waits for the batch delay
+    jest.advanceTimersByTime(50);
+    await hWallet.newTxPromise;
+    expect(batches).toEqual([[1, 2, 3], [4]]);
+
+    // A failed batch does not stop the next ones
+    hWallet.onNewTxBatch.mockRejectedValueOnce(new Error('boom'));
+    hWallet.handleWebsocketMsg(msg(5));
+    hWallet.flushWsTxBatch();
+    hWallet.handleWebsocketMsg(msg(6));
+    hWallet.flushWsTxBatch();
+    await hWallet.newTxPromise;
+    expect(batches).toEqual([[1, 2, 3], [4], [6]]);
+    expect(hWallet.logger.error).toHaveBeenCalledTimes(1);
+
+    // The pending batch is queued when the wallet leaves the ready state
+    hWallet.handleWebsocketMsg(msg(7));
+    hWallet.setState(HathorWallet.CONNECTING);
+    expect(hWallet.wsTxBatchPending).toHaveLength(0);
+    expect(hWallet.wsTxBatchTimer).toBeNull();
+    expect(hWallet.wsTxQueue.dequeue()).toEqual(msg(7));
+    jest.advanceTimersByTime(50);
+    await hWallet.newTxPromise;
+    expect(batches).toHaveLength(3);
+  } finally {
+    jest.useRealTimers();
+  }
+});
+
 test('handleWebsocketMsg', async () => {
   const hWallet = new FakeHathorWallet();
 
@@ -673,6 +817,82 @@ test('setState', async () => {
   expect(hWallet.state).toEqual(HathorWallet.READY);
 });
 
+test('refreshSyncCheckpoint only requests the checkpoint block on a new height', async () => {
+  const hWallet = new FakeHathorWallet();
+  const store = new MemoryStore();
+  const flush = jest.fn();
+  // Only persistent stores resume from the checkpoint
+  Object.assign(store, { flush });
+  hWallet.storage = new Storage(store);
+  hWallet.state = HathorWallet.READY;
+  hWallet.walletStopped = false;
+  hWallet.syncCheckpointBlock = null;
+  const blockSpy = jest
+    .spyOn(txApi, 'getBlockAtHeight')
+    .mockImplementation((height, resolve) => {
+      resolve({ success: true, block: { tx_id: `block-${height}` } });
+      return Promise.resolve();
+    });
+  let now = 1_000_000;
+  jest.spyOn(Date, 'now').mockImplementation(() => now);
+
+  await store.setCurrentHeight(10);
+  await hWallet.refreshSyncCheckpoint();
+  await hWallet.refreshSyncCheckpoint();
+  expect(blockSpy).toHaveBeenCalledTimes(1);
+  // The checkpoint is persisted by the debounced flush of the store
+  expect(flush).not.toHaveBeenCalled();
+
+  // A new block within the refresh interval keeps the previous checkpoint block
+  await store.setCurrentHeight(11);
+  now += 1000;
+  await hWallet.refreshSyncCheckpoint();
+  expect(blockSpy).toHaveBeenCalledTimes(1);
+  await expect(hWallet.storage.getSyncCheckpoint()).resolves.toMatchObject({
+    height: 10,
+    blockHash: 'block-10',
+    timestamp: 1000,
+  });
+
+  now += 60_000;
+  await hWallet.refreshSyncCheckpoint();
+  expect(blockSpy).toHaveBeenCalledTimes(2);
+  await expect(hWallet.storage.getSyncCheckpoint()).resolves.toMatchObject({
+    height: 11,
+    blockHash: 'block-11',
+    timestamp: 1061,
+  });
+});
+
+test('resumeFromSyncCheckpoint falls back to a full sync when it fails', async () => {
+  const hWallet = new FakeHathorWallet();
+  hWallet.storage = new Storage(new MemoryStore());
+  hWallet.logger = { info: jest.fn(), warn: jest.fn(), error: jest.fn(), debug: jest.fn() };
+  await hWallet.storage.saveSyncCheckpoint('block-10', { height: 10 });
+  const checkpoint = await hWallet.storage.getSyncCheckpoint();
+  const bestChainSpy = jest
+    .spyOn(storageUtils, 'isSyncCheckpointOnBestChain')
+    .mockResolvedValue(true);
+  hWallet.syncHistorySinceCheckpoint.mockRejectedValue(new SyncCheckpointTooOldError('too old'));
+
+  await expect(hWallet.resumeFromSyncCheckpoint(checkpoint)).resolves.toBe(false);
+  await expect(hWallet.storage.getSyncCheckpoint()).resolves.toBeNull();
+  // The whole history is processed after the full sync
+  expect(hWallet.storage.syncChanges).toBeNull();
+
+  // Failing to reach the full node does not fail the load either
+  await hWallet.storage.saveSyncCheckpoint('block-10', { height: 10 });
+  hWallet.syncHistorySinceCheckpoint.mockRejectedValue(new Error('boom'));
+  await expect(hWallet.resumeFromSyncCheckpoint(checkpoint)).resolves.toBe(false);
+  await expect(hWallet.storage.getSyncCheckpoint()).resolves.toBeNull();
+
+  await hWallet.storage.saveSyncCheckpoint('block-10', { height: 10 });
+  bestChainSpy.mockRejectedValue(new Error('Request failed'));
+  await expect(hWallet.resumeFromSyncCheckpoint(checkpoint)).resolves.toBe(false);
+  await expect(hWallet.storage.getSyncCheckpoint()).resolves.toBeNull();
+  expect(hWallet.logger.warn).toHaveBeenCalledTimes(2);
+});
+
 test('getAddressAtIndex', async () => {
   const store = new MemoryStore();
   const storage = new Storage(store);
@@ -0,0 +1,122 @@
+/**
+ * Copyright (c) Hathor Labs and its affiliates.
+ *
+ * This source code is licensed under the MIT license found in the
+ * LICENSE file in the root directory of this source tree.
+ */
+
+import SendTransactionBatch from '../../src/new/sendTransactionBatch';
+import SendTransaction from '../../src/new/sendTransaction';
+import Transaction from '../../src/models/transaction';
+import { MemoryStore, Storage } from '../../src/storage';
+import { IHistoryTx } from '../../src/types';
+
+const FUNDING_TX = 'aa'.repeat(32);
+
+async function createStorage(): Promise<Storage> {
+  const store = new MemoryStore();
+  const storage = new Storage(store);
+  await store.saveTx({
+    tx_id: FUNDING_TX,
+    version: 1,
+    timestamp: 1,
+    is_voided: false,
+    inputs: [],
+    outputs: [0, 1, 2].map(() => ({
+      value: 10n,
+      token_data: 0,
+      token: '00',
+      script: '',
+      decoded: {},
+      spent_by: null,
+    })),
+    tokens: [],
+  } as unknown as IHistoryTx);
+  jest.spyOn(storage, 'startSigningSession').mockResolvedValue();
+  jest.spyOn(storage, 'closeSigningSession');
+  return storage;
+}
+
+function mockSendTransaction(
+  storage: Storage,
+  inputIndexes: number[],
+  { pushError }: { pushError?: Error } = {}
+) {
+  const transaction = {
+    inputs: inputIndexes.map(index => ({ hash: FUNDING_TX, index })),
+  } as unknown as Transaction;
+  return {
+    transaction,
+    prepareTx: jest.fn().mockResolvedValue(transaction),
+    signTx: jest.fn().mockResolvedValue(transaction),
+    runFromMining: pushError
+      ? jest.fn().mockRejectedValue(pushError)
+      : jest.fn().mockResolvedValue(transaction),
+    releaseUtxos: jest.fn(async () => {
+      for (const index of inputIndexes) {
+        await storage.utxoSelectAsInput({ txId: FUNDING_TX, index }, false);
+      }
+    }),
+  };
+}
+
+describe('SendTransactionBatch', () => {
+  it('should not send two transactions spending the same utxo', async () => {
+    const storage = await createStorage();
+    const sendTxs = [
+      mockSendTransaction(storage, [0]),
+      mockSendTransaction(storage, [0, 1]),
+      mockSendTransaction(storage, [2]),
+    ];
+    const batch = new SendTransactionBatch(storage, sendTxs as unknown as SendTransaction[], {
+      pin: '123',
+    });
+
+    const results = await batch.run();
+
+    expect(results.map(r => r.success)).toEqual([true, false, true]);
+    expect(results[1].error?.message).toMatch(/already selected/);
+    expect(results[0].transaction).toBe(sendTxs[0].transaction);
+    expect(sendTxs[1].signTx).not.toHaveBeenCalled();
+    expect(sendTxs[1].runFromMining).not.toHaveBeenCalled();
+    // The failed transaction does not release the utxo reserved by the first one
+    expect(sendTxs[1].releaseUtxos).not.toHaveBeenCalled();
+    await expect(storage.isUtxoSelectedAsInput({ txId: FUNDING_TX, index: 0 })).resolves.toBe(
+      true
+    );
+    await expect(storage.isUtxoSelectedAsInput({ txId: FUNDING_TX, index: 1 })).resolves.toBe(
+      false
+    );
+
+    // The keys are unlocked once for the whole batch
+    expect(storage.startSigningSession).toHaveBeenCalledTimes(1);
+    expect(storage.startSigningSession).toHaveBeenCalledWith('123');
+    expect(storage.closeSigningSession).toHaveBeenCalledTimes(1);
+  });
+
+  it('should release the inputs of a transaction that fails to be pushed', async () => {
+    const storage = await createStorage();
+    const sendTxs = [
+      mockSendTransaction(storage, [0], { pushError: new Error('push failed') }),
+      mockSendTransaction(storage, [1]),
+    ];
+    const batch = new SendTransactionBatch(storage, sendTxs as unknown as SendTransaction[], {
+      pin: '123',
+      concurrency: 1,
+    });
+
+    const results = await batch.run();
+
+    expect(results[0]).toEqual({
+      index: 0,
+      success: false,
+      transaction: null,
+      error: new Error('push failed'),
+    });
+    expect(results[1].success).toBe(true);
+    expect(sendTxs[0].releaseUtxos).toHaveBeenCalled();
+    await expect(storage.isUtxoSelectedAsInput({ txId: FUNDING_TX, index: 0 })).resolves.toBe(
+      false
+    );
+  });
+});
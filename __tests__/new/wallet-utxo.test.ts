@@ -11,6 +11,7 @@ import {
 import { encryptData } from '../../src/utils/crypto';
 import { WalletType } from '../../src/types';
 import walletApi from '../../src/api/wallet';
+import Queue from '../../src/models/queue';
 
 class FakeHathorWallet {
   constructor() {
@@ -194,4 +195,34 @@ describe('UTXO Consolidation', () => {
       new Error("Utxo consolidation to an address not owned by this wallet isn't allowed.")
     );
   });
+
+  test('consolidate the dust utxos when the wallet is idle', async () => {
+    Object.assign(hathorWallet, {
+      state: HathorWallet.READY,
+      lastWsTxAt: 0,
+      wsTxQueue: new Queue(),
+      wsTxBatchPending: [],
+      utxoConsolidationRunning: false,
+      logger: { info: jest.fn(), error: jest.fn() },
+    });
+    hathorWallet.sendManyOutputsSendTransaction.mockClear();
+    const options = { dustThreshold: 2n, minUtxos: 2, destinationAddress };
+
+    // Not enough dust utxos
+    await expect(
+      hathorWallet.runUtxoConsolidation({ ...options, minUtxos: 3 })
+    ).resolves.toBeNull();
+
+    // The wallet received a transaction recently
+    hathorWallet.lastWsTxAt = Date.now();
+    await expect(hathorWallet.runUtxoConsolidation(options)).resolves.toBeNull();
+    expect(hathorWallet.sendManyOutputsSendTransaction).not.toHaveBeenCalled();
+
+    hathorWallet.lastWsTxAt = 0;
+    await expect(hathorWallet.runUtxoConsolidation(options)).resolves.toBe('123');
+    expect(hathorWallet.sendManyOutputsSendTransaction.mock.calls[0][0]).toEqual([
+      { address: destinationAddress, value: 2n, token: '00' },
+    ]);
+    expect(hathorWallet.sendManyOutputsSendTransaction.mock.calls[0][1].inputs).toHaveLength(2);
+  });
 });
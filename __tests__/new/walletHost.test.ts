@@ -0,0 +1,163 @@
+/**
+ * Copyright (c) Hathor Labs and its affiliates.
+ *
+ * This source code is licensed under the MIT license found in the
+ * LICENSE file in the root directory of this source tree.
+ */
+
+import WalletHost from '../../src/new/walletHost';
+import SyncScheduler from '../../src/sync/scheduler';
+import { ConnectionState } from '../../src/wallet/types';
+import { getDefaultLogger } from '../../src/types';
+
+const ADDR_A = 'WZ7pDnkPnxbs14GHdUFivFzPbzitwNtvZo';
+const ADDR_B = 'WewDeXWyvHP7jJTs7tjLoQfoB72LLxJQqN';
+const ADDR_C = 'WmtWgtk5GxdcDKwjNwmXXn74nQWTPWhKfx';
+
+function makeTxMessage(inputAddress: string, outputAddress: string) {
+  return {
+    type: 'wallet:address_history',
+    history: {
+      tx_id: '00'.repeat(32),
+      inputs: [{ decoded: { address: inputAddress } }],
+      outputs: [{ decoded: { address: outputAddress } }],
+    },
+  };
+}
+
+describe('WalletHost', () => {
+  let host: WalletHost;
+  let subscribeSpy: jest.SpyInstance;
+  let unsubscribeSpy: jest.SpyInstance;
+
+  beforeEach(() => {
+    host = new WalletHost({
+      network: 'testnet',
+      servers: ['http://localhost:8080/v1a/'],
+      logger: getDefaultLogger(),
+      scheduler: { concurrency: 2 },
+    });
+    // Don't open the shared websocket
+    jest.spyOn(host.connection, 'start').mockImplementation(() => {});
+    subscribeSpy = jest.spyOn(host.connection, 'subscribeAddresses').mockImplementation(() => {});
+    unsubscribeSpy = jest
+      .spyOn(host.connection, 'unsubscribeAddress')
+      .mockImplementation(() => {});
+  });
+
+  it('should create the scheduler from the options', () => {
+    expect(host.scheduler).toBeInstanceOf(SyncScheduler);
+    expect(host.scheduler.concurrency).toEqual(2);
+  });
+
+  it('should follow the state of the shared connection', async () => {
+    const conn = host.createConnection();
+    expect(conn.getState()).toEqual(ConnectionState.CLOSED);
+    expect(conn.websocket).toBeNull();
+
+    conn.start();
+    expect(host.connection.start).toHaveBeenCalledTimes(1);
+    expect(conn.getState()).toEqual(ConnectionState.CONNECTING);
+
+    host.connection.setState(ConnectionState.CONNECTED);
+    expect(conn.getState()).toEqual(ConnectionState.CONNECTED);
+
+    // A wallet started later is connected right away
+    const other = host.createConnection();
+    other.start();
+    expect(host.connection.start).toHaveBeenCalledTimes(1);
+    expect(other.getState()).toEqual(ConnectionState.CONNECTED);
+
+    // Hosted wallets don't stream their history
+    await expect(conn.hasCapability('history-streaming')).resolves.toBe(false);
+    expect(conn.lockStream('stream-id')).toBe(false);
+  });
+
+  it('should subscribe each address once on the shared connection', () => {
+    const conn1 = host.createConnection();
+    const conn2 = host.createConnection();
+    conn1.start();
+    conn2.start();
+
+    conn1.subscribeAddresses([ADDR_A, ADDR_B]);
+    conn2.subscribeAddresses([ADDR_B, ADDR_C]);
+    expect(subscribeSpy).toHaveBeenNthCalledWith(1, [ADDR_A, ADDR_B]);
+    expect(subscribeSpy).toHaveBeenNthCalledWith(2, [ADDR_C]);
+
+    // ADDR_B is still used by the second wallet
+    conn1.unsubscribeAddress(ADDR_B);
+    expect(unsubscribeSpy).not.toHaveBeenCalled();
+
+    // Stopping the second wallet removes its subscriptions
+    conn2.stop();
+    expect(conn2.getState()).toEqual(ConnectionState.CLOSED);
+    expect(unsubscribeSpy).toHaveBeenCalledWith(ADDR_B);
+    expect(unsubscribeSpy).toHaveBeenCalledWith(ADDR_C);
+    expect(unsubscribeSpy).not.toHaveBeenCalledWith(ADDR_A);
+    expect([...host.addressIndex.keys()]).toEqual([ADDR_A]);
+
+    // The subscriptions are made again when the shared connection reconnects
+    subscribeSpy.mockClear();
+    host.connection.setState(ConnectionState.CONNECTING);
+    host.connection.setState(ConnectionState.CONNECTED);
+    expect(subscribeSpy).toHaveBeenCalledWith([ADDR_A]);
+  });
+
+  it('should route the transactions to the wallets of their addresses', () => {
+    const conn1 = host.createConnection();
+    const conn2 = host.createConnection();
+    const conn3 = host.createConnection();
+    const updates1 = jest.fn();
+    const updates2 = jest.fn();
+    const updates3 = jest.fn();
+    conn1.on('wallet-update', updates1);
+    conn2.on('wallet-update', updates2);
+    conn3.on('wallet-update', updates3);
+    for (const conn of [conn1, conn2, conn3]) {
+      conn.start();
+    }
+    conn1.subscribeAddresses([ADDR_A]);
+    conn2.subscribeAddresses([ADDR_B]);
+
+    // Sent by the first wallet to the second
+    const tx = makeTxMessage(ADDR_A, ADDR_B);
+    host.connection.emit('wallet-update', tx);
+    expect(updates1).toHaveBeenCalledWith(tx);
+    expect(updates2).toHaveBeenCalledWith(tx);
+    expect(updates3).not.toHaveBeenCalled();
+
+    // Transactions of no hosted wallet are dropped
+    host.connection.emit('wallet-update', makeTxMessage(ADDR_C, ADDR_C));
+    expect(updates1).toHaveBeenCalledTimes(1);
+    expect(updates2).toHaveBeenCalledTimes(1);
+
+    // Other messages are sent to all wallets
+    host.connection.emit('wallet-update', { type: 'wallet:other' });
+    expect(updates3).toHaveBeenCalledWith({ type: 'wallet:other' });
+  });
+
+  it('should remove its listeners on stop and be able to start again', () => {
+    jest.spyOn(host.connection, 'stop').mockImplementation(() => {});
+    const { websocket } = host.connection;
+    const conn = host.createConnection();
+    conn.start();
+    expect(host.started).toBe(true);
+    expect(host.connection.listenerCount('wallet-update')).toEqual(1);
+    expect(websocket!.listenerCount('dashboard')).toEqual(1);
+
+    host.stop();
+    expect(host.started).toBe(false);
+    expect(conn.getState()).toEqual(ConnectionState.CLOSED);
+    for (const event of ['state', 'wallet-update', 'best-block-update']) {
+      expect(host.connection.listenerCount(event)).toEqual(0);
+    }
+    expect(websocket!.listenerCount('dashboard')).toEqual(0);
+    expect(websocket!.listenerCount('subscribe_address')).toEqual(0);
+
+    // The next wallet starts the host again, without duplicating the listeners
+    host.createConnection().start();
+    expect(host.connection.start).toHaveBeenCalledTimes(2);
+    expect(host.connection.listenerCount('wallet-update')).toEqual(1);
+    expect(websocket!.listenerCount('subscribe_address')).toEqual(1);
+  });
+});
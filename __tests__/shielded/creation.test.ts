@@ -139,6 +139,80 @@ describe('createShieldedOutputs', () => {
     expect(provider.createSurjectionProof).toHaveBeenCalledTimes(2);
   });
 
+  it('should build the surjection domain once and cache the tags per token', async () => {
+    const provider = makeMockProvider();
+    const otherToken = 'ab'.repeat(32);
+    const proposals = [
+      makeProposal({ value: 10n, shieldedMode: ShieldedOutputMode.FULLY_SHIELDED }),
+      makeProposal({ value: 20n, shieldedMode: ShieldedOutputMode.FULLY_SHIELDED }),
+      makeProposal({ value: 30n, shieldedMode: ShieldedOutputMode.FULLY_SHIELDED }),
+    ];
+    const inputGenerators = [
+      { tokenUid: '00' },
+      { tokenUid: '00' },
+      { tokenUid: otherToken, assetBlindingFactor: Buffer.alloc(32, 0x0c) },
+    ];
+
+    await createShieldedOutputs(proposals, provider, network, inputGenerators);
+
+    // One tag per token UID, shared by the domain and the codomains
+    expect(provider.deriveTag).toHaveBeenCalledTimes(2);
+    // The two unblinded HTR inputs share a generator
+    expect(provider.createAssetCommitment).toHaveBeenCalledTimes(2);
+    expect(provider.createSurjectionProof).toHaveBeenCalledTimes(3);
+    const domains = (provider.createSurjectionProof as jest.Mock).mock.calls.map(call => call[2]);
+    expect(domains[0]).toHaveLength(3);
+    expect(domains[1]).toBe(domains[0]);
+    expect(domains[2]).toBe(domains[0]);
+  });
+
+  it('should build the non-balancing outputs concurrently and the balancing output last', async () => {
+    const pending: (() => void)[] = [];
+    const createAmountShieldedOutput = jest.fn().mockImplementation(
+      () =>
+        new Promise(resolve => {
+          const index = pending.length;
+          pending.push(() =>
+            resolve({
+              ephemeralPubkey: Buffer.alloc(33, 0x02),
+              commitment: Buffer.alloc(33, 0x03),
+              rangeProof: Buffer.alloc(10, 0x04),
+              blindingFactor: Buffer.alloc(32, index + 1),
+            })
+          );
+        })
+    );
+    const provider = makeMockProvider({ createAmountShieldedOutput });
+    const proposals = [
+      makeProposal({ value: 10n }),
+      makeProposal({ value: 20n }),
+      makeProposal({ value: 30n }),
+    ];
+
+    const promise = createShieldedOutputs(proposals, provider, network);
+    await new Promise(resolve => setTimeout(resolve, 0));
+    // Both random-blinded outputs are in flight, the balancing output waits for them
+    expect(createAmountShieldedOutput).toHaveBeenCalledTimes(2);
+    expect(provider.computeBalancingBlindingFactor).not.toHaveBeenCalled();
+    // Resolve them out of order
+    pending[1]();
+    pending[0]();
+    await new Promise(resolve => setTimeout(resolve, 0));
+    expect(provider.computeBalancingBlindingFactor).toHaveBeenCalledWith(
+      30n,
+      expect.any(Buffer),
+      [],
+      [
+        expect.objectContaining({ value: 10n, valueBlindingFactor: Buffer.alloc(32, 1) }),
+        expect.objectContaining({ value: 20n, valueBlindingFactor: Buffer.alloc(32, 2) }),
+      ]
+    );
+    pending[2]();
+
+    const results = await promise;
+    expect(results.map(output => output.value)).toEqual([10n, 20n, 30n]);
+  });
+
   it('rejects a single-output call (hathor-core trivial-commitment rule)', async () => {
     const provider = makeMockProvider();
     const proposals = [makeProposal({ value: 100n })];
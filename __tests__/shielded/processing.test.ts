@@ -7,7 +7,12 @@
 
 /* eslint-disable @typescript-eslint/no-explicit-any */
 import { HDPrivateKey } from 'bitcore-lib';
-import { resolveTokenUid, processShieldedOutputs } from '../../src/shielded/processing';
+import {
+  resolveTokenUid,
+  processShieldedOutputs,
+  rewindShieldedOutputsBatch,
+  ShieldedRewindContext,
+} from '../../src/shielded/processing';
 import { NATIVE_TOKEN_UID_HEX, NATIVE_TOKEN_UID } from '../../src/constants';
 import {
   ShieldedOutputMode,
@@ -456,3 +461,83 @@ describe('processShieldedOutputs (SEPARATED model — write in place)', () => {
     expect(errorMsg).toMatch(/expected assetCommitment=[0-9a-f]+/);
   });
 });
+
+describe('rewindShieldedOutputsBatch', () => {
+  function makeStorage(xpriv: string | Error) {
+    return {
+      isAddressMine: jest.fn().mockImplementation(async (addr: string) => addr !== 'other'),
+      getAddressInfo: jest.fn().mockResolvedValue({ bip32AddressIndex: 4 }),
+      getScanXPrivKey:
+        xpriv instanceof Error
+          ? jest.fn().mockRejectedValue(xpriv)
+          : jest.fn().mockResolvedValue(xpriv),
+      logger: { warn: jest.fn(), error: jest.fn(), debug: jest.fn() },
+    } as any;
+  }
+
+  it('should unlock the scan xpriv once and apply the results in tx order', async () => {
+    const mockXpriv = new HDPrivateKey().deriveNonCompliantChild(0).xprivkey;
+    const storage = makeStorage(mockXpriv);
+    const txs = [1, 2, 3].map(i =>
+      makeHistoryTx({
+        tx_id: `tx${i}`,
+        outputs: [{ value: 1n } as any],
+        shielded_outputs: [
+          makeShieldedOutput({ decoded: { type: 'P2PKH', address: 'addr1' } }),
+          makeShieldedOutput({ decoded: { type: 'P2PKH', address: 'other' } }),
+        ],
+      })
+    );
+    // Resolve the rewinds out of order, the results must still land on their slots.
+    let call = 0;
+    const provider = makeMockProvider({
+      rewindAmountShieldedOutput: jest.fn().mockImplementation(async () => {
+        call++;
+        const value = BigInt(call * 100);
+        await new Promise(resolve => {
+          setTimeout(resolve, 10 - call * 3);
+        });
+        return { value, blindingFactor: Buffer.alloc(32, call) };
+      }),
+    });
+    const context = new ShieldedRewindContext(storage, 'pin');
+
+    const decodedTxs = await rewindShieldedOutputsBatch(storage, txs, provider, context);
+
+    expect(decodedTxs.map(tx => tx.tx_id)).toEqual(['tx1', 'tx2', 'tx3']);
+    expect(txs.map(tx => tx.shielded_outputs![0].value)).toEqual([100n, 200n, 300n]);
+    expect(txs.map(tx => tx.shielded_outputs![1].value)).toEqual([
+      undefined,
+      undefined,
+      undefined,
+    ]);
+    expect(storage.getScanXPrivKey).toHaveBeenCalledTimes(1);
+    expect(context.childKeys.size).toBe(1);
+
+    // The slots scanned by the batch are not rewound again by the per-tx processing.
+    const result = await processShieldedOutputs(storage, txs[0], provider, 'pin', context);
+    expect(result).toEqual([]);
+    expect(provider.rewindAmountShieldedOutput).toHaveBeenCalledTimes(3);
+
+    context.close();
+    expect(context.childKeys.size).toBe(0);
+  });
+
+  it('should leave the txs untouched when the scan xpriv unlock fails', async () => {
+    const storage = makeStorage(new Error('wrong pin'));
+    const tx = makeHistoryTx({ shielded_outputs: [makeShieldedOutput()] });
+    const provider = makeMockProvider();
+    const context = new ShieldedRewindContext(storage, 'pin');
+
+    const decodedTxs = await rewindShieldedOutputsBatch(storage, [tx], provider, context);
+    expect(decodedTxs).toEqual([]);
+    expect(tx.shielded_outputs![0].value).toBeUndefined();
+
+    // The per-tx processing reaches the same error without unlocking again.
+    await expect(processShieldedOutputs(storage, tx, provider, 'pin', context)).rejects.toThrow(
+      'wrong pin'
+    );
+    expect(storage.getScanXPrivKey).toHaveBeenCalledTimes(1);
+    expect(provider.rewindAmountShieldedOutput).not.toHaveBeenCalled();
+  });
+});
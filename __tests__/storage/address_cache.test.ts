@@ -0,0 +1,104 @@
+/**
+ * Copyright (c) Hathor Labs and its affiliates.
+ *
+ * This source code is licensed under the MIT license found in the
+ * LICENSE file in the root directory of this source tree.
+ */
+
+import { promises as fs } from 'fs';
+import os from 'os';
+import path from 'path';
+import walletUtils from '../../src/utils/wallet';
+import * as addressUtils from '../../src/utils/address';
+import * as derivation from '../../src/sync/derivation_pool';
+import { FileAddressCache, MemoryAddressCache, MemoryStore, Storage } from '../../src/storage';
+import { getP2SHChainKey } from '../../src/storage/address_cache';
+import { loadAddresses } from '../../src/utils/storage';
+
+// Shielded derivation is slow on jest's vm sandbox.
+const DERIVATION_TEST_TIMEOUT = 30000;
+
+describe('address cache', () => {
+  let dir: string;
+
+  const PIN = '0000';
+  const seed = walletUtils.generateWalletWords();
+  const accessData = walletUtils.generateAccessDataFromSeed(seed, {
+    pin: PIN,
+    password: PIN,
+    networkName: 'testnet',
+  });
+
+  beforeEach(async () => {
+    dir = await fs.mkdtemp(path.join(os.tmpdir(), 'hathor-address-cache-'));
+  });
+
+  afterEach(async () => {
+    jest.restoreAllMocks();
+    await fs.rm(dir, { recursive: true, force: true });
+  });
+
+  it('should key multisig chains regardless of the order of the participants', () => {
+    const pubkeys = ['xpubA', 'xpubB', 'xpubC'];
+    const key = getP2SHChainKey({ pubkeys, numSignatures: 2 }, 'testnet');
+    expect(getP2SHChainKey({ pubkeys: [...pubkeys].reverse(), numSignatures: 2 }, 'testnet')).toBe(
+      key
+    );
+    expect(getP2SHChainKey({ pubkeys, numSignatures: 3 }, 'testnet')).not.toBe(key);
+    expect(getP2SHChainKey({ pubkeys, numSignatures: 2 }, 'mainnet')).not.toBe(key);
+  });
+
+  it('should persist the cached addresses on disk', async () => {
+    const cache = new FileAddressCache(dir);
+    const addresses = [
+      { base58: 'addr0', bip32AddressIndex: 0, publicKey: 'pub0' },
+      { base58: 'addr1', bip32AddressIndex: 1, publicKey: 'pub1' },
+    ];
+    await cache.saveAddresses('chain', addresses);
+    await cache.close();
+
+    const restored = new FileAddressCache(dir);
+    const cached = await restored.getAddresses('chain', 0, 5);
+    expect(Array.from(cached.values())).toEqual(addresses);
+    await expect(restored.getAddresses('other', 0, 5)).resolves.toEqual(new Map());
+
+    // A corrupted file is discarded
+    await fs.writeFile(path.join(dir, 'broken.json'), '{', 'utf8');
+    await expect(restored.getAddresses('broken', 0, 1)).resolves.toEqual(new Map());
+  });
+
+  it(
+    'should load the addresses of a restarted wallet without deriving',
+    async () => {
+      const cache = new MemoryAddressCache();
+      const storage = new Storage(new MemoryStore());
+      await storage.saveAccessData(accessData);
+      storage.setAddressCache(cache);
+      const loaded = await loadAddresses(0, 5, storage);
+
+      const restarted = new Storage(new MemoryStore());
+      await restarted.saveAccessData(accessData);
+      restarted.setAddressCache(cache);
+      const deriveSpies = [
+        jest.spyOn(derivation, 'deriveP2PKHAddresses'),
+        jest.spyOn(derivation, 'deriveShieldedAddressPairs'),
+        jest.spyOn(addressUtils, 'deriveAddressP2PKH'),
+        jest.spyOn(addressUtils, 'deriveShieldedAddressPair'),
+      ];
+
+      await expect(loadAddresses(0, 5, restarted)).resolves.toEqual(loaded);
+      for (const spy of deriveSpies) {
+        expect(spy).not.toHaveBeenCalled();
+      }
+      for (let i = 0; i < 5; i++) {
+        await expect(restarted.getAddressAtIndex(i)).resolves.toEqual(
+          await storage.getAddressAtIndex(i)
+        );
+        await expect(restarted.getAddressAtIndex(i, { legacy: false })).resolves.toEqual(
+          await storage.getAddressAtIndex(i, { legacy: false })
+        );
+      }
+    },
+    DERIVATION_TEST_TIMEOUT
+  );
+});
@@ -5,7 +5,9 @@
  * LICENSE file in the root directory of this source tree.
  */
 
-import { MemoryStore, Storage } from '../../src/storage';
+import os from 'os';
+import path from 'path';
+import { MemoryStore, FileStore, Storage } from '../../src/storage';
 import { TOKEN_AUTHORITY_MASK, TOKEN_MINT_MASK, GAP_LIMIT } from '../../src/constants';
 import {
   ILockedUtxo,
@@ -36,6 +38,12 @@ describe('locked utxo methods', () => {
     await testLockedUtxoMethods(store);
   });
 
+  it('should work with file store', async () => {
+    const store = new FileStore(path.join(os.tmpdir(), `locked-utxos-${process.pid}.json`));
+    await testLockedUtxoMethods(store);
+    await store.destroy();
+  });
+
   // helper functions
 
   async function countUtxos(store: IStore) {
@@ -0,0 +1,266 @@
+/**
+ * Copyright (c) Hathor Labs and its affiliates.
+ *
+ * This source code is licensed under the MIT license found in the
+ * LICENSE file in the root directory of this source tree.
+ */
+
+import { promises as fs } from 'fs';
+import os from 'os';
+import path from 'path';
+import { FileStore, Storage } from '../../src/storage';
+import { decodeSnapshot, encodeSnapshot } from '../../src/storage/file_store';
+import { IHistoryTx, TokenVersion } from '../../src/types';
+
+describe('FileStore', () => {
+  let dir: string;
+  let filePath: string;
+
+  beforeEach(async () => {
+    dir = await fs.mkdtemp(path.join(os.tmpdir(), 'hathor-file-store-'));
+    filePath = path.join(dir, 'wallet.json');
+  });
+
+  afterEach(async () => {
+    await fs.rm(dir, { recursive: true, force: true });
+  });
+
+  function getTx(txId: string, timestamp: number): IHistoryTx {
+    return {
+      tx_id: txId,
+      version: 1,
+      signalBits: 0,
+      weight: 1,
+      nonce: 0,
+      timestamp,
+      is_voided: false,
+      parents: [],
+      tokens: [],
+      inputs: [],
+      outputs: [
+        {
+          value: 2n ** 60n,
+          token_data: 0,
+          script: 'cafe',
+          decoded: { type: 'P2PKH', address: 'WYiD1E8n5oB9weZ8NMyM3KoCjKf1KCjWAZ', timelock: null },
+          token: '00',
+          spent_by: null,
+        },
+      ],
+      height: 5,
+    };
+  }
+
+  it('should encode bigints and maps', () => {
+    const value = {
+      a: 10n,
+      b: new Map([
+        ['00', { locked: 1n, unlocked: 2n }],
+        ['01', { locked: 0n, unlocked: 5n }],
+      ]),
+      c: [1, 'x', null],
+    };
+    expect(decodeSnapshot(encodeSnapshot(value))).toEqual(value);
+  });
+
+  it('should start clean when there is no file', async () => {
+    const store = new FileStore(filePath);
+    await store.validate();
+    await expect(store.historyCount()).resolves.toEqual(0);
+    await expect(store.addressCount()).resolves.toEqual(0);
+  });
+
+  it('should restore the persisted state', async () => {
+    const store = new FileStore(filePath, { flushInterval: 10 });
+    await store.validate();
+    await store.saveAddress({ base58: 'WYiD1E8n5oB9weZ8NMyM3KoCjKf1KCjWAZ', bip32AddressIndex: 0 });
+    await store.saveToken({ uid: '00', name: 'Hathor', symbol: 'HTR', version: TokenVersion.NATIVE });
+    await store.registerNanoContract('nc1', {
+      ncId: 'nc1',
+      address: 'WYiD1E8n5oB9weZ8NMyM3KoCjKf1KCjWAZ',
+      blueprintId: 'bp1',
+      blueprintName: 'Bet',
+    });
+    const tx = getTx('tx01', 10);
+    await store.saveTx(tx);
+    await store.saveUtxo({
+      txId: 'tx01',
+      index: 0,
+      token: '00',
+      address: 'WYiD1E8n5oB9weZ8NMyM3KoCjKf1KCjWAZ',
+      value: 2n ** 60n,
+      authorities: 0n,
+      timelock: null,
+      type: 1,
+      height: 5,
+    });
+    await store.saveLockedUtxo({ tx, index: 0 });
+    await store.setCurrentHeight(42);
+    const storage = new Storage(store);
+    await storage.saveSyncCheckpoint();
+    await store.close();
+
+    const restored = new FileStore(filePath);
+    await restored.validate();
+    await expect(restored.getTx('tx01')).resolves.toEqual(tx);
+    await expect(restored.getAddressAtIndex(0)).resolves.toMatchObject({
+      base58: 'WYiD1E8n5oB9weZ8NMyM3KoCjKf1KCjWAZ',
+    });
+    await expect(restored.getUtxo({ txId: 'tx01', index: 0 })).resolves.toMatchObject({
+      value: 2n ** 60n,
+    });
+    await expect(restored.getCurrentHeight()).resolves.toEqual(42);
+    await expect(restored.isNanoContractRegistered('nc1')).resolves.toBe(true);
+    await expect(restored.getToken('00')).resolves.toMatchObject({ symbol: 'HTR' });
+
+    // Locked utxos point to the restored history tx
+    const locked = [];
+    for await (const lutxo of restored.iterateLockedUtxos()) {
+      locked.push(lutxo);
+    }
+    expect(locked).toHaveLength(1);
+    expect(locked[0].tx).toBe(restored.history.get('tx01'));
+
+    await expect(new Storage(restored).getSyncCheckpoint()).resolves.toMatchObject({
+      height: 42,
+      historyCount: 1,
+    });
+  });
+
+  it('should coalesce writes and write on the debounce interval', async () => {
+    jest.useFakeTimers();
+    try {
+      const store = new FileStore(filePath, { flushInterval: 100 });
+      const flushSpy = jest.spyOn(store, 'flush');
+      await store.saveAddress({ base58: 'a', bip32AddressIndex: 0 });
+      await store.saveAddress({ base58: 'b', bip32AddressIndex: 1 });
+      expect(flushSpy).not.toHaveBeenCalled();
+      jest.advanceTimersByTime(100);
+      expect(flushSpy).toHaveBeenCalledTimes(1);
+      await store.flushWait;
+    } finally {
+      jest.useRealTimers();
+    }
+  });
+
+  it('should append the changes to the log instead of rewriting the snapshot', async () => {
+    const store = new FileStore(filePath, { flushInterval: 10 });
+    await store.validate();
+    await store.saveTx(getTx('tx01', 10));
+    await store.flush();
+    // The first flush writes the snapshot
+    const snapshotStat = await fs.stat(filePath);
+    expect(store.logRecords).toEqual(0);
+
+    await store.saveTx(getTx('tx02', 11));
+    await store.flush();
+    // Only the changed tx and the state record are appended
+    expect(store.logRecords).toEqual(2);
+    await expect(fs.stat(filePath)).resolves.toMatchObject({ mtimeMs: snapshotStat.mtimeMs });
+    const log = (await fs.readFile(`${filePath}.log`, 'utf8')).trim().split('\n');
+    expect(log).toHaveLength(3);
+    expect(decodeSnapshot(log[1])).toMatchObject({ c: 'history', k: 'tx02' });
+
+    const restored = new FileStore(filePath);
+    await restored.validate();
+    await expect(restored.historyCount()).resolves.toEqual(2);
+    await expect(restored.getTx('tx02')).resolves.toEqual(getTx('tx02', 11));
+    expect(restored.historyTs).toHaveLength(2);
+    expect(restored.needsCompaction).toBe(false);
+  });
+
+  it('should log deleted entries and cleaned collections', async () => {
+    const store = new FileStore(filePath, { flushInterval: 10 });
+    await store.validate();
+    await store.saveAddress({ base58: 'a', bip32AddressIndex: 0 });
+    await store.saveTx(getTx('tx01', 10));
+    await store.flush();
+
+    await store.cleanStorage(true);
+    await store.saveTx(getTx('tx02', 11));
+    await store.registerToken({
+      uid: '01',
+      name: 'Token',
+      symbol: 'TKN',
+      version: TokenVersion.DEPOSIT,
+    });
+    await store.flush();
+
+    const restored = new FileStore(filePath);
+    await restored.validate();
+    await expect(restored.getTx('tx01')).resolves.toBeNull();
+    await expect(restored.getTx('tx02')).resolves.toEqual(getTx('tx02', 11));
+    await expect(restored.addressExists('a')).resolves.toBe(true);
+    await expect(restored.isTokenRegistered('01')).resolves.toBe(true);
+  });
+
+  it('should compact the log into a new snapshot', async () => {
+    const store = new FileStore(filePath, { flushInterval: 10, compactThreshold: 3 });
+    await store.validate();
+    await store.saveTx(getTx('tx01', 10));
+    await store.flush();
+    expect(store.generation).toEqual(1);
+
+    await store.saveTx(getTx('tx02', 11));
+    await store.saveTx(getTx('tx03', 12));
+    await store.flush();
+    expect(store.logRecords).toEqual(3);
+    expect(store.generation).toEqual(1);
+
+    await store.saveTx(getTx('tx04', 13));
+    await store.flush();
+    expect(store.generation).toEqual(2);
+    expect(store.logRecords).toEqual(0);
+    const log = (await fs.readFile(`${filePath}.log`, 'utf8')).trim().split('\n');
+    expect(log).toHaveLength(1);
+
+    const restored = new FileStore(filePath);
+    await restored.validate();
+    await expect(restored.historyCount()).resolves.toEqual(4);
+  });
+
+  it('should ignore a torn log record and logs of another snapshot', async () => {
+    const store = new FileStore(filePath, { flushInterval: 10 });
+    await store.validate();
+    await store.saveTx(getTx('tx01', 10));
+    await store.flush();
+    await store.saveTx(getTx('tx02', 11));
+    await store.flush();
+    await fs.appendFile(`${filePath}.log`, '{"c":"history","k":"tx03","v":{');
+
+    const restored = new FileStore(filePath);
+    await restored.validate();
+    await expect(restored.historyCount()).resolves.toEqual(2);
+    // The next flush replaces the broken log
+    expect(restored.needsCompaction).toBe(true);
+
+    await fs.writeFile(
+      `${filePath}.log`,
+      `${encodeSnapshot({ version: 2, generation: 99 })}\n${encodeSnapshot({
+        c: 'history',
+        k: 'tx03',
+        v: getTx('tx03', 12),
+      })}\n`
+    );
+    const other = new FileStore(filePath);
+    await other.validate();
+    await expect(other.historyCount()).resolves.toEqual(1);
+  });
+
+  it('should discard snapshots with an unknown version', async () => {
+    await fs.writeFile(filePath, encodeSnapshot({ version: 999, history: new Map() }));
+    const store = new FileStore(filePath);
+    await store.validate();
+    await expect(store.historyCount()).resolves.toEqual(0);
+  });
+
+  it('should remove the file on destroy', async () => {
+    const store = new FileStore(filePath);
+    await store.saveAddress({ base58: 'a', bip32AddressIndex: 0 });
+    await store.close();
+    await expect(fs.stat(filePath)).resolves.toBeDefined();
+    await store.destroy();
+    await expect(fs.stat(filePath)).rejects.toThrow();
+    await expect(fs.stat(`${filePath}.log`)).rejects.toThrow();
+  });
+});
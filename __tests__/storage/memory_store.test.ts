@@ -8,6 +8,8 @@
 import { HDPrivateKey } from 'bitcore-lib';
 import { GAP_LIMIT } from '../../src/constants';
 import { MemoryStore, Storage } from '../../src/storage';
+import { CompactHistory } from '../../src/storage/compact_history';
+import { ShieldedOutputMode } from '../../src/shielded/types';
 import tx_history from '../__fixtures__/tx_history';
 import walletApi from '../../src/api/wallet';
 import { encryptData } from '../../src/utils/crypto';
@@ -76,6 +78,53 @@ test('addresses methods', async () => {
   await expect(store.getCurrentAddress()).resolves.toEqual('e');
 });
 
+test('batched address and tx saves', async () => {
+  const store = new MemoryStore();
+  const setIndexSpy = jest.spyOn(store, 'setCurrentAddressIndex');
+
+  // A batch with an invalid or repeated address is not saved at all
+  await expect(
+    store.saveAddresses([
+      { base58: 'a', bip32AddressIndex: 0 },
+      { base58: 'a', bip32AddressIndex: 1 },
+    ])
+  ).rejects.toThrow('Already have this address');
+  await expect(store.addressCount()).resolves.toEqual(0);
+
+  await store.saveAddresses([
+    { base58: 'a', bip32AddressIndex: 0 },
+    { base58: 'b', bip32AddressIndex: 1 },
+    { base58: 'c', bip32AddressIndex: 2 },
+    { base58: 'c-shielded', bip32AddressIndex: 2, addressType: 'shielded' },
+  ]);
+  expect(store.walletData).toMatchObject({
+    currentAddressIndex: 0,
+    lastLoadedAddressIndex: 2,
+    shieldedCurrentAddressIndex: 2,
+    shieldedLastLoadedAddressIndex: 2,
+  });
+  await expect(store.getAddressAtIndex(1)).resolves.toMatchObject({ base58: 'b' });
+  expect(setIndexSpy).toHaveBeenCalledTimes(2);
+
+  // The cursors are updated once for the whole batch of txs
+  setIndexSpy.mockClear();
+  const makeTx = (txId: string, timestamp: number, address: string) =>
+    ({
+      tx_id: txId,
+      timestamp,
+      is_voided: false,
+      inputs: [],
+      outputs: [{ value: 1n, token: '00', token_data: 0, decoded: { address } }],
+    }) as unknown as IHistoryTx;
+  await store.saveTxs([makeTx('tx1', 1, 'b'), makeTx('tx2', 2, 'a'), makeTx('tx3', 3, 'other')]);
+  expect(store.walletData).toMatchObject({ currentAddressIndex: 2, lastUsedAddressIndex: 1 });
+  expect(setIndexSpy).toHaveBeenCalledTimes(1);
+  await expect(store.historyCount()).resolves.toEqual(3);
+  const txIds: string[] = [];
+  for await (const tx of store.historyIter('00')) txIds.push(tx.tx_id);
+  expect(txIds).toEqual(['tx2', 'tx1']);
+});
+
 test('addressIter chain-selection (legacy vs shielded)', async () => {
   const store = new MemoryStore();
 
@@ -202,6 +251,214 @@ test('history methods', async () => {
   });
 });
 
+test('compact history methods', async () => {
+  // Without the cache every read rebuilds the tx
+  const store = new MemoryStore({ compactHistory: true, historyCacheSize: 0 });
+  await store.saveAddress({ base58: 'WYiD1E8n5oB9weZ8NMyM3KoCjKf1KCjWAZ', bip32AddressIndex: 0 });
+  await store.saveAddress({ base58: 'WYBwT3xLpDnHNtYZiU52oanupVeDKhAvNp', bip32AddressIndex: 1 });
+  const storage = new Storage(store);
+
+  for (const tx of tx_history) {
+    await store.saveTx(tx);
+  }
+  expect(store.history.size).toEqual(0);
+  await expect(store.historyCount()).resolves.toEqual(11);
+  for (const tx of tx_history) {
+    const stored = await store.getTx(tx.tx_id);
+    expect(stored).toEqual(tx);
+    expect(stored).not.toBe(tx);
+  }
+  let txsBuf = [];
+  for await (const tx of store.historyIter('01')) {
+    txsBuf.push(tx);
+  }
+  expect(txsBuf).toHaveLength(2);
+  txsBuf = [];
+  for await (const tx of store.historyIter()) {
+    txsBuf.push(tx);
+  }
+  expect(txsBuf).toHaveLength(11);
+
+  store.walletData.bestBlockHeight = 11;
+  const getTokenApi = jest
+    .spyOn(walletApi, 'getGeneralTokenInfo')
+    .mockImplementation((uid, resolve) => {
+      resolve({
+        success: true,
+        name: 'Custom token',
+        symbol: 'CTK',
+      });
+    });
+  await processHistory(storage, { rewardLock: 1 });
+  getTokenApi.mockRestore();
+  expect(store.tokensMetadata.get('00')).toMatchObject({
+    numTransactions: 4,
+    balance: {
+      tokens: { locked: 2n, unlocked: 2n },
+    },
+  });
+
+  await store.cleanStorage(true);
+  await expect(store.historyCount()).resolves.toEqual(0);
+  await expect(store.getTx(tx_history[0].tx_id)).resolves.toBeNull();
+});
+
+test('compact history keeps the shielded data and the recent txs', async () => {
+  const txId = 'ab'.repeat(32);
+  const tx: IHistoryTx = {
+    tx_id: txId,
+    version: 1,
+    weight: 18,
+    timestamp: 1700000000,
+    is_voided: false,
+    nonce: 0,
+    parents: ['cd'.repeat(32), 'ef'.repeat(32)],
+    tokens: ['01'.repeat(32)],
+    headers: [{ id: 16, entries: [{ tokenIndex: 0, amount: 1n }] }],
+    inputs: [
+      { tx_id: '12'.repeat(32), index: 2, type: 'shielded', commitment: '08'.repeat(33) },
+      {
+        tx_id: '34'.repeat(32),
+        index: 0,
+        value: 2n ** 63n,
+        token_data: 0,
+        token: '00',
+        script: '76a914',
+        decoded: { type: 'P2PKH', address: 'WYiD1E8n5oB9weZ8NMyM3KoCjKf1KCjWAZ', timelock: null },
+      },
+    ],
+    outputs: [
+      {
+        value: 10n,
+        token_data: 0,
+        token: '00',
+        // Not hex, kept as it is
+        script: 'dqkUVTXZg887mKgf7wgS3RddNtu+EkiIrA==',
+        decoded: { type: 'P2PKH', address: 'WYiD1E8n5oB9weZ8NMyM3KoCjKf1KCjWAZ', timelock: null },
+        spent_by: null,
+      },
+    ],
+    shielded_outputs: [
+      {
+        mode: ShieldedOutputMode.AMOUNT_SHIELDED,
+        commitment: '09'.repeat(33),
+        range_proof: 'aa'.repeat(600),
+        script: '76a914',
+        token_data: 0,
+        ephemeral_pubkey: '02'.repeat(33),
+        decoded: { type: 'P2PKH', address: 'WYBwT3xLpDnHNtYZiU52oanupVeDKhAvNp' },
+        spent_by: null,
+        value: 5n,
+        token: '00',
+        blindingFactor: '11'.repeat(32),
+      },
+    ],
+  };
+
+  const store = new MemoryStore({ compactHistory: true, historyCacheSize: 0 });
+  await store.saveTx(tx);
+  await expect(store.getTx(txId)).resolves.toEqual(tx);
+  const compact = store.compactHistory!.txs.get(txId)!;
+  expect(compact.values).toEqual(new BigUint64Array([2n ** 63n, 10n, 5n]));
+
+  // Only the recently used txs are kept rebuilt
+  const history = new CompactHistory(2 * compact.size);
+  for (const id of ['01', '02', '03']) {
+    history.set(id, { ...tx, tx_id: id });
+  }
+  expect([...history.hot.keys()]).toEqual(['02', '03']);
+  expect(history.get('01')).toEqual({ ...tx, tx_id: '01' });
+  expect([...history.hot.keys()]).toEqual(['03', '01']);
+  // Reads while iterating don't change the txs kept
+  expect(history.peek('02')).toEqual({ ...tx, tx_id: '02' });
+  expect([...history.hot.keys()]).toEqual(['03', '01']);
+  expect(history.hotSize).toEqual(2 * compact.size);
+});
+
+test('compact history keeps the inputs enriched by processHistory', async () => {
+  const owned = 'WYBwT3xLpDnHNtYZiU52oanupVeDKhAvNp';
+  // A new copy for each store, the default store keeps the objects saved
+  function buildHistory(): IHistoryTx[] {
+    return [
+      {
+        tx_id: '01'.repeat(32),
+        version: 1,
+        weight: 1,
+        timestamp: 1,
+        is_voided: false,
+        first_block: '00'.repeat(32),
+        inputs: [],
+        outputs: [],
+        shielded_outputs: [
+          {
+            mode: ShieldedOutputMode.AMOUNT_SHIELDED,
+            commitment: '09'.repeat(33),
+            range_proof: 'aa'.repeat(60),
+            script: '76a914',
+            token_data: 0,
+            ephemeral_pubkey: '02'.repeat(33),
+            decoded: { type: 'P2PKH', address: owned },
+            spent_by: '02'.repeat(32),
+            // Decoded on a previous run
+            value: 5n,
+            token: '00',
+            blindingFactor: '11'.repeat(32),
+          },
+        ],
+        parents: [],
+      },
+      {
+        tx_id: '02'.repeat(32),
+        version: 1,
+        weight: 1,
+        timestamp: 2,
+        is_voided: false,
+        first_block: '00'.repeat(32),
+        // Bare shielded input, as the address history api sends it
+        inputs: [{ tx_id: '01'.repeat(32), index: 0, type: 'shielded' }],
+        outputs: [
+          {
+            value: 5n,
+            token_data: 0,
+            token: '00',
+            script: 'dqkUVTXZg887mKgf7wgS3RddNtu+EkiIrA==',
+            decoded: {
+              type: 'P2PKH',
+              address: 'WXzJ8n1WSkSkGPLKCmSsAqtGBv1Bdby1Ap',
+              timelock: null,
+            },
+            spent_by: null,
+          },
+        ],
+        parents: [],
+      },
+    ] as unknown as IHistoryTx[];
+  }
+
+  const processWith = async (store: MemoryStore) => {
+    await store.saveAddress({ base58: owned, bip32AddressIndex: 1 });
+    for (const tx of buildHistory()) {
+      await store.saveTx(tx);
+    }
+    await processHistory(new Storage(store));
+    return store;
+  };
+  const defaultStore = await processWith(new MemoryStore());
+  const compactStore = await processWith(
+    new MemoryStore({ compactHistory: true, historyCacheSize: 0 })
+  );
+
+  const spend = await compactStore.getTx('02'.repeat(32));
+  expect(spend!.inputs[0]).toMatchObject({ value: 5n, token: '00', decoded: { address: owned } });
+  await expect(compactStore.getTx('02'.repeat(32))).resolves.toEqual(
+    await defaultStore.getTx('02'.repeat(32))
+  );
+  expect(compactStore.tokensMetadata.get('00')).toEqual(defaultStore.tokensMetadata.get('00'));
+  expect(compactStore.addressesMetadata.get(owned)).toEqual(
+    defaultStore.addressesMetadata.get(owned)
+  );
+});
+
 test('token methods', async () => {
   const store = new MemoryStore();
 
@@ -277,6 +534,70 @@ test('token methods', async () => {
   });
 });
 
+test('token history index and cursor pagination', async () => {
+  const store = new MemoryStore();
+  const addr = 'WYiD1E8n5oB9weZ8NMyM3KoCjKf1KCjWAZ';
+  await store.saveAddress({ base58: addr, bip32AddressIndex: 0 });
+  const makeTx = (txId: string, timestamp: number, token: string, address = addr) =>
+    ({
+      tx_id: txId,
+      timestamp,
+      is_voided: false,
+      inputs: [],
+      outputs: [{ value: 1n, token, token_data: 0, decoded: { address } }],
+    }) as unknown as IHistoryTx;
+  // Saved out of order
+  for (const tx of [
+    makeTx('tx3', 3, '00'),
+    makeTx('tx1', 1, '00'),
+    makeTx('tx2', 2, '01'),
+    makeTx('tx4', 4, '00'),
+    makeTx('tx5', 5, '00', 'other-address'),
+  ]) {
+    await store.saveTx(tx);
+  }
+  const history = async (token?: string, options = {}) => {
+    const txIds: string[] = [];
+    for await (const tx of store.historyIter(token, options)) txIds.push(tx.tx_id);
+    return txIds;
+  };
+
+  await expect(history('00')).resolves.toEqual(['tx4', 'tx3', 'tx1']);
+  await expect(history('00', { cursor: 'tx4' })).resolves.toEqual(['tx3', 'tx1']);
+  await expect(history('00', { cursor: 'tx3', order: 'asc' })).resolves.toEqual(['tx4']);
+  await expect(history('00', { skip: 1 })).resolves.toEqual(['tx3', 'tx1']);
+  await expect(history('00', { cursor: 'tx4', skip: 1 })).resolves.toEqual(['tx1']);
+  await expect(history('01')).resolves.toEqual(['tx2']);
+  await expect(history(undefined, { cursor: 'tx3' })).resolves.toEqual(['tx2', 'tx1']);
+  await expect(history('00', { cursor: 'unknown' })).rejects.toThrow('Invalid history cursor');
+
+  // The txs with a new address are reindexed when read, with their cached balance removed
+  await store.saveTxBalanceCache('tx5', { '00': 0n });
+  await store.saveTxBalanceCache('tx3', { '00': 1n });
+  await store.saveAddress({ base58: 'other-address', bip32AddressIndex: 1 });
+  expect(store.tokenHistoryIndex).not.toBeNull();
+  expect(store.staleAddresses).toEqual(new Set(['other-address']));
+  await expect(history('00')).resolves.toEqual(['tx5', 'tx4', 'tx3', 'tx1']);
+  expect(store.staleAddresses.size).toBe(0);
+  await expect(store.getTxBalanceCache('tx5')).resolves.toBeNull();
+  await expect(store.getTxBalanceCache('tx3')).resolves.toEqual({ '00': 1n });
+
+  // Saving a tx removes its cached balance and the balance of the txs spending it
+  await store.saveTxBalanceCache('tx4', { '00': 1n });
+  await store.saveTxBalanceCache('tx2', { '01': 1n });
+  await expect(store.getTxBalanceCache('tx4')).resolves.toEqual({ '00': 1n });
+  const spentTx = makeTx('tx1', 1, '00');
+  spentTx.outputs[0].spent_by = 'tx2';
+  await store.saveTx(spentTx);
+  await expect(store.getTxBalanceCache('tx2')).resolves.toBeNull();
+  await expect(store.getTxBalanceCache('tx3')).resolves.toEqual({ '00': 1n });
+  await store.saveTx(makeTx('tx4', 4, '01'));
+  await expect(store.getTxBalanceCache('tx4')).resolves.toBeNull();
+  await expect(store.getTxBalanceCache('tx3')).resolves.toEqual({ '00': 1n });
+  await expect(history('00')).resolves.toEqual(['tx5', 'tx3', 'tx1']);
+  await expect(history('01')).resolves.toEqual(['tx4', 'tx2']);
+});
+
 test('utxo methods', async () => {
   const store = new MemoryStore();
   const utxos = [
@@ -419,6 +740,98 @@ test('selectUtxos resolves a shielded filter_address to its spend P2PKH via ctMa
   expect(bySpend[0].txId).toEqual('txS');
 });
 
+test('selectUtxos keeps the utxo indexes updated', async () => {
+  const store = new MemoryStore();
+  const utxo = (txId, value, fields = {}) => ({
+    txId,
+    index: 0,
+    token: '00',
+    address: 'addr1',
+    value,
+    authorities: 0n,
+    timelock: null,
+    type: 1,
+    height: null,
+    ...fields,
+  });
+  const select = async options => {
+    const buf = [];
+    for await (const u of store.selectUtxos(options)) buf.push(u.txId);
+    return buf;
+  };
+  await store.saveUtxo(utxo('tx1', 30n));
+  await store.saveUtxo(utxo('tx2', 10n));
+  await store.saveUtxo(utxo('tx3', 20n, { address: 'addr2' }));
+  await store.saveUtxo(utxo('tx4', 10n));
+  await store.saveUtxo(utxo('tx5', 20n, { token: '01' }));
+  await store.saveUtxo(utxo('tx6', 1n, { token: '01', authorities: 1n }));
+
+  // Insertion order without ordering, the same order as the utxos map
+  await expect(select({})).resolves.toEqual(['tx1', 'tx2', 'tx3', 'tx4']);
+  // Same values keep the insertion order on both directions, as a stable sort would
+  await expect(select({ order_by_value: 'asc' })).resolves.toEqual(['tx2', 'tx4', 'tx3', 'tx1']);
+  await expect(select({ order_by_value: 'desc' })).resolves.toEqual(['tx1', 'tx3', 'tx2', 'tx4']);
+  await expect(
+    select({ order_by_value: 'asc', amount_bigger_than: 10n, amount_smaller_than: 30n })
+  ).resolves.toEqual(['tx3']);
+  await expect(select({ order_by_value: 'desc', filter_address: 'addr1' })).resolves.toEqual([
+    'tx1',
+    'tx2',
+    'tx4',
+  ]);
+  // Authority utxos are kept separate from the funds
+  await expect(select({ token: '01' })).resolves.toEqual(['tx5']);
+  await expect(select({ token: '01', authorities: 1n })).resolves.toEqual(['tx6']);
+
+  // Saving an existing utxo keeps its position, deleting removes it from all indexes
+  await store.saveUtxo(utxo('tx2', 40n));
+  await store.deleteUtxo(utxo('tx3', 20n, { address: 'addr2' }));
+  await expect(select({})).resolves.toEqual(['tx1', 'tx2', 'tx4']);
+  await expect(select({ order_by_value: 'desc' })).resolves.toEqual(['tx2', 'tx1', 'tx4']);
+  await expect(select({ filter_address: 'addr2' })).resolves.toEqual([]);
+
+  await store.cleanMetadata();
+  await expect(select({})).resolves.toEqual([]);
+  expect(store.utxoIndex.funds.size).toEqual(0);
+});
+
+test('selectUtxos handles the utxo indexes changing during the iteration', async () => {
+  const store = new MemoryStore();
+  const utxo = (txId, value) => ({
+    txId,
+    index: 0,
+    token: '00',
+    address: 'addr1',
+    value,
+    authorities: 0n,
+    timelock: null,
+    type: 1,
+    height: null,
+  });
+  await store.saveUtxo(utxo('tx1', 10n));
+  await store.saveUtxo(utxo('tx2', 20n));
+  await store.saveUtxo(utxo('tx3', 20n));
+  await store.saveUtxo(utxo('tx4', 30n));
+
+  for (const order of ['asc', 'desc']) {
+    const buf: string[] = [];
+    for await (const u of store.selectUtxos({ order_by_value: order as 'asc' | 'desc' })) {
+      buf.push(u.txId);
+      if (buf.length === 1) {
+        // Remove an utxo not yet yielded and save new utxos on both ends
+        await store.deleteUtxo(utxo('tx2', 20n));
+        await store.saveUtxo(utxo('tx5', 1n));
+        await store.saveUtxo(utxo('tx6', 50n));
+      }
+    }
+    expect(buf).toEqual(order === 'asc' ? ['tx1', 'tx3', 'tx4'] : ['tx4', 'tx3', 'tx1']);
+
+    await store.saveUtxo(utxo('tx2', 20n));
+    await store.deleteUtxo(utxo('tx5', 1n));
+    await store.deleteUtxo(utxo('tx6', 50n));
+  }
+});
+
 test('addTx advances the shielded cursor only for a DECODED owned shielded receive', async () => {
   const store = new MemoryStore();
   // Own a shielded-spend P2PKH at index 7 (the on-chain form of a shielded
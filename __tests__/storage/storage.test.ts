@@ -12,6 +12,7 @@ import { MemoryStore, Storage } from '../../src/storage';
 import { getDefaultAddressMeta } from '../../src/storage/storage';
 import tx_history from '../__fixtures__/tx_history';
 import { processHistory, loadAddresses } from '../../src/utils/storage';
+import * as storageUtils from '../../src/utils/storage';
 import walletUtils from '../../src/utils/wallet';
 import {
   P2PKH_ACCT_PATH,
@@ -534,6 +535,98 @@ describe('process locked utxos', () => {
     await processLockedUtxoTest(store);
   });
 
+  it('should only visit the utxos that unlock on the memory store', async () => {
+    const store = new MemoryStore();
+    const nowTs = Math.floor(Date.now() / 1000);
+    const byTime = getLockedUtxo('tx01', 'addr1', nowTs - 60, undefined, 1n, '00', 0);
+    const timelocked = getLockedUtxo('tx02', 'addr1', nowTs + 60, undefined, 1n, '00', 0);
+    const byHeight = getLockedUtxo('tx03', 'addr1', nowTs - 60, 5, 1n, '00', 0);
+    const heightAndTime = getLockedUtxo('tx04', 'addr1', nowTs + 60, 5, 1n, '00', 0);
+    for (const lutxo of [byTime, timelocked, byHeight, heightAndTime]) {
+      await store.saveLockedUtxo(lutxo);
+    }
+    const unlockable = async (currentHeight: number, ts: number) => {
+      const txIds: string[] = [];
+      for await (const lutxo of store.iterateUnlockableUtxos({
+        currentHeight,
+        rewardLock: 1,
+        nowTs: ts,
+      })) {
+        txIds.push(lutxo.tx.tx_id);
+        await store.unlockUtxo(lutxo);
+      }
+      return txIds;
+    };
+
+    await expect(unlockable(1, nowTs)).resolves.toEqual(['tx01']);
+    await expect(store.getNextUnlockTimestamp()).resolves.toEqual(nowTs + 60);
+    await expect(unlockable(10, nowTs)).resolves.toEqual(['tx03']);
+    await expect(unlockable(10, nowTs + 60)).resolves.toEqual(
+      expect.arrayContaining(['tx02', 'tx04'])
+    );
+    await expect(store.getNextUnlockTimestamp()).resolves.toBeNull();
+    await expect(unlockable(20, nowTs + 120)).resolves.toEqual([]);
+  });
+
+  it('should keep the utxos scheduled when the unlock fails', async () => {
+    const store = new MemoryStore();
+    const nowTs = Math.floor(Date.now() / 1000);
+    const first = getLockedUtxo('tx01', 'addr1', nowTs - 60, undefined, 1n, '00', 0);
+    const second = getLockedUtxo('tx02', 'addr1', nowTs - 30, undefined, 1n, '00', 0);
+    await store.saveLockedUtxo(first);
+    await store.saveLockedUtxo(second);
+    const options = { currentHeight: 1, rewardLock: 1, nowTs };
+
+    await expect(
+      (async () => {
+        for await (const lutxo of store.iterateUnlockableUtxos(options)) {
+          if (lutxo.tx.tx_id === 'tx02') {
+            throw new Error('unlock failed');
+          }
+          await store.unlockUtxo(lutxo);
+        }
+      })()
+    ).rejects.toThrow('unlock failed');
+
+    // Only the utxo that failed is visited again
+    const txIds: string[] = [];
+    for await (const lutxo of store.iterateUnlockableUtxos(options)) {
+      txIds.push(lutxo.tx.tx_id);
+      await store.unlockUtxo(lutxo);
+    }
+    expect(txIds).toEqual(['tx02']);
+  });
+
+  it('should unlock timelocked utxos when the timelock expires', async () => {
+    jest.useFakeTimers();
+    try {
+      const store = new MemoryStore();
+      const storage = new Storage(store);
+      const nowTs = Math.floor(Date.now() / 1000);
+      const lutxo = getLockedUtxo('tx01', 'addr1', nowTs + 60, undefined, 1n, '00', 0);
+      await store.saveAddress({ base58: 'addr1', bip32AddressIndex: 0 });
+      await store.saveLockedUtxo(lutxo);
+      const processSpy = jest.spyOn(storage, 'processLockedUtxos');
+
+      await storage.scheduleTimelockUnlock();
+      expect(storage.timelockUnlockTimer).not.toBeNull();
+      await jest.advanceTimersByTimeAsync(30 * 1000);
+      expect(processSpy).not.toHaveBeenCalled();
+
+      await jest.advanceTimersByTimeAsync(31 * 1000);
+      await storage.utxoUnlockWait;
+      expect(processSpy).toHaveBeenCalledTimes(1);
+      const locked: ILockedUtxo[] = [];
+      for await (const u of store.iterateLockedUtxos()) {
+        locked.push(u);
+      }
+      expect(locked).toHaveLength(0);
+      expect(storage.timelockUnlockTimer).toBeNull();
+    } finally {
+      jest.useRealTimers();
+    }
+  });
+
   function getLockedUtxo(
     txId,
     address,
@@ -1360,3 +1453,151 @@ describe('getDefaultAddressMeta — per-call balance Map (no shared aliasing)',
     expect(b.balance.has(NATIVE_TOKEN_UID)).toBe(false);
   });
 });
+
+describe('sync checkpoint', () => {
+  it('should only return a checkpoint matching the stored history', async () => {
+    const store = new MemoryStore();
+    const storage = new Storage(store);
+    await expect(storage.getSyncCheckpoint()).resolves.toBeNull();
+
+    await store.setCurrentHeight(10);
+    await storage.saveSyncCheckpoint();
+    await expect(storage.getSyncCheckpoint()).resolves.toMatchObject({
+      height: 10,
+      historyCount: 0,
+    });
+
+    // A tx saved outside of a sync invalidates the checkpoint
+    await store.saveTx({
+      tx_id: 'tx01',
+      version: 1,
+      timestamp: 1,
+      is_voided: false,
+      inputs: [],
+      outputs: [],
+      parents: [],
+    } as unknown as IHistoryTx);
+    await expect(storage.getSyncCheckpoint()).resolves.toBeNull();
+
+    await storage.saveSyncCheckpoint();
+    await expect(storage.getSyncCheckpoint()).resolves.toMatchObject({ historyCount: 1 });
+
+    // Cleaning the history removes the checkpoint
+    await storage.cleanStorage(true);
+    await expect(storage.getSyncCheckpoint()).resolves.toBeNull();
+  });
+
+  it('should not return a checkpoint of another network', async () => {
+    const storage = new Storage(new MemoryStore());
+    await storage.saveSyncCheckpoint('block-hash');
+    await expect(storage.getSyncCheckpoint()).resolves.toMatchObject({
+      network: storage.config.getNetwork().name,
+      blockHash: 'block-hash',
+    });
+
+    await storage.store.setItem('wallet:sync:checkpoint', {
+      ...(await storage.getSyncCheckpoint()),
+      network: 'another-network',
+    });
+    await expect(storage.getSyncCheckpoint()).resolves.toBeNull();
+  });
+
+  it('should only process the txs saved since the checkpoint', async () => {
+    const store = new MemoryStore();
+    const storage = new Storage(store);
+    const makeTx = (txId: string, timestamp: number, data: Partial<IHistoryTx> = {}) =>
+      ({
+        tx_id: txId,
+        version: 1,
+        timestamp,
+        is_voided: false,
+        first_block: null,
+        inputs: [],
+        outputs: [],
+        parents: [],
+        ...data,
+      }) as unknown as IHistoryTx;
+    await storage.addTxs([makeTx('tx01', 1), makeTx('tx02', 2, { first_block: 'block1' })]);
+
+    const batchSpy = jest.spyOn(storage, 'processNewTxBatch').mockResolvedValue(undefined);
+    const historySpy = jest.spyOn(storage, 'processHistory').mockResolvedValue(undefined);
+    const metadataSpy = jest
+      .spyOn(storageUtils, 'processMetadataChanged')
+      .mockResolvedValue(undefined);
+    try {
+      // The whole history is processed when the changes are not tracked
+      await storage.processSyncChanges();
+      expect(historySpy).toHaveBeenCalledTimes(1);
+
+      storage.trackSyncChanges();
+      await storage.addTxs([
+        makeTx('tx04', 4),
+        makeTx('tx03', 3),
+        makeTx('tx01', 1, { first_block: 'block2' }),
+        makeTx('tx02', 2, { first_block: 'block1' }),
+      ]);
+      await storage.processSyncChanges('123');
+      expect(historySpy).toHaveBeenCalledTimes(1);
+      expect(batchSpy).toHaveBeenCalledTimes(1);
+      expect(batchSpy.mock.calls[0][0].map(tx => tx.tx_id)).toEqual(['tx03', 'tx04']);
+      expect(batchSpy.mock.calls[0][1]).toEqual('123');
+      // Only the tx with a new first block has its utxos updated
+      expect(metadataSpy).toHaveBeenCalledTimes(1);
+      expect(metadataSpy).toHaveBeenCalledWith(storage, expect.objectContaining({ tx_id: 'tx01' }));
+      expect(storage.syncChanges).toBeNull();
+
+      // A tx with a new voided flag cannot be reverted alone
+      storage.trackSyncChanges();
+      await storage.addTx(makeTx('tx02', 2, { is_voided: true, first_block: 'block1' }));
+      await storage.processSyncChanges();
+      expect(historySpy).toHaveBeenCalledTimes(2);
+      expect(batchSpy).toHaveBeenCalledTimes(1);
+
+      // Cleaning the history stops tracking the changes
+      storage.trackSyncChanges();
+      await storage.cleanStorage(true);
+      expect(storage.syncChanges).toBeNull();
+    } finally {
+      batchSpy.mockRestore();
+      historySpy.mockRestore();
+      metadataSpy.mockRestore();
+    }
+  });
+});
+
+describe('bulk writes', () => {
+  it('should save addresses and txs with the bulk store methods', async () => {
+    const store = new MemoryStore();
+    const storage = new Storage(store);
+    const saveAddressesSpy = jest.spyOn(store, 'saveAddresses');
+    const saveTxsSpy = jest.spyOn(store, 'saveTxs');
+
+    await storage.saveAddresses([
+      { base58: 'WYiD1E8n5oB9weZ8NMyM3KoCjKf1KCjWAZ', bip32AddressIndex: 0 },
+      { base58: 'WYBwT3xLpDnHNtYZiU52oanupVeDKhAvNp', bip32AddressIndex: 1 },
+    ]);
+    await storage.addTxs(
+      ['tx01', 'tx02'].map(
+        txId =>
+          ({
+            tx_id: txId,
+            version: 1,
+            timestamp: 1,
+            is_voided: false,
+            inputs: [],
+            outputs: [],
+            parents: [],
+          }) as unknown as IHistoryTx
+      )
+    );
+    // Empty batches do not reach the store
+    await storage.saveAddresses([]);
+    await storage.addTxs([]);
+
+    expect(saveAddressesSpy).toHaveBeenCalledTimes(1);
+    expect(saveTxsSpy).toHaveBeenCalledTimes(1);
+    await expect(storage.isAddressMine('WYBwT3xLpDnHNtYZiU52oanupVeDKhAvNp')).resolves.toBe(true);
+    await expect(store.historyCount()).resolves.toBe(2);
+    await expect(storage.getTx('tx02')).resolves.toMatchObject({ tx_id: 'tx02' });
+  });
+});
@@ -2,11 +2,14 @@ import { Server, WebSocket } from 'mock-socket';
 import HathorWallet from '../src/new/wallet';
 import Connection from '../src/new/connection';
 import { MemoryStore, Storage } from '../src/storage';
-import { HistorySyncMode, WalletType, getDefaultLogger } from '../src/types';
+import { HistorySyncMode, IHistoryTx, WalletType, getDefaultLogger } from '../src/types';
 import { JSONBigInt } from '../src/utils/bigint';
 import { getGapLimitConfig } from './integration/utils/core.util';
 import { StreamManager, loadP2SHAddressesCPUIntensive } from '../src/sync/stream';
 import { XPubError } from '../src/errors';
+import { getP2PKHChainKey } from '../src/storage/address_cache';
+import walletApi from '../src/api/wallet';
+import txApi from '../src/api/txApi';
 
 // Per-test budget for the wallet start/sync tests in this file. Wallet startup
 // runs bitcore EC derivations, which jest's vm sandbox slows down dramatically,
@@ -500,3 +503,222 @@ describe('Websocket stream history sync for multisig', () => {
     }
   });
 });
+
+describe('Stream sync checkpoint', () => {
+  const XPUBKEY = 'xpub-checkpoint-test';
+
+  async function prepareStorage() {
+    const storage = new Storage(new MemoryStore());
+    jest.spyOn(storage, 'getWalletType').mockResolvedValue(WalletType.P2PKH);
+    jest.spyOn(storage, 'getAccessData').mockResolvedValue({ xpubkey: XPUBKEY } as never);
+    jest.spyOn(storage, 'getGapLimit').mockResolvedValue(20);
+    return storage;
+  }
+
+  function mockListedTxs(txs: { tx_id: string; timestamp: number; address: string }[]) {
+    return jest
+      .spyOn(txApi, 'getTransactions')
+      .mockImplementation(async (type, _count, _timestamp, _hash, _page, resolve) => {
+        resolve({
+          success: true,
+          has_more: false,
+          transactions:
+            type === 'tx'
+              ? txs.map(({ address, ...tx }) => ({
+                  ...tx,
+                  inputs: [],
+                  outputs: [{ decoded: { address } }],
+                }))
+              : [],
+        });
+      });
+  }
+
+  afterEach(() => {
+    jest.restoreAllMocks();
+  });
+
+  function makeConnection() {
+    return {
+      lockStream: jest.fn().mockReturnValue(true),
+      streamController: new AbortController(),
+    } as never;
+  }
+
+  it('should resume after the address of a valid checkpoint', async () => {
+    const storage = await prepareStorage();
+    mockListedTxs([]);
+    await storage.saveStreamSyncCheckpoint({
+      mode: HistorySyncMode.XPUB_STREAM_WS,
+      chainKey: getP2PKHChainKey(XPUBKEY, storage.config.getNetwork().name),
+      lastProcessedIndex: 41,
+      lastProcSeq: 100,
+    });
+
+    const manager = new StreamManager(0, storage, makeConnection(), HistorySyncMode.XPUB_STREAM_WS);
+    try {
+      await manager.setupStream();
+      expect(manager.lastLoadedIndex).toBe(41);
+      expect(manager.lastProcessedIndex).toBe(41);
+    } finally {
+      manager.abort();
+      manager.stats.clean();
+    }
+
+    // A checkpoint of another mode is not used
+    const manual = new StreamManager(
+      0,
+      storage,
+      makeConnection(),
+      HistorySyncMode.MANUAL_STREAM_WS
+    );
+    try {
+      await manual.setupStream();
+      expect(manual.lastLoadedIndex).toBe(-1);
+      expect(manual.lastProcessedIndex).toBe(-1);
+    } finally {
+      manual.abort();
+      manual.stats.clean();
+    }
+  });
+
+  it('should refresh the addresses before the checkpoint changed since it', async () => {
+    const storage = await prepareStorage();
+    await storage.saveAddress({ base58: 'addr0', bip32AddressIndex: 0 });
+    await storage.saveAddress({ base58: 'addr1', bip32AddressIndex: 1 });
+    await storage.saveAddress({ base58: 'addr2', bip32AddressIndex: 2 });
+    await storage.addTx({ ...mock_tx, outputs: [{ ...mock_tx.outputs[0] }] } as IHistoryTx);
+    await storage.saveStreamSyncCheckpoint({
+      mode: HistorySyncMode.XPUB_STREAM_WS,
+      chainKey: getP2PKHChainKey(XPUBKEY, storage.config.getNetwork().name),
+      lastProcessedIndex: 1,
+      lastProcSeq: 10,
+    });
+    const now = Math.floor(Date.now() / 1000);
+    // addr1 received a tx while the stream was stopped, addr2 is after the checkpoint
+    const listSpy = mockListedTxs([
+      { tx_id: 'new-tx', timestamp: now, address: 'addr1' },
+      { tx_id: 'new-tx2', timestamp: now, address: 'addr2' },
+    ]);
+    // The output was spent while the stream was stopped
+    const spentTx = { ...mock_tx, outputs: [{ ...mock_tx.outputs[0], spent_by: 'spent-by-tx' }] };
+    const apiSpy = jest.spyOn(walletApi, 'getAddressHistoryForAwait').mockResolvedValue({
+      data: { success: true, history: [spentTx], has_more: false },
+    } as never);
+
+    const manager = new StreamManager(0, storage, makeConnection(), HistorySyncMode.XPUB_STREAM_WS);
+    try {
+      await manager.setupStream();
+      expect(listSpy).toHaveBeenCalled();
+      // addr0 has no changes and its history is not fetched again
+      expect(apiSpy).toHaveBeenCalledTimes(1);
+      expect(apiSpy).toHaveBeenCalledWith(['addr1'], null);
+      expect(manager.foundAnyTx).toBe(true);
+      const tx = await storage.getTx(mock_tx.tx_id);
+      expect(tx?.outputs[0].spent_by).toEqual('spent-by-tx');
+    } finally {
+      apiSpy.mockRestore();
+      manager.abort();
+      manager.stats.clean();
+    }
+  });
+
+  it('should only save the addresses followed by their history', async () => {
+    const storage = await prepareStorage();
+    const manager = new StreamManager(0, storage, makeConnection(), HistorySyncMode.XPUB_STREAM_WS);
+    try {
+      await manager.setupStream();
+      manager.lastProcSeq = 3;
+      await manager.saveCheckpoint([
+        { seq: 1, type: 'address', address: { base58: 'addr0', bip32AddressIndex: 0 } },
+        { seq: 2, type: 'address', address: { base58: 'addr1', bip32AddressIndex: 1 } },
+        { seq: 3, type: 'vertex', vertex: { tx_id: 'tx01' } as IHistoryTx },
+      ]);
+      // The history of address 1 may continue on the next batch
+      await expect(storage.getStreamSyncCheckpoint()).resolves.toMatchObject({
+        lastProcessedIndex: 0,
+        lastProcSeq: 3,
+      });
+
+      // The address indexes are not assumed to be contiguous
+      manager.lastProcSeq = 5;
+      await manager.saveCheckpoint([
+        { seq: 4, type: 'address', address: { base58: 'addr5', bip32AddressIndex: 5 } },
+        { seq: 5, type: 'vertex', vertex: { tx_id: 'tx05' } as IHistoryTx },
+      ]);
+      await expect(storage.getStreamSyncCheckpoint()).resolves.toMatchObject({
+        lastProcessedIndex: 1,
+        lastProcSeq: 5,
+      });
+    } finally {
+      manager.abort();
+      manager.stats.clean();
+    }
+  });
+
+  it('should not return a checkpoint after the history changed', async () => {
+    const storage = await prepareStorage();
+    await storage.store.setCurrentHeight(10);
+    await storage.saveStreamSyncCheckpoint({
+      mode: HistorySyncMode.XPUB_STREAM_WS,
+      chainKey: 'chain',
+      lastProcessedIndex: 5,
+      lastProcSeq: 10,
+    });
+    await expect(storage.getStreamSyncCheckpoint()).resolves.toMatchObject({ height: 10 });
+
+    // The best chain went back past the checkpoint
+    await storage.store.setCurrentHeight(9);
+    await expect(storage.getStreamSyncCheckpoint()).resolves.toBeNull();
+
+    await storage.store.setCurrentHeight(10);
+    await storage.cleanStorage(true);
+    await expect(storage.getStreamSyncCheckpoint()).resolves.toBeNull();
+  });
+});
+
+describe('Stream items processing', () => {
+  const shieldedPair = (index: number) => ({
+    shieldedAddress: {
+      base58: `shielded${index}`,
+      bip32AddressIndex: index,
+      addressType: 'shielded' as const,
+      ctMappingAddress: `spend${index}`,
+    },
+    spendAddress: {
+      base58: `spend${index}`,
+      bip32AddressIndex: index,
+      addressType: 'shielded-spend' as const,
+    },
+  });
+
+  it('should derive the shielded pairs of the batch on the derivation pool', async () => {
+    const storage = new Storage(new MemoryStore());
+    jest.spyOn(storage, 'getScanXPubKey').mockResolvedValue('scan-xpub');
+    jest.spyOn(storage, 'getSpendXPubKey').mockResolvedValue('spend-xpub');
+    const saveSpy = jest.spyOn(storage, 'saveAddresses');
+    const manager = new StreamManager(0, storage, {} as never, HistorySyncMode.MANUAL_STREAM_WS);
+    manager.network = 'testnet';
+    const deriveShieldedPairs = jest.fn().mockResolvedValue([shieldedPair(0), shieldedPair(1)]);
+    manager.derivationPool = { deriveShieldedPairs } as never;
+    try {
+      await manager.processItems([
+        { seq: 1, type: 'address', address: { base58: 'addr0', bip32AddressIndex: 0 } },
+        { seq: 2, type: 'address', address: { base58: 'addr1', bip32AddressIndex: 1 } },
+      ]);
+      expect(deriveShieldedPairs).toHaveBeenCalledTimes(1);
+      expect(deriveShieldedPairs).toHaveBeenCalledWith('scan-xpub', 'spend-xpub', 0, 2, 'testnet');
+      expect(saveSpy.mock.calls[0][0].map(addr => addr.base58)).toEqual([
+        'addr0',
+        'shielded0',
+        'spend0',
+        'addr1',
+        'shielded1',
+        'spend1',
+      ]);
+    } finally {
+      manager.abort();
+      manager.stats.clean();
+    }
+  });
+});
@@ -0,0 +1,122 @@
+/**
+ * Copyright (c) Hathor Labs and its affiliates.
+ *
+ * This source code is licensed under the MIT license found in the
+ * LICENSE file in the root directory of this source tree.
+ */
+
+import path from 'path';
+import walletUtils from '../../src/utils/wallet';
+import { MemoryStore, Storage } from '../../src/storage';
+import { loadAddresses } from '../../src/utils/storage';
+import { AddressDerivationPool } from '../../src/sync/derivation_pool';
+import { loadAddressesCPUIntensive, loadP2SHAddressesCPUIntensive } from '../../src/sync/stream';
+
+const MULTISIG_DATA = {
+  numSignatures: 3,
+  pubkeys: [
+    'xpub6CvvCBtHqFfErbcW2Rv28TmZ3MqcFuWQVKGg8xDzLeAwEAHRz9LBTgSFSj7B99scSvZGbq6TxAyyATA9b6cnwsgduNs9NGKQJnEQr3PYtwK',
+    'xpub6CA16g2qPwukWAWBMdJKU3p2fQEEi831W3WAs2nesuCzPhbrG29aJsoRDSEDT4Ac3smqSk51uuv6oujU3MAAL3d1Nm87q9GDwE3HRGQLjdP',
+    'xpub6BwNT613Vzy7ARVHDEpoX23SMBEZQMJXdqTWYjQKvJZJVDBjEemU38exJEhc6qbFVc4MmarN68gUKHkyZ3NEgXXCbWtoXXGouHpwMEcXJLf',
+    'xpub6DCyPHg4AwXsdiMh7QSTHR7afmNVwZKHBBMFUiy5aCYQNaWp68ceQXYXCGQr5fZyLAe5hiJDdXrq6w3AXzvVmjFX9F7EdM87repxJEhsmjL',
+    'xpub6CgPUcCCJ9pAK7Rj52hwkxTutSRv91Fq74Hx1SjN62eg6Mp3S3YCJFPChPaDjpp9jCbCZHibBgdKnfNdq6hE9umyjyZKUCySBNF7wkoG4uK',
+  ],
+};
+
+// The compiled worker does not exist when the tests run from the typescript sources.
+const TEST_WORKER_PATH = path.join(__dirname, '..', '__fixtures__', 'derivation_worker.js');
+
+// Shielded derivation is slow on jest's vm sandbox.
+const DERIVATION_TEST_TIMEOUT = 30000;
+
+describe('AddressDerivationPool', () => {
+  const PIN = '0000';
+  const seed = walletUtils.generateWalletWords();
+  const accessData = walletUtils.generateAccessDataFromSeed(seed, {
+    pin: PIN,
+    password: PIN,
+    networkName: 'testnet',
+  });
+
+  it('should derive on the current thread when the worker is not available', async () => {
+    const pool = new AddressDerivationPool({ size: 2, workerPath: '/does/not/exist.js' });
+    expect(pool.isParallel).toBe(false);
+    expect(new AddressDerivationPool({ size: 0 }).isParallel).toBe(false);
+    await pool.terminate();
+  });
+
+  it('should derive on the worker threads', async () => {
+    const pool = new AddressDerivationPool({ size: 2, taskSize: 3, workerPath: TEST_WORKER_PATH });
+    expect(pool.isParallel).toBe(true);
+    try {
+      const addresses = await pool.deriveP2PKH('xpub', 1, 8, 'testnet');
+      expect(addresses.map(addr => [addr.bip32AddressIndex, addr.base58])).toEqual(
+        Array.from({ length: 8 }, (_, i) => [i + 1, `xpub-${i + 1}`])
+      );
+      // The tasks were split between the workers, which are idle after the derivation
+      expect(pool.workers).toHaveLength(2);
+      expect(pool.idleWorkers).toHaveLength(2);
+      expect(pool.running.size).toBe(0);
+
+      // Worker errors reject the derivation and the workers are reused
+      await expect(pool.deriveShieldedPairs('scan', 'spend', 0, 1, 'testnet')).rejects.toThrow(
+        'Unknown derivation task'
+      );
+      expect(pool.workers).toHaveLength(2);
+    } finally {
+      await pool.terminate();
+    }
+    expect(pool.workers).toHaveLength(0);
+  });
+
+  it('should derive the same addresses as the stream derivation', async () => {
+    // A small task size splits the request in multiple tasks
+    const pool = new AddressDerivationPool({ size: 0, taskSize: 3 });
+
+    const p2pkh = await pool.deriveP2PKH(accessData.xpubkey, 2, 7, 'testnet');
+    expect(p2pkh.map(addr => [addr.bip32AddressIndex, addr.base58])).toEqual(
+      loadAddressesCPUIntensive(2, 7, accessData.xpubkey, 'testnet')
+    );
+    expect(p2pkh.every(addr => !!addr.publicKey)).toBe(true);
+
+    const p2sh = await pool.deriveP2SH(MULTISIG_DATA, 0, 5, 'testnet');
+    expect(p2sh.map(addr => [addr.bip32AddressIndex, addr.base58])).toEqual(
+      loadP2SHAddressesCPUIntensive(0, 5, MULTISIG_DATA, 'testnet')
+    );
+
+    await expect(
+      pool.deriveP2SH({ pubkeys: ['not-an-xpub'], numSignatures: 1 }, 0, 1, 'testnet')
+    ).rejects.toThrow();
+  });
+
+  it(
+    'should load the same addresses on storage with a derivation pool',
+    async () => {
+      const storage = new Storage(new MemoryStore());
+      await storage.saveAccessData(accessData);
+      const pooledStorage = new Storage(new MemoryStore());
+      await pooledStorage.saveAccessData(accessData);
+      const pool = new AddressDerivationPool({ size: 0, taskSize: 2 });
+      pooledStorage.setDerivationPool(pool);
+      const deriveSpy = jest.spyOn(pool, 'deriveP2PKH');
+
+      // Index 1 is already loaded, the pool derives the span of missing indexes
+      await loadAddresses(1, 1, pooledStorage);
+      deriveSpy.mockClear();
+      const pooled = await loadAddresses(0, 5, pooledStorage);
+      expect(deriveSpy).toHaveBeenCalledTimes(1);
+      expect(deriveSpy).toHaveBeenCalledWith(accessData.xpubkey, 0, 5, expect.any(String));
+
+      await expect(loadAddresses(0, 5, storage)).resolves.toEqual(pooled);
+      for (let i = 0; i < 5; i++) {
+        await expect(pooledStorage.getAddressAtIndex(i)).resolves.toEqual(
+          await storage.getAddressAtIndex(i)
+        );
+        await expect(pooledStorage.getAddressAtIndex(i, { legacy: false })).resolves.toEqual(
+          await storage.getAddressAtIndex(i, { legacy: false })
+        );
+      }
+    },
+    DERIVATION_TEST_TIMEOUT
+  );
+});
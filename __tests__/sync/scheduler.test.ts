@@ -0,0 +1,162 @@
+/**
+ * Copyright (c) Hathor Labs and its affiliates.
+ *
+ * This source code is licensed under the MIT license found in the
+ * LICENSE file in the root directory of this source tree.
+ */
+
+import SyncScheduler from '../../src/sync/scheduler';
+
+/**
+ * Task that only finishes when `finish` is called.
+ */
+function deferredTask(name: string, started: string[]) {
+  let finish: () => void = () => {};
+  const done = new Promise<void>(resolve => {
+    finish = resolve;
+  });
+  return {
+    run: async () => {
+      started.push(name);
+      await done;
+      return name;
+    },
+    finish: () => finish(),
+  };
+}
+
+// Let the finished tasks release their slots
+const flush = () => new Promise(resolve => setImmediate(resolve));
+
+describe('SyncScheduler', () => {
+  it('should not start more tasks than the concurrency', async () => {
+    const scheduler = new SyncScheduler({ concurrency: 2, maxTasksPerOwner: 3 });
+    const started: string[] = [];
+    const tasks = ['a', 'b', 'c'].map(name => deferredTask(name, started));
+    const promises = tasks.map(task => scheduler.add(task.run));
+
+    expect(scheduler.jobsRunning).toEqual(2);
+    expect(scheduler.size).toEqual(1);
+    expect(started).toEqual(['a', 'b']);
+
+    tasks[0].finish();
+    await expect(promises[0]).resolves.toEqual('a');
+    await flush();
+    expect(started).toEqual(['a', 'b', 'c']);
+
+    tasks[1].finish();
+    tasks[2].finish();
+    await expect(Promise.all(promises)).resolves.toEqual(['a', 'b', 'c']);
+    expect(scheduler.jobsRunning).toEqual(0);
+    expect(() => {
+      scheduler.concurrency = 0;
+    }).toThrow('Cannot have less than 1 job running.');
+  });
+
+  it('should start the tasks with higher priority first', async () => {
+    const scheduler = new SyncScheduler({ concurrency: 1 });
+    const started: string[] = [];
+    const first = deferredTask('first', started);
+    const tasks = [
+      scheduler.add(first.run),
+      scheduler.add(async () => started.push('low'), { priority: 0 }),
+      scheduler.add(async () => started.push('high'), { priority: 10 }),
+      scheduler.add(async () => started.push('medium'), { priority: 5 }),
+    ];
+    first.finish();
+    await Promise.all(tasks);
+    expect(started).toEqual(['first', 'high', 'medium', 'low']);
+  });
+
+  it('should take turns between the owners of the same priority', async () => {
+    const scheduler = new SyncScheduler({ concurrency: 1 });
+    const walletA = {};
+    const walletB = {};
+    const started: string[] = [];
+    const first = deferredTask('a0', started);
+    const tasks = [scheduler.add(first.run, { owner: walletA })];
+    for (let i = 1; i <= 3; i++) {
+      tasks.push(scheduler.add(async () => `${started.push(`a${i}`)}`, { owner: walletA }));
+    }
+    tasks.push(scheduler.add(async () => `${started.push('b0')}`, { owner: walletB }));
+    tasks.push(scheduler.add(async () => `${started.push('b1')}`, { owner: walletB }));
+    first.finish();
+    await Promise.all(tasks);
+    expect(started).toEqual(['a0', 'b0', 'a1', 'b1', 'a2', 'a3']);
+  });
+
+  it('should limit the tasks running for the same owner', async () => {
+    const scheduler = new SyncScheduler({ concurrency: 3 });
+    const wallet = {};
+    const started: string[] = [];
+    const first = deferredTask('first', started);
+    const second = deferredTask('second', started);
+    const tasks = [
+      scheduler.add(first.run, { owner: wallet }),
+      scheduler.add(second.run, { owner: wallet }),
+      scheduler.add(async () => 'other', { owner: {} }),
+    ];
+    await tasks[2];
+    // The second task of the wallet waits even with free slots
+    expect(started).toEqual(['first']);
+    first.finish();
+    await tasks[0];
+    await flush();
+    expect(started).toEqual(['first', 'second']);
+    second.finish();
+    await Promise.all(tasks);
+  });
+
+  it('should wait while the CPU usage is over the budget', async () => {
+    jest.useFakeTimers();
+    let cpuTime = 0;
+    const cpuSpy = jest
+      .spyOn(process, 'cpuUsage')
+      .mockImplementation(() => ({ user: cpuTime * 1000, system: 0 }));
+    try {
+      const scheduler = new SyncScheduler({ concurrency: 3, cpuBudget: 0.5, cpuWindow: 100 });
+      const started: string[] = [];
+      const first = deferredTask('first', started);
+      const firstPromise = scheduler.add(first.run);
+      // The first sample is taken when the second task is added
+      const second = scheduler.add(async () => started.push('second'));
+      await second;
+      expect(started).toEqual(['first', 'second']);
+
+      // The process was fully busy during the last window
+      cpuTime += 100;
+      jest.advanceTimersByTime(100);
+      const third = scheduler.add(async () => started.push('third'));
+      expect(started).toEqual(['first', 'second']);
+      expect(scheduler.size).toEqual(1);
+
+      // Idle during the next window, the retry starts the task
+      jest.advanceTimersByTime(100);
+      await third;
+      expect(started).toEqual(['first', 'second', 'third']);
+
+      first.finish();
+      await firstPromise;
+      scheduler.stopBackgroundTask();
+    } finally {
+      cpuSpy.mockRestore();
+      jest.useRealTimers();
+    }
+  });
+
+  it('should reject aborted tasks', async () => {
+    const scheduler = new SyncScheduler({ concurrency: 1 });
+    const controller = new AbortController();
+    const started: string[] = [];
+    const first = deferredTask('first', started);
+    const firstPromise = scheduler.add(first.run);
+    const aborted = scheduler.add(async () => started.push('aborted'), {
+      signal: controller.signal,
+    });
+    controller.abort(new Error('aborted by the wallet'));
+    first.finish();
+    await firstPromise;
+    await expect(aborted).rejects.toThrow('aborted by the wallet');
+    expect(started).toEqual(['first']);
+  });
+});
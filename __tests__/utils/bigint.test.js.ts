@@ -112,6 +112,34 @@ describe('test JSONBigInt', () => {
   test('should stringify bigint', () => {
     expect(JSONBigInt.stringify(bigIntObj)).toStrictEqual(bigIntJson);
   });
+
+  test('should only run the reviver when there may be unsafe integers', () => {
+    const reviverSpy = jest.spyOn(JSONBigInt, 'bigIntReviver');
+    try {
+      // Digits inside strings are not numbers
+      const hash = '00001234567890123456789012345678';
+      const smallJson = `{"hash":"${hash}","value":123,"f":0.12345678901234567}`;
+      expect(JSONBigInt.parse(smallJson)).toStrictEqual({
+        hash,
+        value: 123,
+        f: 0.12345678901234567,
+      });
+      expect(JSONBigInt.parse(nativeJson)).toStrictEqual(obj);
+      expect(reviverSpy).not.toHaveBeenCalled();
+
+      const largeJson = `{"hash":"${hash}","values":[1, 12345678901234567890]}`;
+      expect(JSONBigInt.parse(largeJson)).toStrictEqual({
+        hash,
+        values: [1, 12345678901234567890n],
+      });
+      expect(JSONBigInt.parse('[1e20, 1234567890123456.5]')).toStrictEqual([
+        1e20, 1234567890123456.5,
+      ]);
+      expect(reviverSpy).toHaveBeenCalled();
+    } finally {
+      reviverSpy.mockRestore();
+    }
+  });
 });
 
 describe('test parseJsonBigInt', () => {
@@ -122,6 +150,13 @@ describe('test parseJsonBigInt', () => {
   test('should parse object with small and large bigints', () => {
     expect(parseJsonBigInt(bigIntJson, bigIntObjSchema)).toStrictEqual(bigIntCoercedObj);
   });
+
+  test('should throw a ZodError for invalid JSON', () => {
+    expect(() => parseJsonBigInt('{"large":', bigIntObjSchema)).toThrow(z.ZodError);
+    expect(() => parseJsonBigInt('{"large":', bigIntObjSchema)).toThrow(
+      'Could not parse with JSONBigInt'
+    );
+  });
 });
 
 describe('test ceilDiv', () => {
@@ -29,8 +29,21 @@ import {
   processNewTx,
   processSingleTx,
   processHistory,
+  revertTxEffects,
+  loadAddressHistory,
+  refreshHistorySince,
+  isSyncCheckpointOnBestChain,
 } from '../../src/utils/storage';
-import { NATIVE_TOKEN_UID } from '../../src/constants';
+import walletApi from '../../src/api/wallet';
+import txApi from '../../src/api/txApi';
+import helpers from '../../src/utils/helpers';
+import {
+  NATIVE_TOKEN_UID,
+  LOAD_WALLET_RETRY_SLEEP,
+  MAX_ADDRESSES_GET,
+  SYNC_CHECKPOINT_MAX_PAGES,
+} from '../../src/constants';
+import { SyncCheckpointTooOldError } from '../../src/errors';
 import { ShieldedOutputMode } from '../../src/shielded/types';
 import { manualStreamSyncHistory, xpubStreamSyncHistory } from '../../src/sync/stream';
 import CreateTokenTransaction from '../../src/models/create_token_transaction';
@@ -313,6 +326,9 @@ describe('processHistory — orchestration', () => {
     expect(skipCalls.map(c => c[1])).toEqual([TX_A, TX_B]);
     // The partial-history flag surfaces the skip (not just a per-tx log line).
     expect(storage.shieldedDecodeSkippedTxIds).toEqual([TX_A, TX_B]);
+    // Nothing was applied for the skipped txs, so they have no effects to revert.
+    expect(storage.txJournal.has(TX_A)).toBe(false);
+    expect(storage.txJournal.has(TX_B)).toBe(false);
   });
 
   it('processes a healthy tx that follows a skipped one — the rest of the history still rebuilds', async () => {
@@ -444,6 +460,214 @@ describe('scanning policy methods', () => {
   });
 });
 
+describe('loadAddressHistory', () => {
+  afterEach(() => {
+    jest.restoreAllMocks();
+  });
+
+  function historyResponse(txIds: string[]) {
+    return {
+      data: {
+        success: true,
+        has_more: false,
+        history: txIds.map(txId => ({
+          tx_id: txId,
+          version: 1,
+          timestamp: 1,
+          is_voided: false,
+          inputs: [],
+          outputs: [],
+          parents: [],
+        })),
+      },
+    };
+  }
+
+  it('should fetch the chunks with bounded concurrency', async () => {
+    const storage = new Storage(new MemoryStore());
+    const addresses = Array.from({ length: MAX_ADDRESSES_GET * 5 }, (_, i) => `addr${i}`);
+    let inFlight = 0;
+    let maxInFlight = 0;
+    const apiSpy = jest
+      .spyOn(walletApi, 'getAddressHistoryForAwait')
+      .mockImplementation(async (addrs: string[]) => {
+        inFlight++;
+        maxInFlight = Math.max(maxInFlight, inFlight);
+        await new Promise(resolve => {
+          setTimeout(resolve, 5);
+        });
+        inFlight--;
+        return historyResponse([`tx-${addrs[0]}`]) as never;
+      });
+
+    const results: boolean[] = [];
+    for await (const gotTx of loadAddressHistory(addresses, storage, true, 2)) {
+      results.push(gotTx);
+    }
+
+    expect(results).toEqual([true, true, true, true, true]);
+    expect(apiSpy).toHaveBeenCalledTimes(5);
+    expect(maxInFlight).toBe(2);
+    await expect(storage.store.historyCount()).resolves.toBe(5);
+  });
+
+  it('should retry a failed chunk with backoff', async () => {
+    const storage = new Storage(new MemoryStore());
+    const sleepSpy = jest.spyOn(helpers, 'sleep').mockResolvedValue(undefined as never);
+    const networkError = Object.assign(new Error('Network Error'), { isAxiosError: true });
+    jest
+      .spyOn(walletApi, 'getAddressHistoryForAwait')
+      .mockRejectedValueOnce(networkError)
+      .mockRejectedValueOnce(networkError)
+      .mockResolvedValue(historyResponse([]) as never);
+
+    const results: boolean[] = [];
+    for await (const gotTx of loadAddressHistory(['addr0'], storage)) {
+      results.push(gotTx);
+    }
+
+    expect(results).toEqual([false]);
+    expect(sleepSpy).toHaveBeenNthCalledWith(1, LOAD_WALLET_RETRY_SLEEP);
+    expect(sleepSpy).toHaveBeenNthCalledWith(2, LOAD_WALLET_RETRY_SLEEP * 2);
+  });
+});
+
+describe('refreshHistorySince', () => {
+  afterEach(() => {
+    jest.restoreAllMocks();
+  });
+
+  function listedTx(txId: string, timestamp: number, address: string) {
+    return {
+      tx_id: txId,
+      timestamp,
+      inputs: [],
+      outputs: [{ decoded: { address } }],
+    };
+  }
+
+  it('should only fetch the addresses changed since the timestamp', async () => {
+    const storage = new Storage(new MemoryStore());
+    for (const [i, base58] of ['addr0', 'addr1', 'addr2', 'addr3'].entries()) {
+      await storage.saveAddress({ base58, bip32AddressIndex: i });
+    }
+    // Unconfirmed tx of the history, its address is refreshed
+    await storage.addTx({
+      tx_id: 'pending',
+      version: 1,
+      timestamp: 10,
+      is_voided: false,
+      first_block: null,
+      inputs: [],
+      outputs: [{ decoded: { address: 'addr3' } }],
+      parents: [],
+    } as unknown as IHistoryTx);
+
+    const since = 100_000;
+    const listSpy = jest
+      .spyOn(txApi, 'getTransactions')
+      .mockImplementation(async (type, _count, timestamp, hash, page, resolve) => {
+        if (type === 'block') {
+          resolve({ success: true, has_more: true, transactions: [listedTx('b1', 1, 'addr0')] });
+        } else if (!hash) {
+          resolve({
+            success: true,
+            has_more: true,
+            transactions: [listedTx('t2', since + 10, 'addr1'), listedTx('t1', since, 'other')],
+          });
+        } else {
+          expect([timestamp, hash, page]).toEqual([since, 't1', 'next']);
+          resolve({ success: true, has_more: true, transactions: [listedTx('t0', 1, 'addr2')] });
+        }
+      });
+    const apiSpy = jest
+      .spyOn(walletApi, 'getAddressHistoryForAwait')
+      .mockResolvedValue({ data: { success: true, has_more: false, history: [] } } as never);
+
+    for await (const _gotTx of refreshHistorySince(storage, since + 3600)) {
+      // consume
+    }
+
+    // The old block and tx are not listed past the timestamp
+    expect(listSpy).toHaveBeenCalledTimes(3);
+    expect(apiSpy).toHaveBeenCalledTimes(1);
+    expect(apiSpy.mock.calls[0][0]).toEqual(['addr1', 'addr3']);
+  });
+
+  it('should apply the address filter', async () => {
+    const storage = new Storage(new MemoryStore());
+    await storage.saveAddress({ base58: 'addr0', bip32AddressIndex: 0 });
+    await storage.saveAddress({ base58: 'addr1', bip32AddressIndex: 1 });
+    jest
+      .spyOn(txApi, 'getTransactions')
+      .mockImplementation(async (type, _count, _timestamp, _hash, _page, resolve) => {
+        resolve({
+          success: true,
+          has_more: false,
+          transactions:
+            type === 'tx' ? [listedTx('t1', 10, 'addr0'), listedTx('t2', 10, 'addr1')] : [],
+        });
+      });
+    const apiSpy = jest
+      .spyOn(walletApi, 'getAddressHistoryForAwait')
+      .mockResolvedValue({ data: { success: true, has_more: false, history: [] } } as never);
+
+    for await (const _gotTx of refreshHistorySince(storage, 0, info => info.bip32AddressIndex < 1)) {
+      // consume
+    }
+    expect(apiSpy).toHaveBeenCalledTimes(1);
+    expect(apiSpy.mock.calls[0][0]).toEqual(['addr0']);
+  });
+
+  it('should not list more than the maximum number of pages', async () => {
+    const storage = new Storage(new MemoryStore());
+    await storage.saveAddress({ base58: 'addr0', bip32AddressIndex: 0 });
+    let page = 0;
+    const listSpy = jest
+      .spyOn(txApi, 'getTransactions')
+      .mockImplementation(async (_type, _count, _timestamp, _hash, _page, resolve) => {
+        page += 1;
+        resolve({ success: true, has_more: true, transactions: [listedTx(`b${page}`, 10, 'x')] });
+      });
+    const apiSpy = jest.spyOn(walletApi, 'getAddressHistoryForAwait');
+
+    const consume = async () => {
+      for await (const _gotTx of refreshHistorySince(storage, 0)) {
+        // consume
+      }
+    };
+    await expect(consume()).rejects.toThrow(SyncCheckpointTooOldError);
+    // Only the blocks were listed and no history was fetched
+    expect(listSpy).toHaveBeenCalledTimes(SYNC_CHECKPOINT_MAX_PAGES);
+    expect(apiSpy).not.toHaveBeenCalled();
+  });
+});
+
+test('isSyncCheckpointOnBestChain', async () => {
+  const spy = jest
+    .spyOn(txApi, 'getBlockAtHeight')
+    .mockImplementation(async (_height, resolve) => {
+      resolve({ success: true, block: { tx_id: 'block10' } });
+    });
+  const checkpoint = {
+    height: 10,
+    historyCount: 0,
+    timestamp: 0,
+    network: 'testnet',
+    blockHash: 'block10',
+  };
+  await expect(isSyncCheckpointOnBestChain(checkpoint)).resolves.toBe(true);
+  expect(spy).toHaveBeenCalledWith(10, expect.any(Function));
+  await expect(isSyncCheckpointOnBestChain({ ...checkpoint, blockHash: 'other' })).resolves.toBe(
+    false
+  );
+  // Checkpoints without the block are not trusted
+  await expect(isSyncCheckpointOnBestChain({ ...checkpoint, blockHash: null })).resolves.toBe(
+    false
+  );
+  spy.mockRestore();
+});
+
 describe('_updateTokensData', () => {
   let axiosMock;
   const updateTokenApiUrl = 'thin_wallet/token';
@@ -1272,3 +1496,156 @@ describe('checkGapLimit — dual-chain (legacy + shielded) gap-limit logic', ()
     await expect(checkGapLimit(storage)).resolves.toBeNull();
   });
 });
+
+describe('revertTxEffects — incremental reprocessing of voided txs', () => {
+  const ADDR = 'WewDeXWyvHP7jJTs7tjLoQfoB72LLxJQqN';
+  const OTHER_ADDR = 'WYBwT3xLpDnHNtYZiU52oanupVeDKhAvNp';
+
+  const buildTx = (fields: Partial<IHistoryTx>): IHistoryTx =>
+    ({
+      version: 1,
+      weight: 1,
+      timestamp: 1,
+      is_voided: false,
+      inputs: [],
+      outputs: [],
+      parents: [],
+      ...fields,
+    }) as unknown as IHistoryTx;
+
+  const output = (value: bigint, address: string, spentBy: string | null = null) => ({
+    value,
+    token_data: 0,
+    token: NATIVE_TOKEN_UID,
+    script: '',
+    spent_by: spentBy,
+    decoded: { type: 'P2PKH', address, timelock: null },
+  });
+
+  const seedStorage = async () => {
+    const store = new MemoryStore();
+    const storage = new Storage(store);
+    await store.saveAddress({ base58: ADDR, bip32AddressIndex: 0 });
+    const tx1 = buildTx({ tx_id: 'tx1', outputs: [output(100n, ADDR)] });
+    const tx2 = buildTx({
+      tx_id: 'tx2',
+      timestamp: 2,
+      inputs: [{ ...output(100n, ADDR), tx_id: 'tx1', index: 0 }],
+      outputs: [output(60n, ADDR), output(40n, OTHER_ADDR)],
+    } as unknown as Partial<IHistoryTx>);
+    await storage.addTx(tx1);
+    await storage.processNewTx(tx1);
+    await storage.addTx(tx2);
+    await storage.processNewTx(tx2);
+    // The fullnode marks the output of tx1 as spent
+    tx1.outputs[0].spent_by = 'tx2';
+    await storage.addTx(tx1);
+    return { store, storage, tx1, tx2 };
+  };
+
+  it('should revert a voided tx without processing the history', async () => {
+    const { store, storage, tx1, tx2 } = await seedStorage();
+    expect((await store.getTokenMeta(NATIVE_TOKEN_UID))?.balance.tokens.unlocked).toBe(60n);
+    expect(await store.getUtxo({ txId: 'tx1', index: 0 })).toBeNull();
+
+    const processHistorySpy = jest.spyOn(storage, 'processHistory');
+    tx1.outputs[0].spent_by = null;
+    await storage.addTx(tx1);
+    tx2.is_voided = true;
+    await storage.addTx(tx2);
+    await storage.reprocessTx(tx2);
+    expect(processHistorySpy).not.toHaveBeenCalled();
+
+    const tokenMeta = await store.getTokenMeta(NATIVE_TOKEN_UID);
+    expect(tokenMeta?.balance.tokens.unlocked).toBe(100n);
+    expect(tokenMeta?.numTransactions).toBe(1);
+    const addressMeta = await store.getAddressMeta(ADDR);
+    expect(addressMeta?.balance.get(NATIVE_TOKEN_UID)?.tokens.unlocked).toBe(100n);
+    expect(addressMeta?.numTransactions).toBe(1);
+    expect(await store.getUtxo({ txId: 'tx1', index: 0 })).toMatchObject({ value: 100n });
+    expect(await store.getUtxo({ txId: 'tx2', index: 0 })).toBeNull();
+
+    // Unvoiding the tx applies its effects again
+    tx1.outputs[0].spent_by = 'tx2';
+    await storage.addTx(tx1);
+    tx2.is_voided = false;
+    await storage.addTx(tx2);
+    await storage.reprocessTx(tx2);
+    expect(processHistorySpy).not.toHaveBeenCalled();
+    expect((await store.getTokenMeta(NATIVE_TOKEN_UID))?.balance.tokens.unlocked).toBe(60n);
+    expect((await store.getAddressMeta(ADDR))?.numTransactions).toBe(2);
+    expect(await store.getUtxo({ txId: 'tx1', index: 0 })).toBeNull();
+    expect(await store.getUtxo({ txId: 'tx2', index: 0 })).toMatchObject({ value: 60n });
+  });
+
+  it('should revert the txs spending the outputs of a voided tx along with it', async () => {
+    const { store, storage, tx1, tx2 } = await seedStorage();
+    const processHistorySpy = jest.spyOn(storage, 'processHistory');
+    // tx2 spends the output of tx1, it cannot be reverted alone
+    expect(storage.txJournal.hasDependants('tx1')).toBe(true);
+    expect(storage.txJournal.getDependantClosure('tx1')).toEqual(['tx1', 'tx2']);
+    await expect(revertTxEffects(storage, 'tx1')).resolves.toBe(false);
+    expect(storage.txJournal.has('tx1')).toBe(true);
+    expect((await store.getTokenMeta(NATIVE_TOKEN_UID))?.balance.tokens.unlocked).toBe(60n);
+
+    // Voiding tx1 also voids tx2 on the fullnode
+    tx2.is_voided = true;
+    await storage.addTx(tx2);
+    tx1.is_voided = true;
+    await storage.addTx(tx1);
+    await storage.reprocessTx(tx1);
+    expect(processHistorySpy).not.toHaveBeenCalled();
+
+    const tokenMeta = await store.getTokenMeta(NATIVE_TOKEN_UID);
+    expect(tokenMeta?.balance.tokens.unlocked).toBe(0n);
+    expect(tokenMeta?.numTransactions).toBe(0);
+    expect((await store.getAddressMeta(ADDR))?.numTransactions).toBe(0);
+    expect(await store.getUtxo({ txId: 'tx1', index: 0 })).toBeNull();
+    expect(await store.getUtxo({ txId: 'tx2', index: 0 })).toBeNull();
+    // Voided txs have no debits left on the journal
+    expect(storage.txJournal.hasDependants('tx1')).toBe(false);
+  });
+
+  it('should process the history to restore a utxo of a tx processed before a resume', async () => {
+    const store = new MemoryStore();
+    const storage = new Storage(store);
+    await store.saveAddress({ base58: ADDR, bip32AddressIndex: 0 });
+    const tx1 = buildTx({ tx_id: 'tx1', outputs: [output(100n, ADDR)] });
+    await storage.addTx(tx1);
+    await storage.processNewTx(tx1);
+    // Resuming from the sync checkpoint the metadata is on the store but not on the journal
+    storage.txJournal.clear();
+
+    const tx2 = buildTx({
+      tx_id: 'tx2',
+      timestamp: 2,
+      inputs: [{ ...output(100n, ADDR), tx_id: 'tx1', index: 0 }],
+      outputs: [output(40n, OTHER_ADDR)],
+    } as unknown as Partial<IHistoryTx>);
+    await storage.addTx(tx2);
+    await storage.processNewTx(tx2);
+    tx1.outputs[0].spent_by = 'tx2';
+    await storage.addTx(tx1);
+    expect(await store.getUtxo({ txId: 'tx1', index: 0 })).toBeNull();
+    await expect(revertTxEffects(storage, 'tx2')).resolves.toBe(false);
+
+    const processHistorySpy = jest.spyOn(storage, 'processHistory');
+    tx1.outputs[0].spent_by = null;
+    await storage.addTx(tx1);
+    tx2.is_voided = true;
+    await storage.addTx(tx2);
+    await storage.reprocessTx(tx2);
+    expect(processHistorySpy).toHaveBeenCalledTimes(1);
+    expect((await store.getTokenMeta(NATIVE_TOKEN_UID))?.balance.tokens.unlocked).toBe(100n);
+    expect(await store.getUtxo({ txId: 'tx1', index: 0 })).toMatchObject({ value: 100n });
+  });
+
+  it('should fallback to processing the history for a tx not on the journal', async () => {
+    const { storage, tx2 } = await seedStorage();
+    storage.txJournal.clear();
+    const processHistorySpy = jest.spyOn(storage, 'processHistory').mockResolvedValue();
+    await expect(revertTxEffects(storage, 'tx2')).resolves.toBe(false);
+    await storage.reprocessTx(tx2);
+    expect(processHistorySpy).toHaveBeenCalledTimes(1);
+  });
+});
@@ -21,6 +21,7 @@ import {
   TX_WEIGHT_CONSTANTS,
 } from '../../src/constants';
 import txApi from '../../src/api/txApi';
+import walletUtils from '../../src/utils/wallet';
 import { MemoryStore, Storage } from '../../src/storage';
 import Input from '../../src/models/input';
 import Transaction from '../../src/models/transaction';
@@ -294,6 +295,76 @@ test('signTxInputs sources keys from the resolver, not from storage', async () =
   );
 });
 
+test('getSignatureForTx signs with the unlocked signing session', async () => {
+  const store = new MemoryStore();
+  const storage = new Storage(store);
+  const accessData = walletUtils.generateAccessDataFromSeed(walletUtils.generateWalletWords(), {
+    pin: '123',
+    password: '123',
+    networkName: 'testnet',
+  });
+  await storage.saveAccessData(accessData);
+  const mainXpriv = HDPrivateKey.fromString(await storage.getMainXPrivKey('123'));
+
+  jest.spyOn(storage, 'getAddressInfo').mockImplementation(async addr => ({
+    base58: addr,
+    bip32AddressIndex: addr === 'addr-10' ? 10 : 11,
+  }));
+  async function* getSpentMock(inputs) {
+    let index = 0;
+    for (const inp of inputs) {
+      yield {
+        index,
+        input: inp,
+        tx: {
+          outputs: [{ decoded: { address: 'addr-10' } }, { decoded: { address: 'addr-11' } }],
+        },
+      };
+      index += 1;
+    }
+  }
+  jest.spyOn(storage, 'getSpentTxs').mockImplementation(getSpentMock);
+
+  await storage.startSigningSession('123', { maxKeys: 1 });
+  const getMainSpy = jest.spyOn(storage, 'getMainXPrivKey');
+
+  const tx = new Transaction([new Input('cafe', 0), new Input('d00d', 1)], []);
+  const sigData = await transaction.getSignatureForTx(tx, storage, '123');
+  // The keys were not decrypted again
+  expect(getMainSpy).not.toHaveBeenCalled();
+  expect(sigData.inputSignatures.map(sig => sig.pubkey)).toStrictEqual([
+    mainXpriv.deriveNonCompliantChild(10).publicKey.toDER(),
+    mainXpriv.deriveNonCompliantChild(11).publicKey.toDER(),
+  ]);
+  // Only the most recently used child key is kept
+  expect(Array.from(storage.signingSession!.childKeys.keys())).toEqual(['legacy:11']);
+
+  // A wrong pin does not use the session keys
+  await expect(transaction.getSignatureForTx(tx, storage, '456')).rejects.toThrow();
+  expect(getMainSpy).toHaveBeenCalledWith('456');
+  getMainSpy.mockClear();
+
+  // The session expires while signing, the keys are decrypted with the pin
+  const expiring = storage.signingSession!;
+  jest.spyOn(expiring, 'deriveChild').mockImplementationOnce(() => {
+    expiring.close();
+    throw new Error('Signing session is closed.');
+  });
+  await expect(transaction.getSignatureForTx(tx, storage, '123')).resolves.toStrictEqual(sigData);
+  expect(getMainSpy).toHaveBeenCalledWith('123');
+  await storage.startSigningSession('123', { maxKeys: 1 });
+  getMainSpy.mockClear();
+
+  // A closed session erases the keys and the signature decrypts the key again
+  const session = storage.signingSession!;
+  storage.closeSigningSession();
+  expect(session.isActive()).toBe(false);
+  expect(session.legacyXpriv).toBeNull();
+  expect(() => session.deriveChild('legacy', 10)).toThrow('Signing session is closed.');
+  await expect(transaction.getSignatureForTx(tx, storage, '123')).resolves.toStrictEqual(sigData);
+  expect(getMainSpy).toHaveBeenCalledWith('123');
+});
+
 test('signTransaction', async () => {
   const xpriv = new HDPrivateKey();
   const store = new MemoryStore();
@@ -6,7 +6,12 @@
  */
 
 import { MemoryStore, Storage } from '../../src/storage';
-import { bestUtxoSelection, fastUtxoSelection } from '../../src/utils/utxo';
+import {
+  bestUtxoSelection,
+  branchAndBoundUtxoSelection,
+  fastUtxoSelection,
+  planUtxoConsolidation,
+} from '../../src/utils/utxo';
 import { IStore } from '../../src/types';
 
 describe('bestUtxoSelection', () => {
@@ -287,4 +292,70 @@ describe('bestUtxoSelection', () => {
     const store = new MemoryStore();
     await testFastUtxoSelection(store);
   });
+
+  test('branchAndBoundUtxoSelection with memory store', async () => {
+    const store = new MemoryStore();
+    await addUtxosToStore(store);
+    await store.setCurrentHeight(1);
+    const storage = new Storage(store);
+
+    // Trying to select more than available will return no utxos
+    await expect(branchAndBoundUtxoSelection(storage, '00', 601n)).resolves.toMatchObject({
+      utxos: [],
+      amount: 0n,
+      available: 600n,
+    });
+
+    // A single utxo is used when possible, without change if there is an exact match
+    await expect(branchAndBoundUtxoSelection(storage, '00', 200n)).resolves.toMatchObject({
+      utxos: [utxos[1]],
+      amount: 200n,
+    });
+    await expect(branchAndBoundUtxoSelection(storage, '01', 450n)).resolves.toMatchObject({
+      utxos: [utxos[4]],
+      amount: 500n,
+    });
+
+    // With the same number of inputs, the selection without change is preferred
+    await expect(branchAndBoundUtxoSelection(storage, '00', 400n)).resolves.toMatchObject({
+      utxos: [utxos[2], utxos[0]],
+      amount: 400n,
+    });
+    // Otherwise the one with the smallest change
+    await expect(branchAndBoundUtxoSelection(storage, '01', 700n)).resolves.toMatchObject({
+      utxos: [utxos[4], utxos[3]],
+      amount: 900n,
+    });
+
+    // When the search runs out of tries the biggest utxos are used
+    await expect(
+      branchAndBoundUtxoSelection(storage, '00', 400n, { maxTries: 1 })
+    ).resolves.toMatchObject({
+      utxos: [utxos[2], utxos[1]],
+      amount: 500n,
+    });
+  });
+
+  test('planUtxoConsolidation with memory store', async () => {
+    const store = new MemoryStore();
+    await addUtxosToStore(store);
+    await store.setCurrentHeight(1);
+    const storage = new Storage(store);
+
+    // The utxos smaller than the threshold are merged, from the smallest
+    await expect(
+      planUtxoConsolidation(storage, '00', { dustThreshold: 300n, minUtxos: 2 })
+    ).resolves.toMatchObject({ utxos: [utxos[0], utxos[1]], amount: 300n });
+    await expect(
+      planUtxoConsolidation(storage, '00', { dustThreshold: 1000n, minUtxos: 2, maxUtxos: 2 })
+    ).resolves.toMatchObject({ utxos: [utxos[0], utxos[1]], amount: 300n });
+
+    // Not enough dust utxos
+    await expect(
+      planUtxoConsolidation(storage, '00', { dustThreshold: 300n, minUtxos: 3 })
+    ).resolves.toBeNull();
+    await expect(
+      planUtxoConsolidation(storage, '01', { dustThreshold: 500n, minUtxos: 1 })
+    ).resolves.toBeNull();
+  });
 });
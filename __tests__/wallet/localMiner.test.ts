@@ -0,0 +1,90 @@
+/**
+ * Copyright (c) Hathor Labs and its affiliates.
+ *
+ * This source code is licensed under the MIT license found in the
+ * LICENSE file in the root directory of this source tree.
+ */
+
+import Network from '../../src/models/network';
+import helpers from '../../src/utils/helpers';
+import txApi from '../../src/api/txApi';
+import { getPowTarget, verifyPow } from '../../src/utils/pow';
+import LocalMiner from '../../src/wallet/localMiner';
+import MineTransaction from '../../src/wallet/mineTransaction';
+
+// Transaction with weight 8
+const rawTx =
+  '00010001020082c7dd1f0ceb8867219dcca68540abe77222d11bb2dc67a7af1f04640ea1f701006a473045022100e41968f863dc3372c96a944641f2361ed86849249822b5988804adba1683b3ec02201877dd97d0c85d3754f3378828a4484de407ed2985fcf87782d90cce8f72ec9c2103168e0d873a5bbd75c90c24a68071ea05b9c10996d0cadb543ca650aa76607a260000006400001976a9143f207b6b6fdc624f6c4aff52daf5b80f7f15caf988ac0000001700001976a9143f207b6b6fdc624f6c4aff52daf5b80f7f15caf988ac40200000218def4160dcc22702006f1ebedd590bb5db5c71adbdeaa9b15f7f75c6257c26b11781dc1a5b20f83300b96fdd7a445e063326bbba979919be3b76add5b9cac9ff3330aa2bb804fb0e000000f4';
+
+describe('LocalMiner', () => {
+  const network = new Network('testnet');
+
+  it('should calculate the target of a weight', () => {
+    expect(getPowTarget(8).toString('hex')).toEqual(`01${'00'.repeat(31)}`);
+    expect(getPowTarget(0).toString('hex')).toEqual('ff'.repeat(32));
+  });
+
+  it('should solve the proof of work without changing the transaction', async () => {
+    const tx = helpers.createTxFromHex(rawTx, network);
+    const original = tx.toHex();
+    // A small task size splits the search in multiple tasks
+    const miner = new LocalMiner({ size: 0, taskSize: 16 });
+    const progress = jest.fn();
+
+    const result = await miner.mine(tx, progress);
+
+    expect(tx.toHex()).toEqual(original);
+    expect(result.parents).toEqual(tx.parents);
+    expect(result.weight).toEqual(tx.weight);
+    expect(result.timestamp).toBeGreaterThanOrEqual(tx.timestamp!);
+    expect(progress).toHaveBeenCalled();
+
+    tx.nonce = result.nonce;
+    tx.timestamp = result.timestamp;
+    expect(verifyPow(tx)).toBe(true);
+    await miner.terminate();
+  });
+
+  it('should request the parents when the transaction has none', async () => {
+    const tx = helpers.createTxFromHex(rawTx, network);
+    const parents = [...tx.parents];
+    tx.parents = [];
+    const parentsSpy = jest.spyOn(txApi, 'getTxParents').mockImplementation(async resolve => {
+      resolve({ success: true, tx_parents: parents });
+    });
+    try {
+      const result = await new LocalMiner({ size: 0 }).mine(tx);
+      expect(result.parents).toEqual(parents);
+      expect(tx.parents).toEqual([]);
+
+      tx.parents = result.parents;
+      tx.timestamp = result.timestamp;
+      tx.nonce = result.nonce;
+      expect(verifyPow(tx)).toBe(true);
+    } finally {
+      parentsSpy.mockRestore();
+    }
+  });
+
+  it('should mine with the backend up to its maximum weight', async () => {
+    const tx = helpers.createTxFromHex(rawTx, network);
+    const miner = new LocalMiner({ size: 0 });
+    const mineSpy = jest.spyOn(miner, 'mine');
+
+    const mineTransaction = new MineTransaction(tx, { miningBackend: miner });
+    const submitted = jest.fn();
+    mineTransaction.on('job-submitted', submitted);
+    mineTransaction.start();
+    const data = await mineTransaction.promise;
+
+    expect(mineSpy).toHaveBeenCalledTimes(1);
+    expect(submitted).toHaveBeenCalledWith(expect.objectContaining({ jobID: null }));
+    tx.nonce = data.nonce;
+    tx.timestamp = data.timestamp;
+    expect(verifyPow(tx)).toBe(true);
+
+    miner.maxWeight = 5;
+    expect(new MineTransaction(tx, { miningBackend: miner }).shouldMineLocally()).toBe(false);
+    expect(new MineTransaction(tx).shouldMineLocally()).toBe(false);
+  });
+});
@@ -11,6 +11,8 @@ process.env.NODE_ENV = 'test';
 import 'jest-localstorage-mock';
 import helpers from './src/utils/helpers';
 import { stopGLLBackgroundTask } from './src/sync/gll';
+import { resetRequestPool } from './src/api/requestPool';
+import { blueprintCache } from './src/nano_contracts/blueprint_cache';
 // Mocking WebSocket for tests
 import { Server, WebSocket } from 'mock-socket';
 global.WebSocket = WebSocket;
@@ -79,3 +81,10 @@ global.TextDecoder = TextDecoder;
 
 // Stop gll interval to avoid background tasks during tests
 stopGLLBackgroundTask();
+
+// Requests running and responses cached by the api clients are module-level, so a test
+// must not receive a response (or share a request) of a previous test.
+afterEach(() => {
+  resetRequestPool();
+  blueprintCache.clear();
+});
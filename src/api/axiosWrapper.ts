@@ -5,9 +5,11 @@
  * LICENSE file in the root directory of this source tree.
  */
 
-import axios from 'axios';
+import axios, { AxiosInstance, InternalAxiosRequestConfig } from 'axios';
 import { TIMEOUT } from '../constants';
 import config from '../config';
+import { METRIC_NAMES, startTimer } from '../metrics';
+import { getKeepAliveAgents, IKeepAliveAgents } from './requestPool';
 
 /**
  * Method that creates an axios instance
@@ -15,6 +17,42 @@ import config from '../config';
  * @module Axios
  */
 
+/**
+ * Timers of the requests running, by request config.
+ */
+const requestTimers = new WeakMap<InternalAxiosRequestConfig, ReturnType<typeof startTimer>>();
+
+/**
+ * Observe the latency of the requests sent by an axios instance, labeled by
+ * method and response status.
+ *
+ * @param instance Axios instance to instrument
+ */
+export const addRequestMetrics = (instance: AxiosInstance) => {
+  const stopTimer = (requestConfig: InternalAxiosRequestConfig | undefined, status: string) => {
+    const stop = requestConfig && requestTimers.get(requestConfig);
+    if (stop) {
+      requestTimers.delete(requestConfig);
+      stop({ status });
+    }
+  };
+  instance.interceptors.request.use(requestConfig => {
+    const method = (requestConfig.method ?? 'get').toLowerCase();
+    requestTimers.set(requestConfig, startTimer(METRIC_NAMES.HTTP_REQUEST, { method }));
+    return requestConfig;
+  });
+  instance.interceptors.response.use(
+    response => {
+      stopTimer(response.config, String(response.status));
+      return response;
+    },
+    error => {
+      stopTimer(error?.config, error?.response ? String(error.response.status) : 'error');
+      return Promise.reject(error);
+    }
+  );
+};
+
 /**
  * Create an axios instance to be used when sending requests
  *
@@ -45,18 +83,22 @@ export const axiosWrapperCreateRequestInstance = (
     baseURL: string;
     timeout?: number;
     headers: Record<string, string>;
-  } = {
+  } & Partial<IKeepAliveAgents> = {
     baseURL: url,
     headers: {
       'Content-Type': 'application/json',
       ...additionalHeadersObj,
     },
+    // Requests to the same server share the open connections
+    ...getKeepAliveAgents(url),
   };
   if (timeoutRef) {
     defaultOptions.timeout = timeoutRef;
   }
 
-  return axios.create(defaultOptions);
+  const instance = axios.create(defaultOptions);
+  addRequestMetrics(instance);
+  return instance;
 };
 
 export default axiosWrapperCreateRequestInstance;
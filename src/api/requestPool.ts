@@ -0,0 +1,186 @@
+/**
+ * Copyright (c) Hathor Labs and its affiliates.
+ *
+ * This source code is licensed under the MIT license found in the
+ * LICENSE file in the root directory of this source tree.
+ */
+
+import { cloneDeep } from 'lodash';
+import type { Agent as HttpAgent } from 'http';
+import type { Agent as HttpsAgent } from 'https';
+import { HTTP_AGENT_MAX_SOCKETS, API_RESPONSE_CACHE_MAX_ENTRIES } from '../constants';
+
+/**
+ * Connection pooling and request deduplication shared by the api clients.
+ *
+ * @module Axios
+ */
+
+export interface IKeepAliveAgents {
+  httpAgent: HttpAgent;
+  httpsAgent: HttpsAgent;
+}
+
+/**
+ * Map<origin, agents>
+ */
+const keepAliveAgents = new Map<string, IKeepAliveAgents>();
+
+/**
+ * Node http modules, null when they are not available (e.g. browser and react-native).
+ */
+let httpModules: { http: typeof import('http'); https: typeof import('https') } | null | undefined;
+
+function loadHttpModules() {
+  if (httpModules === undefined) {
+    try {
+      /* eslint-disable global-require, @typescript-eslint/no-var-requires */
+      httpModules = { http: require('http'), https: require('https') };
+      /* eslint-enable global-require, @typescript-eslint/no-var-requires */
+      if (typeof httpModules?.http.Agent !== 'function') {
+        // Bundlers may replace the node modules with an empty object
+        httpModules = null;
+      }
+    } catch (err) {
+      httpModules = null;
+    }
+  }
+  return httpModules;
+}
+
+/**
+ * Get the keep-alive agents shared by all requests to the origin of a base URL,
+ * so the requests reuse the open connections instead of doing a new TCP/TLS handshake.
+ *
+ * Returns null when the node http modules are not available, browsers and react-native
+ * already pool the connections.
+ *
+ * @param {string} baseURL Base URL of the requests
+ * @returns {IKeepAliveAgents|null}
+ */
+export function getKeepAliveAgents(baseURL: string): IKeepAliveAgents | null {
+  const modules = loadHttpModules();
+  if (!modules) {
+    return null;
+  }
+  let origin: string;
+  try {
+    origin = new URL(baseURL).origin;
+  } catch (err) {
+    origin = baseURL;
+  }
+  let agents = keepAliveAgents.get(origin);
+  if (!agents) {
+    const options = { keepAlive: true, maxSockets: HTTP_AGENT_MAX_SOCKETS };
+    agents = {
+      httpAgent: new modules.http.Agent(options),
+      httpsAgent: new modules.https.Agent(options),
+    };
+    keepAliveAgents.set(origin, agents);
+  }
+  return agents;
+}
+
+/**
+ * Close the idle connections of all keep-alive agents.
+ */
+export function destroyKeepAliveAgents(): void {
+  for (const { httpAgent, httpsAgent } of keepAliveAgents.values()) {
+    httpAgent.destroy();
+    httpsAgent.destroy();
+  }
+  keepAliveAgents.clear();
+}
+
+/**
+ * Requests running, Map<key, promise>
+ */
+const inFlight = new Map<string, Promise<unknown>>();
+
+/**
+ * Responses kept by `cachedRequest`, Map<key, { value, expiresAt }> in least recently used order.
+ */
+const responseCache = new Map<string, { value: unknown; expiresAt: number }>();
+
+/**
+ * Incremented by `resetRequestPool`, responses of requests started before a reset are not kept.
+ */
+let poolGeneration = 0;
+
+/**
+ * Run a request only once for all callers asking for the same key at the same time.
+ * Callers arriving while the request is running receive a copy of its result.
+ *
+ * @param {string} key Identifies the request, should include the base URL
+ * @param {() => Promise<T>} request Method that runs the request
+ * @returns {Promise<T>}
+ */
+export function singleFlight<T>(key: string, request: () => Promise<T>): Promise<T> {
+  const running = inFlight.get(key);
+  if (running) {
+    return (running as Promise<T>).then(value => cloneDeep(value));
+  }
+  const promise = request().finally(() => {
+    // The pool may have been reset and the key requested again while this request ran
+    if (inFlight.get(key) === promise) {
+      inFlight.delete(key);
+    }
+  });
+  inFlight.set(key, promise);
+  return promise;
+}
+
+/**
+ * Run a request with `singleFlight` and keep its response for `ttl` ms.
+ * Only responses accepted by `shouldCache` are kept, failures are never cached.
+ *
+ * @param {string} key Identifies the request, should include the base URL
+ * @param {() => Promise<T>} request Method that runs the request
+ * @param {Object} options
+ * @param {number} options.ttl Time in ms the response is kept
+ * @param {(value: T) => boolean} [options.shouldCache] If the response can be kept
+ * @returns {Promise<T>}
+ */
+export async function cachedRequest<T>(
+  key: string,
+  request: () => Promise<T>,
+  { ttl, shouldCache }: { ttl: number; shouldCache?: (value: T) => boolean }
+): Promise<T> {
+  const cached = responseCache.get(key);
+  if (cached) {
+    responseCache.delete(key);
+    if (cached.expiresAt > Date.now()) {
+      // Move to the most recently used position
+      responseCache.set(key, cached);
+      return cloneDeep(cached.value as T);
+    }
+  }
+
+  const generation = poolGeneration;
+  const value = await singleFlight(key, request);
+  if (generation === poolGeneration && (!shouldCache || shouldCache(value))) {
+    // The caller owns the value returned, the cache keeps its own copy
+    responseCache.set(key, { value: cloneDeep(value), expiresAt: Date.now() + ttl });
+    while (responseCache.size > API_RESPONSE_CACHE_MAX_ENTRIES) {
+      responseCache.delete(responseCache.keys().next().value as string);
+    }
+  }
+  return value;
+}
+
+/**
+ * Remove all responses kept by `cachedRequest`.
+ */
+export function clearResponseCache(): void {
+  responseCache.clear();
+}
+
+/**
+ * Forget the requests running and the responses kept, so the next calls request them again.
+ * The requests running are not cancelled, their callers still receive the results.
+ */
+export function resetRequestPool(): void {
+  inFlight.clear();
+  responseCache.clear();
+  poolGeneration++;
+}
@@ -6,6 +6,9 @@
  */
 
 import { createRequestInstance } from './axiosInstance';
+import { cachedRequest } from './requestPool';
+import config from '../config';
+import { API_RESPONSE_CACHE_TTL } from '../constants';
 import { transformJsonBigIntResponse } from '../utils/bigint';
 import {
   FullNodeTxApiResponse,
@@ -83,7 +86,21 @@ const txApi = {
    */
   getTransaction(id: string, resolve: (response: FullNodeTxApiResponse) => void): Promise<void> {
     const data = { id };
-    return this.getTransactionBase(data, resolve, transactionApiSchema);
+    // Concurrent requests for the same tx are sent once, confirmed txs are cached for a short time
+    return cachedRequest(
+      `${config.getServerUrl()}|transaction|${id}`,
+      () =>
+        new Promise<FullNodeTxApiResponse>((resolveRequest, reject) => {
+          this.getTransactionBase(data, resolveRequest, transactionApiSchema).catch(reject);
+        }),
+      {
+        ttl: API_RESPONSE_CACHE_TTL,
+        shouldCache: response =>
+          response.success && !!response.meta.first_block && response.meta.voided_by.length === 0,
+      }
+    ).then(response => {
+      resolve(response);
+    });
   },
 
   /**
@@ -181,6 +198,51 @@ const txApi = {
       );
   },
 
+  /**
+   * Call api to get the parents a new transaction should confirm
+   *
+   * @param {function} resolve Method to be called after response arrives
+   *
+   * @return {Promise}
+   * @memberof ApiTransaction
+   * @inner
+   */
+  getTxParents(resolve) {
+    return createRequestInstance(resolve)
+      .get(`tx_parents`)
+      .then(
+        res => {
+          resolve(res.data);
+        },
+        res => {
+          return Promise.reject(res);
+        }
+      );
+  },
+
+  /**
+   * Call api to get the block of the best chain at a height
+   *
+   * @param {number} height Height of the block
+   * @param {function} resolve Method to be called after response arrives
+   *
+   * @return {Promise}
+   * @memberof ApiTransaction
+   * @inner
+   */
+  getBlockAtHeight(height, resolve) {
+    return createRequestInstance(resolve)
+      .get(`block_at_height`, { params: { height } })
+      .then(
+        res => {
+          resolve(res.data);
+        },
+        res => {
+          return Promise.reject(res);
+        }
+      );
+  },
+
   /**
    * Call api to get graphviz
    *
@@ -6,6 +6,8 @@
  */
 
 import { createRequestInstance } from './axiosInstance';
+import { singleFlight } from './requestPool';
+import config from '../config';
 import { ApiVersion } from '../types';
 
 /**
@@ -28,16 +30,18 @@ const versionApi = {
   // TODO: This method uses a callback pattern but also returns a Promise, which is an anti-pattern
   // NOTE: createRequestInstance has legacy typing (resolve?: null) that doesn't match actual usage.
   getVersion(resolve: (data: ApiVersion) => void) {
-    return createRequestInstance(resolve as unknown as null)
-      .get<ApiVersion>(`version`)
-      .then(
-        res => {
-          resolve(res.data);
-        },
-        res => {
-          return Promise.reject(res);
-        }
-      );
+    return singleFlight(`${config.getServerUrl()}|version`, () =>
+      createRequestInstance(resolve as unknown as null)
+        .get<ApiVersion>(`version`)
+        .then(res => res.data)
+    ).then(
+      data => {
+        resolve(data);
+      },
+      res => {
+        return Promise.reject(res);
+      }
+    );
   },
 
   /**
@@ -51,16 +55,18 @@ const versionApi = {
     // FIXME: This function wraps a Promise around another Promise, which is an anti-pattern.
     return new Promise((resolve, reject) => {
       // NOTE: createRequestInstance has legacy typing (resolve?: null) that doesn't match actual usage.
-      createRequestInstance(resolve as unknown as null)
-        .get<ApiVersion>(`version`)
-        .then(
-          res => {
-            resolve(res.data);
-          },
-          err => {
-            reject(err);
-          }
-        );
+      singleFlight(`${config.getServerUrl()}|version`, () =>
+        createRequestInstance(resolve as unknown as null)
+          .get<ApiVersion>(`version`)
+          .then(res => res.data)
+      ).then(
+        data => {
+          resolve(data);
+        },
+        err => {
+          reject(err);
+        }
+      );
     });
   },
 };
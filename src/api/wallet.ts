@@ -7,6 +7,8 @@
 
 import { AxiosResponse } from 'axios';
 import { createRequestInstance } from './axiosInstance';
+import { singleFlight } from './requestPool';
+import config from '../config';
 import { SEND_TOKENS_TIMEOUT } from '../constants';
 import { transformJsonBigIntResponse } from '../utils/bigint';
 import {
@@ -146,19 +148,22 @@ const walletApi = {
    */
   getGeneralTokenInfo(uid, resolve): Promise<void | AxiosResponse<GeneralTokenInfoSchema>> {
     const data = { id: uid };
-    return createRequestInstance(resolve)
-      .get('thin_wallet/token', {
-        params: data,
-        transformResponse: res => transformJsonBigIntResponse(res, generalTokenInfoSchema),
-      })
-      .then(
-        res => {
-          resolve(res.data);
-        },
-        res => {
-          return Promise.reject(res);
-        }
-      );
+    // Concurrent requests for the same token are sent once
+    return singleFlight(`${config.getServerUrl()}|thin_wallet/token|${uid}`, () =>
+      createRequestInstance(resolve)
+        .get('thin_wallet/token', {
+          params: data,
+          transformResponse: res => transformJsonBigIntResponse(res, generalTokenInfoSchema),
+        })
+        .then(res => res.data as GeneralTokenInfoSchema)
+    ).then(
+      tokenInfo => {
+        resolve(tokenInfo);
+      },
+      res => {
+        return Promise.reject(res);
+      }
+    );
   },
 
   /**
@@ -88,6 +88,11 @@ export const POA_BLOCK_VERSION = 5;
  */
 export const NANO_CONTRACTS_INITIALIZE_METHOD = 'initialize';
 
+/**
+ * Maximum number of blueprints kept by the blueprint information cache
+ */
+export const NANO_BLUEPRINT_CACHE_MAX_ENTRIES = 500;
+
 /**
  * On chain blueprints information version
  * If we decide to change the serialization of the object information
@@ -175,6 +180,22 @@ export const HATHOR_TOKEN_INDEX: number = 0;
  */
 export const TIMEOUT: number = 10000;
 
+/**
+ * Maximum number of connections opened by the keep-alive agent of each api server
+ */
+export const HTTP_AGENT_MAX_SOCKETS: number = 50;
+
+/**
+ * Time in milliseconds the api responses of confirmed data (e.g. confirmed transactions)
+ * are cached
+ */
+export const API_RESPONSE_CACHE_TTL: number = 10000;
+
+/**
+ * Maximum number of api responses cached
+ */
+export const API_RESPONSE_CACHE_MAX_ENTRIES: number = 1000;
+
 /**
  * Default timeout for send tokens request in milliseconds
  */
@@ -224,6 +245,12 @@ export const STRATUM_TIMEOUT_RETURN_CODE = 'stratum_timeout';
  */
 export const MIN_POLLING_INTERVAL: number = 0.5;
 
+/**
+ * Default maximum weight of the transactions mined by a local mining backend,
+ * heavier transactions are sent to the tx mining service
+ */
+export const LOCAL_MINING_MAX_WEIGHT: number = 22;
+
 /**
  * Shape of the per-network weight constants consumed by
  * {@link Transaction.calculateWeight}. Network values arrive via the
@@ -378,6 +405,103 @@ export const LOAD_WALLET_MAX_RETRY: number = 5;
  */
 export const LOAD_WALLET_RETRY_SLEEP: number = 5000;
 
+/**
+ * Maximum time in milliseconds between each load wallet retry,
+ * the time doubles on each retry of the same request
+ */
+export const LOAD_WALLET_MAX_RETRY_SLEEP: number = 30000;
+
+/**
+ * Number of address history requests running at the same time when loading wallet history
+ */
+export const LOAD_WALLET_HISTORY_CONCURRENCY: number = 4;
+
+/**
+ * Time in seconds before the sync checkpoint to also look for changed transactions when
+ * resuming from it, the timestamp of a tx can be older than when it reached the full node
+ */
+export const SYNC_CHECKPOINT_TIMESTAMP_MARGIN: number = 3600;
+
+/**
+ * Number of transactions requested per page when listing the transactions since a checkpoint
+ */
+export const SYNC_CHECKPOINT_PAGE_SIZE: number = 100;
+
+/**
+ * Maximum number of pages of blocks and of transactions listed since a checkpoint, with more
+ * activity since it the wallet history is synced again instead of resuming from it
+ */
+export const SYNC_CHECKPOINT_MAX_PAGES: number = 20;
+
+/**
+ * Minimum time in seconds between the requests of the sync checkpoint block while the wallet
+ * is running, the checkpoint saved in between keeps the last block requested
+ */
+export const SYNC_CHECKPOINT_REFRESH_INTERVAL: number = 60;
+
+/**
+ * Default maximum number of websocket transactions in a batch, when batching is enabled
+ */
+export const WS_TX_BATCH_MAX_SIZE: number = 100;
+
+/**
+ * Default time in ms a websocket transaction waits for its batch, when batching is enabled
+ */
+export const WS_TX_BATCH_MAX_DELAY: number = 50;
+
+/**
+ * Time in ms processing websocket transactions can hold the event loop before yielding
+ */
+export const WS_TX_PROCESSING_YIELD_INTERVAL: number = 50;
+
+/**
+ * Default upper bounds, in seconds, of the histogram buckets kept by the metrics registry
+ */
+export const METRICS_HISTOGRAM_BUCKETS: number[] = [
+  0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60,
+];
+
+/**
+ * Default number of wallet sync tasks running at the same time
+ */
+export const SYNC_SCHEDULER_CONCURRENCY: number = 3;
+
+/**
+ * Default time in ms of the window the process CPU usage is measured on by the sync scheduler
+ */
+export const SYNC_SCHEDULER_CPU_WINDOW: number = 1000;
+
+/**
+ * Maximum number of nodes visited by the branch-and-bound utxo selection before it settles
+ * for the best selection found so far
+ */
+export const UTXO_BNB_MAX_TRIES: number = 100000;
+
+/**
+ * Maximum time in ms spent by the branch-and-bound utxo selection searching for a selection
+ */
+export const UTXO_BNB_TIME_LIMIT: number = 50;
+
+/**
+ * Default number of dust utxos required to start a background consolidation
+ */
+export const UTXO_CONSOLIDATION_MIN_UTXOS: number = 10;
+
+/**
+ * Default time in ms without new transactions before the wallet is considered idle
+ */
+export const UTXO_CONSOLIDATION_IDLE_TIME: number = 30000;
+
+/**
+ * Default interval in ms between the checks of the background consolidation
+ */
+export const UTXO_CONSOLIDATION_INTERVAL: number = 60000;
+
+/**
+ * Default memory in bytes used by the rebuilt txs kept by a compact memory store history
+ */
+export const COMPACT_HISTORY_CACHE_SIZE: number = 8 * 1024 * 1024;
+
 /**
  * Limit of retries when downloading token metadata
  */
@@ -471,3 +471,12 @@ export class NanoHeaderNotFound extends Error {}
 export class HasTxOutsideFirstAddressError extends Error {
   errorCode: string = ErrorMessages.HAS_TX_OUTSIDE_FIRST_ADDRESS;
 }
+
+/**
+ * Error thrown when there is too much network activity since a sync checkpoint to resume
+ * from it, a full sync of the wallet is faster.
+ *
+ * @memberof Errors
+ * @inner
+ */
+export class SyncCheckpointTooOldError extends Error {}
@@ -9,15 +9,20 @@ import txMiningApi from './api/txMining';
 import healthApi from './api/health';
 import versionApi from './api/version';
 import * as axios from './api/axiosInstance';
+import * as requestPool from './api/requestPool';
 import metadataApi from './api/metadataApi';
 import featuresApi from './api/featuresApi';
 import { Storage } from './storage/storage';
 import { MemoryStore } from './storage/memory_store';
+import { FileStore } from './storage/file_store';
+import { MemoryAddressCache, FileAddressCache } from './storage/address_cache';
 import network from './network';
 import HathorWallet from './new/wallet';
 import Connection from './new/connection';
+import WalletHost, { HostedConnection } from './new/walletHost';
 import WalletServiceConnection from './wallet/connection';
 import SendTransaction from './new/sendTransaction';
+import SendTransactionBatch from './new/sendTransactionBatch';
 import Address from './models/address';
 import Output from './models/output';
 import P2PKH from './models/p2pkh';
@@ -27,6 +32,7 @@ import ScriptData from './models/script_data';
 import Input from './models/input';
 import Transaction from './models/transaction';
 import CreateTokenTransaction from './models/create_token_transaction';
+import TransactionView from './models/transaction_view';
 import Network from './models/network';
 import FeeHeader from './headers/fee';
 import * as addressUtils from './utils/address';
@@ -52,12 +58,16 @@ import ncApi from './api/nano';
 import * as nanoUtils from './nano_contracts/utils';
 import NanoContractTransactionParser from './nano_contracts/parser';
 import * as bigIntUtils from './utils/bigint';
+import * as metrics from './metrics';
 import {
   TransactionTemplate,
   TransactionTemplateBuilder,
   WalletTxTemplateInterpreter,
 } from './template/transaction';
 import { stopGLLBackgroundTask } from './sync/gll';
+import { AddressDerivationPool } from './sync/derivation_pool';
+import SyncScheduler from './sync/scheduler';
+import LocalMiner from './wallet/localMiner';
 import * as enums from './models/enum';
 import { Fee } from './utils/fee';
 import * as shielded from './shielded';
@@ -79,14 +89,21 @@ export {
   ErrorMessages,
   constants,
   axios,
+  requestPool,
   Storage,
   MemoryStore,
+  FileStore,
+  MemoryAddressCache,
+  FileAddressCache,
   network,
   HathorWallet,
   Connection,
+  WalletHost,
+  HostedConnection,
   AtomicSwapServiceConnection,
   WalletServiceConnection,
   SendTransaction,
+  SendTransactionBatch,
   Address,
   Output,
   P2PKH,
@@ -96,6 +113,7 @@ export {
   Input,
   Transaction,
   CreateTokenTransaction,
+  TransactionView,
   Network,
   FeeHeader,
   Fee,
@@ -120,10 +138,14 @@ export {
   nanoUtils,
   NanoContractTransactionParser,
   bigIntUtils,
+  metrics,
   TransactionTemplate,
   TransactionTemplateBuilder,
   WalletTxTemplateInterpreter,
   stopGLLBackgroundTask,
+  AddressDerivationPool,
+  SyncScheduler,
+  LocalMiner,
   enums,
   shielded,
 };
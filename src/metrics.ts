@@ -0,0 +1,342 @@
+/**
+ * Copyright (c) Hathor Labs and its affiliates.
+ *
+ * This source code is licensed under the MIT license found in the
+ * LICENSE file in the root directory of this source tree.
+ */
+
+import { IMetrics, MetricLabels } from './types';
+import { METRICS_HISTOGRAM_BUCKETS } from './constants';
+
+/**
+ * Instrumentation of the lib hot paths.
+ *
+ * The lib reports to the instance set with `setMetrics`, which does nothing by default.
+ * `MetricsRegistry` keeps the values in memory and exports them as a snapshot or in the
+ * Prometheus text format, any other backend can be used by implementing `IMetrics`.
+ *
+ * @module Metrics
+ */
+
+/**
+ * Names of the metrics reported by the lib.
+ */
+export const METRIC_NAMES = {
+  PROCESS_NEW_TX: 'hathor_wallet_process_new_tx_seconds',
+  PROCESS_HISTORY: 'hathor_wallet_process_history_seconds',
+  UTXO_SELECTION: 'hathor_wallet_utxo_selection_seconds',
+  ADDRESS_DERIVATION: 'hathor_wallet_address_derivation_seconds',
+  SHIELDED_REWIND: 'hathor_wallet_shielded_rewind_seconds',
+  SIGN_TX: 'hathor_wallet_sign_tx_seconds',
+  MINING_WAIT: 'hathor_wallet_mining_wait_seconds',
+  HTTP_REQUEST: 'hathor_wallet_http_request_seconds',
+  WEBSOCKET_RTT: 'hathor_wallet_websocket_rtt_seconds',
+  STREAM_EVENTS_RECEIVED: 'hathor_wallet_stream_events_received_total',
+  STREAM_EVENTS_PROCESSED: 'hathor_wallet_stream_events_processed_total',
+  STREAM_QUEUE_SIZE: 'hathor_wallet_stream_queue_size',
+} as const;
+
+/**
+ * Metrics implementation that ignores all values, used when no metrics were set.
+ */
+export class NoopMetrics implements IMetrics {
+  // eslint-disable-next-line class-methods-use-this -- Values are ignored
+  incrementCounter(_name: string, _value?: number, _labels?: MetricLabels): void {}
+
+  // eslint-disable-next-line class-methods-use-this -- Values are ignored
+  setGauge(_name: string, _value: number, _labels?: MetricLabels): void {}
+
+  // eslint-disable-next-line class-methods-use-this -- Values are ignored
+  observeHistogram(_name: string, _value: number, _labels?: MetricLabels): void {}
+}
+
+const noopMetrics = new NoopMetrics();
+
+let currentMetrics: IMetrics = noopMetrics;
+
+/**
+ * Set the metrics instance the lib reports to.
+ *
+ * @param {IMetrics|null} metrics Metrics instance, null to stop reporting
+ */
+export function setMetrics(metrics: IMetrics | null): void {
+  currentMetrics = metrics ?? noopMetrics;
+}
+
+/**
+ * Get the metrics instance the lib reports to.
+ *
+ * @returns {IMetrics}
+ */
+export function getMetrics(): IMetrics {
+  return currentMetrics;
+}
+
+function now(): number {
+  return typeof performance !== 'undefined' ? performance.now() : Date.now();
+}
+
+function noopStop(): number {
+  return 0;
+}
+
+/**
+ * Start measuring a duration.
+ * The returned method observes the seconds elapsed in the histogram `name` and returns them.
+ *
+ * @param {string} name Histogram name
+ * @param {MetricLabels} [labels] Labels of the observation
+ * @returns {(extraLabels?: MetricLabels) => number} Method to stop the timer
+ */
+export function startTimer(
+  name: string,
+  labels?: MetricLabels
+): (extraLabels?: MetricLabels) => number {
+  const metrics = currentMetrics;
+  if (metrics === noopMetrics) {
+    // Avoid reading the clock when nobody is listening
+    return noopStop;
+  }
+  const start = now();
+  return (extraLabels?: MetricLabels) => {
+    const seconds = (now() - start) / 1000;
+    metrics.observeHistogram(name, seconds, extraLabels ? { ...labels, ...extraLabels } : labels);
+    return seconds;
+  };
+}
+
+/**
+ * Run an async method observing its duration in the histogram `name`.
+ * Failures are observed as well, with the label `status` set to `error`.
+ *
+ * @param {string} name Histogram name
+ * @param {() => Promise<T>} fn Method to measure
+ * @param {MetricLabels} [labels] Labels of the observation
+ * @returns {Promise<T>} The result of `fn`
+ */
+export async function timeAsync<T>(
+  name: string,
+  fn: () => Promise<T>,
+  labels?: MetricLabels
+): Promise<T> {
+  const stop = startTimer(name, labels);
+  try {
+    const result = await fn();
+    stop();
+    return result;
+  } catch (err) {
+    stop({ status: 'error' });
+    throw err;
+  }
+}
+
+export interface IMetricSample {
+  name: string;
+  labels: MetricLabels;
+  value: number;
+}
+
+export interface IHistogramSample {
+  name: string;
+  labels: MetricLabels;
+  count: number;
+  sum: number;
+  /**
+   * Cumulative count of observations less than or equal to each upper bound.
+   */
+  buckets: { le: number; count: number }[];
+}
+
+export interface IMetricsSnapshot {
+  counters: IMetricSample[];
+  gauges: IMetricSample[];
+  histograms: IHistogramSample[];
+}
+
+interface IHistogramSeries {
+  name: string;
+  labels: MetricLabels;
+  count: number;
+  sum: number;
+  /**
+   * Observations of each bucket, not cumulative.
+   * The last position counts the observations above all upper bounds.
+   */
+  bucketCounts: number[];
+}
+
+function seriesKey(name: string, labels?: MetricLabels): string {
+  const keys = labels ? Object.keys(labels).sort() : [];
+  if (keys.length === 0) {
+    return name;
+  }
+  return `${name}{${keys.map(key => `${key}=${JSON.stringify(labels![key])}`).join(',')}}`;
+}
+
+function escapeLabelValue(value: string): string {
+  return value.replace(/\\/g, '\\\\').replace(/\n/g, '\\n').replace(/"/g, '\\"');
+}
+
+function formatLabels(labels: MetricLabels, extra?: [string, string]): string {
+  const pairs = Object.keys(labels)
+    .sort()
+    .map(key => `${key}="${escapeLabelValue(labels[key])}"`);
+  if (extra) {
+    pairs.push(`${extra[0]}="${escapeLabelValue(extra[1])}"`);
+  }
+  return pairs.length > 0 ? `{${pairs.join(',')}}` : '';
+}
+
+function formatNumber(value: number): string {
+  if (value === Infinity) {
+    return '+Inf';
+  }
+  if (value === -Infinity) {
+    return '-Inf';
+  }
+  return String(value);
+}
+
+/**
+ * In memory metrics with a snapshot and a Prometheus text exporter.
+ *
+ * Each combination of name and labels is a series, labels should have a small
+ * set of values (e.g. a wallet id, never a tx id).
+ */
+export class MetricsRegistry implements IMetrics {
+  buckets: number[];
+
+  counters: Map<string, IMetricSample>;
+
+  gauges: Map<string, IMetricSample>;
+
+  histograms: Map<string, IHistogramSeries>;
+
+  /**
+   * @param {Object} [options]
+   * @param {number[]} [options.buckets] Upper bounds of the histogram buckets, in seconds
+   */
+  constructor({ buckets = METRICS_HISTOGRAM_BUCKETS }: { buckets?: number[] } = {}) {
+    this.buckets = [...buckets].sort((a, b) => a - b);
+    this.counters = new Map();
+    this.gauges = new Map();
+    this.histograms = new Map();
+  }
+
+  incrementCounter(name: string, value: number = 1, labels?: MetricLabels): void {
+    const key = seriesKey(name, labels);
+    const counter = this.counters.get(key);
+    if (counter) {
+      counter.value += value;
+    } else {
+      this.counters.set(key, { name, labels: { ...labels }, value });
+    }
+  }
+
+  setGauge(name: string, value: number, labels?: MetricLabels): void {
+    const key = seriesKey(name, labels);
+    const gauge = this.gauges.get(key);
+    if (gauge) {
+      gauge.value = value;
+    } else {
+      this.gauges.set(key, { name, labels: { ...labels }, value });
+    }
+  }
+
+  observeHistogram(name: string, value: number, labels?: MetricLabels): void {
+    const key = seriesKey(name, labels);
+    let histogram = this.histograms.get(key);
+    if (!histogram) {
+      histogram = {
+        name,
+        labels: { ...labels },
+        count: 0,
+        sum: 0,
+        bucketCounts: new Array(this.buckets.length + 1).fill(0),
+      };
+      this.histograms.set(key, histogram);
+    }
+    let index = this.buckets.findIndex(le => value <= le);
+    if (index === -1) {
+      index = this.buckets.length;
+    }
+    histogram.bucketCounts[index] += 1;
+    histogram.count += 1;
+    histogram.sum += value;
+  }
+
+  /**
+   * Get a copy of the current values.
+   *
+   * @returns {IMetricsSnapshot}
+   */
+  snapshot(): IMetricsSnapshot {
+    const copySample = (sample: IMetricSample) => ({ ...sample, labels: { ...sample.labels } });
+    return {
+      counters: [...this.counters.values()].map(copySample),
+      gauges: [...this.gauges.values()].map(copySample),
+      histograms: [...this.histograms.values()].map(histogram => {
+        let cumulative = 0;
+        const buckets = [...this.buckets, Infinity].map((le, index) => {
+          cumulative += histogram.bucketCounts[index];
+          return { le, count: cumulative };
+        });
+        return {
+          name: histogram.name,
+          labels: { ...histogram.labels },
+          count: histogram.count,
+          sum: histogram.sum,
+          buckets,
+        };
+      }),
+    };
+  }
+
+  /**
+   * Export the current values in the Prometheus text exposition format.
+   *
+   * @returns {string}
+   */
+  toPrometheus(): string {
+    const { counters, gauges, histograms } = this.snapshot();
+    const lines: string[] = [];
+    const typed = new Set<string>();
+    const addType = (name: string, type: string) => {
+      if (!typed.has(name)) {
+        typed.add(name);
+        lines.push(`# TYPE ${name} ${type}`);
+      }
+    };
+    const byName = <T extends { name: string }>(samples: T[]) =>
+      samples.sort((a, b) => (a.name < b.name ? -1 : Number(a.name > b.name)));
+
+    for (const counter of byName(counters)) {
+      addType(counter.name, 'counter');
+      lines.push(`${counter.name}${formatLabels(counter.labels)} ${formatNumber(counter.value)}`);
+    }
+    for (const gauge of byName(gauges)) {
+      addType(gauge.name, 'gauge');
+      lines.push(`${gauge.name}${formatLabels(gauge.labels)} ${formatNumber(gauge.value)}`);
+    }
+    for (const histogram of byName(histograms)) {
+      addType(histogram.name, 'histogram');
+      for (const bucket of histogram.buckets) {
+        const labels = formatLabels(histogram.labels, ['le', formatNumber(bucket.le)]);
+        lines.push(`${histogram.name}_bucket${labels} ${bucket.count}`);
+      }
+      const labels = formatLabels(histogram.labels);
+      lines.push(`${histogram.name}_sum${labels} ${formatNumber(histogram.sum)}`);
+      lines.push(`${histogram.name}_count${labels} ${histogram.count}`);
+    }
+    return lines.length > 0 ? `${lines.join('\n')}\n` : '';
+  }
+
+  /**
+   * Remove all values.
+   */
+  reset(): void {
+    this.counters.clear();
+    this.gauges.clear();
+    this.histograms.clear();
+  }
+}
@@ -95,6 +95,33 @@ class CreateTokenTransaction extends Transaction {
     this.serializeTokenInfo(array);
   }
 
+  /**
+   * Get the size of the serialized funds fields, without serializing them
+   *
+   * @return {number}
+   * @memberof CreateTokenTransaction
+   * @inner
+   */
+  getFundsFieldsSize(): number {
+    // Signal bits, version, len inputs and len outputs
+    let size = 4 + this.getInputsOutputsSize(true);
+    // Token info version, name and symbol with their sizes
+    size += 3 + buffer.Buffer.byteLength(this.name, 'utf8');
+    size += buffer.Buffer.byteLength(this.symbol, 'utf8');
+    return size;
+  }
+
+  /**
+   * Values that change the serialization of the funds fields
+   *
+   * @return {unknown[]}
+   * @memberof CreateTokenTransaction
+   * @inner
+   */
+  getFundsFieldsFingerprint(): unknown[] {
+    return [...super.getFundsFieldsFingerprint(), this.name, this.symbol, this.tokenVersion];
+  }
+
   /**
    * Serialize create token tx info to bytes
    *
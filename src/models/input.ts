@@ -67,6 +67,24 @@ class Input {
     return arr;
   }
 
+  /**
+   * Get the size of the input serialization, without serializing it
+   *
+   * @param {boolean} addData If the input data is added to the serialization
+   *
+   * @return {number}
+   * @memberof Input
+   * @inner
+   */
+  getSize(addData: boolean = true): number {
+    // Hash, index and data length
+    let size = TX_HASH_SIZE_BYTES + 1 + 2;
+    if (this.data && addData) {
+      size += this.data.length;
+    }
+    return size;
+  }
+
   setData(data: Buffer) {
     this.data = data;
   }
@@ -7,6 +7,7 @@
 
 import _ from 'lodash';
 import {
+  MAX_OUTPUT_VALUE_32,
   TOKEN_AUTHORITY_MASK,
   TOKEN_INDEX_MASK,
   TOKEN_MELT_MASK,
@@ -152,6 +153,20 @@ class Output {
     return this.getTokenIndex() === -1;
   }
 
+  /**
+   * Get the size of the output serialization, without serializing it
+   *
+   * @return {number}
+   * @memberof Output
+   * @inner
+   */
+  getSize(): number {
+    // Values above the 32 bits limit are serialized with 8 bytes
+    const valueSize = this.value > MAX_OUTPUT_VALUE_32 ? 8 : 4;
+    // Value, token data, script length and script
+    return valueSize + 1 + 2 + this.script.length;
+  }
+
   /**
    * Serialize an output to bytes
    *
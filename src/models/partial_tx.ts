@@ -11,13 +11,13 @@ import { get } from 'lodash';
 import Input from './input';
 import Output from './output';
 import Transaction from './transaction';
+import TransactionView from './transaction_view';
 import Network from './network';
 
 import P2PKH from './p2pkh';
 import P2SH from './p2sh';
 
 import transactionUtils from '../utils/transaction';
-import helpers from '../utils/helpers';
 import { IndexOOBError, UnsupportedScriptError } from '../errors';
 
 import txApi from '../api/txApi';
@@ -426,21 +426,32 @@ export class PartialTx {
       [];
     const changeOutputs = dataArr[3].split(':').map(x => parseInt(x, 16));
 
-    const tx = helpers.createTxFromHex(txHex, network);
+    // The tx is only read, the view does not create the inputs
+    const tx = TransactionView.fromHex(txHex, network);
+    // The headers are parsed as well, so malformed trailing bytes are still rejected
+    tx.parseHeaders();
+    const { tokens } = tx;
 
     const instance = new PartialTx(network);
 
-    for (const [index, input] of tx.inputs.entries()) {
+    for (let index = 0; index < tx.inputsLength; index++) {
       const inputMeta = inputArr[index];
-      instance.addInput(input.hash, input.index, inputMeta.value, inputMeta.address, {
-        token: inputMeta.token,
-        authorities: inputMeta.authorities,
-      });
+      instance.addInput(
+        tx.getInputTxId(index),
+        tx.getInputIndex(index),
+        inputMeta.value,
+        inputMeta.address,
+        {
+          token: inputMeta.token,
+          authorities: inputMeta.authorities,
+        }
+      );
     }
 
-    for (const [index, output] of tx.outputs.entries()) {
-      // validate script
-      const script = output.parseScript(network);
+    for (let index = 0; index < tx.outputsLength; index++) {
+      // validate script, parsed when the output is created
+      const output = tx.getOutput(index);
+      const script = output.decodedScript;
       if (!(script instanceof P2PKH || script instanceof P2SH)) {
         throw new UnsupportedScriptError('Unsupported script type');
       }
@@ -453,7 +464,7 @@ export class PartialTx {
         authorities += TOKEN_MELT_MASK;
       }
 
-      const token = output.isTokenHTR() ? NATIVE_TOKEN_UID : tx.tokens[output.getTokenIndex()];
+      const token = output.isTokenHTR() ? NATIVE_TOKEN_UID : tokens[output.getTokenIndex()];
       instance.addOutput(output.value, output.script, {
         token,
         authorities,
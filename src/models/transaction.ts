@@ -64,6 +64,32 @@ type optionsType = {
   headers?: Header[];
 };
 
+/**
+ * Serialized bytes of a group of fields, kept while the fingerprint of
+ * the fields does not change.
+ */
+type SerializationCache = {
+  fingerprint: unknown[];
+  bytes: Buffer;
+  hash: Buffer | null;
+  headers?: Buffer;
+};
+
+/**
+ * Check if two fingerprints have the same values, objects are compared by reference
+ */
+function isSameFingerprint(a: unknown[], b: unknown[]): boolean {
+  if (a.length !== b.length) {
+    return false;
+  }
+  for (let i = 0; i < a.length; i++) {
+    if (a[i] !== b[i]) {
+      return false;
+    }
+  }
+  return true;
+}
+
 /**
  * Representation of a transaction with helper methods.
  *
@@ -104,6 +130,10 @@ class Transaction {
 
   protected _dataToSignCache: Buffer | null;
 
+  protected _fundsCache: SerializationCache | null;
+
+  protected _graphCache: SerializationCache | null;
+
   constructor(inputs: Input[], outputs: Output[], options: optionsType = {}) {
     const defaultOptions: optionsType = {
       signalBits: DEFAULT_SIGNAL_BITS,
@@ -134,6 +164,11 @@ class Transaction {
 
     // All inputs sign the same data, so we cache it in the first getDataToSign method call
     this._dataToSignCache = null;
+
+    // Funds and graph fields are serialized again only when they change
+    // see `getFundsFieldsBytes` and `getGraphFieldsBytes`
+    this._fundsCache = null;
+    this._graphCache = null;
   }
 
   /**
@@ -325,6 +360,180 @@ class Transaction {
     }
   }
 
+  /**
+   * Values that change the serialization of the funds fields.
+   * Inputs, outputs and buffers are compared by reference, so changing them
+   * in place (e.g. `input.data = ...` when signing) is detected.
+   *
+   * @return {unknown[]}
+   * @memberof Transaction
+   * @inner
+   */
+  getFundsFieldsFingerprint(): unknown[] {
+    const fingerprint: unknown[] = [
+      this.signalBits,
+      this.version,
+      this.tokens.length,
+      ...this.tokens,
+      this.inputs.length,
+      this.outputs.length,
+    ];
+    for (const input of this.inputs) {
+      fingerprint.push(input, input.hash, input.index, input.data);
+    }
+    for (const output of this.outputs) {
+      fingerprint.push(output, output.value, output.tokenData, output.script);
+    }
+    return fingerprint;
+  }
+
+  /**
+   * Values that change the serialization of the graph fields
+   *
+   * @return {unknown[]}
+   * @memberof Transaction
+   * @inner
+   */
+  getGraphFieldsFingerprint(): unknown[] {
+    const parents = this.parents || [];
+    return [this.weight, this.timestamp, parents.length, ...parents];
+  }
+
+  /**
+   * Get the serialized funds fields (with input data).
+   * The bytes are cached until one of the funds fields changes.
+   *
+   * @return {Buffer}
+   * @memberof Transaction
+   * @inner
+   */
+  getFundsFieldsBytes(): Buffer {
+    const fingerprint = this.getFundsFieldsFingerprint();
+    if (
+      this._fundsCache === null ||
+      !isSameFingerprint(this._fundsCache.fingerprint, fingerprint)
+    ) {
+      const arr: Buffer[] = [];
+      this.serializeFundsFields(arr, true);
+      this._fundsCache = { fingerprint, bytes: util.buffer.concat(arr), hash: null };
+    }
+    return this._fundsCache.bytes;
+  }
+
+  /**
+   * Get the serialized graph fields (weight, timestamp and parents).
+   * The bytes are cached until one of the graph fields changes.
+   *
+   * @return {Buffer}
+   * @memberof Transaction
+   * @inner
+   */
+  getGraphFieldsBytes(): Buffer {
+    const fingerprint = this.getGraphFieldsFingerprint();
+    if (
+      this._graphCache === null ||
+      !isSameFingerprint(this._graphCache.fingerprint, fingerprint)
+    ) {
+      const arr: Buffer[] = [];
+      this.serializeGraphFields(arr);
+      this._graphCache = { fingerprint, bytes: util.buffer.concat(arr), hash: null };
+    }
+    return this._graphCache.bytes;
+  }
+
+  /**
+   * Get the size of the serialized funds fields, without serializing them
+   *
+   * @return {number}
+   * @memberof Transaction
+   * @inner
+   */
+  getFundsFieldsSize(): number {
+    // Signal bits, version, len tokens, len inputs and len outputs
+    return 5 + this.tokens.length * TX_HASH_SIZE_BYTES + this.getInputsOutputsSize(true);
+  }
+
+  /**
+   * Get the size of the serialized inputs and outputs, without serializing them
+   *
+   * @param {boolean} addInputData If the input data is added to the serialization
+   *
+   * @return {number}
+   * @memberof Transaction
+   * @inner
+   */
+  getInputsOutputsSize(addInputData: boolean): number {
+    let size = 0;
+    for (const input of this.inputs) {
+      size += input.getSize(addInputData);
+    }
+    for (const output of this.outputs) {
+      size += output.getSize();
+    }
+    return size;
+  }
+
+  /**
+   * Get the size of the serialized graph fields, without serializing them
+   *
+   * @return {number}
+   * @memberof Transaction
+   * @inner
+   */
+  getGraphFieldsSize(): number {
+    const parentsLen = this.parents ? this.parents.length : 0;
+    // Weight, timestamp, len parents and parents
+    return 8 + 4 + 1 + parentsLen * TX_HASH_SIZE_BYTES;
+  }
+
+  /**
+   * Get the size of the serialized transaction (`toBytes().length`).
+   * Only the headers are serialized to get their size.
+   *
+   * @return {number}
+   * @memberof Transaction
+   * @inner
+   */
+  getSize(): number {
+    // Funds fields, graph fields and nonce
+    let size = this.getFundsFieldsSize() + this.getGraphFieldsSize() + 4;
+    const arrHeaders: Buffer[] = [];
+    this.serializeHeaders(arrHeaders);
+    for (const part of arrHeaders) {
+      size += part.length;
+    }
+    return size;
+  }
+
+  /**
+   * Write the funds fields, graph fields, nonce and the trailing parts in a single buffer.
+   *
+   * @param {Buffer[]} trailing Serialized parts added after the nonce
+   *
+   * @return {Buffer}
+   * @memberof Transaction
+   * @inner
+   */
+  serializeWithTrailing(trailing: Buffer[]): Buffer {
+    const funds = this.getFundsFieldsBytes();
+    const graph = this.getGraphFieldsBytes();
+    let size = funds.length + graph.length + 4;
+    for (const part of trailing) {
+      size += part.length;
+    }
+
+    const buf = buffer.Buffer.allocUnsafe(size);
+    let offset = funds.copy(buf, 0);
+    offset += graph.copy(buf, offset);
+    // Nonce
+    new DataView(buf.buffer, buf.byteOffset + offset, 4).setUint32(0, this.nonce, false);
+    offset += 4;
+    for (const part of trailing) {
+      offset += part.copy(buf, offset);
+    }
+    return buf;
+  }
+
   /*
    * Execute hash of the data to sign
    *
@@ -354,7 +563,7 @@ class Transaction {
    */
   calculateWeight(weightConstants?: TxWeightConstants): number {
     const constants = weightConstants ?? TX_WEIGHT_CONSTANTS;
-    let txSize = this.toBytes().length;
+    let txSize = this.getSize();
 
     // If parents are not in txData, we need to consider them here
     if (!this.parents || !this.parents.length || this.parents.length === 0) {
@@ -419,21 +628,11 @@ class Transaction {
    * @inner
    */
   toBytes(): Buffer {
-    const arr: Buffer[] = [];
-    // Serialize first the funds part
-    //
-    this.serializeFundsFields(arr, true);
+    // Funds fields, graph fields and nonce, then the headers
+    const arrHeaders: Buffer[] = [];
+    this.serializeHeaders(arrHeaders);
 
-    // Weight, timestamp, parents
-    this.serializeGraphFields(arr);
-
-    // Nonce
-    this.serializeNonce(arr);
-
-    // Headers
-    this.serializeHeaders(arr);
-
-    return util.buffer.concat(arr);
+    return this.serializeWithTrailing(arrHeaders);
   }
 
   /**
@@ -718,11 +917,14 @@ class Transaction {
    * @inner
    */
   getFundsHash(): Buffer {
-    const arrFunds = [];
-    this.serializeFundsFields(arrFunds, true);
-    const fundsHash = crypto.createHash('sha256');
-    fundsHash.update(buffer.Buffer.concat(arrFunds));
-    return fundsHash.digest();
+    const fundsBytes = this.getFundsFieldsBytes();
+    const cache = this._fundsCache!;
+    if (cache.hash === null) {
+      const fundsHash = crypto.createHash('sha256');
+      fundsHash.update(fundsBytes);
+      cache.hash = fundsHash.digest();
+    }
+    return buffer.Buffer.from(cache.hash);
   }
 
   /**
@@ -733,19 +935,25 @@ class Transaction {
    * @inner
    */
   getGraphAndHeadersHash() {
-    const arrGraph = [];
-    this.serializeGraphFields(arrGraph);
-    const hash = crypto.createHash('sha256');
-    hash.update(buffer.Buffer.concat(arrGraph));
-
-    if (this.headers.length !== 0) {
-      // The hathor-core method returns b'' here if there are no headers
-      const arrHeaders = [];
-      this.serializeHeaders(arrHeaders);
-      hash.update(buffer.Buffer.concat(arrHeaders));
+    const graphBytes = this.getGraphFieldsBytes();
+    const cache = this._graphCache!;
+
+    // The hathor-core method returns b'' here if there are no headers
+    const arrHeaders: Buffer[] = [];
+    this.serializeHeaders(arrHeaders);
+    const headersBytes = buffer.Buffer.concat(arrHeaders);
+
+    // Headers are changed in place (e.g. the nano header script when signing),
+    // so the hash is kept only for the same serialized headers
+    if (cache.hash === null || !cache.headers!.equals(headersBytes)) {
+      const hash = crypto.createHash('sha256');
+      hash.update(graphBytes);
+      hash.update(headersBytes);
+      cache.hash = hash.digest();
+      cache.headers = headersBytes;
     }
 
-    return hash.digest();
+    return buffer.Buffer.from(cache.hash);
   }
 
   /**
@@ -0,0 +1,509 @@
+/**
+ * Copyright (c) Hathor Labs and its affiliates.
+ *
+ * This source code is licensed under the MIT license found in the
+ * LICENSE file in the root directory of this source tree.
+ */
+
+import crypto from 'crypto';
+import { CREATE_TOKEN_TX_VERSION, DEFAULT_TX_VERSION, TX_HASH_SIZE_BYTES } from '../constants';
+import { ParseError } from '../errors';
+import { bufferToHex, hexToBuffer } from '../utils/buffer';
+import { OutputValueType } from '../types';
+import type Header from '../headers/base';
+import HeaderParser from '../headers/parser';
+import { getVertexHeaderIdFromBuffer } from '../headers/types';
+import Input from './input';
+import Output from './output';
+import Network from './network';
+import Transaction from './transaction';
+import CreateTokenTransaction from './create_token_transaction';
+
+/**
+ * Read-only view over a serialized transaction.
+ *
+ * The bytes are scanned once to record the offsets of each field, nothing is copied.
+ * Inputs, outputs and headers are only created when they are accessed, so reading a
+ * few fields of many transactions (e.g. PartialTx proposals or audits) does not build
+ * the full `Transaction` objects.
+ *
+ * The view keeps a reference to the buffer, it must not be changed while the view is used.
+ */
+class TransactionView {
+  buf: Buffer;
+
+  network: Network;
+
+  signalBits: number;
+
+  version: number;
+
+  /**
+   * Offset of each input and output, with the end of the last one at the end
+   */
+  protected _inputOffsets: number[];
+
+  protected _outputOffsets: number[];
+
+  protected _tokensOffset: number;
+
+  protected _tokensLength: number;
+
+  protected _tokenInfoOffset: number | null;
+
+  protected _graphOffset: number;
+
+  protected _nonceOffset: number;
+
+  protected _headersOffset: number;
+
+  protected _inputs: (Input | undefined)[];
+
+  protected _outputs: (Output | undefined)[];
+
+  protected _headers: Header[] | null;
+
+  protected _hash: string | null;
+
+  /**
+   * @param {Buffer} buf Serialized transaction, it is not copied
+   * @param {Network} network Network of the output addresses
+   *
+   * @throws {ParseError} If the version is not supported or the buffer is truncated
+   */
+  constructor(buf: Buffer, network: Network) {
+    this.buf = buf;
+    this.network = network;
+    this._inputs = [];
+    this._outputs = [];
+    this._headers = null;
+    this._hash = null;
+
+    let offset = 0;
+    const read = (n: number) => {
+      if (buf.length < offset + n) {
+        throw new ParseError(
+          `Don't have enough bytes to unpack. Requested ${n} and buffer has ${buf.length - offset}`
+        );
+      }
+      const start = offset;
+      offset += n;
+      return start;
+    };
+
+    this.signalBits = buf.readUInt8(read(1));
+    this.version = buf.readUInt8(read(1));
+    if (this.version !== DEFAULT_TX_VERSION && this.version !== CREATE_TOKEN_TX_VERSION) {
+      throw new ParseError(
+        'We currently support only the Transaction and CreateTokenTransaction types. Other types will be supported in the future.'
+      );
+    }
+    const isCreateToken = this.version === CREATE_TOKEN_TX_VERSION;
+
+    this._tokensLength = isCreateToken ? 0 : buf.readUInt8(read(1));
+    const lenInputs = buf.readUInt8(read(1));
+    const lenOutputs = buf.readUInt8(read(1));
+
+    this._tokensOffset = read(this._tokensLength * TX_HASH_SIZE_BYTES);
+
+    this._inputOffsets = [];
+    for (let i = 0; i < lenInputs; i++) {
+      this._inputOffsets.push(offset);
+      read(TX_HASH_SIZE_BYTES + 1);
+      read(buf.readUInt16BE(read(2)));
+    }
+    this._inputOffsets.push(offset);
+
+    this._outputOffsets = [];
+    for (let i = 0; i < lenOutputs; i++) {
+      this._outputOffsets.push(offset);
+      // Values with the sign bit set use 8 bytes
+      read(1);
+      read(buf.readInt8(offset - 1) < 0 ? 7 : 3);
+      read(1);
+      read(buf.readUInt16BE(read(2)));
+    }
+    this._outputOffsets.push(offset);
+
+    this._tokenInfoOffset = null;
+    if (isCreateToken) {
+      // Token info version, name and symbol
+      this._tokenInfoOffset = read(1);
+      read(buf.readUInt8(read(1)));
+      read(buf.readUInt8(read(1)));
+    }
+
+    // Weight, timestamp and parents
+    this._graphOffset = read(8 + 4);
+    read(buf.readUInt8(read(1)) * TX_HASH_SIZE_BYTES);
+    this._nonceOffset = read(4);
+    this._headersOffset = offset;
+  }
+
+  /**
+   * Create a view from the transaction hex
+   *
+   * @param {string} hex Serialized transaction in hex
+   * @param {Network} network Network of the output addresses
+   *
+   * @return {TransactionView}
+   * @memberof TransactionView
+   * @static
+   */
+  static fromHex(hex: string, network: Network): TransactionView {
+    return new TransactionView(hexToBuffer(hex), network);
+  }
+
+  get inputsLength(): number {
+    return this._inputOffsets.length - 1;
+  }
+
+  get outputsLength(): number {
+    return this._outputOffsets.length - 1;
+  }
+
+  get tokens(): string[] {
+    const tokens: string[] = [];
+    for (let i = 0; i < this._tokensLength; i++) {
+      const start = this._tokensOffset + i * TX_HASH_SIZE_BYTES;
+      tokens.push(bufferToHex(this.buf.subarray(start, start + TX_HASH_SIZE_BYTES)));
+    }
+    return tokens;
+  }
+
+  get weight(): number {
+    return this.buf.readDoubleBE(this._graphOffset);
+  }
+
+  get timestamp(): number {
+    return this.buf.readUInt32BE(this._graphOffset + 8);
+  }
+
+  get parents(): string[] {
+    const parents: string[] = [];
+    const lenParents = this.buf.readUInt8(this._graphOffset + 12);
+    for (let i = 0; i < lenParents; i++) {
+      const start = this._graphOffset + 13 + i * TX_HASH_SIZE_BYTES;
+      parents.push(bufferToHex(this.buf.subarray(start, start + TX_HASH_SIZE_BYTES)));
+    }
+    return parents;
+  }
+
+  get nonce(): number {
+    return this.buf.readUInt32BE(this._nonceOffset);
+  }
+
+  /**
+   * Get the hash of the transaction, calculated on the first access
+   */
+  get hash(): string {
+    if (this._hash === null) {
+      this._hash = this.calculateHash();
+    }
+    return this._hash;
+  }
+
+  /**
+   * Get the token info of a create token transaction
+   *
+   * @return {{ tokenVersion: number, name: string, symbol: string }|null}
+   *   null if it's not a create token transaction
+   * @memberof TransactionView
+   * @inner
+   */
+  getTokenInfo(): { tokenVersion: number; name: string; symbol: string } | null {
+    if (this._tokenInfoOffset === null) {
+      return null;
+    }
+    let offset = this._tokenInfoOffset;
+    const tokenVersion = this.buf.readUInt8(offset);
+    const lenName = this.buf.readUInt8(offset + 1);
+    const name = this.buf.toString('utf-8', offset + 2, offset + 2 + lenName);
+    offset += 2 + lenName;
+    const lenSymbol = this.buf.readUInt8(offset);
+    const symbol = this.buf.toString('utf-8', offset + 1, offset + 1 + lenSymbol);
+    return { tokenVersion, name, symbol };
+  }
+
+  /**
+   * Get the tx id of the output spent by an input
+   *
+   * @param {number} index Index of the input
+   *
+   * @return {string}
+   * @memberof TransactionView
+   * @inner
+   */
+  getInputTxId(index: number): string {
+    const start = this.getInputOffset(index);
+    return bufferToHex(this.buf.subarray(start, start + TX_HASH_SIZE_BYTES));
+  }
+
+  /**
+   * Get the index of the output spent by an input
+   *
+   * @param {number} index Index of the input
+   *
+   * @return {number}
+   * @memberof TransactionView
+   * @inner
+   */
+  getInputIndex(index: number): number {
+    return this.buf.readUInt8(this.getInputOffset(index) + TX_HASH_SIZE_BYTES);
+  }
+
+  /**
+   * Get the data of an input, the returned buffer shares the memory of the view
+   *
+   * @param {number} index Index of the input
+   *
+   * @return {Buffer|null} The input data or null if it is empty
+   * @memberof TransactionView
+   * @inner
+   */
+  getInputData(index: number): Buffer | null {
+    const dataOffset = this.getInputOffset(index) + TX_HASH_SIZE_BYTES + 1;
+    const dataLen = this.buf.readUInt16BE(dataOffset);
+    if (dataLen === 0) {
+      return null;
+    }
+    return this.buf.subarray(dataOffset + 2, dataOffset + 2 + dataLen);
+  }
+
+  /**
+   * Get an input, it is created on the first access
+   *
+   * @param {number} index Index of the input
+   *
+   * @return {Input}
+   * @memberof TransactionView
+   * @inner
+   */
+  getInput(index: number): Input {
+    let input = this._inputs[index];
+    if (input === undefined) {
+      input = new Input(this.getInputTxId(index), this.getInputIndex(index), {
+        data: this.getInputData(index),
+      });
+      this._inputs[index] = input;
+    }
+    return input;
+  }
+
+  /**
+   * Get the value of an output
+   *
+   * @param {number} index Index of the output
+   *
+   * @return {OutputValueType}
+   * @memberof TransactionView
+   * @inner
+   */
+  getOutputValue(index: number): OutputValueType {
+    const start = this.getOutputOffset(index);
+    if (this.buf.readInt8(start) < 0) {
+      // Values above the 32 bits limit are serialized negative with 8 bytes
+      return -this.buf.readBigInt64BE(start);
+    }
+    return BigInt(this.buf.readInt32BE(start));
+  }
+
+  /**
+   * Get the token data of an output
+   *
+   * @param {number} index Index of the output
+   *
+   * @return {number}
+   * @memberof TransactionView
+   * @inner
+   */
+  getOutputTokenData(index: number): number {
+    return this.buf.readUInt8(this.getOutputScriptOffset(index) - 3);
+  }
+
+  /**
+   * Get the script of an output, the returned buffer shares the memory of the view
+   *
+   * @param {number} index Index of the output
+   *
+   * @return {Buffer}
+   * @memberof TransactionView
+   * @inner
+   */
+  getOutputScript(index: number): Buffer {
+    return this.buf.subarray(this.getOutputScriptOffset(index), this._outputOffsets[index + 1]);
+  }
+
+  /**
+   * Get an output, it is created on the first access with its script parsed
+   *
+   * @param {number} index Index of the output
+   *
+   * @return {Output}
+   * @memberof TransactionView
+   * @inner
+   */
+  getOutput(index: number): Output {
+    let output = this._outputs[index];
+    if (output === undefined) {
+      output = new Output(this.getOutputValue(index), this.getOutputScript(index), {
+        tokenData: this.getOutputTokenData(index),
+      });
+      output.parseScript(this.network);
+      this._outputs[index] = output;
+    }
+    return output;
+  }
+
+  /**
+   * All inputs of the transaction, creating the ones not yet accessed
+   */
+  get inputs(): Input[] {
+    return Array.from({ length: this.inputsLength }, (_, index) => this.getInput(index));
+  }
+
+  /**
+   * All outputs of the transaction, creating the ones not yet accessed
+   */
+  get outputs(): Output[] {
+    return Array.from({ length: this.outputsLength }, (_, index) => this.getOutput(index));
+  }
+
+  /**
+   * Headers of the transaction, deserialized on the first access
+   */
+  get headers(): Header[] {
+    return this.parseHeaders();
+  }
+
+  /**
+   * Deserialize the headers of the transaction, only done once.
+   * Throws if the bytes after the graph fields are not valid headers.
+   *
+   * @return {Header[]}
+   * @memberof TransactionView
+   * @inner
+   */
+  parseHeaders(): Header[] {
+    if (this._headers === null) {
+      const headers: Header[] = [];
+      let buf = this.buf.subarray(this._headersOffset);
+      // Same as `Transaction.getHeadersFromBytes`, a single byte is not a header
+      if (buf.length > 1) {
+        while (buf.length > 0) {
+          const headerClass = HeaderParser.getHeader(getVertexHeaderIdFromBuffer(buf));
+          let header: Header;
+          // eslint-disable-next-line prefer-const -- To split this declaration would be confusing
+          [header, buf] = headerClass.deserialize(buf, this.network);
+          headers.push(header);
+        }
+      }
+      this._headers = headers;
+    }
+    return this._headers;
+  }
+
+  /**
+   * Get the serialized funds fields, the returned buffer shares the memory of the view
+   *
+   * @return {Buffer}
+   * @memberof TransactionView
+   * @inner
+   */
+  getFundsFieldsBytes(): Buffer {
+    return this.buf.subarray(0, this._graphOffset);
+  }
+
+  /**
+   * Return the data signed by the inputs, the same as `Transaction.getDataToSign`.
+   * The funds fields are copied from the view without the input data.
+   *
+   * @return {Buffer}
+   * @memberof TransactionView
+   * @inner
+   */
+  getDataToSign(): Buffer {
+    const inputsStart = this._inputOffsets[0];
+    const outputsStart = this._outputOffsets[0];
+    const arr: Buffer[] = [this.buf.subarray(0, inputsStart)];
+    const emptyData = Buffer.alloc(2);
+    for (let i = 0; i < this.inputsLength; i++) {
+      const start = this._inputOffsets[i];
+      arr.push(this.buf.subarray(start, start + TX_HASH_SIZE_BYTES + 1), emptyData);
+    }
+    // Outputs and token info
+    arr.push(this.buf.subarray(outputsStart, this._graphOffset));
+
+    for (const header of this.headers) {
+      header.serializeSighash(arr);
+    }
+    return Buffer.concat(arr);
+  }
+
+  /**
+   * Calculate the transaction hash from the serialized fields, without creating the transaction
+   *
+   * @return {string} Transaction hash in hexadecimal
+   * @memberof TransactionView
+   * @inner
+   */
+  calculateHash(): string {
+    const fundsHash = crypto.createHash('sha256');
+    fundsHash.update(this.getFundsFieldsBytes());
+
+    const graphAndHeadersHash = crypto.createHash('sha256');
+    graphAndHeadersHash.update(this.buf.subarray(this._graphOffset, this._nonceOffset));
+    if (this.buf.length - this._headersOffset > 1) {
+      // Same as `Transaction.getHeadersFromBytes`, a single byte is not a header
+      graphAndHeadersHash.update(this.buf.subarray(this._headersOffset));
+    }
+
+    const part1 = crypto.createHash('sha256');
+    part1.update(fundsHash.digest());
+    part1.update(graphAndHeadersHash.digest());
+    // Nonce with 12 bytes of padding
+    part1.update(Buffer.alloc(12));
+    part1.update(this.buf.subarray(this._nonceOffset, this._nonceOffset + 4));
+
+    const part2 = crypto.createHash('sha256');
+    part2.update(part1.digest());
+    return bufferToHex(part2.digest().reverse());
+  }
+
+  /**
+   * Create the full transaction object from the view
+   *
+   * @return {Transaction|CreateTokenTransaction}
+   * @memberof TransactionView
+   * @inner
+   */
+  toTransaction(): Transaction | CreateTokenTransaction {
+    if (this.version === CREATE_TOKEN_TX_VERSION) {
+      return CreateTokenTransaction.createFromBytes(this.buf, this.network);
+    }
+    return Transaction.createFromBytes(this.buf, this.network);
+  }
+
+  protected getInputOffset(index: number): number {
+    if (index < 0 || index >= this.inputsLength) {
+      throw new RangeError(`Input ${index} does not exist.`);
+    }
+    return this._inputOffsets[index];
+  }
+
+  protected getOutputOffset(index: number): number {
+    if (index < 0 || index >= this.outputsLength) {
+      throw new RangeError(`Output ${index} does not exist.`);
+    }
+    return this._outputOffsets[index];
+  }
+
+  protected getOutputScriptOffset(index: number): number {
+    const start = this.getOutputOffset(index);
+    const valueSize = this.buf.readInt8(start) < 0 ? 8 : 4;
+    // Value, token data and script length
+    return start + valueSize + 1 + 2;
+  }
+}
+
+export default TransactionView;
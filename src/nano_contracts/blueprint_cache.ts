@@ -0,0 +1,205 @@
+/**
+ * Copyright (c) Hathor Labs and its affiliates.
+ *
+ * This source code is licensed under the MIT license found in the
+ * LICENSE file in the root directory of this source tree.
+ */
+
+import { get, has } from 'lodash';
+import Network from '../models/network';
+import ncApi from '../api/nano';
+import config from '../config';
+import { NanoContractTransactionParseError } from '../errors';
+import { NANO_BLUEPRINT_CACHE_MAX_ENTRIES } from '../constants';
+import leb128 from '../utils/leb128';
+import { NCFieldBase } from './fields';
+import { getFieldParser, normalizeTypeString } from './ncTypes/parser';
+import {
+  IParsedArgument,
+  MethodArgInfo,
+  NanoContractBlueprintInformationAPIResponse,
+} from './types';
+
+/**
+ * Decoder of the serialized arguments of a blueprint method.
+ *
+ * The type strings of the method arguments are parsed once into fields, each decode
+ * creates new instances from them so decoders can be shared.
+ */
+export class MethodArgsDecoder {
+  args: (MethodArgInfo & { field: NCFieldBase })[];
+
+  /**
+   * @param {MethodArgInfo[]} methodArgs Arguments of the method from the blueprint information
+   * @param {Network} network Network used by the address fields
+   * @throws {NanoContractTransactionParseError} If an argument type is not supported
+   */
+  constructor(methodArgs: MethodArgInfo[], network: Network) {
+    this.args = methodArgs.map(arg => {
+      // Normalize type string (e.g., union[Address, ContractId] -> CallerId)
+      const type = normalizeTypeString(arg.type);
+      try {
+        return { ...arg, type, field: getFieldParser(type, network) };
+      } catch (err: unknown) {
+        throw new NanoContractTransactionParseError(`Failed to deserialize argument ${type}.`);
+      }
+    });
+  }
+
+  /**
+   * Decode the serialized arguments of a method call.
+   *
+   * @param {string} argsHex Serialized arguments in hex
+   * @returns {IParsedArgument[]}
+   * @throws {NanoContractTransactionParseError} If the arguments do not match the method
+   */
+  decode(argsHex: string): IParsedArgument[] {
+    let argsBuffer = Buffer.from(argsHex, 'hex');
+
+    // Number of arguments
+    const numArgsReadResult = leb128.decodeUnsigned(argsBuffer);
+    const numArgs = Number(numArgsReadResult.value);
+    argsBuffer = numArgsReadResult.rest;
+
+    if (numArgs !== this.args.length) {
+      throw new NanoContractTransactionParseError(`Number of arguments do not match blueprint.`);
+    }
+
+    const parsedArgs: IParsedArgument[] = [];
+    for (const { field: fieldType, ...arg } of this.args) {
+      let parsed: IParsedArgument;
+      let size: number;
+      try {
+        const field = fieldType.createNew();
+        const result = field.fromBuffer(argsBuffer);
+        parsed = { ...arg, value: field.toUser() };
+        size = result.bytesRead;
+      } catch (err: unknown) {
+        throw new NanoContractTransactionParseError(`Failed to deserialize argument ${arg.type}.`);
+      }
+      parsedArgs.push(parsed);
+      argsBuffer = argsBuffer.subarray(size);
+    }
+    if (parsedArgs.length > 0 && argsBuffer.length !== 0) {
+      throw new Error(`${argsBuffer.length} bytes left after parsing all arguments.`);
+    }
+    return parsedArgs;
+  }
+}
+
+interface IBlueprintCacheEntry {
+  info: Promise<NanoContractBlueprintInformationAPIResponse>;
+  /**
+   * Map<`<network>:<method>`, decoder>
+   */
+  decoders: Map<string, MethodArgsDecoder>;
+}
+
+/**
+ * Least recently used cache of the blueprint information, along with the argument
+ * decoders of their methods.
+ *
+ * The code of a blueprint does not change once it is on chain, so entries are only
+ * removed to keep the cache under `maxEntries`. Entries are kept per full node server,
+ * a blueprint id of one network says nothing about the other networks.
+ */
+export class BlueprintCache {
+  maxEntries: number;
+
+  /**
+   * Map<`<server>|<blueprintId>`, entry> in least recently used order.
+   */
+  entries: Map<string, IBlueprintCacheEntry>;
+
+  /**
+   * @param {number} [maxEntries] Maximum number of blueprints kept
+   */
+  constructor(maxEntries: number = NANO_BLUEPRINT_CACHE_MAX_ENTRIES) {
+    this.maxEntries = maxEntries;
+    this.entries = new Map<string, IBlueprintCacheEntry>();
+  }
+
+  private getEntry(blueprintId: string): IBlueprintCacheEntry {
+    const key = `${config.getServerUrl()}|${blueprintId}`;
+    let entry = this.entries.get(key);
+    if (entry) {
+      // Move to the most recently used position
+      this.entries.delete(key);
+    } else {
+      const info = ncApi.getBlueprintInformation(blueprintId);
+      entry = { info, decoders: new Map<string, MethodArgsDecoder>() };
+      // A failed request is not cached, the next call requests it again
+      info.catch(() => {
+        if (this.entries.get(key) === entry) {
+          this.entries.delete(key);
+        }
+      });
+    }
+    this.entries.set(key, entry);
+    while (this.entries.size > Math.max(this.maxEntries, 1)) {
+      this.entries.delete(this.entries.keys().next().value as string);
+    }
+    return entry;
+  }
+
+  /**
+   * Get the information of a blueprint, requested to the current full node only once.
+   * Concurrent calls for the same blueprint share the same request.
+   *
+   * @param {string} blueprintId Blueprint ID
+   * @returns {Promise<NanoContractBlueprintInformationAPIResponse>}
+   */
+  async getBlueprintInformation(
+    blueprintId: string
+  ): Promise<NanoContractBlueprintInformationAPIResponse> {
+    return this.getEntry(blueprintId).info;
+  }
+
+  /**
+   * Get the decoder of the arguments of a blueprint public method.
+   *
+   * @param {string} blueprintId Blueprint ID
+   * @param {string} method Public method name
+   * @param {Network} network Network used by the address fields
+   * @returns {Promise<MethodArgsDecoder>}
+   * @throws {NanoContractTransactionParseError} If the method is not a public blueprint method
+   */
+  async getMethodDecoder(
+    blueprintId: string,
+    method: string,
+    network: Network
+  ): Promise<MethodArgsDecoder> {
+    const entry = this.getEntry(blueprintId);
+    const blueprintInformation = await entry.info;
+    const decoderKey = `${network.name}:${method}`;
+    let decoder = entry.decoders.get(decoderKey);
+    if (!decoder) {
+      if (!has(blueprintInformation, `public_methods.${method}`)) {
+        // If the method is not in the blueprint information public methods, then there's an error
+        throw new NanoContractTransactionParseError(
+          'Failed to parse nano contract transaction. Method not found.'
+        );
+      }
+      const methodArgs = get(
+        blueprintInformation,
+        `public_methods.${method}.args`,
+        []
+      ) as MethodArgInfo[];
+      decoder = new MethodArgsDecoder(methodArgs, network);
+      entry.decoders.set(decoderKey, decoder);
+    }
+    return decoder;
+  }
+
+  /**
+   * Remove all blueprints from the cache.
+   */
+  clear(): void {
+    this.entries.clear();
+  }
+}
+
+/**
+ * Blueprint cache shared by the nano contract parsers.
+ */
+export const blueprintCache = new BlueprintCache();
@@ -105,17 +105,37 @@ class OnChainBlueprint extends Transaction {
    * @inner
    */
   toBytes(): Buffer {
-    const arr: Buffer[] = [];
-    // Serialize first the funds part
-    this.serializeFundsFields(arr, true);
-
-    // Graph fields
-    this.serializeGraphFields(arr);
+    // Funds fields, graph fields and nonce, without headers
+    return this.serializeWithTrailing([]);
+  }
 
-    // Nonce
-    this.serializeNonce(arr);
+  /**
+   * Get the size of the serialized blueprint (`toBytes().length`).
+   * The code is compressed when serialized, so the funds size comes from the cached bytes.
+   *
+   * @memberof OnChainBlueprint
+   * @inner
+   */
+  getSize(): number {
+    // Funds fields, graph fields and nonce
+    return this.getFundsFieldsBytes().length + this.getGraphFieldsSize() + 4;
+  }
 
-    return Buffer.concat(arr);
+  /**
+   * Values that change the serialization of the funds fields
+   *
+   * @memberof OnChainBlueprint
+   * @inner
+   */
+  getFundsFieldsFingerprint(): unknown[] {
+    return [
+      ...super.getFundsFieldsFingerprint(),
+      this.code,
+      this.code.kind,
+      this.code.content,
+      this.pubkey,
+      this.signature,
+    ];
   }
 }
 
@@ -5,14 +5,10 @@
  * LICENSE file in the root directory of this source tree.
  */
 
-import { get, has } from 'lodash';
 import Address from '../models/address';
 import Network from '../models/network';
-import ncApi from '../api/nano';
-import { NanoContractTransactionParseError } from '../errors';
-import { MethodArgInfo, IParsedArgument } from './types';
-import leb128 from '../utils/leb128';
-import { getFieldParser, normalizeTypeString } from './ncTypes/parser';
+import { IParsedArgument } from './types';
+import { blueprintCache } from './blueprint_cache';
 
 class NanoContractTransactionParser {
   blueprintId: string;
@@ -45,68 +41,60 @@ class NanoContractTransactionParser {
   /**
    * Parse the arguments in hex into a list of parsed arguments
    *
+   * The blueprint information and the argument decoders of its methods are kept
+   * in the shared blueprint cache.
+   *
    * @memberof NanoContractTransactionParser
    * @inner
    */
   async parseArguments() {
-    const parsedArgs: IParsedArgument[] = [];
     if (!this.args) {
       return;
     }
 
-    // Get the blueprint data from full node
-    const blueprintInformation = await ncApi.getBlueprintInformation(this.blueprintId);
-    if (!has(blueprintInformation, `public_methods.${this.method}`)) {
-      // If this.method is not in the blueprint information public methods, then there's an error
-      throw new NanoContractTransactionParseError(
-        'Failed to parse nano contract transaction. Method not found.'
-      );
-    }
-
-    const methodArgs = get(
-      blueprintInformation,
-      `public_methods.${this.method}.args`,
-      []
-    ) as MethodArgInfo[];
-    let argsBuffer = Buffer.from(this.args, 'hex');
-
-    // Number of arguments
-    const numArgsReadResult = leb128.decodeUnsigned(argsBuffer);
-    const numArgs = Number(numArgsReadResult.value);
-    argsBuffer = numArgsReadResult.rest;
-
-    if (numArgs !== methodArgs.length) {
-      throw new NanoContractTransactionParseError(`Number of arguments do not match blueprint.`);
-    }
-
-    if (methodArgs.length === 0) {
+    const decoder = await blueprintCache.getMethodDecoder(
+      this.blueprintId,
+      this.method,
+      this.network
+    );
+    const parsedArgs = decoder.decode(this.args);
+    if (parsedArgs.length === 0) {
       return;
     }
 
-    for (const arg of methodArgs) {
-      // Normalize type string (e.g., union[Address, ContractId] -> CallerId)
-      const normalizedType = normalizeTypeString(arg.type);
-      let parsed: IParsedArgument;
-      let size: number;
-      try {
-        const field = getFieldParser(normalizedType, this.network);
-        const result = field.fromBuffer(argsBuffer);
-        parsed = { ...arg, type: normalizedType, value: field.toUser() };
-        size = result.bytesRead;
-      } catch (err: unknown) {
-        throw new NanoContractTransactionParseError(
-          `Failed to deserialize argument ${normalizedType}.`
-        );
-      }
-      parsedArgs.push(parsed);
-      argsBuffer = argsBuffer.subarray(size);
-    }
-    if (argsBuffer.length !== 0) {
-      throw new Error(`${argsBuffer.length} bytes left after parsing all arguments.`);
-    }
-
     this.parsedArgs = parsedArgs;
   }
+
+  /**
+   * Parse the arguments of many parsers, the information of each distinct blueprint
+   * is requested only once.
+   *
+   * @param {NanoContractTransactionParser[]} parsers Parsers to run
+   * @returns {Promise<(Error|null)[]>} The error of each parser in the same order, null on success
+   *
+   * @memberof NanoContractTransactionParser
+   * @static
+   */
+  static async parseArgumentsBatch(
+    parsers: NanoContractTransactionParser[]
+  ): Promise<(Error | null)[]> {
+    const blueprintIds = new Set(parsers.filter(p => p.args).map(p => p.blueprintId));
+    // Errors fetching a blueprint are reported by the parsers using it
+    await Promise.allSettled(
+      [...blueprintIds].map(blueprintId => blueprintCache.getBlueprintInformation(blueprintId))
+    );
+
+    return Promise.all(
+      parsers.map(async parser => {
+        try {
+          await parser.parseArguments();
+          return null;
+        } catch (err: unknown) {
+          return err instanceof Error ? err : new Error(String(err));
+        }
+      })
+    );
+  }
 }
 
 export default NanoContractTransactionParser;
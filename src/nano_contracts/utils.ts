@@ -36,6 +36,7 @@ import { getFieldParser, normalizeTypeString } from './ncTypes/parser';
 import { isSignedDataField } from './fields';
 import HathorWallet from '../new/wallet';
 import NanoContractHeader from './header';
+import { blueprintCache } from './blueprint_cache';
 
 /**
  * Set the caller address and seqnum on a nano contract header.
@@ -230,8 +231,8 @@ export const validateAndParseBlueprintMethodArgs = async (
   args: unknown[] | null,
   network: Network
 ): Promise<IArgumentField[]> => {
-  // Get the blueprint data from full node
-  const blueprintInformation = await ncApi.getBlueprintInformation(blueprintId);
+  // Get the blueprint data from full node, or from the blueprint cache
+  const blueprintInformation = await blueprintCache.getBlueprintInformation(blueprintId);
 
   const methodArgs = get(
     blueprintInformation,
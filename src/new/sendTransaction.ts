@@ -976,6 +976,7 @@ export default class SendTransaction extends EventEmitter implements ISendTransa
 
     this.mineTransaction = new MineTransaction(this.transaction, {
       maxTxMiningRetries: newOptions.maxTxMiningRetries,
+      miningBackend: this.storage?.miningBackend ?? null,
     });
 
     this.mineTransaction.on('mining-started', () => {
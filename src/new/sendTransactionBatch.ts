@@ -0,0 +1,175 @@
+/**
+ * Copyright (c) Hathor Labs and its affiliates.
+ *
+ * This source code is licensed under the MIT license found in the
+ * LICENSE file in the root directory of this source tree.
+ */
+
+import { SendTxError } from '../errors';
+import Transaction from '../models/transaction';
+import { IStorage } from '../types';
+import SendTransaction from './sendTransaction';
+import { SendBatchResult } from './types';
+
+/**
+ * Default number of transactions being mined and pushed at the same time.
+ */
+export const SEND_BATCH_DEFAULT_CONCURRENCY = 4;
+
+/**
+ * Send many transactions of the same wallet.
+ *
+ * The transactions are sent in 3 stages:
+ * - Prepare: each transaction selects its inputs and reserves them (selected as input)
+ *   before the next one is prepared, so the transactions never spend the same utxo.
+ * - Sign: the wallet keys are unlocked once with a signing session and every
+ *   transaction is signed with it.
+ * - Mine and push: up to `concurrency` transactions are mined and pushed at the same time.
+ *
+ * A failure only affects its own transaction, the inputs it reserved are released
+ * and the error is reported on its result.
+ */
+export default class SendTransactionBatch {
+  storage: IStorage;
+
+  sendTransactions: SendTransaction[];
+
+  pin: string | null;
+
+  concurrency: number;
+
+  /**
+   * @param {IStorage} storage Storage of the wallet sending the transactions
+   * @param {SendTransaction[]} sendTransactions The transactions to send, not yet prepared
+   * @param {Object} [options]
+   * @param {string|null} [options.pin=null] Pin to unlock the wallet keys
+   * @param {number} [options.concurrency] Maximum number of transactions being mined and pushed
+   */
+  constructor(
+    storage: IStorage,
+    sendTransactions: SendTransaction[],
+    {
+      pin = null,
+      concurrency = SEND_BATCH_DEFAULT_CONCURRENCY,
+    }: { pin?: string | null; concurrency?: number } = {}
+  ) {
+    this.storage = storage;
+    this.sendTransactions = sendTransactions;
+    this.pin = pin;
+    this.concurrency = concurrency;
+  }
+
+  /**
+   * Prepare, sign, mine and push all transactions.
+   *
+   * @returns {Promise<SendBatchResult[]>} The result of each transaction, in the same order
+   */
+  async run(): Promise<SendBatchResult[]> {
+    const results: SendBatchResult[] = this.sendTransactions.map((_, index) => ({
+      index,
+      success: false,
+      transaction: null,
+      error: null,
+    }));
+    const fail = async (index: number, error: unknown, release: boolean) => {
+      if (release) {
+        await this.sendTransactions[index].releaseUtxos();
+      }
+      results[index].error = error instanceof Error ? error : new Error(String(error));
+    };
+
+    // Prepared one at a time, each transaction reserves its inputs before the next
+    // one selects utxos.
+    const prepared: number[] = [];
+    for (const [index, sendTransaction] of this.sendTransactions.entries()) {
+      try {
+        const tx = await sendTransaction.prepareTx();
+        await this.reserveInputs(tx);
+        prepared.push(index);
+      } catch (err) {
+        await fail(index, err, false);
+      }
+    }
+
+    const signed: number[] = [];
+    if (prepared.length > 0) {
+      let sessionStarted = false;
+      try {
+        sessionStarted = await this.startSigningSession();
+        for (const index of prepared) {
+          try {
+            await this.sendTransactions[index].signTx(this.pin);
+            signed.push(index);
+          } catch (err) {
+            await fail(index, err, true);
+          }
+        }
+      } catch (err) {
+        // The keys could not be unlocked, no transaction can be signed
+        for (const index of prepared) {
+          await fail(index, err, true);
+        }
+      } finally {
+        if (sessionStarted) {
+          this.storage.closeSigningSession();
+        }
+      }
+    }
+
+    let next = 0;
+    const sendNext = async () => {
+      while (next < signed.length) {
+        const index = signed[next++];
+        try {
+          results[index].transaction = await this.sendTransactions[index].runFromMining();
+          results[index].success = true;
+        } catch (err) {
+          await fail(index, err, true);
+        }
+      }
+    };
+    const runners = Math.min(Math.max(this.concurrency, 1), signed.length);
+    await Promise.all(Array.from({ length: runners }, sendNext));
+
+    return results;
+  }
+
+  /**
+   * Mark the inputs of a prepared transaction as selected, so the next transactions
+   * do not select them.
+   *
+   * @param {Transaction} tx The prepared transaction
+   * @throws {SendTxError} If an input is already selected by another transaction
+   */
+  async reserveInputs(tx: Transaction): Promise<void> {
+    for (const input of tx.inputs) {
+      if (await this.storage.isUtxoSelectedAsInput({ txId: input.hash, index: input.index })) {
+        throw new SendTxError(
+          `Input ${input.hash}:${input.index} is already selected by another transaction.`
+        );
+      }
+    }
+    // The inputs stay selected until the transaction is sent or fails, mining
+    // selects them again with the usual timeout.
+    for (const input of tx.inputs) {
+      await this.storage.utxoSelectAsInput({ txId: input.hash, index: input.index }, true);
+    }
+  }
+
+  /**
+   * Unlock the wallet keys for the signing stage.
+   * Nothing is done if a session is already active or the wallet uses an external signer.
+   *
+   * @returns {Promise<boolean>} If a signing session was started by this method
+   */
+  async startSigningSession(): Promise<boolean> {
+    if (this.storage.signingSession?.isActive() || this.storage.hasTxSignatureMethod()) {
+      return false;
+    }
+    if (!this.pin) {
+      throw new SendTxError('Pin is not set.');
+    }
+    await this.storage.startSigningSession(this.pin);
+    return true;
+  }
+}
@@ -17,7 +17,9 @@ import {
 import { ShieldedOutputMode } from '../shielded/types';
 import { NanoContractAction } from '../nano_contracts/types';
 import WalletConnection from './connection';
+import type SyncScheduler from '../sync/scheduler';
 import Address from '../models/address';
+import Transaction from '../models/transaction';
 
 /**
  * Parameters for HathorWallet constructor
@@ -89,6 +91,52 @@ export interface HathorWalletConstructorParams {
   scanPolicy?: AddressScanPolicyData | null;
   /** Logger instance for wallet operations */
   logger?: ILogger | null;
+  /**
+   * Coalesce the websocket transactions received while the wallet is ready into batches.
+   * A batch is processed when `maxSize` transactions are pending or `maxDelay` ms after
+   * its first transaction, checking the address scanning policy once per batch.
+   * Disabled by default, each transaction is processed as it arrives.
+   */
+  wsTxBatch?: WsTxBatchOptions | null;
+  /**
+   * Scheduler running the wallet sync tasks, e.g. the one of a WalletHost.
+   * Defaults to a scheduler shared by all wallets of the process.
+   */
+  syncScheduler?: SyncScheduler | null;
+  /** Priority of the wallet sync tasks on the scheduler, the higher the sooner they run */
+  syncPriority?: number;
+}
+
+/**
+ * Options of the websocket transaction batches
+ */
+export interface WsTxBatchOptions {
+  /** Maximum number of transactions in a batch */
+  maxSize?: number;
+  /** Maximum time in ms a transaction waits for its batch */
+  maxDelay?: number;
+}
+
+/**
+ * Options of the background consolidation of the wallet dust utxos
+ */
+export interface UtxoConsolidationOptions {
+  /** Utxos with a value smaller than this are merged */
+  dustThreshold: bigint;
+  /** Token of the utxos to merge, defaults to HTR */
+  token?: string;
+  /** Minimum number of dust utxos worth a consolidation */
+  minUtxos?: number;
+  /** Maximum number of utxos merged on each transaction, defaults to the maximum inputs */
+  maxUtxos?: number;
+  /** Time in ms without new transactions before the wallet is considered idle */
+  idleTime?: number;
+  /** Time in ms between the checks */
+  interval?: number;
+  /** Address receiving the merged utxos, defaults to the current address */
+  destinationAddress?: string;
+  /** PIN to sign the consolidation, defaults to the wallet PIN */
+  pinCode?: string | null;
 }
 
 /**
@@ -247,6 +295,10 @@ export interface WalletStartOptions {
  * @property cleanTokens Clean token data (default false)
  */
 export interface WalletStopOptions {
+  /**
+   * Remove the history from storage. Defaults to true, or false for persistent stores
+   * (e.g. FileStore) so a restarted wallet resumes from the saved history.
+   */
   cleanStorage?: boolean;
   cleanAddresses?: boolean;
   cleanTokens?: boolean;
@@ -429,6 +481,44 @@ export interface SendManyOutputsOptions {
   changeShieldedMode?: ShieldedOutputMode;
 }
 
+/**
+ * A transaction of a batch send
+ * @property outputs Array of proposed outputs
+ * @property inputs Optional array of proposed inputs to use
+ * @property changeAddress Address for change output
+ * @property changeShieldedMode Shielded mode of the change outputs, see SendManyOutputsOptions
+ */
+export interface SendBatchPayout {
+  outputs: ProposedOutput[];
+  inputs?: ProposedInput[];
+  changeAddress?: string | null;
+  changeShieldedMode?: ShieldedOutputMode;
+}
+
+/**
+ * Options for sending a batch of transactions
+ * @property pinCode Pin to decrypt xpriv information
+ * @property concurrency Maximum number of transactions being mined and pushed at the same time
+ */
+export interface SendBatchOptions {
+  pinCode?: string | null;
+  concurrency?: number;
+}
+
+/**
+ * Result of a transaction of a batch send
+ * @property index Index of the transaction on the batch
+ * @property success If the transaction was pushed
+ * @property transaction The pushed transaction
+ * @property error The error that prevented the transaction from being sent
+ */
+export interface SendBatchResult {
+  index: number;
+  success: boolean;
+  transaction: Transaction | null;
+  error: Error | null;
+}
+
 /**
  * Options for creating a token
  * @property address Destination address for the minted tokens
@@ -32,6 +32,12 @@ import {
   P2SH_ACCT_PATH,
   SHIELDED_SPEND_ACCT_PATH,
   GAP_LIMIT,
+  WS_TX_BATCH_MAX_DELAY,
+  WS_TX_BATCH_MAX_SIZE,
+  WS_TX_PROCESSING_YIELD_INTERVAL,
+  UTXO_CONSOLIDATION_IDLE_TIME,
+  UTXO_CONSOLIDATION_INTERVAL,
+  SYNC_CHECKPOINT_REFRESH_INTERVAL,
 } from '../constants';
 import tokenUtils from '../utils/tokens';
 import walletApi from '../api/wallet';
@@ -42,12 +48,14 @@ import helpers from '../utils/helpers';
 import { createP2SHRedeemScript } from '../utils/scripts';
 import walletUtils from '../utils/wallet';
 import SendTransaction from './sendTransaction';
+import SendTransactionBatch from './sendTransactionBatch';
 import Network from '../models/network';
 import {
   AddressError,
   HasTxOutsideFirstAddressError,
   NanoContractTransactionError,
   PinRequiredError,
+  SyncCheckpointTooOldError,
   TxNotFoundError,
   WalletError,
   WalletFromXPubGuard,
@@ -62,6 +70,7 @@ import {
   getDefaultLogger,
   HistorySyncMode,
   IHistoryTx,
+  ISyncCheckpoint,
   IIndexLimitAddressScanPolicy,
   ILogger,
   IMultisigData,
@@ -78,15 +87,22 @@ import {
   WalletType,
   WalletAddressMode,
   IAddressChainOptions,
+  IAddressDerivationPool,
+  IAddressDerivationCache,
+  IMiningBackend,
 } from '../types';
 import transactionUtils from '../utils/transaction';
 import Queue from '../models/queue';
+import { planUtxoConsolidation } from '../utils/utxo';
 import {
   checkScanningPolicy,
+  getBestChainBlockHash,
   getHistorySyncMethod,
   getSupportedSyncMode,
+  isSyncCheckpointOnBestChain,
   loadAddressHistory,
   processMetadataChanged,
+  refreshHistorySince,
   savePrecalculatedLegacyAddresses,
   savePrecalculatedShieldedAddresses,
   scanPolicyStartAddresses,
@@ -109,10 +125,12 @@ import {
 } from '../nano_contracts/types';
 import { IHistoryTxSchema } from '../schemas';
 import GLL from '../sync/gll';
+import SyncScheduler from '../sync/scheduler';
 import { TransactionTemplate, WalletTxTemplateInterpreter } from '../template/transaction';
 import Address from '../models/address';
 import type { HistoryTransactionOutput } from '../models/types';
 import type { IShieldedCryptoProvider } from '../shielded/types';
+import type { ISigningSessionOptions } from '../storage/signing_session';
 import { ConnectionState, FullNodeVersionData, IHathorWallet, Utxo } from '../wallet/types';
 import Transaction from '../models/transaction';
 import {
@@ -139,12 +157,17 @@ import {
   ShieldedOpening,
   ShieldedOpeningEntry,
   SendManyOutputsOptions,
+  SendBatchPayout,
+  SendBatchOptions,
+  SendBatchResult,
+  UtxoConsolidationOptions,
   UtxoDetails,
   UtxoOptions,
   SendTransactionFullnodeOptions,
   WalletWebSocketData,
   WalletStartOptions,
   WalletStopOptions,
+  WsTxBatchOptions,
   BuildTxTemplateOptions,
   StartReadOnlyOptions,
 } from './types';
@@ -161,6 +184,25 @@ import NanoContractHeader from '../nano_contracts/header';
 
 const ERROR_MESSAGE_PIN_REQUIRED = 'Pin is required.';
 
+/**
+ * Release the event loop if it has been held for `WS_TX_PROCESSING_YIELD_INTERVAL` ms,
+ * so long bursts of websocket transactions do not starve other tasks.
+ *
+ * @param yieldedAt Time of the last yield
+ * @returns The time of the last yield, updated if it yielded now
+ */
+async function yieldAfterInterval(yieldedAt: number): Promise<number> {
+  if (Date.now() - yieldedAt < WS_TX_PROCESSING_YIELD_INTERVAL) {
+    return yieldedAt;
+  }
+  // This effectively awaits 0 seconds
+  // but it schedules the next iteration to run after other tasks.
+  await new Promise(resolve => {
+    setTimeout(resolve, 0);
+  });
+  return Date.now();
+}
+
 const ERROR_MESSAGE_PASSWORD_REQUIRED = 'Password is required.';
 
 /**
@@ -252,7 +294,28 @@ class HathorWallet extends EventEmitter {
 
   newTxPromise: Promise<void>;
 
+  wsTxBatch: Required<WsTxBatchOptions> | null;
+
+  wsTxBatchPending: WalletWebSocketData[];
+
+  wsTxBatchTimer: ReturnType<typeof setTimeout> | null;
+
+  // Block of the sync checkpoint, requested at most once per SYNC_CHECKPOINT_REFRESH_INTERVAL
+  syncCheckpointBlock: { height: number; blockHash: string | null; timestamp: number } | null;
+
+  // Timestamp in ms of the last transaction received from the websocket
+  lastWsTxAt: number;
+
+  // Background consolidation of the dust utxos
+  utxoConsolidationTimer: ReturnType<typeof setInterval> | null;
+
+  utxoConsolidationRunning: boolean;
+
   // Scanning & sync configuration
+  syncScheduler: SyncScheduler;
+
+  syncPriority: number;
+
   scanPolicy: AddressScanPolicyData | null;
 
   isSignedExternally: boolean;
@@ -349,6 +412,9 @@ class HathorWallet extends EventEmitter {
       preCalculatedAddresses = null,
       scanPolicy = null,
       logger = null,
+      wsTxBatch = null,
+      syncScheduler = null,
+      syncPriority = 0,
     }: HathorWalletConstructorParams = {} as HathorWalletConstructorParams
   ) {
     super();
@@ -439,6 +505,26 @@ class HathorWallet extends EventEmitter {
     this.wsTxQueue = new Queue<WalletWebSocketData>();
     this.newTxPromise = Promise.resolve();
 
+    // Websocket transactions are processed one by one unless batching is enabled
+    this.wsTxBatch = wsTxBatch
+      ? {
+          maxSize: wsTxBatch.maxSize ?? WS_TX_BATCH_MAX_SIZE,
+          maxDelay: wsTxBatch.maxDelay ?? WS_TX_BATCH_MAX_DELAY,
+        }
+      : null;
+    this.wsTxBatchPending = [];
+    this.wsTxBatchTimer = null;
+    this.lastWsTxAt = 0;
+    this.syncCheckpointBlock = null;
+
+    // Dust utxos are only consolidated after startUtxoConsolidation is called
+    this.utxoConsolidationTimer = null;
+    this.utxoConsolidationRunning = false;
+
+    // Wallets without a scheduler share the global one
+    this.syncScheduler = syncScheduler ?? GLL;
+    this.syncPriority = syncPriority;
+
     // Defaults to single address scanning policy
     if (scanPolicy == null) {
       this.scanPolicy = { policy: SCANNING_POLICY.SINGLE_ADDRESS };
@@ -684,13 +770,16 @@ class HathorWallet extends EventEmitter {
               }
             }
           }
-          const addressesToLoad = await scanPolicyStartAddresses(this.storage);
-          await this.syncHistory(
-            addressesToLoad.nextIndex,
-            addressesToLoad.count,
-            false,
-            this.pinCode ?? undefined
-          );
+          const checkpoint = await this.storage.getSyncCheckpoint();
+          if (!checkpoint || !(await this.resumeFromSyncCheckpoint(checkpoint))) {
+            const addressesToLoad = await scanPolicyStartAddresses(this.storage);
+            await this.syncHistory(
+              addressesToLoad.nextIndex,
+              addressesToLoad.count,
+              false,
+              this.pinCode ?? undefined
+            );
+          }
         } else {
           if (this.beforeReloadCallback) {
             this.beforeReloadCallback();
@@ -969,16 +1058,70 @@ class HathorWallet extends EventEmitter {
    */
   handleWebsocketMsg(wsData: WalletWebSocketData): void {
     if (wsData.type === 'wallet:address_history') {
+      this.lastWsTxAt = Date.now();
       if (this.state !== HathorWallet.READY) {
         // Cannot process new transactions from ws when the wallet is not ready.
         // So we will enqueue this message to be processed later
         this.wsTxQueue.enqueue(wsData);
+      } else if (this.wsTxBatch) {
+        this.addToWsTxBatch(wsData);
       } else {
         this.enqueueOnNewTx(wsData);
       }
     }
   }
 
+  /**
+   * Add a websocket transaction to the pending batch, processing the batch when it's full
+   * or scheduling it to be processed after the batch delay.
+   *
+   * @param wsData WebSocket message data
+   */
+  addToWsTxBatch(wsData: WalletWebSocketData): void {
+    this.wsTxBatchPending.push(wsData);
+    if (this.wsTxBatchPending.length >= this.wsTxBatch!.maxSize) {
+      this.flushWsTxBatch();
+    } else if (this.wsTxBatchTimer === null) {
+      this.wsTxBatchTimer = setTimeout(() => this.flushWsTxBatch(), this.wsTxBatch!.maxDelay);
+    }
+  }
+
+  /**
+   * Enqueue the processing of the pending websocket transactions as a single batch.
+   */
+  flushWsTxBatch(): void {
+    if (this.wsTxBatchTimer !== null) {
+      clearTimeout(this.wsTxBatchTimer);
+      this.wsTxBatchTimer = null;
+    }
+    if (this.wsTxBatchPending.length === 0) {
+      return;
+    }
+    const batch = this.wsTxBatchPending;
+    this.wsTxBatchPending = [];
+    // Same queue as enqueueOnNewTx, so batches and single txs keep the arrival order
+    this.newTxPromise = this.newTxPromise
+      .then(() => this.onNewTxBatch(batch))
+      .catch(err => {
+        this.logger.error(`flushWsTxBatch: onNewTxBatch failed: ${err?.stack ?? err}`);
+      });
+  }
+
+  /**
+   * Move the pending websocket transactions to the queue processed when the wallet is ready.
+   * They arrived before any transaction queued after the wallet left the ready state.
+   */
+  requeueWsTxBatch(): void {
+    if (this.wsTxBatchTimer !== null) {
+      clearTimeout(this.wsTxBatchTimer);
+      this.wsTxBatchTimer = null;
+    }
+    for (const wsData of this.wsTxBatchPending) {
+      this.wsTxQueue.enqueue(wsData);
+    }
+    this.wsTxBatchPending = [];
+  }
+
   /**
    * Get balance for a token
    *
@@ -1043,7 +1186,14 @@ class HathorWallet extends EventEmitter {
   /**
    * Get transaction history
    *
+   * To paginate the history pass the `txId` of the last transaction of a page as the
+   * `cursor` of the next page, this avoids walking over all the previous pages.
+   *
    * @param options
+   * @param options.token_id Token of the history, defaults to HTR
+   * @param options.count Max number of transactions to return
+   * @param options.skip Number of transactions to skip, counting from the cursor if given
+   * @param options.cursor Start after this transaction id
    *
    * @return Array of transactions
    *
@@ -1055,6 +1205,7 @@ class HathorWallet extends EventEmitter {
       token_id?: string;
       count?: number;
       skip?: number;
+      cursor?: string;
     } = {}
   ): Promise<GetTxHistoryFullnodeFacadeReturnType[]> {
     const newOptions = {
@@ -1063,21 +1214,20 @@ class HathorWallet extends EventEmitter {
       skip: 0,
       ...options,
     };
-    const { skip } = newOptions;
+    const { skip, cursor } = newOptions;
     let { count } = newOptions;
     const uid = newOptions.token_id || this.token!.uid; // FIXME: this.token may be null
 
     const txs: GetTxHistoryFullnodeFacadeReturnType[] = [];
-    let it = 0;
-    for await (const tx of this.storage.tokenHistory(uid)) {
-      if (it < skip) {
-        it++;
-        continue;
-      }
+    for await (const tx of this.storage.tokenHistory(uid, { skip, cursor })) {
       if (count <= 0) {
         break;
       }
-      const txbalance = await this.getTxBalance(tx);
+      let txbalance = await this.storage.getCachedTxBalance(tx.tx_id);
+      if (!txbalance) {
+        txbalance = await this.getTxBalance(tx);
+        await this.storage.cacheTxBalance(tx.tx_id, txbalance);
+      }
       const txHistory: GetTxHistoryFullnodeFacadeReturnType = {
         txId: tx.tx_id,
         timestamp: tx.timestamp,
@@ -1652,6 +1802,91 @@ class HathorWallet extends EventEmitter {
     };
   }
 
+  /**
+   * Merge the dust utxos in the background while the wallet is idle, so the transactions
+   * sent under load need fewer inputs.
+   *
+   * Every `interval` ms, if the wallet didn't receive a transaction in the last `idleTime` ms,
+   * the smallest utxos under `dustThreshold` are merged into a single utxo of the wallet.
+   *
+   * @param options Consolidation options
+   */
+  async startUtxoConsolidation(options: UtxoConsolidationOptions): Promise<void> {
+    if (await this.isReadonly()) {
+      throw new WalletFromXPubGuard('startUtxoConsolidation');
+    }
+    this.stopUtxoConsolidation();
+    this.utxoConsolidationTimer = setInterval(() => {
+      this.runUtxoConsolidation(options).catch(err => {
+        this.logger.error(`Utxo consolidation failed: ${err?.stack ?? err}`);
+      });
+    }, options.interval ?? UTXO_CONSOLIDATION_INTERVAL);
+  }
+
+  /**
+   * Stop the background consolidation of the dust utxos.
+   */
+  stopUtxoConsolidation(): void {
+    if (this.utxoConsolidationTimer !== null) {
+      clearInterval(this.utxoConsolidationTimer);
+      this.utxoConsolidationTimer = null;
+    }
+  }
+
+  /**
+   * Merge the dust utxos if the wallet is idle, called by the background consolidation.
+   *
+   * @param options Consolidation options
+   *
+   * @return The id of the consolidation transaction, or null if nothing was merged
+   */
+  async runUtxoConsolidation({
+    dustThreshold,
+    token = NATIVE_TOKEN_UID,
+    minUtxos,
+    maxUtxos,
+    idleTime = UTXO_CONSOLIDATION_IDLE_TIME,
+    destinationAddress,
+    pinCode = null,
+  }: UtxoConsolidationOptions): Promise<string | null> {
+    if (
+      this.utxoConsolidationRunning ||
+      this.state !== HathorWallet.READY ||
+      Date.now() - this.lastWsTxAt < idleTime ||
+      this.wsTxQueue.size() > 0 ||
+      this.wsTxBatchPending.length > 0
+    ) {
+      return null;
+    }
+
+    this.utxoConsolidationRunning = true;
+    try {
+      const plan = await planUtxoConsolidation(this.storage, token, {
+        dustThreshold,
+        minUtxos,
+        maxUtxos,
+      });
+      if (!plan) {
+        return null;
+      }
+
+      const address = destinationAddress ?? (await this.getCurrentAddress()).address;
+      if (!(await this.isAddressMine(address))) {
+        throw new Error("Utxo consolidation to an address not owned by this wallet isn't allowed.");
+      }
+      const inputs = plan.utxos.map(utxo => ({ txId: utxo.txId, index: utxo.index, token }));
+      const sendTx = await this.sendManyOutputsSendTransaction(
+        [{ address, value: plan.amount, token }],
+        { inputs, pinCode }
+      );
+      const tx = await sendTx.run();
+      this.logger.info(`Consolidated ${plan.utxos.length} utxos of ${token} on ${tx!.hash}`);
+      return tx!.hash!;
+    } finally {
+      this.utxoConsolidationRunning = false;
+    }
+  }
+
   /**
    * Get full wallet history (same as old method to be used for compatibility)
    *
@@ -1669,24 +1904,275 @@ class HathorWallet extends EventEmitter {
   }
 
   /**
-   * Process the transactions on the websocket transaction queue as if they just arrived.
+   * Save the transactions on the websocket transaction queue and process the history.
+   *
+   * The queued txs are processed with the rest of the history, processing each of them
+   * as they are saved would be undone by the history processing. When the wallet resumed
+   * from a sync checkpoint only the txs saved since then are processed.
    */
   async processTxQueue(): Promise<void> {
-    let wsData = this.wsTxQueue.dequeue();
+    const queued: { tx: IHistoryTx; isNewTx: boolean }[] = [];
+    let yieldedAt = Date.now();
 
+    let wsData = this.wsTxQueue.dequeue();
     while (wsData !== undefined) {
-      // save new txdata
-      await this.onNewTx(wsData);
+      const tx = this.parseWsTx(wsData);
+      if (tx && !this.walletStopped) {
+        const isNewTx = (await this.storage.getTx(tx.tx_id)) === null;
+        tx.processingStatus = TxHistoryProcessingStatus.PROCESSING;
+        await this.storage.addTx(tx);
+        queued.push({ tx, isNewTx });
+      }
       wsData = this.wsTxQueue.dequeue();
-      // We should release the event loop for other threads
-      // This effectively awaits 0 seconds
-      // but it schedule the next iteration to run after other threads.
-      await new Promise(resolve => {
-        setTimeout(resolve, 0);
-      });
+      yieldedAt = await yieldAfterInterval(yieldedAt);
+    }
+
+    await this.scanAddressesToLoad();
+    await this.storage.processSyncChanges(this.pinCode ?? undefined);
+    await this.finishWsTxs(queued);
+  }
+
+  /**
+   * Process a batch of transactions received from websocket.
+   *
+   * The batch is saved with a single store call, the new txs are processed in a single pass
+   * and the address scanning policy is checked once for the whole batch. A tx delivered more
+   * than once on the batch is processed once, with its latest data.
+   *
+   * A failure only affects its own transaction, the rest of the batch is processed.
+   *
+   * @param batch WebSocket messages data containing transaction history
+   */
+  async onNewTxBatch(batch: WalletWebSocketData[]): Promise<void> {
+    // Map<txId, tx> in the order the txs first arrived, with the tx before this batch
+    const entries = new Map<string, { tx: IHistoryTx; storageTx: IHistoryTx | null }>();
+    for (const wsData of batch) {
+      const tx = this.parseWsTx(wsData);
+      if (!tx) {
+        continue;
+      }
+      const entry = entries.get(tx.tx_id);
+      if (entry) {
+        entry.tx = tx;
+      } else {
+        entries.set(tx.tx_id, { tx, storageTx: await this.storage.getTx(tx.tx_id) });
+      }
+    }
+    if (this.walletStopped || entries.size === 0) {
+      return;
+    }
+
+    const txs = [...entries.values()].map(({ tx }) => tx);
+    for (const tx of txs) {
+      tx.processingStatus = TxHistoryProcessingStatus.PROCESSING;
+    }
+    await this.storage.addTxs(txs);
+    await this.scanAddressesToLoad();
+
+    const pin = this.pinCode ?? undefined;
+    const failed = new Set<string>();
+    const onTxError = (tx: IHistoryTx, err: unknown) => {
+      failed.add(tx.tx_id);
+      const error = err as Error | undefined;
+      this.logger.error(`onNewTxBatch: failed to process tx ${tx.tx_id}: ${error?.stack ?? err}`);
+    };
+
+    const previousState = this.state;
+    this.state = HathorWallet.PROCESSING;
+    try {
+      // The new txs go first, so a reprocess below falling back to the whole history
+      // does not apply them twice.
+      const newTxs = [...entries.values()].filter(e => e.storageTx === null).map(e => e.tx);
+      if (newTxs.length > 0) {
+        await this.storage.processNewTxBatch(newTxs, pin, onTxError);
+      }
+      for (const { tx, storageTx } of entries.values()) {
+        if (storageTx === null || this.walletStopped) {
+          continue;
+        }
+        try {
+          if (storageTx.is_voided !== tx.is_voided) {
+            await this.storage.reprocessTx(tx, pin);
+          } else if (!tx.is_voided) {
+            await processMetadataChanged(this.storage, tx);
+          }
+        } catch (err) {
+          onTxError(tx, err);
+        }
+      }
+
+      // Same as onNewTx, a stopped wallet must not save or emit the txs
+      if (this.walletStopped) {
+        return;
+      }
+      this.state = previousState;
+      await this.finishWsTxs(
+        [...entries.values()]
+          .filter(({ tx }) => !failed.has(tx.tx_id))
+          .map(({ tx, storageTx }) => ({ tx, isNewTx: storageTx === null }))
+      );
+    } finally {
+      if (this.state === HathorWallet.PROCESSING && !this.walletStopped) {
+        this.state = previousState;
+      }
+    }
+  }
+
+  /**
+   * Mark processed websocket transactions as finished and emit their events.
+   *
+   * The persisted txs are saved, as storage holds their state after processing. A tx no
+   * longer on storage (e.g. wiped by a concurrent stop) is not saved again.
+   *
+   * @param processed The processed txs and if they were new to the wallet
+   */
+  async finishWsTxs(processed: { tx: IHistoryTx; isNewTx: boolean }[]): Promise<void> {
+    const finished: { tx: IHistoryTx; isNewTx: boolean }[] = [];
+    for (const { tx, isNewTx } of processed) {
+      const persisted = await this.storage.getTx(tx.tx_id);
+      if (persisted) {
+        persisted.processingStatus = TxHistoryProcessingStatus.FINISHED;
+        finished.push({ tx: persisted, isNewTx });
+      }
+    }
+    if (this.walletStopped) {
+      return;
+    }
+    await this.storage.addTxs(finished.map(({ tx }) => tx));
+    for (const { tx, isNewTx } of finished) {
+      this.emit(isNewTx ? 'new-tx' : 'update-tx', tx);
+    }
+    await this.refreshSyncCheckpoint();
+  }
+
+  /**
+   * Save the sync checkpoint, marking the history on storage as fully processed.
+   *
+   * Only persistent stores can resume from the checkpoint, for them the checkpoint also has
+   * the hash of a best chain block so a reorg past it is detected. The block is requested
+   * again only when the height changed and SYNC_CHECKPOINT_REFRESH_INTERVAL passed, so
+   * processing websocket txs does not wait for the full node. The checkpoint is written by
+   * the next flush of the store, or when the wallet stops.
+   */
+  async saveSyncCheckpoint(): Promise<void> {
+    if (!this.storage.store.flush) {
+      await this.storage.saveSyncCheckpoint();
+      return;
+    }
+    const height = await this.storage.getCurrentHeight();
+    const now = Math.floor(Date.now() / 1000);
+    const block = this.syncCheckpointBlock;
+    if (
+      block === null ||
+      ((block.height !== height || block.blockHash === null) &&
+        now - block.timestamp >= SYNC_CHECKPOINT_REFRESH_INTERVAL)
+    ) {
+      let hash: string | null = null;
+      try {
+        hash = await getBestChainBlockHash(height);
+      } catch (err) {
+        // Without the block hash the checkpoint is not resumed from
+        this.logger.debug('Could not fetch the checkpoint block', err);
+      }
+      this.syncCheckpointBlock = { height, blockHash: hash, timestamp: now };
     }
+    const { blockHash, ...anchor } = this.syncCheckpointBlock!;
+    await this.storage.saveSyncCheckpoint(blockHash, anchor);
+  }
 
-    await this.storage.processHistory(this.pinCode ?? undefined);
+  /**
+   * Update the sync checkpoint of a persistent store after processing websocket txs,
+   * so a restart resumes from the latest history instead of syncing everything again.
+   */
+  async refreshSyncCheckpoint(): Promise<void> {
+    if (this.state !== HathorWallet.READY || this.walletStopped || !this.storage.store.flush) {
+      return;
+    }
+    await this.saveSyncCheckpoint();
+  }
+
+  /**
+   * Resume the sync from the checkpoint of a persistent store, which restored the addresses,
+   * history and metadata of a previous run. Only the addresses with txs changed while we were
+   * offline are synced again and only the txs the sync adds or changes are processed, see
+   * processTxQueue.
+   *
+   * @param checkpoint The sync checkpoint of the restored history
+   * @returns If the sync resumed, otherwise the whole history should be synced
+   */
+  async resumeFromSyncCheckpoint(checkpoint: ISyncCheckpoint): Promise<boolean> {
+    try {
+      if (!(await isSyncCheckpointOnBestChain(checkpoint))) {
+        this.logger.info(
+          `Checkpoint block at height ${checkpoint.height} is not on the best chain, syncing the whole history`
+        );
+        return false;
+      }
+      this.logger.info(
+        `Resuming wallet sync from checkpoint at height ${checkpoint.height} with ${checkpoint.historyCount} txs`
+      );
+      this.storage.trackSyncChanges();
+      await this.syncHistorySinceCheckpoint(checkpoint);
+    } catch (err) {
+      // Resuming is an optimization, failing to do it should not fail the wallet load
+      if (err instanceof SyncCheckpointTooOldError) {
+        this.logger.info(`${err.message}, syncing the whole history`);
+      } else {
+        this.logger.warn('Could not resume from the sync checkpoint, syncing the whole history', {
+          error: err,
+        });
+      }
+      await this.storage.cleanSyncCheckpoint();
+      return false;
+    }
+    return true;
+  }
+
+  /**
+   * Catch up a history restored from a sync checkpoint.
+   *
+   * The restored addresses are subscribed first, so the txs arriving during the catch up are
+   * queued by the websocket. Then only the history of the addresses with txs since the
+   * checkpoint or with unconfirmed txs is fetched again. Addresses required by the scanning
+   * policy are loaded when the queue is processed, see processTxQueue.
+   *
+   * @param checkpoint The sync checkpoint of the restored history
+   */
+  async syncHistorySinceCheckpoint(checkpoint: ISyncCheckpoint): Promise<void> {
+    this.conn.subscribeAddresses(await this.getStoredSubscriptionAddresses());
+    await this.syncScheduler.add(
+      async () => {
+        for await (const _gotTx of refreshHistorySince(this.storage, checkpoint.timestamp)) {
+          // update UI
+          this.conn.emit('wallet-load-partial-update', {
+            addressesFound: await this.storage.store.addressCount(),
+            historyLength: await this.storage.store.historyCount(),
+          });
+        }
+      },
+      { priority: this.syncPriority, owner: this }
+    );
+  }
+
+  /**
+   * Get the addresses on storage the wallet subscribes to on the full node.
+   *
+   * Shielded receives are subscribed by their on-chain spend-derived P2PKH (the shielded
+   * address itself is never subscribed, the fullnode indexes by on-chain script).
+   *
+   * @returns The addresses in base58
+   */
+  async getStoredSubscriptionAddresses(): Promise<string[]> {
+    const addresses: string[] = [];
+    for await (const address of this.storage.getAllAddresses()) {
+      addresses.push(address.base58);
+    }
+    for await (const address of this.storage.getAllAddresses({ legacy: false })) {
+      if (address.ctMappingAddress) {
+        addresses.push(address.ctMappingAddress);
+      }
+    }
+    return addresses;
   }
 
   /**
@@ -1717,6 +2203,8 @@ class HathorWallet extends EventEmitter {
     // Started processing state now, so we prepare the local data to support using this facade interchangeable with wallet service facade in both wallets
     try {
       await this.processTxQueue();
+      // Mark the history as fully processed so a persistent store can resume from here
+      await this.saveSyncCheckpoint();
       this.setState(HathorWallet.READY);
     } catch (e) {
       this.setState(HathorWallet.ERROR);
@@ -1724,6 +2212,10 @@ class HathorWallet extends EventEmitter {
   }
 
   setState(state: WalletState): void {
+    if (this.state === HathorWallet.READY && state !== HathorWallet.READY) {
+      // The pending batch cannot be processed until the wallet is ready again
+      this.requeueWsTxBatch();
+    }
     if (state === HathorWallet.PROCESSING && state !== this.state) {
       // XXX: will not await this so we can process history on background.
       this.onEnterStateProcessing().catch(e => {
@@ -1765,17 +2257,16 @@ class HathorWallet extends EventEmitter {
   }
 
   /**
-   * Process a new transaction received from websocket.
+   * Parse the transaction of a websocket message, removing the data the fullnode cannot provide.
    *
    * @param wsData WebSocket message data containing transaction history
-   * @param txPin Optional PIN for this tx's shielded decryption (see
-   *   enqueueOnNewTx); falls back to the wallet's stored `pinCode`.
+   * @returns The transaction or null if the message is invalid
    */
-  async onNewTx(wsData: WalletWebSocketData, txPin?: string): Promise<void> {
+  parseWsTx(wsData: WalletWebSocketData): IHistoryTx | null {
     const parseResult = IHistoryTxSchema.safeParse(wsData.history);
     if (!parseResult.success) {
       this.logger.error(parseResult.error);
-      return;
+      return null;
     }
     const newTx = parseResult.data;
 
@@ -1790,6 +2281,21 @@ class HathorWallet extends EventEmitter {
     // from our own storage inside storage.addTx. Honest deliveries carry these
     // bare, so this is a no-op there. See transactionUtils for the rationale.
     transactionUtils.clearUntrustedShieldedData(newTx);
+    return newTx;
+  }
+
+  /**
+   * Process a new transaction received from websocket.
+   *
+   * @param wsData WebSocket message data containing transaction history
+   * @param txPin Optional PIN for this tx's shielded decryption (see
+   *   enqueueOnNewTx); falls back to the wallet's stored `pinCode`.
+   */
+  async onNewTx(wsData: WalletWebSocketData, txPin?: string): Promise<void> {
+    const newTx = this.parseWsTx(wsData);
+    if (!newTx) {
+      return;
+    }
 
     // Bail before touching storage if the wallet was already stopped. stop()
     // sets walletStopped synchronously as its first statement (before the
@@ -1824,9 +2330,10 @@ class HathorWallet extends EventEmitter {
         // Handling new metadatas and deleting utxos that are not available anymore
         await this.storage.processNewTx(newTx, pin);
       } else if (storageTx.is_voided !== newTx.is_voided) {
-        // Voided flag changed — a full history reprocess is required to avoid
-        // double-counting from the prior processNewTx.
-        await this.storage.processHistory(pin);
+        // Voided flag changed — revert what the prior processNewTx added and
+        // reprocess this tx alone to avoid double-counting. Falls back to a full
+        // history reprocess when the effects of the tx are not journaled.
+        await this.storage.reprocessTx(newTx, pin);
       } else if (!newTx.is_voided) {
         // Process other metadata updates (first_block confirmation, height, …).
         await processMetadataChanged(this.storage, newTx);
@@ -1869,6 +2376,7 @@ class HathorWallet extends EventEmitter {
       } else {
         this.emit('update-tx', persisted);
       }
+      await this.refreshSyncCheckpoint();
     } finally {
       // Safety net: if the block above threw before restoring the state (the
       // enqueueOnNewTx .catch then logs+swallows it), un-stick it here.
@@ -2004,6 +2512,45 @@ class HathorWallet extends EventEmitter {
     return sendTransaction.run();
   }
 
+  /**
+   * Send many transactions, each with its own outputs.
+   *
+   * The inputs of each transaction are reserved as it is prepared so the transactions never
+   * spend the same utxo, the wallet keys are unlocked once to sign all of them and up to
+   * `concurrency` transactions are mined and pushed at the same time.
+   * A failure only affects its own transaction.
+   *
+   * @param payouts - The transactions to send
+   * @param options - Options parameters
+   *
+   * @returns Promise that resolves with the result of each transaction, in the same order
+   */
+  async sendManyTransactions(
+    payouts: SendBatchPayout[],
+    options: SendBatchOptions = {}
+  ): Promise<SendBatchResult[]> {
+    if (await this.isReadonly()) {
+      throw new WalletFromXPubGuard('sendManyTransactions');
+    }
+    const pin = options.pinCode || this.pinCode;
+    if (this.pinIsRequired(pin)) {
+      throw new Error(ERROR_MESSAGE_PIN_REQUIRED);
+    }
+
+    const sendTransactions: SendTransaction[] = [];
+    for (const payout of payouts) {
+      const { outputs, ...payoutOptions } = payout;
+      sendTransactions.push(
+        await this.sendManyOutputsSendTransaction(outputs, { ...payoutOptions, pinCode: pin })
+      );
+    }
+    const batch = new SendTransactionBatch(this.storage, sendTransactions, {
+      pin,
+      concurrency: options.concurrency,
+    });
+    return batch.run();
+  }
+
   /**
    * Connect to the server and start emitting events.
    *
@@ -2129,10 +2676,13 @@ class HathorWallet extends EventEmitter {
   /**
    * Close the connections and stop emitting events.
    *
+   * The history is removed from storage unless `cleanStorage` is false, except for
+   * persistent stores (e.g. FileStore) which keep it by default so the wallet can resume.
+   *
    * @param options Options for stopping the wallet
    */
   async stop({
-    cleanStorage = true,
+    cleanStorage,
     cleanAddresses = false,
     cleanTokens = false,
   }: WalletStopOptions = {}): Promise<void> {
@@ -2140,20 +2690,55 @@ class HathorWallet extends EventEmitter {
     // onNewTx cannot pass its walletStopped guard during the wipe and resurrect
     // a tx (with decoded shielded secrets) into the just-cleaned storage.
     this.walletStopped = true;
+    // Pending websocket transactions are dropped with the rest of the wallet data
+    if (this.wsTxBatchTimer !== null) {
+      clearTimeout(this.wsTxBatchTimer);
+      this.wsTxBatchTimer = null;
+    }
+    this.wsTxBatchPending = [];
+    this.stopUtxoConsolidation();
     this.setState(HathorWallet.CLOSED);
     this.removeAllListeners();
 
     await this.storage.handleStop({
       connection: this.conn,
-      cleanStorage,
+      // Persistent stores are the ones that flush their changes
+      cleanStorage: cleanStorage ?? !this.storage.store.flush,
       cleanAddresses,
       cleanTokens,
     });
 
     this.firstConnection = true;
+    this.syncCheckpointBlock = null;
     this.conn.stop();
   }
 
+  /**
+   * Unlock the signing keys for a bounded time, so the transactions signed while the
+   * session is active skip the key decryption and derivation.
+   *
+   * @param options.pinCode - The PIN to unlock the keys, defaults to the wallet PIN
+   * @param options.ttl - Time in ms the keys stay unlocked
+   * @param options.maxKeys - Maximum number of derived address keys kept unlocked
+   */
+  async startSigningSession(
+    options: { pinCode?: string | null } & ISigningSessionOptions = {}
+  ): Promise<void> {
+    const { pinCode, ...sessionOptions } = options;
+    const pin = pinCode || this.pinCode;
+    if (!pin) {
+      throw new PinRequiredError(ERROR_MESSAGE_PIN_REQUIRED);
+    }
+    await this.storage.startSigningSession(pin, sessionOptions);
+  }
+
+  /**
+   * Close the signing session, erasing the unlocked keys.
+   */
+  closeSigningSession(): void {
+    this.storage.closeSigningSession();
+  }
+
   /**
    * Returns an address' HDPrivateKey given an index and the encryption password
    *
@@ -3813,6 +4398,47 @@ class HathorWallet extends EventEmitter {
     this.storage.setShieldedCryptoProvider(provider);
   }
 
+  /**
+   * Set the priority of the wallet sync tasks on its scheduler.
+   * The tasks already queued keep their priority.
+   *
+   * @param priority The higher the priority the sooner the wallet syncs
+   */
+  setSyncPriority(priority: number): void {
+    this.syncPriority = priority;
+  }
+
+  /**
+   * Set the pool used to derive the wallet addresses during the sync.
+   * The same pool can be shared by all wallets running on the process.
+   *
+   * @param pool The derivation pool, or null to derive on the main thread
+   */
+  setDerivationPool(pool: IAddressDerivationPool | null): void {
+    this.storage.setDerivationPool(pool);
+  }
+
+  /**
+   * Set the cache of derived addresses, consulted before deriving the wallet addresses.
+   * A persistent cache shared by the wallets on the process (e.g. FileAddressCache)
+   * allows restarted wallets to skip the address derivation.
+   *
+   * @param cache The address cache, or null to always derive the addresses
+   */
+  setAddressCache(cache: IAddressDerivationCache | null): void {
+    this.storage.setAddressCache(cache);
+  }
+
+  /**
+   * Set the backend used to mine the wallet transactions locally (e.g. LocalMiner).
+   * Transactions heavier than its `maxWeight` are still mined by the tx mining service.
+   *
+   * @param backend The mining backend, or null to always use the tx mining service
+   */
+  setMiningBackend(backend: IMiningBackend | null): void {
+    this.storage.setMiningBackend(backend);
+  }
+
   /**
    * Set the history sync mode.
    *
@@ -3854,11 +4480,14 @@ class HathorWallet extends EventEmitter {
       syncMode = HistorySyncMode.POLLING_HTTP_API;
     }
     const syncMethod = getHistorySyncMethod(syncMode);
-    // This will add the task to the GLL queue and return a promise that
+    // This will add the task to the sync scheduler and return a promise that
     // resolves when the task finishes executing
-    await GLL.add(async () => {
-      await syncMethod(startIndex, count, this.storage, this.conn, shouldProcessHistory, pinCode);
-    });
+    await this.syncScheduler.add(
+      async () => {
+        await syncMethod(startIndex, count, this.storage, this.conn, shouldProcessHistory, pinCode);
+      },
+      { priority: this.syncPriority, owner: this }
+    );
   }
 
   /**
@@ -3866,6 +4495,8 @@ class HathorWallet extends EventEmitter {
    */
   async reloadStorage(): Promise<void> {
     await this.conn.onReload();
+    // The history is synced again, so is the checkpoint block
+    this.syncCheckpointBlock = null;
 
     // unsub all addresses. getAllAddresses() yields the legacy chain; shielded
     // receives are subscribed by their on-chain spend-derived P2PKH (the 71-byte
@@ -3881,7 +4512,18 @@ class HathorWallet extends EventEmitter {
       }
     }
     const accessData = await this.storage.getAccessData();
-    if (accessData != null) {
+    const isStreamSync = [
+      HistorySyncMode.MANUAL_STREAM_WS,
+      HistorySyncMode.XPUB_STREAM_WS,
+    ].includes(this.historySyncMode);
+    if (isStreamSync && (await this.storage.getStreamSyncCheckpoint())) {
+      // The connection was lost during a stream sync, the history saved up to the checkpoint
+      // is kept, only the addresses changed since it are refreshed and the stream resumes
+      // after it.
+      // The stream only subscribes the addresses it sends, so the addresses already synced
+      // are subscribed again.
+      this.conn.subscribeAddresses(await this.getStoredSubscriptionAddresses());
+    } else if (accessData != null) {
       // Clean entire storage
       await this.storage.cleanStorage(true, true);
       // Reset access data
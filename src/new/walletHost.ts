@@ -0,0 +1,335 @@
+/**
+ * Copyright (c) Hathor Labs and its affiliates.
+ *
+ * This source code is licensed under the MIT license found in the
+ * LICENSE file in the root directory of this source tree.
+ */
+/* eslint max-classes-per-file: ["error", 2] */
+
+import WalletConnection from './connection';
+import { ConnectionParams } from '../connection';
+import SyncScheduler from '../sync/scheduler';
+import { ConnectionState } from '../wallet/types';
+import { handleWsDashboard } from '../utils/connection';
+import { IHistoryTx, ILogger, IStorage, ISyncSchedulerOptions, getDefaultLogger } from '../types';
+import { WalletWebSocketData } from './types';
+
+/**
+ * Get the addresses of the inputs and outputs of a transaction, as decoded by the fullnode.
+ */
+function getTxAddresses(tx: IHistoryTx): Set<string> {
+  const addresses = new Set<string>();
+  for (const io of [...(tx.inputs ?? []), ...(tx.outputs ?? []), ...(tx.shielded_outputs ?? [])]) {
+    const address = io?.decoded?.address;
+    if (address) {
+      addresses.add(address);
+    }
+  }
+  return addresses;
+}
+
+/**
+ * Connection of a wallet running on a WalletHost.
+ *
+ * It has the same interface as the wallet's own connection, but the messages go through the
+ * websocket of the host, shared by all its wallets. Created with `WalletHost.createConnection`.
+ *
+ * The fullnode runs a single history stream per connection, so hosted wallets never stream
+ * their history and sync through the HTTP API instead.
+ */
+export class HostedConnection extends WalletConnection {
+  host: WalletHost;
+
+  // Addresses subscribed by this connection.
+  addresses: Set<string>;
+
+  dashboardHandler: ((data: { best_block_height: number }) => void) | null;
+
+  constructor(host: WalletHost, options: ConnectionParams) {
+    super(options);
+    this.host = host;
+    // The websocket belongs to the host
+    this.websocket = null;
+    this.addresses = new Set();
+    this.dashboardHandler = null;
+  }
+
+  /**
+   * Attach to the host, which starts its connection if needed.
+   */
+  start() {
+    this.host.attach(this);
+  }
+
+  /**
+   * Detach from the host, the connection of the host stays open for the other wallets.
+   */
+  stop() {
+    this.host.detach(this);
+    this.removeAllListeners();
+    this.setState(ConnectionState.CLOSED);
+  }
+
+  // eslint-disable-next-line class-methods-use-this -- Hosted wallets never stream
+  async hasCapability(_flag: 'history-streaming') {
+    return false;
+  }
+
+  // eslint-disable-next-line class-methods-use-this -- Hosted wallets never stream
+  lockStream(_streamId: string): boolean {
+    return false;
+  }
+
+  subscribeAddresses(addresses: string[]) {
+    this.host.subscribeAddresses(this, addresses);
+  }
+
+  unsubscribeAddress(address: string) {
+    this.host.unsubscribeAddress(this, address);
+  }
+
+  addMetricsHandlers(storage: IStorage) {
+    this.dashboardHandler = handleWsDashboard(storage);
+  }
+
+  removeMetricsHandlers() {
+    this.dashboardHandler = null;
+  }
+
+  sendMessageWS(msg: string) {
+    this.host.connection.sendMessageWS(msg);
+  }
+}
+
+/**
+ * Runs many wallets on a single fullnode connection.
+ *
+ * Each wallet receives its own HostedConnection, the address subscriptions of all wallets are
+ * made on the shared websocket and the transactions received are routed to the wallets that
+ * subscribed any of their addresses. The wallets sync through the host scheduler, which keeps
+ * the sync of one wallet from delaying all the others.
+ *
+ * @example
+ * const host = new WalletHost({ network: 'mainnet', logger, scheduler: { concurrency: 8 } });
+ * const wallet = new HathorWallet({
+ *   connection: host.createConnection(),
+ *   syncScheduler: host.scheduler,
+ *   xpub,
+ * });
+ * await wallet.start();
+ */
+export class WalletHost {
+  connection: WalletConnection;
+
+  scheduler: SyncScheduler;
+
+  connections: Set<HostedConnection>;
+
+  /**
+   * Map<address, connections subscribed to the address>
+   */
+  addressIndex: Map<string, Set<HostedConnection>>;
+
+  started: boolean;
+
+  protected params: ConnectionParams;
+
+  protected logger: ILogger;
+
+  /**
+   * @param {Object} options Parameters of the shared connection
+   * @param {SyncScheduler|ISyncSchedulerOptions} [options.scheduler] Scheduler of the wallet syncs
+   */
+  constructor({
+    scheduler,
+    ...params
+  }: ConnectionParams & { scheduler?: SyncScheduler | ISyncSchedulerOptions }) {
+    this.params = params;
+    this.logger = params.logger || getDefaultLogger();
+    this.connection = new WalletConnection(params);
+    this.scheduler = scheduler instanceof SyncScheduler ? scheduler : new SyncScheduler(scheduler);
+    this.connections = new Set();
+    this.addressIndex = new Map();
+    this.started = false;
+
+    this.onStateChange = this.onStateChange.bind(this);
+    this.routeWalletMessage = this.routeWalletMessage.bind(this);
+    this.onBestBlockUpdate = this.onBestBlockUpdate.bind(this);
+    this.onDashboard = this.onDashboard.bind(this);
+    this.onSubscribeAddress = this.onSubscribeAddress.bind(this);
+  }
+
+  /**
+   * Create the connection of a new wallet running on this host.
+   */
+  createConnection(): HostedConnection {
+    return new HostedConnection(this, this.params);
+  }
+
+  /**
+   * Start the shared connection, called when the first wallet starts.
+   */
+  start() {
+    if (this.started) {
+      return;
+    }
+    this.started = true;
+    this.connection.on('state', this.onStateChange);
+    this.connection.on('wallet-update', this.routeWalletMessage);
+    this.connection.on('best-block-update', this.onBestBlockUpdate);
+    this.connection.start();
+
+    const { websocket } = this.connection;
+    websocket?.on('dashboard', this.onDashboard);
+    websocket?.on('subscribe_address', this.onSubscribeAddress);
+  }
+
+  /**
+   * Close the shared connection, the wallets running on the host should be stopped first.
+   * The host can be started again by the next wallet attached.
+   */
+  stop() {
+    for (const conn of this.connections) {
+      conn.setState(ConnectionState.CLOSED);
+    }
+    this.connections.clear();
+    this.addressIndex.clear();
+    this.scheduler.stopBackgroundTask();
+
+    this.connection.removeListener('state', this.onStateChange);
+    this.connection.removeListener('wallet-update', this.routeWalletMessage);
+    this.connection.removeListener('best-block-update', this.onBestBlockUpdate);
+    const { websocket } = this.connection;
+    websocket?.removeListener('dashboard', this.onDashboard);
+    websocket?.removeListener('subscribe_address', this.onSubscribeAddress);
+    this.connection.stop();
+    this.started = false;
+  }
+
+  /**
+   * Add a wallet connection, its state follows the shared connection from now on.
+   */
+  attach(conn: HostedConnection) {
+    this.connections.add(conn);
+    this.start();
+    conn.setState(
+      this.connection.getState() === ConnectionState.CONNECTED
+        ? ConnectionState.CONNECTED
+        : ConnectionState.CONNECTING
+    );
+  }
+
+  /**
+   * Remove a wallet connection and its address subscriptions.
+   */
+  detach(conn: HostedConnection) {
+    for (const address of [...conn.addresses]) {
+      this.unsubscribeAddress(conn, address);
+    }
+    this.connections.delete(conn);
+  }
+
+  /**
+   * Subscribe addresses for a wallet connection.
+   * Only the addresses no other wallet subscribed are sent to the fullnode.
+   */
+  subscribeAddresses(conn: HostedConnection, addresses: string[]) {
+    const newAddresses: string[] = [];
+    for (const address of addresses) {
+      conn.addresses.add(address);
+      let owners = this.addressIndex.get(address);
+      if (!owners) {
+        owners = new Set();
+        this.addressIndex.set(address, owners);
+        newAddresses.push(address);
+      }
+      owners.add(conn);
+    }
+    if (newAddresses.length > 0) {
+      this.connection.subscribeAddresses(newAddresses);
+    }
+  }
+
+  /**
+   * Unsubscribe an address of a wallet connection.
+   * The fullnode subscription is only removed when no other wallet subscribed the address.
+   */
+  unsubscribeAddress(conn: HostedConnection, address: string) {
+    conn.addresses.delete(address);
+    const owners = this.addressIndex.get(address);
+    if (!owners) {
+      return;
+    }
+    owners.delete(conn);
+    if (owners.size === 0) {
+      this.addressIndex.delete(address);
+      this.connection.unsubscribeAddress(address);
+    }
+  }
+
+  /**
+   * Send a wallet message to the connections of the wallets it belongs to.
+   * Transactions are routed by the addresses of their inputs and outputs, other messages are
+   * sent to all wallets.
+   */
+  routeWalletMessage(wsData: WalletWebSocketData) {
+    if (wsData.type !== 'wallet:address_history' || !wsData.history) {
+      for (const conn of this.connections) {
+        conn.handleWalletMessage(wsData);
+      }
+      return;
+    }
+
+    const targets = new Set<HostedConnection>();
+    for (const address of getTxAddresses(wsData.history)) {
+      for (const conn of this.addressIndex.get(address) ?? []) {
+        targets.add(conn);
+      }
+    }
+    for (const conn of targets) {
+      conn.handleWalletMessage(wsData);
+    }
+  }
+
+  /**
+   * Forward the best block height to the wallets.
+   */
+  onBestBlockUpdate(height: number) {
+    for (const conn of this.connections) {
+      conn.emit('best-block-update', height);
+    }
+  }
+
+  /**
+   * Send the dashboard metrics to the wallets that handle them.
+   */
+  onDashboard(data: { best_block_height: number }) {
+    for (const conn of this.connections) {
+      conn.dashboardHandler?.(data);
+    }
+  }
+
+  /**
+   * Log a failed address subscription, it should not take down the other wallets.
+   */
+  onSubscribeAddress(data: { success?: boolean; message?: string }) {
+    if (data.success === false) {
+      this.logger.error(`Address subscription failed: ${data.message}`);
+    }
+  }
+
+  /**
+   * Forward the state of the shared connection to the wallets.
+   */
+  onStateChange(state: ConnectionState) {
+    if (state === ConnectionState.CONNECTED && this.addressIndex.size > 0) {
+      // The fullnode does not keep the subscriptions of a lost connection
+      this.connection.subscribeAddresses([...this.addressIndex.keys()]);
+    }
+    for (const conn of this.connections) {
+      conn.setState(state);
+    }
+  }
+}
+
+export default WalletHost;
@@ -36,10 +36,10 @@ import {
 
 // ─── per-proposal build context ───────────────────────────────────────────
 //
-// Shared inputs for the per-proposal helpers. `createdOutputs` is the
-// accumulator from previous iterations; the helpers only read from it.
-// The orchestrator (`createShieldedOutputs`) pushes the new createdEntry
-// returned by each call once the helper has succeeded.
+// Shared inputs for the per-proposal helpers. `createdOutputs` holds the
+// entries of every other output and is only read when building the last
+// (balancing) output; the orchestrator (`createShieldedOutputs`) builds the
+// other outputs first and collects their createdEntry into it.
 
 interface ShieldedOutputBuildContext {
   proposal: ShieldedOutputProposal;
@@ -53,7 +53,8 @@ interface ShieldedOutputBuildContext {
 }
 
 interface FullShieldedBuildContext extends ShieldedOutputBuildContext {
-  inputGenerators: InputGeneratorInfo[];
+  surjectionDomain: ISurjectionDomainEntry[];
+  getTag: (tokenUidBuf: Buffer) => Promise<Buffer>;
 }
 
 // ─── provider-output shape checks ──────────────────────────────────────────
@@ -173,23 +174,34 @@ async function buildAmountShieldedOutput(
  * the unblinded generator (ZERO_TWEAK); FullShielded inputs use their
  * stored assetBlindingFactor — same shape the fullnode reconstructs for
  * verification.
+ *
+ * The domain only depends on the tx inputs, so it is built once per tx and
+ * shared by every FullShielded output. Inputs of the same token with the same
+ * blinding factor (e.g. several transparent HTR inputs) share one commitment.
  */
 async function buildSurjectionDomain(
   inputGenerators: InputGeneratorInfo[],
-  cryptoProvider: IShieldedCryptoProvider
+  cryptoProvider: IShieldedCryptoProvider,
+  getTag: (tokenUidBuf: Buffer) => Promise<Buffer>
 ): Promise<ISurjectionDomainEntry[]> {
-  const domain: ISurjectionDomainEntry[] = [];
-  for (const inputInfo of inputGenerators) {
-    const inputTokenBuf = Buffer.from(
-      inputInfo.tokenUid === NATIVE_TOKEN_UID ? NATIVE_TOKEN_UID_HEX : inputInfo.tokenUid,
-      'hex'
-    );
-    const inputTag = await cryptoProvider.deriveTag(inputTokenBuf);
-    const abf = inputInfo.assetBlindingFactor ?? ZERO_TWEAK;
-    const inputGen = await cryptoProvider.createAssetCommitment(inputTag, abf);
-    domain.push({ generator: inputGen, tag: inputTag, blindingFactor: abf });
-  }
-  return domain;
+  const generators = new Map<string, Promise<Buffer>>();
+  return Promise.all(
+    inputGenerators.map(async inputInfo => {
+      const inputTokenBuf = Buffer.from(
+        inputInfo.tokenUid === NATIVE_TOKEN_UID ? NATIVE_TOKEN_UID_HEX : inputInfo.tokenUid,
+        'hex'
+      );
+      const abf = inputInfo.assetBlindingFactor ?? ZERO_TWEAK;
+      const inputTag = await getTag(inputTokenBuf);
+      const key = `${inputTokenBuf.toString('hex')}:${abf.toString('hex')}`;
+      let inputGen = generators.get(key);
+      if (!inputGen) {
+        inputGen = cryptoProvider.createAssetCommitment(inputTag, abf);
+        generators.set(key, inputGen);
+      }
+      return { generator: await inputGen, tag: inputTag, blindingFactor: abf };
+    })
+  );
 }
 
 /**
@@ -210,7 +222,8 @@ async function buildFullShieldedOutput(
     recipientPubkeyBuf,
     tokenUidBuf,
     scriptHex,
-    inputGenerators,
+    surjectionDomain,
+    getTag,
   } = ctx;
 
   let cryptoResult;
@@ -276,12 +289,11 @@ async function buildFullShieldedOutput(
     'assetBlindingFactor'
   );
 
-  const codomainTag = await cryptoProvider.deriveTag(tokenUidBuf);
-  const domain = await buildSurjectionDomain(inputGenerators, cryptoProvider);
+  const codomainTag = await getTag(tokenUidBuf);
   const surjectionProof = await cryptoProvider.createSurjectionProof(
     codomainTag,
     cryptoResult.assetBlindingFactor,
-    domain
+    surjectionDomain
   );
   assertProviderProof(surjectionProof, MAX_SURJECTION_PROOF_SIZE, 'surjectionProof');
 
@@ -321,6 +333,11 @@ async function buildFullShieldedOutput(
  * hathor-core forbids transactions with a single shielded output
  * (trivial-commitment matching), so we throw when only one proposal is
  * passed. Empty input returns `[]`.
+ *
+ * The N-1 random-blinded outputs don't depend on each other, so their
+ * provider calls are issued concurrently: a provider that runs the proofs off
+ * the calling thread (worker or native thread pool) builds them in parallel.
+ * Only the balancing output waits for the others.
  */
 export async function createShieldedOutputs(
   proposals: ShieldedOutputProposal[],
@@ -445,10 +462,33 @@ export async function createShieldedOutputs(
     }
   }
 
-  const results: IDataShieldedOutput[] = [];
-  const createdOutputs: IBlindingEntry[] = [];
+  // Tags are deterministic per token UID; cache them for the whole tx so
+  // the domain and every codomain of the same token share one derivation.
+  const tags = new Map<string, Promise<Buffer>>();
+  const getTag = (tokenUidBuf: Buffer): Promise<Buffer> => {
+    const key = tokenUidBuf.toString('hex');
+    let tag = tags.get(key);
+    if (!tag) {
+      tag = cryptoProvider.deriveTag(tokenUidBuf);
+      tags.set(key, tag);
+    }
+    return tag;
+  };
 
-  for (let i = 0; i < proposals.length; i++) {
+  let surjectionDomain: ISurjectionDomainEntry[] = [];
+  if (hasFullShielded) {
+    try {
+      surjectionDomain = await buildSurjectionDomain(inputGenerators, cryptoProvider, getTag);
+    } catch (e) {
+      // Input token UIDs are kept out of the message for the same reason as below.
+      throw new Error('Failed to build the surjection proof domain', { cause: e });
+    }
+  }
+
+  const buildOutput = async (
+    i: number,
+    createdOutputs: IBlindingEntry[]
+  ): Promise<{ result: IDataShieldedOutput; createdEntry: IBlindingEntry }> => {
     const proposal = proposals[i];
     const isLast = i === proposals.length - 1;
     const recipientPubkeyBuf = Buffer.from(proposal.scanPubkey, 'hex');
@@ -459,7 +499,7 @@ export async function createShieldedOutputs(
 
     // proposal.address is already the spend-derived P2PKH (resolved in
     // `sendManyOutputsSendTransaction`); compute the on-chain script once
-    // per iteration so both helpers receive it ready to use.
+    // per output so both helpers receive it ready to use.
     const scriptHex = transactionUtils
       .createOutputScript(
         {
@@ -485,13 +525,9 @@ export async function createShieldedOutputs(
         tokenUidBuf,
         scriptHex,
       };
-      const built =
-        proposal.shieldedMode === ShieldedOutputMode.FULLY_SHIELDED
-          ? await buildFullShieldedOutput({ ...baseCtx, inputGenerators })
-          : await buildAmountShieldedOutput(baseCtx);
-
-      results.push(built.result);
-      createdOutputs.push(built.createdEntry);
+      return proposal.shieldedMode === ShieldedOutputMode.FULLY_SHIELDED
+        ? await buildFullShieldedOutput({ ...baseCtx, surjectionDomain, getTag })
+        : await buildAmountShieldedOutput(baseCtx);
     } catch (e) {
       const mode = ShieldedOutputMode[proposal.shieldedMode];
       // The token UID is precisely the secret a FullShielded output
@@ -507,7 +543,16 @@ export async function createShieldedOutputs(
         { cause: e }
       );
     }
-  }
+  };
+
+  // Random-blinded outputs first, concurrently. The results keep the proposal order.
+  const lastIndex = proposals.length - 1;
+  const built = await Promise.all(
+    proposals.slice(0, lastIndex).map((_proposal, i) => buildOutput(i, []))
+  );
+  // The balancing output needs the blinding factors of all the others.
+  const createdOutputs = built.map(output => output.createdEntry);
+  built.push(await buildOutput(lastIndex, createdOutputs));
 
-  return results;
+  return built.map(output => output.result);
 }
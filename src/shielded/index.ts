@@ -26,4 +26,9 @@ export type {
 // Install whichever crypto package matches your runtime, then wire it in via
 // `wallet.setShieldedCryptoProvider(createXxxShieldedCryptoProvider())`.
 
-export { processShieldedOutputs, resolveTokenUid } from './processing';
+export {
+  processShieldedOutputs,
+  rewindShieldedOutputsBatch,
+  resolveTokenUid,
+  ShieldedRewindContext,
+} from './processing';
@@ -9,7 +9,13 @@ import { HDPrivateKey } from 'bitcore-lib';
 import { IStorage, IHistoryTx, ILogger } from '../types';
 import { NATIVE_TOKEN_UID, NATIVE_TOKEN_UID_HEX, PRIVATE_KEY_SIZE_BYTES } from '../constants';
 import tokenUtils from '../utils/tokens';
-import { IShieldedCryptoProvider, IProcessedShieldedOutput, ShieldedOutputMode } from './types';
+import { METRIC_NAMES, startTimer } from '../metrics';
+import {
+  IShieldedCryptoProvider,
+  IDecryptedShieldedOutput,
+  IProcessedShieldedOutput,
+  ShieldedOutputMode,
+} from './types';
 
 /**
  * Resolve the 32-byte hex token UID (NATIVE_TOKEN_UID_HEX for HTR) from an
@@ -42,10 +48,22 @@ export function resolveTokenUid(tokenData: number | undefined, tx: IHistoryTx):
   );
 }
 
+/**
+ * Default number of shielded output rewinds kept in flight by
+ * `rewindShieldedOutputsBatch`.
+ */
+export const SHIELDED_REWIND_CONCURRENCY = 8;
+
+/**
+ * Number of history txs whose shielded outputs are rewound together by
+ * `processHistory`.
+ */
+export const SHIELDED_REWIND_WINDOW_SIZE = 100;
+
 /**
  * Derive the per-address scan private key from an already-decrypted scan
- * HDPrivateKey. The parent xpriv is unlocked once per tx by the caller; only the
- * cheap per-address child derivation runs here.
+ * HDPrivateKey. The parent xpriv is unlocked once per sync by the rewind
+ * context; only the cheap per-address child derivation runs here.
  *
  * The scan key uses a separate account (m/44'/280'/1'/0) from legacy P2PKH (account 0').
  * Returns the raw 32-byte private key for ECDH, or undefined if not derivable.
@@ -73,62 +91,139 @@ function deriveScanChildPrivkey(
 }
 
 /**
- * Process the shielded outputs of a transaction (SEPARATED model).
+ * Scan key material shared by every rewind of a sync.
  *
- * For each entry in `tx.shielded_outputs[]`, attempt to detect ownership and
- * decrypt it with the wallet's per-address scan key. When an output is owned,
- * the recovered fields are written **IN PLACE** onto the corresponding
- * `tx.shielded_outputs[s]` entry — `value`, `token`, `decoded.address`,
- * `blindingFactor` and (FullShielded only) `assetBlindingFactor`. The single
- * ownership/decoded marker is the top-level `value !== undefined`; every
- * downstream consumer (balance, credit, sign) gates off that.
+ * The PBKDF2 unlock of the scan xpriv and the HD key construction are the
+ * expensive part of detecting owned shielded outputs, and every wallet reloads
+ * its history from block 0, so a history walk builds ONE context and threads it
+ * through every tx: the scan xpriv is unlocked once (lazily, on the first owned
+ * output) and the per-address child keys are cached by BIP32 index.
  *
- * Non-owned slots and 0-value rewinds are left untouched (value stays
- * `undefined`), so the full on-chain-ordered list is preserved and the
- * arithmetic resolver still lands on the right slot.
+ * The context also remembers which slots were already scanned, so a slot
+ * rewound (or found non-owned) by the batched stage is not scanned again when
+ * the same tx goes through `processNewTx`.
  *
- * The function also returns an `IProcessedShieldedOutput[]` report of the slots
- * that were decoded (absolute on-chain index `tx.outputs.length + s`), useful
- * for callers/tests that want to inspect the result without re-scanning the
- * array. The authoritative state, however, lives on `tx.shielded_outputs[]`.
+ * Callers must `close()` the context when the sync ends to zero the cached keys.
+ */
+export class ShieldedRewindContext {
+  storage: IStorage;
+
+  pinCode: string;
+
+  scanHdPrivKey: HDPrivateKey | null;
+
+  /**
+   * Error of a failed scan xpriv unlock, rethrown without retrying the unlock.
+   */
+  unlockError: unknown;
+
+  /**
+   * Map<bip32AddressIndex, scan child private key>
+   */
+  childKeys: Map<number, Buffer>;
+
+  /**
+   * Slots already scanned on this sync, as `<txId>:<absoluteIndex>`.
+   */
+  scannedSlots: Set<string>;
+
+  constructor(storage: IStorage, pinCode: string) {
+    this.storage = storage;
+    this.pinCode = pinCode;
+    this.scanHdPrivKey = null;
+    this.unlockError = null;
+    this.childKeys = new Map<number, Buffer>();
+    this.scannedSlots = new Set<string>();
+  }
+
+  /**
+   * Get the scan private key of an address index.
+   *
+   * @param {number} addressIndex BIP32 index of the address
+   * @returns {Promise<Buffer|undefined>} The raw private key, or undefined if not derivable
+   * @throws If the scan xpriv cannot be unlocked (wrong PIN, missing/corrupted key)
+   */
+  async getScanChildPrivkey(addressIndex: number): Promise<Buffer | undefined> {
+    const cached = this.childKeys.get(addressIndex);
+    if (cached) return cached;
+
+    if (!this.scanHdPrivKey) {
+      // A failure here (wrong PIN, or a missing/corrupted scan key) is
+      // systemic — it would fail for every owned shielded output — so it
+      // propagates to fail loud rather than silently under-counting the
+      // wallet's shielded balance. The error is kept so the remaining txs of
+      // the sync fail the same way without paying for another PBKDF2 run.
+      if (this.unlockError) throw this.unlockError;
+      try {
+        this.scanHdPrivKey = new HDPrivateKey(await this.storage.getScanXPrivKey(this.pinCode));
+      } catch (e) {
+        this.unlockError = e;
+        throw e;
+      }
+    }
+    const privkey = deriveScanChildPrivkey(this.scanHdPrivKey, addressIndex, this.storage.logger);
+    if (privkey) {
+      this.childKeys.set(addressIndex, privkey);
+    }
+    return privkey;
+  }
+
+  /**
+   * Zero the cached scan keys.
+   * Not guaranteed by JS GC but a defense-in-depth best practice.
+   */
+  close(): void {
+    for (const privkey of this.childKeys.values()) {
+      privkey.fill(0);
+    }
+    this.childKeys.clear();
+    this.scanHdPrivKey = null;
+    this.scannedSlots.clear();
+  }
+}
+
+/**
+ * An owned shielded output ready to be rewound.
+ */
+interface IShieldedRewindJob {
+  tx: IHistoryTx;
+  sIndex: number;
+  absoluteIndex: number;
+  address: string;
+  privkey: Buffer;
+}
+
+function getSlotKey(tx: IHistoryTx, absoluteIndex: number): string {
+  return `${tx.tx_id}:${absoluteIndex}`;
+}
+
+/**
+ * Find the shielded outputs of a tx that belong to the wallet and still need a
+ * rewind, pairing each with its scan private key.
  *
- * @param storage - The wallet storage instance
- * @param tx - The transaction whose shielded outputs are processed (mutated in place)
- * @param cryptoProvider - The shielded crypto provider to use for decryption
- * @param pinCode - PIN code to unlock wallet keys for decryption
- * @returns Report of successfully decoded outputs belonging to this wallet
+ * @throws If the scan xpriv cannot be unlocked (systemic failure)
  */
-export async function processShieldedOutputs(
+async function collectShieldedRewindJobs(
   storage: IStorage,
   tx: IHistoryTx,
-  cryptoProvider: IShieldedCryptoProvider,
-  pinCode: string
-): Promise<IProcessedShieldedOutput[]> {
-  const shieldedOutputs = tx.shielded_outputs ?? [];
-  if (shieldedOutputs.length === 0) return [];
-
-  const results: IProcessedShieldedOutput[] = [];
+  context: ShieldedRewindContext
+): Promise<IShieldedRewindJob[]> {
+  const jobs: IShieldedRewindJob[] = [];
   const transparentCount = tx.outputs.length;
 
-  // Unlock the scan xpriv + build the HDPrivateKey ONCE per tx (lazily, on the
-  // first owned shielded output). The PBKDF2 unlock + HD construction are the
-  // expensive part; only the cheap per-address child derivation runs per output.
-  // Every wallet reloads its history from block 0, so this hot path walks every
-  // shielded tx on first sync.
-  let scanHdPrivKey: HDPrivateKey | undefined;
-
-  for (const [sIndex, shieldedOutput] of shieldedOutputs.entries()) {
+  for (const [sIndex, shieldedOutput] of (tx.shielded_outputs ?? []).entries()) {
     const absoluteIndex = transparentCount + sIndex;
     // Already decoded on a prior pass — idempotent skip. Gating per SLOT (not
     // per tx) lets a tx whose other owned slot failed a transient rewind be
     // completed on a later attempt, without re-rewinding the ones that worked.
     if (shieldedOutput.value !== undefined) continue;
+    // Already scanned on this sync (e.g. by the batched rewind stage).
+    const slotKey = getSlotKey(tx, absoluteIndex);
+    if (context.scannedSlots.has(slotKey)) continue;
 
     // No ECDH hint (the on-chain field was all-zeros, so the fullnode omitted
     // it): the output can never be rewound by this wallet — treat as non-owned.
-    // Checked first: it needs no storage access or key material, and skipping
-    // here means no scan child key is ever derived for the slot (the derived
-    // key is only zeroed by the rewind try/finally below).
+    // Checked first: it needs no storage access or key material.
     if (!shieldedOutput.ephemeral_pubkey) continue;
 
     const address = shieldedOutput.decoded?.address;
@@ -140,153 +235,287 @@ export async function processShieldedOutputs(
     if (!address) continue;
 
     // Check if this address belongs to our wallet
-    if (!(await storage.isAddressMine(address))) continue;
-
-    if (!scanHdPrivKey) {
-      // Unlock the scan xpriv once per tx. A failure here (wrong PIN, or a
-      // missing/corrupted scan key) is systemic — it would fail for every owned
-      // shielded output — so let it propagate and fail loud rather than silently
-      // under-counting the wallet's shielded balance.
-      scanHdPrivKey = new HDPrivateKey(await storage.getScanXPrivKey(pinCode));
+    if (!(await storage.isAddressMine(address))) {
+      context.scannedSlots.add(slotKey);
+      continue;
     }
-    // Derive this address's scan private key (ECDH) from the cached HD key.
+
+    // Derive this address's scan private key (ECDH) from the context's HD key.
     // isAddressMine above guarantees the address is in storage, so getAddressInfo
     // is non-null; we fetch it here only for the bip32 derivation index.
     const addressInfo = await storage.getAddressInfo(address);
-    const privkey = deriveScanChildPrivkey(
-      scanHdPrivKey,
-      addressInfo!.bip32AddressIndex,
-      storage.logger
-    );
+    const privkey = await context.getScanChildPrivkey(addressInfo!.bip32AddressIndex);
     // Defensive: deriveScanChildPrivkey only returns undefined if bitcore's child
     // derivation throws (it logs a warning inside), which shouldn't happen for a
     // valid owned address at a valid index — skip rather than crash the sync.
     if (!privkey) continue;
 
-    const ephPk = Buffer.from(shieldedOutput.ephemeral_pubkey, 'hex');
-    const commitment = Buffer.from(shieldedOutput.commitment, 'hex');
-    const rangeProof = Buffer.from(shieldedOutput.range_proof, 'hex');
-    // The fullnode always sets `mode`, so classify directly from it.
-    const isFullShielded = shieldedOutput.mode === ShieldedOutputMode.FULLY_SHIELDED;
+    jobs.push({ tx, sIndex, absoluteIndex, address, privkey });
+  }
 
-    try {
-      let recoveredValue: bigint;
-      let recoveredBf: Buffer;
-      let recoveredTokenUid: string;
-      let recoveredAbf: Buffer | undefined;
-      let mode: ShieldedOutputMode;
-
-      if (isFullShielded) {
-        // FullShielded: rewind recovers token UID and asset blinding factor
-        // asset_commitment is guaranteed for FullShielded outputs (protocol invariant)
-        const assetCommitment = Buffer.from(shieldedOutput.asset_commitment!, 'hex');
-        const result = await cryptoProvider.rewindFullShieldedOutput(
-          privkey,
-          ephPk,
-          commitment,
-          rangeProof,
-          assetCommitment
-        );
-        recoveredValue = result.value;
-        recoveredBf = result.blindingFactor;
-        recoveredAbf = result.assetBlindingFactor;
-        recoveredTokenUid = result.tokenUid;
-        mode = ShieldedOutputMode.FULLY_SHIELDED;
-
-        // Verify that the recovered token_uid is consistent with the on-chain asset_commitment.
-        const expectedTag = await cryptoProvider.deriveTag(Buffer.from(recoveredTokenUid, 'hex'));
-        const expectedAc = await cryptoProvider.createAssetCommitment(
-          expectedTag,
-          result.assetBlindingFactor
-        );
-        if (!assetCommitment.equals(expectedAc)) {
-          // Drop the output AND log loudly: this branch indicates either a bug
-          // in tag/commitment construction (ours or hathor-core's) or active
-          // forgery — someone constructing an `asset_commitment` that doesn't
-          // match the recovered `tokenUid`. Either way, an operator needs to
-          // see this, so route to `error` and include the recovered tokenUid +
-          // on-chain assetCommitment hex so the failure is debuggable from
-          // logs alone.
-          storage.logger.error(
-            `FullShielded token UID cross-check failed for tx ${tx.tx_id} ` +
-              `output ${absoluteIndex} — asset commitment mismatch. ` +
-              `recovered tokenUid=${recoveredTokenUid}, ` +
-              `on-chain assetCommitment=${assetCommitment.toString('hex')}, ` +
-              `expected assetCommitment=${expectedAc.toString('hex')}`
-          );
-          continue;
-        }
-      } else {
-        // AmountShielded: token UID is known from the visible token_data field
-        const tokenUid = resolveTokenUid(shieldedOutput.token_data, tx);
-        const result = await cryptoProvider.rewindAmountShieldedOutput(
-          privkey,
-          ephPk,
-          commitment,
-          rangeProof,
-          Buffer.from(tokenUid, 'hex')
+  return jobs;
+}
+
+/**
+ * Rewind and verify one owned shielded output.
+ * Does not change the tx, the result is applied by `applyShieldedRewind`.
+ *
+ * @returns The decrypted output, or null when the rewind failed or was rejected
+ */
+async function rewindShieldedOutput(
+  storage: IStorage,
+  job: IShieldedRewindJob,
+  cryptoProvider: IShieldedCryptoProvider
+): Promise<IDecryptedShieldedOutput | null> {
+  const { tx, absoluteIndex, privkey } = job;
+  const shieldedOutput = tx.shielded_outputs![job.sIndex];
+  const ephPk = Buffer.from(shieldedOutput.ephemeral_pubkey!, 'hex');
+  const commitment = Buffer.from(shieldedOutput.commitment, 'hex');
+  const rangeProof = Buffer.from(shieldedOutput.range_proof, 'hex');
+  // The fullnode always sets `mode`, so classify directly from it.
+  const isFullShielded = shieldedOutput.mode === ShieldedOutputMode.FULLY_SHIELDED;
+  const stopTimer = startTimer(METRIC_NAMES.SHIELDED_REWIND, {
+    mode: isFullShielded ? 'full' : 'amount',
+  });
+
+  try {
+    let decrypted: IDecryptedShieldedOutput;
+
+    if (isFullShielded) {
+      // FullShielded: rewind recovers token UID and asset blinding factor
+      // asset_commitment is guaranteed for FullShielded outputs (protocol invariant)
+      const assetCommitment = Buffer.from(shieldedOutput.asset_commitment!, 'hex');
+      const result = await cryptoProvider.rewindFullShieldedOutput(
+        privkey,
+        ephPk,
+        commitment,
+        rangeProof,
+        assetCommitment
+      );
+      decrypted = {
+        value: result.value,
+        blindingFactor: result.blindingFactor,
+        assetBlindingFactor: result.assetBlindingFactor,
+        tokenUid: result.tokenUid,
+        mode: ShieldedOutputMode.FULLY_SHIELDED,
+      };
+
+      // Verify that the recovered token_uid is consistent with the on-chain asset_commitment.
+      const expectedTag = await cryptoProvider.deriveTag(Buffer.from(result.tokenUid, 'hex'));
+      const expectedAc = await cryptoProvider.createAssetCommitment(
+        expectedTag,
+        result.assetBlindingFactor
+      );
+      if (!assetCommitment.equals(expectedAc)) {
+        // Drop the output AND log loudly: this branch indicates either a bug
+        // in tag/commitment construction (ours or hathor-core's) or active
+        // forgery — someone constructing an `asset_commitment` that doesn't
+        // match the recovered `tokenUid`. Either way, an operator needs to
+        // see this, so route to `error` and include the recovered tokenUid +
+        // on-chain assetCommitment hex so the failure is debuggable from
+        // logs alone.
+        storage.logger.error(
+          `FullShielded token UID cross-check failed for tx ${tx.tx_id} ` +
+            `output ${absoluteIndex} — asset commitment mismatch. ` +
+            `recovered tokenUid=${result.tokenUid}, ` +
+            `on-chain assetCommitment=${assetCommitment.toString('hex')}, ` +
+            `expected assetCommitment=${expectedAc.toString('hex')}`
         );
-        recoveredValue = result.value;
-        recoveredBf = result.blindingFactor;
-        recoveredTokenUid = tokenUid;
-        mode = ShieldedOutputMode.AMOUNT_SHIELDED;
+        return null;
       }
+    } else {
+      // AmountShielded: token UID is known from the visible token_data field
+      const tokenUid = resolveTokenUid(shieldedOutput.token_data, tx);
+      const result = await cryptoProvider.rewindAmountShieldedOutput(
+        privkey,
+        ephPk,
+        commitment,
+        rangeProof,
+        Buffer.from(tokenUid, 'hex')
+      );
+      decrypted = {
+        value: result.value,
+        blindingFactor: result.blindingFactor,
+        tokenUid,
+        mode: ShieldedOutputMode.AMOUNT_SHIELDED,
+      };
+    }
 
-      // Validate recovered value — a corrupted rewind could return garbage.
-      // Leave value undefined (do NOT write in place) so the slot stays
-      // "not owned" and is excluded by the `value !== undefined` gate.
-      if (recoveredValue <= 0n) {
-        storage.logger.warn(
-          `Shielded output rewind returned non-positive value ${recoveredValue} ` +
-            `for tx ${tx.tx_id} output ${absoluteIndex} — skipping`
-        );
-        continue;
+    // Validate recovered value — a corrupted rewind could return garbage.
+    // Leave value undefined (do NOT write in place) so the slot stays
+    // "not owned" and is excluded by the `value !== undefined` gate.
+    if (decrypted.value <= 0n) {
+      storage.logger.warn(
+        `Shielded output rewind returned non-positive value ${decrypted.value} ` +
+          `for tx ${tx.tx_id} output ${absoluteIndex} — skipping`
+      );
+      return null;
+    }
+    return decrypted;
+  } catch (e) {
+    // Rewind failed — output doesn't belong to us or data is corrupt
+    storage.logger.debug(
+      'Shielded output rewind failed for tx',
+      tx.tx_id,
+      'index',
+      absoluteIndex,
+      e
+    );
+    return null;
+  } finally {
+    stopTimer();
+  }
+}
+
+/**
+ * Write a decrypted output IN PLACE onto its `tx.shielded_outputs[s]` entry.
+ *
+ * @returns The report entry of the decoded output
+ */
+function applyShieldedRewind(
+  job: IShieldedRewindJob,
+  decrypted: IDecryptedShieldedOutput
+): IProcessedShieldedOutput {
+  const { tx, address } = job;
+  const shieldedOutput = tx.shielded_outputs![job.sIndex];
+  const walletTokenUid =
+    decrypted.tokenUid === NATIVE_TOKEN_UID_HEX ? NATIVE_TOKEN_UID : decrypted.tokenUid;
+
+  // Write the decoded data IN PLACE onto the on-chain-ordered shielded
+  // output entry. `value !== undefined` is now the single ownership gate;
+  // downstream loops (creditOutput, getTxBalance) read straight off these
+  // fields. The `decoded.address` was already present on the wire entry —
+  // we keep it but do NOT rely on it for ownership.
+  shieldedOutput.value = decrypted.value;
+  shieldedOutput.token = walletTokenUid;
+  shieldedOutput.blindingFactor = decrypted.blindingFactor.toString('hex');
+  shieldedOutput.assetBlindingFactor = decrypted.assetBlindingFactor?.toString('hex');
+  shieldedOutput.decoded = { ...shieldedOutput.decoded, address };
+  shieldedOutput.mode = decrypted.mode;
+
+  return {
+    txId: tx.tx_id,
+    index: job.absoluteIndex,
+    decrypted,
+    address,
+    tokenUid: decrypted.tokenUid,
+  };
+}
+
+/**
+ * Process the shielded outputs of a transaction (SEPARATED model).
+ *
+ * For each entry in `tx.shielded_outputs[]`, attempt to detect ownership and
+ * decrypt it with the wallet's per-address scan key. When an output is owned,
+ * the recovered fields are written **IN PLACE** onto the corresponding
+ * `tx.shielded_outputs[s]` entry — `value`, `token`, `decoded.address`,
+ * `blindingFactor` and (FullShielded only) `assetBlindingFactor`. The single
+ * ownership/decoded marker is the top-level `value !== undefined`; every
+ * downstream consumer (balance, credit, sign) gates off that.
+ *
+ * Non-owned slots and 0-value rewinds are left untouched (value stays
+ * `undefined`), so the full on-chain-ordered list is preserved and the
+ * arithmetic resolver still lands on the right slot.
+ *
+ * The function also returns an `IProcessedShieldedOutput[]` report of the slots
+ * that were decoded (absolute on-chain index `tx.outputs.length + s`), useful
+ * for callers/tests that want to inspect the result without re-scanning the
+ * array. The authoritative state, however, lives on `tx.shielded_outputs[]`.
+ *
+ * @param storage - The wallet storage instance
+ * @param tx - The transaction whose shielded outputs are processed (mutated in place)
+ * @param cryptoProvider - The shielded crypto provider to use for decryption
+ * @param pinCode - PIN code to unlock wallet keys for decryption
+ * @param context - Scan keys shared by the txs of a sync; when omitted the scan
+ *   xpriv is unlocked for this tx only
+ * @returns Report of successfully decoded outputs belonging to this wallet
+ */
+export async function processShieldedOutputs(
+  storage: IStorage,
+  tx: IHistoryTx,
+  cryptoProvider: IShieldedCryptoProvider,
+  pinCode: string,
+  context?: ShieldedRewindContext
+): Promise<IProcessedShieldedOutput[]> {
+  if ((tx.shielded_outputs ?? []).length === 0) return [];
+
+  const rewindContext = context ?? new ShieldedRewindContext(storage, pinCode);
+  try {
+    const jobs = await collectShieldedRewindJobs(storage, tx, rewindContext);
+    const results: IProcessedShieldedOutput[] = [];
+    for (const job of jobs) {
+      const decrypted = await rewindShieldedOutput(storage, job, cryptoProvider);
+      rewindContext.scannedSlots.add(getSlotKey(tx, job.absoluteIndex));
+      if (decrypted) {
+        results.push(applyShieldedRewind(job, decrypted));
       }
+    }
+    return results;
+  } finally {
+    if (!context) {
+      rewindContext.close();
+    }
+  }
+}
 
-      const walletTokenUid =
-        recoveredTokenUid === NATIVE_TOKEN_UID_HEX ? NATIVE_TOKEN_UID : recoveredTokenUid;
-
-      // Write the decoded data IN PLACE onto the on-chain-ordered shielded
-      // output entry. `value !== undefined` is now the single ownership gate;
-      // downstream loops (creditOutput, getTxBalance) read straight off these
-      // fields. The `decoded.address` was already present on the wire entry —
-      // we keep it but do NOT rely on it for ownership.
-      shieldedOutput.value = recoveredValue;
-      shieldedOutput.token = walletTokenUid;
-      shieldedOutput.blindingFactor = recoveredBf.toString('hex');
-      shieldedOutput.assetBlindingFactor = recoveredAbf?.toString('hex');
-      shieldedOutput.decoded = { ...shieldedOutput.decoded, address };
-      shieldedOutput.mode = mode;
-
-      results.push({
-        txId: tx.tx_id,
-        index: absoluteIndex,
-        decrypted: {
-          value: recoveredValue,
-          blindingFactor: recoveredBf,
-          tokenUid: recoveredTokenUid,
-          assetBlindingFactor: recoveredAbf,
-          mode,
-        },
-        address,
-        tokenUid: recoveredTokenUid,
-      });
+/**
+ * Rewind the owned shielded outputs of many transactions at once.
+ *
+ * The owned slots of all `txs` are collected first, then rewound and verified
+ * with up to `concurrency` provider calls in flight, so a native provider can
+ * spread the work over its threads instead of running one output at a time.
+ * The results are written IN PLACE in the order of `txs` and of the slots of
+ * each tx, after every rewind of the batch settled.
+ *
+ * A systemic failure (scan xpriv unlock) is not thrown: the txs not collected
+ * are left untouched, and reach the same failure when processed one by one by
+ * `processShieldedOutputs` with the same context.
+ *
+ * @param storage - The wallet storage instance
+ * @param txs - Transactions in chronological order (mutated in place)
+ * @param cryptoProvider - The shielded crypto provider to use for decryption
+ * @param context - Scan keys shared by the txs of the sync
+ * @param options.concurrency - Maximum number of rewinds in flight
+ * @returns The transactions that had at least one output decoded
+ */
+export async function rewindShieldedOutputsBatch(
+  storage: IStorage,
+  txs: IHistoryTx[],
+  cryptoProvider: IShieldedCryptoProvider,
+  context: ShieldedRewindContext,
+  { concurrency = SHIELDED_REWIND_CONCURRENCY }: { concurrency?: number } = {}
+): Promise<IHistoryTx[]> {
+  const jobs: IShieldedRewindJob[] = [];
+  for (const tx of txs) {
+    // Voided txs are not processed, their outputs are never credited.
+    if (tx.is_voided || (tx.shielded_outputs ?? []).length === 0) continue;
+    try {
+      jobs.push(...(await collectShieldedRewindJobs(storage, tx, context)));
     } catch (e) {
-      // Rewind failed — output doesn't belong to us or data is corrupt
-      storage.logger.debug(
-        'Shielded output rewind failed for tx',
-        tx.tx_id,
-        'index',
-        absoluteIndex,
-        e
-      );
-      continue;
-    } finally {
-      // Zero the private key buffer to reduce the window for memory-scraping attacks.
-      // Not guaranteed by JS GC but a defense-in-depth best practice.
-      privkey.fill(0);
+      // Left for the per-tx processing, which reports the failure of each tx.
+      break;
     }
   }
 
-  return results;
+  const decrypted: (IDecryptedShieldedOutput | null)[] = new Array(jobs.length).fill(null);
+  let nextJob = 0;
+  const runJobs = async () => {
+    while (nextJob < jobs.length) {
+      const i = nextJob++;
+      decrypted[i] = await rewindShieldedOutput(storage, jobs[i], cryptoProvider);
+    }
+  };
+  const runners = Math.min(Math.max(concurrency, 1), jobs.length);
+  await Promise.all(Array.from({ length: runners }, runJobs));
+
+  const decodedTxs = new Set<IHistoryTx>();
+  for (const [i, job] of jobs.entries()) {
+    context.scannedSlots.add(getSlotKey(job.tx, job.absoluteIndex));
+    const result = decrypted[i];
+    if (result) {
+      applyShieldedRewind(job, result);
+      decodedTxs.add(job.tx);
+    }
+  }
+  return Array.from(decodedTxs);
 }
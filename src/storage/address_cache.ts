@@ -0,0 +1,367 @@
+/**
+ * Copyright (c) Hathor Labs and its affiliates.
+ *
+ * This source code is licensed under the MIT license found in the
+ * LICENSE file in the root directory of this source tree.
+ */
+
+import path from 'path';
+import { crypto } from 'bitcore-lib';
+import { encodeSnapshot, decodeSnapshot, loadFs } from './file_store';
+import {
+  IAddressDerivationCache,
+  IAddressInfo,
+  IMultisigData,
+  IShieldedAddressPair,
+} from '../types';
+
+/**
+ * Version of the on-disk layout of the address cache.
+ * Files with a different version are ignored and the addresses are derived again.
+ */
+export const ADDRESS_CACHE_VERSION = 1;
+
+type CacheEntry = IAddressInfo | IShieldedAddressPair;
+
+function hashChainKey(data: string): string {
+  return crypto.Hash.sha256(Buffer.from(data)).toString('hex');
+}
+
+/**
+ * Get the cache key of the P2PKH addresses of an xpub.
+ * @param {string} xpubkey The xpub of the wallet (at the change level)
+ * @param {string} networkName The network name
+ * @returns {string}
+ */
+export function getP2PKHChainKey(xpubkey: string, networkName: string): string {
+  return hashChainKey(`p2pkh:${networkName}:${xpubkey}`);
+}
+
+/**
+ * Get the cache key of the P2SH addresses of a multisig configuration.
+ * The participants are sorted, so the order they are configured does not matter.
+ * @param {IMultisigData} multisigData The multisig data of the wallet
+ * @param {string} networkName The network name
+ * @returns {string}
+ */
+export function getP2SHChainKey(multisigData: IMultisigData, networkName: string): string {
+  const pubkeys = [...multisigData.pubkeys].sort().join(',');
+  return hashChainKey(`p2sh:${networkName}:${multisigData.numSignatures}:${pubkeys}`);
+}
+
+/**
+ * Get the cache key of the shielded address pairs of a scan and spend xpubs.
+ * @param {string} scanXpub The scan xpub of the wallet
+ * @param {string} spendXpub The spend xpub of the wallet
+ * @param {string} networkName The network name
+ * @returns {string}
+ */
+export function getShieldedChainKey(
+  scanXpub: string,
+  spendXpub: string,
+  networkName: string
+): string {
+  return hashChainKey(`shielded:${networkName}:${scanXpub}:${spendXpub}`);
+}
+
+/**
+ * Copy an entry so the storage can own the objects it saves.
+ */
+function copyEntry<T extends CacheEntry>(entry: T): T {
+  if ('shieldedAddress' in entry) {
+    return {
+      shieldedAddress: { ...entry.shieldedAddress },
+      spendAddress: { ...entry.spendAddress },
+    } as T;
+  }
+  return { ...entry };
+}
+
+/**
+ * In memory cache of derived addresses.
+ *
+ * Each derivation chain (an xpub, multisig configuration or shielded key pair on a
+ * network) is identified by a chain key and maps the BIP32 index to the derived data.
+ * The same cache can be shared by all wallets on the process.
+ */
+export class MemoryAddressCache implements IAddressDerivationCache {
+  /**
+   * Map<chainKey, Map<index, entry>>
+   */
+  chains: Map<string, Map<number, CacheEntry>>;
+
+  constructor() {
+    this.chains = new Map<string, Map<number, CacheEntry>>();
+  }
+
+  /**
+   * Get the entries of a chain, loading it if needed.
+   * @param {string} chainKey The chain key
+   * @returns {Promise<Map<number, CacheEntry>>}
+   */
+  async getChain(chainKey: string): Promise<Map<number, CacheEntry>> {
+    let chain = this.chains.get(chainKey);
+    if (!chain) {
+      chain = new Map<number, CacheEntry>();
+      this.chains.set(chainKey, chain);
+    }
+    return chain;
+  }
+
+  /**
+   * Get the cached addresses of a chain in the index range [startIndex, startIndex + count).
+   * Indexes not on the cache are absent from the result.
+   *
+   * @param {string} chainKey The chain key
+   * @param {number} startIndex First index of the range
+   * @param {number} count Number of indexes on the range
+   * @returns {Promise<Map<number, IAddressInfo>>}
+   */
+  async getAddresses(
+    chainKey: string,
+    startIndex: number,
+    count: number
+  ): Promise<Map<number, IAddressInfo>> {
+    return this.getRange<IAddressInfo>(chainKey, startIndex, count);
+  }
+
+  /**
+   * Save derived addresses of a chain.
+   * @param {string} chainKey The chain key
+   * @param {IAddressInfo[]} addresses The derived addresses
+   */
+  async saveAddresses(chainKey: string, addresses: IAddressInfo[]): Promise<void> {
+    await this.saveEntries(
+      chainKey,
+      addresses.map(addr => [addr.bip32AddressIndex, addr] as [number, CacheEntry])
+    );
+  }
+
+  /**
+   * Get the cached shielded pairs of a chain in the index range [startIndex, startIndex + count).
+   * Indexes not on the cache are absent from the result.
+   *
+   * @param {string} chainKey The chain key
+   * @param {number} startIndex First index of the range
+   * @param {number} count Number of indexes on the range
+   * @returns {Promise<Map<number, IShieldedAddressPair>>}
+   */
+  async getShieldedPairs(
+    chainKey: string,
+    startIndex: number,
+    count: number
+  ): Promise<Map<number, IShieldedAddressPair>> {
+    return this.getRange<IShieldedAddressPair>(chainKey, startIndex, count);
+  }
+
+  /**
+   * Save derived shielded pairs of a chain.
+   * @param {string} chainKey The chain key
+   * @param {IShieldedAddressPair[]} pairs The derived shielded pairs
+   */
+  async saveShieldedPairs(chainKey: string, pairs: IShieldedAddressPair[]): Promise<void> {
+    await this.saveEntries(
+      chainKey,
+      pairs.map(pair => [pair.shieldedAddress.bip32AddressIndex, pair] as [number, CacheEntry])
+    );
+  }
+
+  private async getRange<T extends CacheEntry>(
+    chainKey: string,
+    startIndex: number,
+    count: number
+  ): Promise<Map<number, T>> {
+    const chain = await this.getChain(chainKey);
+    const result = new Map<number, T>();
+    for (let i = startIndex; i < startIndex + count; i++) {
+      const entry = chain.get(i);
+      if (entry) {
+        result.set(i, copyEntry(entry as T));
+      }
+    }
+    return result;
+  }
+
+  private async saveEntries(chainKey: string, entries: [number, CacheEntry][]): Promise<void> {
+    if (entries.length === 0) {
+      return;
+    }
+    const chain = await this.getChain(chainKey);
+    for (const [index, entry] of entries) {
+      chain.set(index, copyEntry(entry));
+    }
+  }
+}
+
+/**
+ * Address cache persisted on a directory, one file per chain.
+ *
+ * Chains are loaded from disk the first time they are used and changed chains are
+ * written after `flushInterval` ms, with the same atomic write as the FileStore.
+ * Callers should `close()` the cache before exiting the process to write any pending changes.
+ */
+export class FileAddressCache extends MemoryAddressCache {
+  dirPath: string;
+
+  flushInterval: number;
+
+  /**
+   * Chains with changes not yet written on disk.
+   */
+  dirtyChains: Set<string>;
+
+  /**
+   * Chains being loaded from disk, used to load each chain only once.
+   */
+  loading: Map<string, Promise<Map<number, CacheEntry>>>;
+
+  flushTimer: ReturnType<typeof setTimeout> | null;
+
+  flushWait: Promise<void>;
+
+  /**
+   * @param {string} dirPath Directory to save the cache files
+   * @param {Object} [options]
+   * @param {number} [options.flushInterval=1000] Debounce interval in ms of the writes
+   */
+  constructor(dirPath: string, { flushInterval = 1000 }: { flushInterval?: number } = {}) {
+    super();
+    this.dirPath = dirPath;
+    this.flushInterval = flushInterval;
+    this.dirtyChains = new Set<string>();
+    this.loading = new Map<string, Promise<Map<number, CacheEntry>>>();
+    this.flushTimer = null;
+    this.flushWait = Promise.resolve();
+  }
+
+  getChainPath(chainKey: string): string {
+    return path.join(this.dirPath, `${chainKey}.json`);
+  }
+
+  async getChain(chainKey: string): Promise<Map<number, CacheEntry>> {
+    const chain = this.chains.get(chainKey);
+    if (chain) {
+      return chain;
+    }
+    let loading = this.loading.get(chainKey);
+    if (!loading) {
+      loading = this.loadChain(chainKey).finally(() => {
+        this.loading.delete(chainKey);
+      });
+      this.loading.set(chainKey, loading);
+    }
+    return loading;
+  }
+
+  /**
+   * Read a chain from disk, a missing or incompatible file is an empty chain.
+   * @param {string} chainKey The chain key
+   * @returns {Promise<Map<number, CacheEntry>>}
+   */
+  async loadChain(chainKey: string): Promise<Map<number, CacheEntry>> {
+    let chain = new Map<number, CacheEntry>();
+    let text: string | null = null;
+    try {
+      text = await loadFs().readFile(this.getChainPath(chainKey), 'utf8');
+    } catch (e: unknown) {
+      if ((e as NodeJS.ErrnoException).code !== 'ENOENT') {
+        throw e;
+      }
+    }
+    if (text !== null) {
+      let data: { version: number; entries: Map<number, CacheEntry> } | null = null;
+      try {
+        data = decodeSnapshot(text) as { version: number; entries: Map<number, CacheEntry> };
+      } catch (e) {
+        // A corrupted file is discarded, the addresses will be derived and saved again.
+      }
+      if (data && data.version === ADDRESS_CACHE_VERSION && data.entries instanceof Map) {
+        chain = data.entries;
+      }
+    }
+    this.chains.set(chainKey, chain);
+    return chain;
+  }
+
+  async saveAddresses(chainKey: string, addresses: IAddressInfo[]): Promise<void> {
+    await super.saveAddresses(chainKey, addresses);
+    if (addresses.length > 0) {
+      this.markDirty(chainKey);
+    }
+  }
+
+  async saveShieldedPairs(chainKey: string, pairs: IShieldedAddressPair[]): Promise<void> {
+    await super.saveShieldedPairs(chainKey, pairs);
+    if (pairs.length > 0) {
+      this.markDirty(chainKey);
+    }
+  }
+
+  /**
+   * Mark a chain as changed and schedule a write.
+   * @param {string} chainKey The chain key
+   */
+  markDirty(chainKey: string): void {
+    this.dirtyChains.add(chainKey);
+    if (this.flushTimer !== null) {
+      return;
+    }
+    this.flushTimer = setTimeout(() => {
+      this.flushTimer = null;
+      this.flush().catch(() => {
+        // The chains are kept dirty so the next flush retries the write
+      });
+    }, this.flushInterval);
+  }
+
+  /**
+   * Write the changed chains on disk.
+   * @returns {Promise<void>}
+   */
+  async flush(): Promise<void> {
+    if (this.flushTimer !== null) {
+      clearTimeout(this.flushTimer);
+      this.flushTimer = null;
+    }
+    this.flushWait = this.flushWait
+      .catch(() => {
+        // A failed write should not prevent the next one
+      })
+      .then(async () => {
+        if (this.dirtyChains.size === 0) {
+          return;
+        }
+        const chainKeys = Array.from(this.dirtyChains);
+        this.dirtyChains.clear();
+        const fs = loadFs();
+        await fs.mkdir(this.dirPath, { recursive: true });
+        for (let i = 0; i < chainKeys.length; i++) {
+          const chainKey = chainKeys[i];
+          const data = encodeSnapshot({
+            version: ADDRESS_CACHE_VERSION,
+            entries: this.chains.get(chainKey),
+          });
+          const filePath = this.getChainPath(chainKey);
+          const tmpPath = `${filePath}.tmp`;
+          try {
+            await fs.writeFile(tmpPath, data, 'utf8');
+            await fs.rename(tmpPath, filePath);
+          } catch (e) {
+            for (const key of chainKeys.slice(i)) {
+              this.dirtyChains.add(key);
+            }
+            throw e;
+          }
+        }
+      });
+    return this.flushWait;
+  }
+
+  /**
+   * Write any pending changes.
+   * @returns {Promise<void>}
+   */
+  async close(): Promise<void> {
+    await this.flush();
+  }
+}
@@ -0,0 +1,347 @@
+/**
+ * Copyright (c) Hathor Labs and its affiliates.
+ *
+ * This source code is licensed under the MIT license found in the
+ * LICENSE file in the root directory of this source tree.
+ */
+/* eslint max-classes-per-file: ["error", 2] */
+
+import { cloneDeep } from 'lodash';
+import {
+  IHistoryInput,
+  IHistoryOutput,
+  IHistoryOutputDecoded,
+  IHistoryShieldedOutput,
+  IHistoryTx,
+} from '../types';
+import { COMPACT_HISTORY_CACHE_SIZE } from '../constants';
+
+/**
+ * Fields of the inputs and outputs with hex data, kept as raw bytes.
+ */
+const HEX_FIELDS = new Set([
+  'tx_id',
+  'script',
+  'spent_by',
+  'commitment',
+  'range_proof',
+  'surjection_proof',
+  'asset_commitment',
+  'ephemeral_pubkey',
+  'blindingFactor',
+  'assetBlindingFactor',
+]);
+
+const MAX_UINT64 = 2n ** 64n - 1n;
+
+// Approximate size in bytes of the objects of a rebuilt tx, without its hex strings.
+const TX_BASE_SIZE = 400;
+const TX_ENTRY_SIZE = 200;
+
+/**
+ * How a field of an input or output is kept.
+ */
+enum FieldKind {
+  // As it is
+  RAW = 0,
+  // Position on the strings table
+  STRING = 1,
+  // Buffer with the bytes of a hex string
+  BYTES = 2,
+  // Position on the values of the tx
+  VALUE = 3,
+  // Position on the decoded table
+  DECODED = 4,
+}
+
+// Bits of the field tag with the FieldKind, the others have the position of the field name.
+const KIND_BITS = 3;
+const KIND_MASK = (1 << KIND_BITS) - 1;
+
+/**
+ * An input or output as a flat list of `[tag, value, tag, value, ...]`.
+ */
+type CompactEntry = unknown[];
+
+interface ICompactTx {
+  // Fields of the tx without the lists below, as they are.
+  fields: Omit<IHistoryTx, 'tx_id' | 'inputs' | 'outputs' | 'shielded_outputs' | 'parents'>;
+  parents: (Buffer | string)[];
+  inputs: CompactEntry[];
+  outputs: CompactEntry[];
+  shieldedOutputs: CompactEntry[] | null;
+  // Values of the inputs and outputs.
+  values: BigUint64Array;
+  // Approximate size in bytes of the rebuilt tx.
+  size: number;
+}
+
+/**
+ * Check if a string is lowercase hex, so it can be rebuilt as it is from its bytes.
+ * @param {string} value
+ * @returns {boolean}
+ */
+function isHex(value: string): boolean {
+  return value.length % 2 === 0 && /^[0-9a-f]*$/.test(value);
+}
+
+/**
+ * Table of interned values, each distinct value is kept once and referenced by its position.
+ */
+class InternTable<T> {
+  values: T[];
+
+  ids: Map<string, number>;
+
+  constructor() {
+    this.values = [];
+    this.ids = new Map<string, number>();
+  }
+
+  /**
+   * Get the position of a value, adding it to the table if needed.
+   * @param {string} key Identifies the value
+   * @param {T} value The value to add if the key is new
+   * @returns {number}
+   */
+  intern(key: string, value: T): number {
+    let id = this.ids.get(key);
+    if (id === undefined) {
+      id = this.values.length;
+      this.values.push(value);
+      this.ids.set(key, id);
+    }
+    return id;
+  }
+}
+
+/**
+ * Transaction history kept in a compact representation.
+ *
+ * Addresses, token uids and field names are interned, hex data (scripts, proofs and ids)
+ * is kept as raw bytes and the values as a bigint array per tx. The `IHistoryTx` objects are
+ * rebuilt when read and the most recently used are kept rebuilt, up to `cacheSize` bytes.
+ *
+ * Like a persistent store, changes on a tx read from the history are only kept when the tx
+ * is saved again.
+ */
+export class CompactHistory {
+  /**
+   * Map<txId, ICompactTx>
+   */
+  txs: Map<string, ICompactTx>;
+
+  /**
+   * Map<txId, IHistoryTx> with the rebuilt txs, from the least recently used.
+   */
+  hot: Map<string, IHistoryTx>;
+
+  /**
+   * Approximate size in bytes of the rebuilt txs.
+   */
+  hotSize: number;
+
+  cacheSize: number;
+
+  strings: InternTable<string>;
+
+  decoded: InternTable<IHistoryOutputDecoded>;
+
+  /**
+   * @param {number} [cacheSize] Approximate memory in bytes used by the rebuilt txs
+   */
+  constructor(cacheSize: number = COMPACT_HISTORY_CACHE_SIZE) {
+    this.txs = new Map<string, ICompactTx>();
+    this.hot = new Map<string, IHistoryTx>();
+    this.hotSize = 0;
+    this.cacheSize = cacheSize;
+    this.strings = new InternTable<string>();
+    this.decoded = new InternTable<IHistoryOutputDecoded>();
+  }
+
+  /**
+   * Number of txs on the history.
+   */
+  get size(): number {
+    return this.txs.size;
+  }
+
+  has(txId: string): boolean {
+    return this.txs.has(txId);
+  }
+
+  /**
+   * Get a tx, keeping it rebuilt as the most recently used.
+   * @param {string} txId The tx id
+   * @returns {IHistoryTx|undefined}
+   */
+  get(txId: string): IHistoryTx | undefined {
+    const tx = this.hot.get(txId);
+    if (tx) {
+      // Move to the end as the most recently used
+      this.hot.delete(txId);
+      this.hot.set(txId, tx);
+      return tx;
+    }
+    const compact = this.txs.get(txId);
+    if (!compact) {
+      return undefined;
+    }
+    const rebuilt = this.decodeTx(txId, compact);
+    this.addHot(txId, rebuilt, compact.size);
+    return rebuilt;
+  }
+
+  /**
+   * Get a tx without changing the rebuilt txs kept, used when iterating on the whole history.
+   * @param {string} txId The tx id
+   * @returns {IHistoryTx|undefined}
+   */
+  peek(txId: string): IHistoryTx | undefined {
+    const tx = this.hot.get(txId);
+    if (tx) {
+      return tx;
+    }
+    const compact = this.txs.get(txId);
+    return compact && this.decodeTx(txId, compact);
+  }
+
+  /**
+   * Save a tx, the tx object is kept as the most recently used.
+   * @param {string} txId The tx id
+   * @param {IHistoryTx} tx The tx
+   */
+  set(txId: string, tx: IHistoryTx): void {
+    this.removeHot(txId);
+    const compact = this.encodeTx(tx);
+    this.txs.set(txId, compact);
+    this.addHot(txId, tx, compact.size);
+  }
+
+  clear(): void {
+    this.txs.clear();
+    this.hot.clear();
+    this.hotSize = 0;
+    this.strings = new InternTable<string>();
+    this.decoded = new InternTable<IHistoryOutputDecoded>();
+  }
+
+  private addHot(txId: string, tx: IHistoryTx, size: number): void {
+    if (this.cacheSize <= 0) {
+      return;
+    }
+    this.hot.set(txId, tx);
+    this.hotSize += size;
+    // The tx just added is kept even if it alone is over the budget
+    for (const oldest of this.hot.keys()) {
+      if (this.hotSize <= this.cacheSize || oldest === txId) {
+        break;
+      }
+      this.removeHot(oldest);
+    }
+  }
+
+  private removeHot(txId: string): void {
+    if (this.hot.delete(txId)) {
+      this.hotSize -= this.txs.get(txId)!.size;
+    }
+  }
+
+  private encodeTx(tx: IHistoryTx): ICompactTx {
+    const {
+      tx_id: _txId,
+      inputs,
+      outputs,
+      shielded_outputs: shieldedOutputs,
+      parents,
+      ...fields
+    } = tx;
+    const ctx = { values: [] as bigint[], hexSize: 0 };
+    const encodeList = (entries: object[]) => entries.map(entry => this.encodeEntry(entry, ctx));
+    const compact = {
+      fields,
+      parents: parents.map(parent => (isHex(parent) ? Buffer.from(parent, 'hex') : parent)),
+      inputs: encodeList(inputs),
+      outputs: encodeList(outputs),
+      shieldedOutputs: shieldedOutputs ? encodeList(shieldedOutputs) : null,
+    };
+    const entries = inputs.length + outputs.length + (shieldedOutputs?.length ?? 0);
+    return {
+      ...compact,
+      values: BigUint64Array.from(ctx.values),
+      size: TX_BASE_SIZE + entries * TX_ENTRY_SIZE + ctx.hexSize,
+    };
+  }
+
+  private encodeEntry(entry: object, ctx: { values: bigint[]; hexSize: number }): CompactEntry {
+    const compact: CompactEntry = [];
+    for (const [name, value] of Object.entries(entry)) {
+      if (value === undefined) {
+        continue;
+      }
+      let kind = FieldKind.RAW;
+      let encoded: unknown = value;
+      if (name === 'decoded' && value !== null && typeof value === 'object') {
+        kind = FieldKind.DECODED;
+        encoded = this.decoded.intern(JSON.stringify(value), { ...value });
+      } else if (typeof value === 'string' && HEX_FIELDS.has(name) && isHex(value)) {
+        kind = FieldKind.BYTES;
+        encoded = Buffer.from(value, 'hex');
+        ctx.hexSize += value.length;
+      } else if (typeof value === 'string') {
+        kind = FieldKind.STRING;
+        encoded = this.strings.intern(value, value);
+      } else if (typeof value === 'bigint' && value >= 0n && value <= MAX_UINT64) {
+        kind = FieldKind.VALUE;
+        encoded = ctx.values.length;
+        ctx.values.push(value);
+      }
+      compact.push((this.strings.intern(name, name) << KIND_BITS) | kind, encoded);
+    }
+    return compact;
+  }
+
+  private decodeTx(txId: string, compact: ICompactTx): IHistoryTx {
+    const decodeList = <T>(entries: CompactEntry[]) =>
+      entries.map(entry => this.decodeEntry(entry, compact.values) as unknown as T);
+    const tx: IHistoryTx = {
+      ...cloneDeep(compact.fields),
+      tx_id: txId,
+      parents: compact.parents.map(parent =>
+        Buffer.isBuffer(parent) ? parent.toString('hex') : parent
+      ),
+      inputs: decodeList<IHistoryInput>(compact.inputs),
+      outputs: decodeList<IHistoryOutput>(compact.outputs),
+    };
+    if (compact.shieldedOutputs) {
+      tx.shielded_outputs = decodeList<IHistoryShieldedOutput>(compact.shieldedOutputs);
+    }
+    return tx;
+  }
+
+  private decodeEntry(compact: CompactEntry, values: BigUint64Array): Record<string, unknown> {
+    const entry: Record<string, unknown> = {};
+    for (let i = 0; i < compact.length; i += 2) {
+      const tag = compact[i] as number;
+      const value = compact[i + 1];
+      const name = this.strings.values[tag >> KIND_BITS];
+      switch (tag & KIND_MASK) {
+        case FieldKind.STRING:
+          entry[name] = this.strings.values[value as number];
+          break;
+        case FieldKind.BYTES:
+          entry[name] = (value as Buffer).toString('hex');
+          break;
+        case FieldKind.VALUE:
+          entry[name] = values[value as number];
+          break;
+        case FieldKind.DECODED:
+          entry[name] = { ...this.decoded.values[value as number] };
+          break;
+        default:
+          entry[name] = value !== null && typeof value === 'object' ? cloneDeep(value) : value;
+      }
+    }
+    return entry;
+  }
+}
@@ -0,0 +1,867 @@
+/**
+ * Copyright (c) Hathor Labs and its affiliates.
+ *
+ * This source code is licensed under the MIT license found in the
+ * LICENSE file in the root directory of this source tree.
+ */
+
+import { MemoryStore, getOrderingKey } from './memory_store';
+import { UtxoIndex } from './utxo_index';
+import {
+  IAddressInfo,
+  IAddressMetadata,
+  ITokenData,
+  ITokenMetadata,
+  IHistoryTx,
+  IUtxo,
+  IWalletAccessData,
+  IWalletData,
+  ILockedUtxo,
+  INcData,
+  AddressScanPolicyData,
+  IAddressChainOptions,
+} from '../types';
+
+/**
+ * Node `fs` promises api, null when it is not available (e.g. browser and react-native).
+ */
+let fsModule: typeof import('fs').promises | null | undefined;
+
+/**
+ * Load the node `fs` module on first use, so importing the lib does not require it.
+ * @returns {typeof import('fs').promises}
+ * @throws {Error} When the module is not available on the current platform
+ */
+export function loadFs(): typeof import('fs').promises {
+  if (fsModule === undefined) {
+    try {
+      /* eslint-disable global-require, @typescript-eslint/no-var-requires */
+      fsModule = require('fs').promises ?? null;
+      /* eslint-enable global-require, @typescript-eslint/no-var-requires */
+    } catch (err) {
+      fsModule = null;
+    }
+  }
+  if (!fsModule) {
+    throw new Error('The fs module is not available on this platform.');
+  }
+  return fsModule;
+}
+
+/**
+ * Version of the on-disk layout (snapshot and log).
+ * Files with a different version are discarded on load and the wallet syncs from scratch.
+ */
+export const FILE_STORE_VERSION = 2;
+
+/**
+ * Default debounce interval (in ms) between a store mutation and the log write.
+ */
+export const FILE_STORE_FLUSH_INTERVAL = 1000;
+
+/**
+ * Default minimum number of log records before the log is compacted into a new snapshot.
+ */
+export const FILE_STORE_COMPACT_THRESHOLD = 10000;
+
+/**
+ * Collections written on the log entry by entry.
+ * The other fields of the store are small and written whole on each flush.
+ */
+const LOGGED_COLLECTIONS = [
+  'addresses',
+  'addressIndexes',
+  'shieldedAddressIndexes',
+  'addressesMetadata',
+  'seqnumMetadata',
+  'history',
+  'utxos',
+  'lockedUtxos',
+] as const;
+
+type LoggedCollection = (typeof LOGGED_COLLECTIONS)[number];
+
+export interface IFileStoreOptions {
+  /**
+   * Debounce interval in ms, every mutation schedules a write after this interval.
+   * Mutations that happen while a write is scheduled are coalesced into the same write.
+   */
+  flushInterval?: number;
+  /**
+   * Minimum number of log records before compacting the log into a new snapshot.
+   * The log is only compacted once it also has more records than the snapshot has entries,
+   * so the cost of the compaction is spread over the writes that grew the log.
+   */
+  compactThreshold?: number;
+}
+
+/**
+ * Fields of the store which are not logged entry by entry.
+ */
+interface IFileStoreState {
+  tokens: Map<string, ITokenData>;
+  tokensMetadata: Map<string, ITokenMetadata>;
+  registeredTokens: Map<string, ITokenData>;
+  registeredNanoContracts: Map<string, INcData>;
+  accessData: IWalletAccessData | null;
+  walletData: IWalletData;
+  genericStorage: Record<string, unknown>;
+}
+
+/**
+ * Shape of the snapshot written on disk.
+ * Maps are kept as maps and bigints as bigints, the encoding is done by `encodeSnapshot`.
+ */
+interface IFileStoreSnapshot extends IFileStoreState {
+  version: number;
+  generation: number;
+  addresses: Map<string, IAddressInfo>;
+  addressIndexes: Map<number, string>;
+  shieldedAddressIndexes: Map<number, string>;
+  addressesMetadata: Map<string, IAddressMetadata>;
+  seqnumMetadata: Map<string, number>;
+  history: Map<string, IHistoryTx>;
+  utxos: Map<string, IUtxo>;
+  lockedUtxos: Map<string, ILockedUtxo>;
+}
+
+/**
+ * A record of the log, one per line.
+ * - `{ version, generation }`: header, the first line of the log.
+ * - `{ c, k, v }`: entry `k` of collection `c` was set to `v`.
+ * - `{ c, k, d: true }`: entry `k` of collection `c` was deleted.
+ * - `{ c, x: true }`: collection `c` was emptied.
+ * - `{ s }`: the not logged fields of the store were set to `s`.
+ */
+interface IFileStoreLogRecord {
+  version?: number;
+  generation?: number;
+  c?: LoggedCollection;
+  k?: unknown;
+  v?: unknown;
+  d?: boolean;
+  x?: boolean;
+  s?: IFileStoreState;
+}
+
+/**
+ * Encode a snapshot as JSON, tagging the values plain JSON cannot represent.
+ * `bigint` values become `{ $bigint: '<decimal>' }` and `Map` instances become `{ $map: [[k, v], ...] }`.
+ */
+export function encodeSnapshot(value: unknown): string {
+  return JSON.stringify(value, (_key: string, val: unknown) => {
+    if (typeof val === 'bigint') {
+      return { $bigint: val.toString(10) };
+    }
+    if (val instanceof Map) {
+      return { $map: Array.from(val.entries()) };
+    }
+    return val;
+  });
+}
+
+/**
+ * Decode a snapshot encoded with `encodeSnapshot`.
+ */
+export function decodeSnapshot(text: string): unknown {
+  return JSON.parse(text, (_key: string, val: unknown) => {
+    if (val === null || typeof val !== 'object' || Array.isArray(val)) {
+      return val;
+    }
+    const obj = val as Record<string, unknown>;
+    const keys = Object.keys(obj);
+    if (keys.length === 1 && keys[0] === '$bigint' && typeof obj.$bigint === 'string') {
+      return BigInt(obj.$bigint);
+    }
+    if (keys.length === 1 && keys[0] === '$map' && Array.isArray(obj.$map)) {
+      return new Map(obj.$map as [unknown, unknown][]);
+    }
+    return val;
+  });
+}
+
+/**
+ * Map that reports the keys set and deleted on it, used to log the changes of a collection.
+ */
+class JournaledMap<K, V> extends Map<K, V> {
+  onChange?: (key: K) => void;
+
+  onClear?: () => void;
+
+  set(key: K, value: V): this {
+    super.set(key, value);
+    this.onChange?.(key);
+    return this;
+  }
+
+  delete(key: K): boolean {
+    const deleted = super.delete(key);
+    if (deleted) {
+      this.onChange?.(key);
+    }
+    return deleted;
+  }
+
+  clear(): void {
+    super.clear();
+    this.onClear?.();
+  }
+}
+
+/**
+ * File backed implementation of IStore.
+ *
+ * All reads are served from memory (this is a MemoryStore). The data on disk is a snapshot
+ * on `filePath` and an append-only log on `<filePath>.log`:
+ * - Every mutation marks the changed entries of the large collections (addresses, history,
+ *   utxos, etc.) and schedules a flush, which appends one line per changed entry to the log,
+ *   so a new tx costs a write proportional to the tx and not to the whole history.
+ * - Once the log has more records than the snapshot has entries the log is compacted: the
+ *   whole store is written as a new snapshot (atomically, through a temporary file and a
+ *   rename) and the log is started over.
+ *
+ * The snapshot and the log carry a generation number, a log from another generation (e.g.
+ * a crash between writing the snapshot and restarting the log) is ignored. A torn last line
+ * of the log is also ignored, the log is compacted on the next flush.
+ *
+ * The data is loaded on `validate()`, which the wallet calls on `start`, so a restarted
+ * wallet has its addresses, history, utxos and metadata available before connecting.
+ *
+ * Callers should `close()` the store before exiting the process to write any pending changes.
+ * `HathorWallet.stop()` keeps the history of a FileStore unless called with `cleanStorage: true`,
+ * which empties the files.
+ */
+export class FileStore extends MemoryStore {
+  filePath: string;
+
+  logPath: string;
+
+  flushInterval: number;
+
+  compactThreshold: number;
+
+  /**
+   * If the store has changes not yet written on disk.
+   */
+  dirty: boolean;
+
+  /**
+   * If the data was already loaded from disk.
+   */
+  loaded: boolean;
+
+  /**
+   * Timer of the scheduled write, if any.
+   */
+  flushTimer: ReturnType<typeof setTimeout> | null;
+
+  /**
+   * Chain of writes, used to avoid concurrent writes on the same files.
+   */
+  flushWait: Promise<void>;
+
+  /**
+   * Generation of the snapshot on disk, the log is only valid for the same generation.
+   */
+  generation: number;
+
+  /**
+   * If the next flush should write a new snapshot instead of appending to the log.
+   * Set when there is no valid snapshot and log pair on disk.
+   */
+  needsCompaction: boolean;
+
+  /**
+   * Number of records on the log.
+   */
+  logRecords: number;
+
+  /**
+   * Number of collection entries on the snapshot.
+   */
+  snapshotEntries: number;
+
+  /**
+   * Keys changed on each logged collection since the last flush.
+   */
+  pendingKeys: Map<LoggedCollection, Set<unknown>>;
+
+  /**
+   * Logged collections emptied since the last flush.
+   */
+  pendingClears: Set<LoggedCollection>;
+
+  constructor(filePath: string, options: IFileStoreOptions = {}) {
+    super();
+    this.filePath = filePath;
+    this.logPath = `${filePath}.log`;
+    this.flushInterval = options.flushInterval ?? FILE_STORE_FLUSH_INTERVAL;
+    this.compactThreshold = options.compactThreshold ?? FILE_STORE_COMPACT_THRESHOLD;
+    this.dirty = false;
+    this.loaded = false;
+    this.flushTimer = null;
+    this.flushWait = Promise.resolve();
+    this.generation = 0;
+    this.needsCompaction = true;
+    this.logRecords = 0;
+    this.snapshotEntries = 0;
+    this.pendingKeys = new Map();
+    this.pendingClears = new Set();
+    this.journalCollections(false);
+  }
+
+  /**
+   * Get a logged collection of the store.
+   * @param {LoggedCollection} name The collection name
+   * @returns {Map<unknown, unknown>}
+   */
+  getCollection(name: LoggedCollection): Map<unknown, unknown> {
+    return (this as unknown as Record<LoggedCollection, Map<unknown, unknown>>)[name];
+  }
+
+  /**
+   * Make sure every logged collection reports its changes.
+   *
+   * MemoryStore replaces the collections when cleaning the storage, a collection that is
+   * not journaled was replaced and is logged as emptied.
+   *
+   * @param {boolean} logReplaced If replaced collections should be logged
+   */
+  journalCollections(logReplaced: boolean): void {
+    for (const name of LOGGED_COLLECTIONS) {
+      const collection = this.getCollection(name);
+      if (collection instanceof JournaledMap) {
+        continue;
+      }
+      const journaled = new JournaledMap(collection);
+      journaled.onChange = key => this.markKeyDirty(name, key);
+      journaled.onClear = () => this.markCollectionCleared(name);
+      (this as unknown as Record<LoggedCollection, Map<unknown, unknown>>)[name] = journaled;
+      if (logReplaced) {
+        this.markCollectionCleared(name);
+        for (const key of journaled.keys()) {
+          this.markKeyDirty(name, key);
+        }
+      }
+    }
+  }
+
+  /**
+   * Mark an entry of a logged collection as changed.
+   * @param {LoggedCollection} name The collection name
+   * @param {unknown} key The entry key
+   */
+  markKeyDirty(name: LoggedCollection, key: unknown): void {
+    let keys = this.pendingKeys.get(name);
+    if (!keys) {
+      keys = new Set();
+      this.pendingKeys.set(name, keys);
+    }
+    keys.add(key);
+    this.markDirty();
+  }
+
+  /**
+   * Mark a logged collection as emptied, the entry changes before it are not needed.
+   * @param {LoggedCollection} name The collection name
+   */
+  markCollectionCleared(name: LoggedCollection): void {
+    this.pendingKeys.delete(name);
+    this.pendingClears.add(name);
+    this.markDirty();
+  }
+
+  /**
+   * Load the snapshot and replay the log from disk, if they exist.
+   * A missing snapshot means a new wallet and an incompatible snapshot is discarded.
+   */
+  async validate(): Promise<void> {
+    if (this.loaded) {
+      return;
+    }
+    this.loaded = true;
+
+    const fs = loadFs();
+    let text: string;
+    try {
+      text = await fs.readFile(this.filePath, 'utf8');
+    } catch (e: unknown) {
+      if ((e as NodeJS.ErrnoException).code === 'ENOENT') {
+        // Nothing persisted yet
+        return;
+      }
+      throw e;
+    }
+
+    const snapshot = decodeSnapshot(text) as IFileStoreSnapshot;
+    if (!snapshot || snapshot.version !== FILE_STORE_VERSION) {
+      // Unknown layout, we start clean and the wallet will sync from scratch.
+      return;
+    }
+    this.restoreSnapshot(snapshot);
+
+    let log: string | null = null;
+    try {
+      log = await fs.readFile(this.logPath, 'utf8');
+    } catch (e: unknown) {
+      if ((e as NodeJS.ErrnoException).code !== 'ENOENT') {
+        throw e;
+      }
+    }
+    // A missing or unusable log is replaced on the next flush
+    this.needsCompaction = log === null || !this.replayLog(log);
+    this.rebuildIndexes();
+    this.journalCollections(false);
+  }
+
+  /**
+   * Replace the in-memory state with the data from a snapshot.
+   * The indexes are not saved on the snapshot and should be rebuilt with `rebuildIndexes`.
+   * @param {IFileStoreSnapshot} snapshot The decoded snapshot
+   */
+  restoreSnapshot(snapshot: IFileStoreSnapshot): void {
+    for (const name of LOGGED_COLLECTIONS) {
+      (this as unknown as Record<LoggedCollection, Map<unknown, unknown>>)[name] = snapshot[name];
+    }
+    this.restoreState(snapshot);
+    this.generation = snapshot.generation;
+    this.snapshotEntries = this.countEntries();
+    this.logRecords = 0;
+  }
+
+  /**
+   * Replace the not logged fields of the store.
+   * @param {IFileStoreState} state The decoded state
+   */
+  restoreState(state: IFileStoreState): void {
+    this.tokens = state.tokens;
+    this.tokensMetadata = state.tokensMetadata;
+    this.registeredTokens = state.registeredTokens;
+    this.registeredNanoContracts = state.registeredNanoContracts;
+    this.accessData = state.accessData;
+    this.walletData = { ...this.walletData, ...state.walletData };
+    this.genericStorage = state.genericStorage;
+  }
+
+  /**
+   * Apply the records of the log on the in-memory state.
+   * @param {string} log The log contents
+   * @returns {boolean} If the whole log was valid and can be appended to
+   */
+  replayLog(log: string): boolean {
+    const lines = log.split('\n');
+    if (lines[lines.length - 1] === '') {
+      lines.pop();
+    }
+    let header: IFileStoreLogRecord | null = null;
+    try {
+      header = lines.length > 0 ? (decodeSnapshot(lines[0]) as IFileStoreLogRecord) : null;
+    } catch (e) {
+      // Handled as a missing header
+    }
+    if (
+      !header ||
+      header.version !== FILE_STORE_VERSION ||
+      header.generation !== this.generation
+    ) {
+      // Log of another snapshot
+      return false;
+    }
+    for (let i = 1; i < lines.length; i++) {
+      let record: IFileStoreLogRecord;
+      try {
+        record = decodeSnapshot(lines[i]) as IFileStoreLogRecord;
+      } catch (e) {
+        // Torn write, the records after it cannot be trusted
+        return false;
+      }
+      this.applyLogRecord(record);
+      this.logRecords += 1;
+    }
+    return true;
+  }
+
+  /**
+   * Apply a log record on the in-memory state.
+   * @param {IFileStoreLogRecord} record The decoded record
+   */
+  applyLogRecord(record: IFileStoreLogRecord): void {
+    if (record.s) {
+      this.restoreState(record.s);
+      return;
+    }
+    if (!record.c || !LOGGED_COLLECTIONS.includes(record.c)) {
+      return;
+    }
+    const collection = this.getCollection(record.c);
+    if (record.x) {
+      collection.clear();
+    } else if (record.d) {
+      collection.delete(record.k);
+    } else {
+      collection.set(record.k, record.v);
+    }
+  }
+
+  /**
+   * Rebuild the indexes of the history and utxos from the loaded collections.
+   */
+  rebuildIndexes(): void {
+    this.historyTs = Array.from(this.history.values(), tx => getOrderingKey(tx));
+    this.historyTsSorted = false;
+    this.tokenHistoryIndex = null;
+    this.txBalanceCache.clear();
+    this.staleAddresses.clear();
+    this.utxoIndex = new UtxoIndex();
+    for (const [key, utxo] of this.utxos) {
+      this.utxoIndex.add(key, utxo);
+    }
+    this.lockedUtxoSchedule = this.createLockedUtxoSchedule();
+    // Locked utxos hold a reference to the history tx, the decoded data has separate copies.
+    for (const lockedUtxo of this.lockedUtxos.values()) {
+      const tx = this.history.get(lockedUtxo.tx.tx_id);
+      if (tx) {
+        lockedUtxo.tx = tx;
+      }
+      this.lockedUtxoSchedule.add(lockedUtxo);
+    }
+  }
+
+  /**
+   * Count the entries of the logged collections.
+   * @returns {number}
+   */
+  countEntries(): number {
+    let count = 0;
+    for (const name of LOGGED_COLLECTIONS) {
+      count += this.getCollection(name).size;
+    }
+    return count;
+  }
+
+  /**
+   * Get the not logged fields of the store.
+   * @returns {IFileStoreState}
+   */
+  getState(): IFileStoreState {
+    return {
+      tokens: this.tokens,
+      tokensMetadata: this.tokensMetadata,
+      registeredTokens: this.registeredTokens,
+      registeredNanoContracts: this.registeredNanoContracts,
+      accessData: this.accessData,
+      walletData: this.walletData,
+      genericStorage: this.genericStorage,
+    };
+  }
+
+  /**
+   * Build the snapshot of the current in-memory state.
+   * @param {number} generation The generation of the snapshot
+   * @returns {IFileStoreSnapshot}
+   */
+  getSnapshot(generation: number): IFileStoreSnapshot {
+    return {
+      version: FILE_STORE_VERSION,
+      generation,
+      addresses: this.addresses,
+      addressIndexes: this.addressIndexes,
+      shieldedAddressIndexes: this.shieldedAddressIndexes,
+      addressesMetadata: this.addressesMetadata,
+      seqnumMetadata: this.seqnumMetadata,
+      history: this.history,
+      utxos: this.utxos,
+      lockedUtxos: this.lockedUtxos,
+      ...this.getState(),
+    };
+  }
+
+  /**
+   * Encode the pending changes as log lines and forget them.
+   * @returns {{ data: string, count: number }} The lines to append and the number of records
+   */
+  drainLogRecords(): { data: string; count: number } {
+    const lines: string[] = [];
+    for (const name of this.pendingClears) {
+      lines.push(encodeSnapshot({ c: name, x: true }));
+    }
+    for (const [name, keys] of this.pendingKeys) {
+      const collection = this.getCollection(name);
+      for (const key of keys) {
+        if (collection.has(key)) {
+          lines.push(encodeSnapshot({ c: name, k: key, v: collection.get(key) }));
+        } else {
+          lines.push(encodeSnapshot({ c: name, k: key, d: true }));
+        }
+      }
+    }
+    lines.push(encodeSnapshot({ s: this.getState() }));
+    this.pendingClears.clear();
+    this.pendingKeys.clear();
+    return { data: `${lines.join('\n')}\n`, count: lines.length };
+  }
+
+  /**
+   * Mark the store as changed and schedule a write.
+   */
+  markDirty(): void {
+    this.dirty = true;
+    if (this.flushTimer !== null) {
+      // A write is already scheduled and will include this change
+      return;
+    }
+    this.flushTimer = setTimeout(() => {
+      this.flushTimer = null;
+      this.flush().catch(() => {
+        // The store is kept dirty so the next flush retries the write
+      });
+    }, this.flushInterval);
+  }
+
+  /**
+   * Write the pending changes on disk.
+   * The changes are appended to the log, or the log is compacted when it grew too large.
+   * @returns {Promise<void>}
+   */
+  async flush(): Promise<void> {
+    if (this.flushTimer !== null) {
+      clearTimeout(this.flushTimer);
+      this.flushTimer = null;
+    }
+    this.flushWait = this.flushWait
+      .catch(() => {
+        // A failed write should not prevent the next one
+      })
+      .then(async () => {
+        if (!this.dirty) {
+          return;
+        }
+        this.dirty = false;
+        if (
+          this.needsCompaction ||
+          this.logRecords >= Math.max(this.compactThreshold, this.snapshotEntries)
+        ) {
+          await this.compact();
+          return;
+        }
+        // The records are encoded synchronously so they reflect a consistent state.
+        const { data, count } = this.drainLogRecords();
+        try {
+          await loadFs().appendFile(this.logPath, data, 'utf8');
+        } catch (e) {
+          // The log may have a partial write, the next flush writes a new snapshot.
+          this.dirty = true;
+          this.needsCompaction = true;
+          throw e;
+        }
+        this.logRecords += count;
+      });
+    return this.flushWait;
+  }
+
+  /**
+   * Write the whole store as a new snapshot and start a new log.
+   * Should only be called from `flush`, which serializes the writes.
+   * @returns {Promise<void>}
+   */
+  async compact(): Promise<void> {
+    const generation = this.generation + 1;
+    // The snapshot is encoded synchronously so it reflects a consistent state.
+    this.pendingClears.clear();
+    this.pendingKeys.clear();
+    const data = encodeSnapshot(this.getSnapshot(generation));
+    const entries = this.countEntries();
+    const header = `${encodeSnapshot({ version: FILE_STORE_VERSION, generation })}\n`;
+    const tmpPath = `${this.filePath}.tmp`;
+    const fs = loadFs();
+    try {
+      await fs.writeFile(tmpPath, data, 'utf8');
+      await fs.rename(tmpPath, this.filePath);
+      await fs.writeFile(this.logPath, header, 'utf8');
+    } catch (e) {
+      this.dirty = true;
+      this.needsCompaction = true;
+      throw e;
+    }
+    this.generation = generation;
+    this.needsCompaction = false;
+    this.logRecords = 0;
+    this.snapshotEntries = entries;
+  }
+
+  /**
+   * Write any pending changes and stop scheduling writes.
+   * @returns {Promise<void>}
+   */
+  async close(): Promise<void> {
+    await this.flush();
+  }
+
+  /**
+   * Remove the files from disk and clean the in-memory state.
+   * @returns {Promise<void>}
+   */
+  async destroy(): Promise<void> {
+    await this.cleanStorage(true, true, true);
+    this.accessData = null;
+    this.genericStorage = {};
+    if (this.flushTimer !== null) {
+      clearTimeout(this.flushTimer);
+      this.flushTimer = null;
+    }
+    this.dirty = false;
+    await this.flushWait.catch(() => {});
+    this.pendingClears.clear();
+    this.pendingKeys.clear();
+    this.needsCompaction = true;
+    const fs = loadFs();
+    await fs.rm(this.filePath, { force: true });
+    await fs.rm(this.logPath, { force: true });
+  }
+
+  /** Mutations: every write goes to memory first then schedules a flush. */
+
+  async saveAddress(info: IAddressInfo): Promise<void> {
+    await super.saveAddress(info);
+    this.markDirty();
+  }
+
+  async saveAddresses(infos: IAddressInfo[]): Promise<void> {
+    await super.saveAddresses(infos);
+    this.markDirty();
+  }
+
+  async getCurrentAddress(markAsUsed?: boolean, opts?: IAddressChainOptions): Promise<string> {
+    const address = await super.getCurrentAddress(markAsUsed, opts);
+    if (markAsUsed) {
+      this.markDirty();
+    }
+    return address;
+  }
+
+  async setCurrentAddressIndex(index: number, opts?: IAddressChainOptions): Promise<void> {
+    await super.setCurrentAddressIndex(index, opts);
+    this.markDirty();
+  }
+
+  async editAddressMeta(base58: string, meta: IAddressMetadata): Promise<void> {
+    await super.editAddressMeta(base58, meta);
+    this.markDirty();
+  }
+
+  async editSeqnumMeta(base58: string, seqnum: number): Promise<void> {
+    await super.editSeqnumMeta(base58, seqnum);
+    this.markDirty();
+  }
+
+  async saveTx(tx: IHistoryTx): Promise<void> {
+    await super.saveTx(tx);
+    this.markDirty();
+  }
+
+  async saveTxs(txs: IHistoryTx[]): Promise<void> {
+    await super.saveTxs(txs);
+    this.markDirty();
+  }
+
+  async saveToken(tokenConfig: ITokenData, meta?: ITokenMetadata | undefined): Promise<void> {
+    await super.saveToken(tokenConfig, meta);
+    this.markDirty();
+  }
+
+  async registerToken(token: ITokenData): Promise<void> {
+    await super.registerToken(token);
+    this.markDirty();
+  }
+
+  async unregisterToken(tokenUid: string): Promise<void> {
+    await super.unregisterToken(tokenUid);
+    this.markDirty();
+  }
+
+  async editTokenMeta(tokenUid: string, meta: ITokenMetadata): Promise<void> {
+    await super.editTokenMeta(tokenUid, meta);
+    this.markDirty();
+  }
+
+  async deleteUtxo(utxo: IUtxo): Promise<void> {
+    await super.deleteUtxo(utxo);
+    this.markDirty();
+  }
+
+  async saveUtxo(utxo: IUtxo): Promise<void> {
+    await super.saveUtxo(utxo);
+    this.markDirty();
+  }
+
+  async saveLockedUtxo(lockedUtxo: ILockedUtxo): Promise<void> {
+    await super.saveLockedUtxo(lockedUtxo);
+    this.markDirty();
+  }
+
+  async unlockUtxo(lockedUtxo: ILockedUtxo): Promise<void> {
+    await super.unlockUtxo(lockedUtxo);
+    this.markDirty();
+  }
+
+  async saveAccessData(data: IWalletAccessData): Promise<void> {
+    await super.saveAccessData(data);
+    this.markDirty();
+  }
+
+  async setCurrentHeight(height: number): Promise<void> {
+    await super.setCurrentHeight(height);
+    this.markDirty();
+  }
+
+  async setLastUsedAddressIndex(index: number, opts?: IAddressChainOptions): Promise<void> {
+    await super.setLastUsedAddressIndex(index, opts);
+    this.markDirty();
+  }
+
+  async setGapLimit(value: number): Promise<void> {
+    await super.setGapLimit(value);
+    this.markDirty();
+  }
+
+  async setScanningPolicyData(data: AddressScanPolicyData): Promise<void> {
+    await super.setScanningPolicyData(data);
+    this.markDirty();
+  }
+
+  async setItem(key: string, value: unknown): Promise<void> {
+    await super.setItem(key, value);
+    this.markDirty();
+  }
+
+  async cleanStorage(
+    cleanHistory: boolean = false,
+    cleanAddresses: boolean = false,
+    cleanTokens: boolean = false
+  ): Promise<void> {
+    await super.cleanStorage(cleanHistory, cleanAddresses, cleanTokens);
+    this.journalCollections(true);
+    this.markDirty();
+  }
+
+  async cleanMetadata(): Promise<void> {
+    await super.cleanMetadata();
+    this.journalCollections(true);
+    this.markDirty();
+  }
+
+  async registerNanoContract(ncId: string, ncValue: INcData): Promise<void> {
+    await super.registerNanoContract(ncId, ncValue);
+    this.markDirty();
+  }
+
+  async unregisterNanoContract(ncId: string): Promise<void> {
+    await super.unregisterNanoContract(ncId);
+    this.markDirty();
+  }
+
+  async updateNanoContractRegisteredAddress(ncId: string, address: string): Promise<void> {
+    await super.updateNanoContractRegisteredAddress(ncId, address);
+    this.markDirty();
+  }
+}
@@ -0,0 +1,133 @@
+/**
+ * Copyright (c) Hathor Labs and its affiliates.
+ *
+ * This source code is licensed under the MIT license found in the
+ * LICENSE file in the root directory of this source tree.
+ */
+
+/**
+ * Find the position of the first key in a sorted array that is not lower than `key`.
+ * @param {string[]} keys Sorted array of keys
+ * @param {string} key The key to search
+ * @returns {number}
+ */
+export function lowerBound(keys: string[], key: string): number {
+  let lo = 0;
+  let hi = keys.length;
+  while (lo < hi) {
+    const mid = (lo + hi) >>> 1;
+    if (keys[mid] < key) {
+      lo = mid + 1;
+    } else {
+      hi = mid;
+    }
+  }
+  return lo;
+}
+
+/**
+ * Index of the wallet history per token.
+ *
+ * For each token we keep the ordering keys (`<timestamp>:<txId>`) of the txs that
+ * have the token on one of the wallet addresses, so the history of a token can be
+ * paginated without visiting the txs of other tokens.
+ *
+ * Keys are appended as txs are saved, since txs usually arrive in timestamp order the
+ * lists are kept sorted and only lists that received an out of order key are sorted
+ * again when read.
+ */
+export class TokenHistoryIndex {
+  /**
+   * Map<token, ordering keys>
+   */
+  keys: Map<string, string[]>;
+
+  /**
+   * Tokens whose list of keys may not be sorted.
+   */
+  unsorted: Set<string>;
+
+  /**
+   * Map<txId, { key, tokens }> with the ordering key and the tokens each tx was indexed with.
+   */
+  txs: Map<string, { key: string; tokens: Set<string> }>;
+
+  constructor() {
+    this.keys = new Map<string, string[]>();
+    this.unsorted = new Set<string>();
+    this.txs = new Map<string, { key: string; tokens: Set<string> }>();
+  }
+
+  /**
+   * Index a tx with the tokens it has on the wallet.
+   * A tx indexed again keeps its ordering key, only the tokens are updated.
+   *
+   * @param {string} txId The tx id
+   * @param {string} key The ordering key of the tx
+   * @param {Set<string>} tokens Tokens of the tx on the wallet addresses
+   */
+  index(txId: string, key: string, tokens: Set<string>): void {
+    const previous = this.txs.get(txId);
+    const orderKey = previous ? previous.key : key;
+    for (const token of tokens) {
+      if (!previous?.tokens.has(token)) {
+        this.push(token, orderKey);
+      }
+    }
+    for (const token of previous?.tokens ?? []) {
+      if (!tokens.has(token)) {
+        this.remove(token, orderKey);
+      }
+    }
+    this.txs.set(txId, { key: orderKey, tokens });
+  }
+
+  /**
+   * Get the ordering key a tx was indexed with.
+   * @param {string} txId The tx id
+   * @returns {string|null}
+   */
+  getKey(txId: string): string | null {
+    return this.txs.get(txId)?.key ?? null;
+  }
+
+  /**
+   * Get the sorted ordering keys of the txs with the token.
+   * @param {string} token The token uid
+   * @returns {string[]}
+   */
+  getKeys(token: string): string[] {
+    const keys = this.keys.get(token);
+    if (!keys) {
+      return [];
+    }
+    if (this.unsorted.has(token)) {
+      keys.sort();
+      this.unsorted.delete(token);
+    }
+    return keys;
+  }
+
+  private push(token: string, key: string): void {
+    let keys = this.keys.get(token);
+    if (!keys) {
+      keys = [];
+      this.keys.set(token, keys);
+    }
+    if (keys.length > 0 && key < keys[keys.length - 1]) {
+      this.unsorted.add(token);
+    }
+    keys.push(key);
+  }
+
+  private remove(token: string, key: string): void {
+    const keys = this.getKeys(token);
+    const pos = lowerBound(keys, key);
+    if (keys[pos] === key) {
+      keys.splice(pos, 1);
+    }
+    if (keys.length === 0) {
+      this.keys.delete(token);
+    }
+  }
+}
@@ -7,11 +7,15 @@
 
 import { Storage } from './storage';
 import { MemoryStore } from './memory_store';
+import { FileStore } from './file_store';
+import { MemoryAddressCache, FileAddressCache } from './address_cache';
 
 const store = new MemoryStore();
 const storage = new Storage(store);
 
 export { Storage };
 export { MemoryStore };
+export { FileStore };
+export { MemoryAddressCache, FileAddressCache };
 
 export default storage;
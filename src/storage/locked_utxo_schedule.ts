@@ -0,0 +1,132 @@
+/**
+ * Copyright (c) Hathor Labs and its affiliates.
+ *
+ * This source code is licensed under the MIT license found in the
+ * LICENSE file in the root directory of this source tree.
+ */
+
+import PriorityQueue from '../models/priority_queue';
+import { ILockedUtxo } from '../types';
+import transactionUtils from '../utils/transaction';
+
+/**
+ * Schedule of the locked utxos ordered by the moment they can be unlocked.
+ *
+ * Height locked utxos are kept on a queue ordered by the height of the block and
+ * the other utxos on a queue ordered by the timelock of the output. When the height
+ * lock of an utxo expires it is moved to the timelock queue, since the output may
+ * still be timelocked.
+ *
+ * Removing an utxo from the schedule is lazy, the utxos that are not locked anymore
+ * are discarded when they reach the top of the queue.
+ */
+export class LockedUtxoSchedule {
+  heightQueue: PriorityQueue<ILockedUtxo>;
+
+  timeQueue: PriorityQueue<ILockedUtxo>;
+
+  /**
+   * Check that the utxo is still locked on the store.
+   */
+  isLocked: (lockedUtxo: ILockedUtxo) => boolean;
+
+  constructor(isLocked: (lockedUtxo: ILockedUtxo) => boolean) {
+    this.heightQueue = new PriorityQueue<ILockedUtxo>();
+    this.timeQueue = new PriorityQueue<ILockedUtxo>();
+    this.isLocked = isLocked;
+  }
+
+  /**
+   * Get the timelock of the locked output.
+   * @param {ILockedUtxo} lockedUtxo The locked utxo
+   * @returns {number|null}
+   */
+  static getTimelock(lockedUtxo: ILockedUtxo): number | null {
+    const resolved = transactionUtils.resolveSpentOutput(lockedUtxo.tx, lockedUtxo.index);
+    return resolved?.output.decoded.timelock ?? null;
+  }
+
+  /**
+   * Add a locked utxo to the schedule.
+   *
+   * @param {ILockedUtxo} lockedUtxo The locked utxo
+   * @param {boolean} [heightUnlocked=false] If the height lock has already expired
+   */
+  add(lockedUtxo: ILockedUtxo, heightUnlocked: boolean = false): void {
+    const { height } = lockedUtxo.tx;
+    if (height && !heightUnlocked) {
+      // The queue pops the highest priority first
+      this.heightQueue.push(PriorityQueue.makeNode(-height, lockedUtxo));
+      return;
+    }
+    const timelock = LockedUtxoSchedule.getTimelock(lockedUtxo) ?? 0;
+    this.timeQueue.push(PriorityQueue.makeNode(-timelock, lockedUtxo));
+  }
+
+  /**
+   * Remove the utxos that are not locked anymore from the top of a queue.
+   * @param {PriorityQueue<ILockedUtxo>} queue The queue to clean
+   */
+  dropUnlocked(queue: PriorityQueue<ILockedUtxo>): void {
+    while (!queue.isEmpty() && !this.isLocked(queue.peek()!)) {
+      queue.pop();
+    }
+  }
+
+  /**
+   * Remove and return the utxos whose locks have expired.
+   *
+   * @param {Object} options
+   * @param {number} options.currentHeight The current height of the best chain
+   * @param {number} options.rewardLock The reward lock of the network
+   * @param {number} options.nowTs The current timestamp
+   * @returns {ILockedUtxo[]}
+   */
+  popUnlockable({
+    currentHeight,
+    rewardLock,
+    nowTs,
+  }: {
+    currentHeight: number;
+    rewardLock: number;
+    nowTs: number;
+  }): ILockedUtxo[] {
+    this.dropUnlocked(this.heightQueue);
+    while (!this.heightQueue.isEmpty()) {
+      const lockedUtxo = this.heightQueue.peek()!;
+      if (transactionUtils.isHeightLocked(lockedUtxo.tx.height, currentHeight, rewardLock)) {
+        break;
+      }
+      this.heightQueue.pop();
+      // The output may still be timelocked
+      this.add(lockedUtxo, true);
+      this.dropUnlocked(this.heightQueue);
+    }
+
+    const unlockable = new Set<ILockedUtxo>();
+    this.dropUnlocked(this.timeQueue);
+    while (!this.timeQueue.isEmpty()) {
+      const lockedUtxo = this.timeQueue.peek()!;
+      const timelock = LockedUtxoSchedule.getTimelock(lockedUtxo);
+      if (timelock && nowTs < timelock) {
+        break;
+      }
+      this.timeQueue.pop();
+      unlockable.add(lockedUtxo);
+      this.dropUnlocked(this.timeQueue);
+    }
+    return Array.from(unlockable);
+  }
+
+  /**
+   * Get the earliest timelock of the utxos that are no longer height locked.
+   * @returns {number|null}
+   */
+  nextTimelock(): number | null {
+    this.dropUnlocked(this.timeQueue);
+    if (this.timeQueue.isEmpty()) {
+      return null;
+    }
+    return LockedUtxoSchedule.getTimelock(this.timeQueue.peek()!);
+  }
+}
@@ -27,8 +27,13 @@ import {
   TokenVersion,
   IAddressChainOptions,
   IUtxoId,
+  OutputValueType,
 } from '../types';
-import { GAP_LIMIT, NATIVE_TOKEN_UID } from '../constants';
+import { UtxoIndex } from './utxo_index';
+import { LockedUtxoSchedule } from './locked_utxo_schedule';
+import { TokenHistoryIndex, lowerBound } from './history_index';
+import { CompactHistory } from './compact_history';
+import { COMPACT_HISTORY_CACHE_SIZE, GAP_LIMIT, NATIVE_TOKEN_UID } from '../constants';
 import transactionUtils from '../utils/transaction';
 
 const DEFAULT_ADDRESSES_WALLET_DATA = {
@@ -63,7 +68,7 @@ const DEFAULT_WALLET_DATA = {
  * // returns '5fbec5d0:abcdef'
  * getOrderingKey({ tx_id: 'abcdef', timestamp: 1606338000 });
  */
-function getOrderingKey(tx: Pick<IHistoryTx, 'timestamp' | 'tx_id'>): string {
+export function getOrderingKey(tx: Pick<IHistoryTx, 'timestamp' | 'tx_id'>): string {
   const buf = Buffer.alloc(4);
   buf.writeUInt32BE(tx.timestamp, 0);
   return `${buf.toString('hex')}:${tx.tx_id}`;
@@ -92,6 +97,19 @@ function getPartsFromOrderingKey(key: string): { timestamp: number; txId: string
   };
 }
 
+export interface IMemoryStoreOptions {
+  /**
+   * Keep the history in a compact representation, rebuilding the txs when they are read.
+   * Reduces the memory used by big histories at the cost of slower reads.
+   */
+  compactHistory?: boolean;
+  /**
+   * Approximate memory in bytes used by the recently used txs kept rebuilt by the compact
+   * history, 0 to always rebuild them.
+   */
+  historyCacheSize?: number;
+}
+
 export class MemoryStore implements IStore {
   /**
    * Map<base58, IAddressInfo>
@@ -155,6 +173,11 @@ export class MemoryStore implements IStore {
    */
   history: Map<string, IHistoryTx>;
 
+  /**
+   * History used instead of `history` when the store keeps it compacted.
+   */
+  compactHistory: CompactHistory | null;
+
   /**
    * Array of `<timestamp>:<txId>` strings, which should be always sorted.
    * `timestamp` should be in uint32 representation
@@ -162,12 +185,40 @@ export class MemoryStore implements IStore {
    */
   historyTs: string[];
 
+  /**
+   * If `historyTs` is known to be sorted.
+   */
+  historyTsSorted: boolean;
+
+  /**
+   * Index of the history per token.
+   * When null the index is stale and will be rebuilt on the next read.
+   */
+  tokenHistoryIndex: TokenHistoryIndex | null;
+
+  /**
+   * Map<txId, balance> with the balance of each token on the tx for the wallet.
+   * An entry is removed when its tx, a tx it spends or one of its addresses changes.
+   */
+  txBalanceCache: Map<string, Record<string, OutputValueType>>;
+
+  /**
+   * Addresses saved after the history, the txs with them are reindexed on the next read.
+   */
+  staleAddresses: Set<string>;
+
   /**
    * Map<utxoid, IUtxo>
    * where utxoid is the txId + index, a string representation of IUtxoId
    */
   utxos: Map<string, IUtxo>;
 
+  /**
+   * Secondary indexes of `utxos` (per token, per address and authorities),
+   * maintained on every utxo save and delete.
+   */
+  utxoIndex: UtxoIndex;
+
   /**
    * Wallet access data
    */
@@ -185,7 +236,15 @@ export class MemoryStore implements IStore {
 
   lockedUtxos: Map<string, ILockedUtxo>;
 
-  constructor() {
+  /**
+   * Locked utxos ordered by the height and time they can be unlocked.
+   */
+  lockedUtxoSchedule: LockedUtxoSchedule;
+
+  /**
+   * @param {IMemoryStoreOptions} [options]
+   */
+  constructor(options: IMemoryStoreOptions = {}) {
     this.addresses = new Map<string, IAddressInfo>();
     this.addressIndexes = new Map<number, string>();
     this.shieldedAddressIndexes = new Map<number, string>();
@@ -195,11 +254,20 @@ export class MemoryStore implements IStore {
     this.tokensMetadata = new Map<string, ITokenMetadata>();
     this.registeredTokens = new Map<string, ITokenData>();
     this.history = new Map<string, IHistoryTx>();
+    this.compactHistory = options.compactHistory
+      ? new CompactHistory(options.historyCacheSize ?? COMPACT_HISTORY_CACHE_SIZE)
+      : null;
     this.historyTs = [];
+    this.historyTsSorted = true;
+    this.tokenHistoryIndex = new TokenHistoryIndex();
+    this.txBalanceCache = new Map<string, Record<string, OutputValueType>>();
+    this.staleAddresses = new Set<string>();
     this.utxos = new Map<string, IUtxo>();
+    this.utxoIndex = new UtxoIndex();
     this.accessData = null;
     this.genericStorage = {};
     this.lockedUtxos = new Map<string, ILockedUtxo>();
+    this.lockedUtxoSchedule = this.createLockedUtxoSchedule();
     this.registeredNanoContracts = new Map<string, INcData>();
 
     this.walletData = cloneDeep({ ...DEFAULT_WALLET_DATA, ...DEFAULT_ADDRESSES_WALLET_DATA });
@@ -214,7 +282,10 @@ export class MemoryStore implements IStore {
    * Prepare the store for history processing.
    */
   async preProcessHistory(): Promise<void> {
-    this.historyTs.sort();
+    if (!this.historyTsSorted) {
+      this.historyTs.sort();
+      this.historyTsSorted = true;
+    }
   }
 
   /** ADDRESSES */
@@ -329,6 +400,41 @@ export class MemoryStore implements IStore {
    * @returns {Promise<void>}
    */
   async saveAddress(info: IAddressInfo): Promise<void> {
+    this.checkNewAddress(info);
+    this.putAddress(info, (await this.historyCount()) > 0);
+    await this.updateLoadedAddressIndexes([info]);
+  }
+
+  /**
+   * Save many addresses in storage, in order.
+   * The addresses are checked before any is saved and the address cursors are updated once.
+   *
+   * @param {IAddressInfo[]} infos Info on the addresses to save
+   * @async
+   * @returns {Promise<void>}
+   */
+  async saveAddresses(infos: IAddressInfo[]): Promise<void> {
+    const batch = new Set<string>();
+    for (const info of infos) {
+      this.checkNewAddress(info);
+      if (batch.has(info.base58)) {
+        throw new Error('Already have this address');
+      }
+      batch.add(info.base58);
+    }
+    const hasHistory = (await this.historyCount()) > 0;
+    for (const info of infos) {
+      this.putAddress(info, hasHistory);
+    }
+    await this.updateLoadedAddressIndexes(infos);
+  }
+
+  /**
+   * Check that an address can be saved.
+   * @param {IAddressInfo} info Info on the address
+   * @throws {Error} If the address is invalid or already saved
+   */
+  private checkNewAddress(info: IAddressInfo): void {
     // Reject a non-string base58 as well as a falsy one: an object here would be
     // truthy, get keyed into the address map, and make every later ownership
     // check on that index miss. Untyped JS callers can reach this.
@@ -338,9 +444,20 @@ export class MemoryStore implements IStore {
     if (this.addresses.has(info.base58)) {
       throw new Error('Already have this address');
     }
+  }
 
+  /**
+   * Add an address to the address map and the index maps.
+   * @param {IAddressInfo} info Info on the address
+   * @param {boolean} hasHistory If there are txs saved, which may have this address
+   */
+  private putAddress(info: IAddressInfo, hasHistory: boolean): void {
     // Saving address info
     this.addresses.set(info.base58, info);
+    if (hasHistory) {
+      // Txs already saved may have this address, they are reindexed on the next read.
+      this.staleAddresses.add(info.base58);
+    }
 
     // Route to the correct index map based on address type.
     // Each BIP32 index can have up to 3 addresses: legacy, shielded, and shielded-spend.
@@ -350,25 +467,38 @@ export class MemoryStore implements IStore {
       // Legacy P2PKH/P2SH (addressType undefined, 'p2pkh', or 'p2sh')
       this.addressIndexes.set(info.bip32AddressIndex, info.base58);
     }
+  }
 
-    // Update per-chain tracking: currentAddressIndex and lastLoadedAddressIndex.
+  /**
+   * Update per-chain tracking of the saved addresses: currentAddressIndex and
+   * lastLoadedAddressIndex.
+   * @param {IAddressInfo[]} infos Info on the saved addresses, in the order they were saved
+   */
+  private async updateLoadedAddressIndexes(infos: IAddressInfo[]): Promise<void> {
     // Only the 'shielded' type (not 'shielded-spend') advances the cursor, since
     // getCurrentAddress looks up shieldedAddressIndexes which only contains 'shielded' entries.
-    if (info.addressType === 'shielded') {
+    // Legacy P2PKH/P2SH only — shielded-spend does not track its own cursor
+    const shielded = infos.filter(info => info.addressType === 'shielded');
+    const legacy = infos.filter(
+      info => info.addressType !== 'shielded' && info.addressType !== 'shielded-spend'
+    );
+    if (shielded.length > 0) {
       if (this.walletData.shieldedCurrentAddressIndex === -1) {
-        await this.setCurrentAddressIndex(info.bip32AddressIndex, { legacy: false });
-      }
-      if (info.bip32AddressIndex > this.walletData.shieldedLastLoadedAddressIndex) {
-        this.walletData.shieldedLastLoadedAddressIndex = info.bip32AddressIndex;
+        await this.setCurrentAddressIndex(shielded[0].bip32AddressIndex, { legacy: false });
       }
-    } else if (info.addressType !== 'shielded-spend') {
-      // Legacy P2PKH/P2SH only — shielded-spend does not track its own cursor
+      this.walletData.shieldedLastLoadedAddressIndex = shielded.reduce(
+        (max, info) => Math.max(max, info.bip32AddressIndex),
+        this.walletData.shieldedLastLoadedAddressIndex
+      );
+    }
+    if (legacy.length > 0) {
       if (this.walletData.currentAddressIndex === -1) {
-        await this.setCurrentAddressIndex(info.bip32AddressIndex);
-      }
-      if (info.bip32AddressIndex > this.walletData.lastLoadedAddressIndex) {
-        this.walletData.lastLoadedAddressIndex = info.bip32AddressIndex;
+        await this.setCurrentAddressIndex(legacy[0].bip32AddressIndex);
       }
+      this.walletData.lastLoadedAddressIndex = legacy.reduce(
+        (max, info) => Math.max(max, info.bip32AddressIndex),
+        this.walletData.lastLoadedAddressIndex
+      );
     }
   }
 
@@ -454,99 +584,189 @@ export class MemoryStore implements IStore {
    * Iterate on the transaction history ordered by timestamp.
    *
    * @param {string|undefined} tokenUid Only yield txs with this token.
+   * @param {Object} [options]
+   * @param {'asc'|'desc'} [options.order='desc'] Order of the iteration
+   * @param {string} [options.cursor] Start after this tx, i.e. the last tx of the previous page
+   * @param {number} [options.skip] Number of txs to skip
    *
    * @async
    * @returns {AsyncGenerator<IHistoryTx>}
    */
   async *historyIter(
     tokenUid?: string | undefined,
-    options: { order?: 'asc' | 'desc' } = {}
+    options: { order?: 'asc' | 'desc'; cursor?: string; skip?: number } = {}
   ): AsyncGenerator<IHistoryTx> {
     /**
-     * Default `desc` walks `historyTs` from the newest entry back to the
+     * Default `desc` walks the ordering keys from the newest entry back to the
      * oldest — this is what the wallet UI consumes (most-recent-first).
      * Pass `order: 'asc'` for the chronological replay used by
      * `processHistory`, where a tx spending a previous tx's UTXO needs
      * the parent already saved when its own input loop runs.
      */
     const order = options.order ?? 'desc';
-    const len = this.historyTs.length;
-    for (let n = 0; n < len; n += 1) {
+    let keys: string[];
+    if (tokenUid === undefined) {
+      if (options.cursor !== undefined) {
+        // The cursor is searched on the ordering keys, so they should be sorted
+        await this.preProcessHistory();
+      }
+      keys = this.historyTs;
+    } else {
+      // Only the txs with the token on one of our addresses
+      keys = this.getTokenHistoryIndex().getKeys(tokenUid);
+    }
+
+    const len = keys.length;
+    // Number of keys before the first one yielded, counting from the start of the iteration
+    let offset = options.skip ?? 0;
+    if (options.cursor !== undefined) {
+      const cursorKey = this.getCursorKey(options.cursor);
+      const pos = lowerBound(keys, cursorKey);
+      offset += order === 'asc' ? pos + (keys[pos] === cursorKey ? 1 : 0) : len - pos;
+    }
+    for (let n = offset; n < len; n += 1) {
       const i = order === 'asc' ? n : len - 1 - n;
-      const orderKey = this.historyTs[i];
-      const { txId } = getPartsFromOrderingKey(orderKey);
-      const tx = this.history.get(txId);
+      const { txId } = getPartsFromOrderingKey(keys[i]);
+      const tx = this.peekTx(txId);
       if (!tx) {
         // This should never happen since any transactions in historyTs should also be in history
         throw new Error('Transaction not found');
       }
+      yield tx;
+    }
+  }
 
-      if (tokenUid === undefined) {
-        yield tx;
-        continue;
-      }
+  /**
+   * Get the ordering key of the tx used as cursor of the history iteration.
+   * @param {string} txId The cursor, i.e. the tx id
+   * @returns {string}
+   */
+  private getCursorKey(txId: string): string {
+    const key = this.tokenHistoryIndex?.getKey(txId);
+    if (key) {
+      return key;
+    }
+    const tx = this.peekTx(txId);
+    if (!tx) {
+      throw new Error('Invalid history cursor');
+    }
+    return getOrderingKey(tx);
+  }
 
-      // If a tokenUid is passed, we only yield the transaction if it has the token in one of our addresses
-      let found = false;
-      for (const input of tx.inputs) {
-        if (
-          input.decoded?.address &&
-          this.addresses.has(input.decoded.address) &&
-          input.token === tokenUid
-        ) {
-          found = true;
-          break;
-        }
-      }
-      if (found) {
-        yield tx;
-        continue;
+  /**
+   * Get the tokens of a tx on the wallet addresses.
+   * Owned shielded outputs are only considered after being decoded.
+   *
+   * @param {IHistoryTx} tx The transaction
+   * @returns {Set<string>}
+   */
+  private getTxWalletTokens(tx: IHistoryTx): Set<string> {
+    const tokens = new Set<string>();
+    for (const input of tx.inputs) {
+      if (input.decoded?.address && this.addresses.has(input.decoded.address) && input.token) {
+        tokens.add(input.token);
       }
-      for (const output of tx.outputs) {
-        if (
-          output.decoded.address &&
-          this.addresses.has(output.decoded.address) &&
-          output.token === tokenUid
-        ) {
-          found = true;
-          break;
-        }
+    }
+    for (const output of tx.outputs) {
+      if (output.decoded.address && this.addresses.has(output.decoded.address)) {
+        tokens.add(output.token);
       }
-      if (found) {
-        yield tx;
-        continue;
+    }
+    // SEPARATED model: an owned shielded output lives in shielded_outputs[],
+    // not outputs[]. Without this loop a shielded-only receive (the wallet
+    // owns no transparent output of the tx) never appears in tokenHistory /
+    // getTxHistory. Owned slots carry value !== undefined and the decoded
+    // token after decryption (written together, so an owned slot always has
+    // its token); non-owned slots are value-less and skipped.
+    for (const so of tx.shielded_outputs ?? []) {
+      if (
+        so.value !== undefined &&
+        so.decoded?.address &&
+        this.addresses.has(so.decoded.address) &&
+        so.token
+      ) {
+        tokens.add(so.token);
       }
-      // SEPARATED model: an owned shielded output lives in shielded_outputs[],
-      // not outputs[]. Without this loop a shielded-only receive (the wallet
-      // owns no transparent output of the tx) never appears in tokenHistory /
-      // getTxHistory. Owned slots carry value !== undefined and the decoded
-      // token after decryption (written together, so an owned slot always has
-      // its token); non-owned slots are value-less and skipped.
-      for (const so of tx.shielded_outputs ?? []) {
-        if (
-          so.value !== undefined &&
-          so.decoded?.address &&
-          this.addresses.has(so.decoded.address) &&
-          so.token === tokenUid
-        ) {
-          found = true;
-          break;
+    }
+    return tokens;
+  }
+
+  /**
+   * Get the history index per token, rebuilding it if it is stale.
+   * @returns {TokenHistoryIndex}
+   */
+  private getTokenHistoryIndex(): TokenHistoryIndex {
+    this.refreshStaleAddresses();
+    if (this.tokenHistoryIndex === null) {
+      const index = new TokenHistoryIndex();
+      for (const key of this.historyTs) {
+        const { txId } = getPartsFromOrderingKey(key);
+        const tx = this.peekTx(txId);
+        if (tx) {
+          index.index(txId, key, this.getTxWalletTokens(tx));
         }
       }
-      if (found) {
-        yield tx;
+      this.tokenHistoryIndex = index;
+    }
+    return this.tokenHistoryIndex;
+  }
+
+  /**
+   * Reindex the txs with the addresses saved after them and remove their cached balance.
+   */
+  private refreshStaleAddresses(): void {
+    if (this.staleAddresses.size === 0) {
+      return;
+    }
+    const stale = this.staleAddresses;
+    this.staleAddresses = new Set<string>();
+    if (this.tokenHistoryIndex === null && this.txBalanceCache.size === 0) {
+      // The index is rebuilt from scratch and there is no balance to remove
+      return;
+    }
+    for (const key of this.historyTs) {
+      const { txId } = getPartsFromOrderingKey(key);
+      const tx = this.peekTx(txId);
+      if (!tx) {
         continue;
       }
+      const entries = [...tx.inputs, ...tx.outputs, ...(tx.shielded_outputs ?? [])];
+      if (entries.some(el => el.decoded?.address && stale.has(el.decoded.address))) {
+        this.tokenHistoryIndex?.index(txId, key, this.getTxWalletTokens(tx));
+        this.txBalanceCache.delete(txId);
+      }
     }
   }
 
+  /**
+   * Get the cached balance of a tx for the wallet.
+   * @param {string} txId The transaction id
+   * @returns {Promise<Record<string, OutputValueType> | null>}
+   */
+  async getTxBalanceCache(txId: string): Promise<Record<string, OutputValueType> | null> {
+    this.refreshStaleAddresses();
+    return this.txBalanceCache.get(txId) ?? null;
+  }
+
+  /**
+   * Cache the balance of a tx for the wallet.
+   * The entry is removed when the tx, a tx it spends or one of its addresses changes.
+   *
+   * @param {string} txId The transaction id
+   * @param {Record<string, OutputValueType>} balance Balance of each token on the tx
+   * @returns {Promise<void>}
+   */
+  async saveTxBalanceCache(txId: string, balance: Record<string, OutputValueType>): Promise<void> {
+    this.txBalanceCache.set(txId, balance);
+  }
+
   /**
    * Get the size of the transaction history.
    *
    * @returns {Promise<number>} The size of the transaction history
    */
   async historyCount(): Promise<number> {
-    return this.history.size;
+    return this.compactHistory?.size ?? this.history.size;
   }
 
   /**
@@ -556,19 +776,69 @@ export class MemoryStore implements IStore {
    * @returns {Promise<void>}
    */
   async saveTx(tx: IHistoryTx): Promise<void> {
+    this.putTx(tx);
+    await this.updateUsedAddressIndexes([tx]);
+  }
+
+  /**
+   * Save many transactions on storage, in order.
+   * The address cursors are updated once for the whole batch.
+   *
+   * @param {IHistoryTx[]} txs The transactions to store
+   * @async
+   * @returns {Promise<void>}
+   */
+  async saveTxs(txs: IHistoryTx[]): Promise<void> {
+    for (const tx of txs) {
+      this.putTx(tx);
+    }
+    await this.updateUsedAddressIndexes(txs);
+  }
+
+  /**
+   * Add a transaction to the history and its indexes.
+   * @param {IHistoryTx} tx The transaction to store
+   */
+  private putTx(tx: IHistoryTx): void {
     // Protect ordering list from updates on the same transaction
     // We can check the historyTs but it's O(n) and this check is O(1).
-    if (!this.history.has(tx.tx_id)) {
+    const key = getOrderingKey(tx);
+    if (!(this.compactHistory ?? this.history).has(tx.tx_id)) {
       // Add transaction to the ordering list
       // Wallets expect to show users the transactions in order of descending timestamp
       // This is so wallets can show the most recent transactions to users
       // The historyTs should be sorted to ensure the history order but this is not
       // done here due to the performance bottleneck it creates on big wallets.
-      this.historyTs.push(getOrderingKey(tx));
+      const last = this.historyTs[this.historyTs.length - 1];
+      if (last !== undefined && key < last) {
+        this.historyTsSorted = false;
+      }
+      this.historyTs.push(key);
     }
 
-    this.history.set(tx.tx_id, tx);
+    if (this.compactHistory) {
+      this.compactHistory.set(tx.tx_id, tx);
+    } else {
+      this.history.set(tx.tx_id, tx);
+    }
+    if (this.tokenHistoryIndex !== null) {
+      this.tokenHistoryIndex.index(tx.tx_id, key, this.getTxWalletTokens(tx));
+    }
+    // The balance of the txs spending this tx depends on it (e.g. spent shielded outputs)
+    this.txBalanceCache.delete(tx.tx_id);
+    for (const output of [...tx.outputs, ...(tx.shielded_outputs ?? [])]) {
+      if (output.spent_by) {
+        this.txBalanceCache.delete(output.spent_by);
+      }
+    }
+  }
 
+  /**
+   * Update per-chain tracking of the addresses used by saved transactions:
+   * lastUsedAddressIndex and currentAddressIndex.
+   * @param {IHistoryTx[]} txs The saved transactions
+   */
+  private async updateUsedAddressIndexes(txs: IHistoryTx[]): Promise<void> {
     let legacyMaxIndex = this.walletData.lastUsedAddressIndex;
     let shieldedMaxIndex = this.walletData.shieldedLastUsedAddressIndex;
     // SEPARATED model: shielded outputs live in `tx.shielded_outputs`, not
@@ -577,27 +847,29 @@ export class MemoryStore implements IStore {
     // 'shielded-spend' P2PKH. Without this, shieldedLastUsedAddressIndex never
     // moves on receives and the shielded gap-limit fails to extend, so funds on
     // higher shielded indices would be missed.
-    for (const el of [...tx.inputs, ...tx.outputs, ...(tx.shielded_outputs ?? [])]) {
-      if (el.decoded?.address && (await this.addressExists(el.decoded.address))) {
-        const addrInfo = this.addresses.get(el.decoded.address)!;
-        const index = addrInfo.bip32AddressIndex;
-        if (addrInfo.addressType === 'shielded-spend') {
-          // Gate on the SEPARATED ownership marker (value !== undefined), same
-          // as every other shielded consumer. `decoded.address` is UNTRUSTED
-          // wire data — the fullnode emits it even for outputs we cannot
-          // decrypt — so advancing the cursor off a non-decoded entry would let
-          // a crafted tx claiming our spend P2PKH push the gap cursor. Decode-
-          // verified advancement on first receipt is handled by processNewTx;
-          // here we only honor entries already decoded as ours (value set).
-          if ((el as { value?: unknown }).value !== undefined && index > shieldedMaxIndex) {
-            shieldedMaxIndex = index;
+    for (const tx of txs) {
+      for (const el of [...tx.inputs, ...tx.outputs, ...(tx.shielded_outputs ?? [])]) {
+        const addrInfo = el.decoded?.address && this.addresses.get(el.decoded.address);
+        if (addrInfo) {
+          const index = addrInfo.bip32AddressIndex;
+          if (addrInfo.addressType === 'shielded-spend') {
+            // Gate on the SEPARATED ownership marker (value !== undefined), same
+            // as every other shielded consumer. `decoded.address` is UNTRUSTED
+            // wire data — the fullnode emits it even for outputs we cannot
+            // decrypt — so advancing the cursor off a non-decoded entry would let
+            // a crafted tx claiming our spend P2PKH push the gap cursor. Decode-
+            // verified advancement on first receipt is handled by processNewTx;
+            // here we only honor entries already decoded as ours (value set).
+            if ((el as { value?: unknown }).value !== undefined && index > shieldedMaxIndex) {
+              shieldedMaxIndex = index;
+            }
+          } else if (
+            !addrInfo.addressType ||
+            addrInfo.addressType === 'p2pkh' ||
+            addrInfo.addressType === 'p2sh'
+          ) {
+            if (index > legacyMaxIndex) legacyMaxIndex = index;
           }
-        } else if (
-          !addrInfo.addressType ||
-          addrInfo.addressType === 'p2pkh' ||
-          addrInfo.addressType === 'p2sh'
-        ) {
-          if (index > legacyMaxIndex) legacyMaxIndex = index;
         }
       }
     }
@@ -625,7 +897,19 @@ export class MemoryStore implements IStore {
    * @returns {Promise<IHistoryTx | null>} A promise with the transaction or null
    */
   async getTx(txId: string): Promise<IHistoryTx | null> {
-    return this.history.get(txId) || null;
+    return (this.compactHistory ?? this.history).get(txId) || null;
+  }
+
+  /**
+   * Get a transaction while iterating on the history.
+   * A compact history does not keep the txs rebuilt for these reads, so iterating on the
+   * whole history does not evict the recently used txs.
+   *
+   * @param {string} txId The transaction id
+   * @returns {IHistoryTx|undefined}
+   */
+  private peekTx(txId: string): IHistoryTx | undefined {
+    return this.compactHistory ? this.compactHistory.peek(txId) : this.history.get(txId);
   }
 
   /** TOKENS */
@@ -771,7 +1055,12 @@ export class MemoryStore implements IStore {
   }
 
   async deleteUtxo(utxo: IUtxo): Promise<void> {
-    this.utxos.delete(`${utxo.txId}:${utxo.index}`);
+    const key = `${utxo.txId}:${utxo.index}`;
+    const saved = this.utxos.get(key);
+    if (saved) {
+      this.utxoIndex.remove(key, saved);
+    }
+    this.utxos.delete(key);
   }
 
   /**
@@ -817,14 +1106,28 @@ export class MemoryStore implements IStore {
       }
     }
 
-    // Map.prototype.values() is an iterable but orderBy returns an array
-    // Both work with for...of so we can use them interchangeably
-    let iter: IterableIterator<IUtxo> | IUtxo[];
-    if (options.order_by_value) {
-      // Sort by value as requested in options.order_by_value
-      iter = orderBy(Array.from(this.utxos.values()), ['value'], [options.order_by_value]);
+    // Only visit the candidate utxos using the utxo indexes, the filters below are
+    // still checked for each utxo.
+    let iter: Iterable<IUtxo>;
+    if (effectiveFilterAddress) {
+      // The utxos of a single address are few, so we can sort them as requested.
+      iter = this.utxoIndex.iterAddress(effectiveFilterAddress);
+      if (options.order_by_value) {
+        iter = orderBy(Array.from(iter), ['value'], [options.order_by_value]);
+      }
+    } else if (authorities !== 0) {
+      iter = this.utxoIndex.iterAuthorities(token);
+      if (options.order_by_value) {
+        iter = orderBy(Array.from(iter), ['value'], [options.order_by_value]);
+      }
+    } else if (options.order_by_value) {
+      // Fund utxos of the token are already sorted by value
+      iter = this.utxoIndex.iterFundsByValue(token, options.order_by_value, {
+        biggerThan: options.amount_bigger_than,
+        smallerThan: options.amount_smaller_than,
+      });
     } else {
-      iter = this.utxos.values();
+      iter = this.utxoIndex.iterFunds(token);
     }
 
     for (const utxo of iter) {
@@ -883,7 +1186,9 @@ export class MemoryStore implements IStore {
    * @returns {Promise<void>}
    */
   async saveUtxo(utxo: IUtxo): Promise<void> {
-    this.utxos.set(`${utxo.txId}:${utxo.index}`, utxo);
+    const key = `${utxo.txId}:${utxo.index}`;
+    this.utxoIndex.add(key, utxo, this.utxos.get(key) ?? null);
+    this.utxos.set(key, utxo);
   }
 
   async getUtxo(utxoId: IUtxoId): Promise<IUtxo | null> {
@@ -899,7 +1204,24 @@ export class MemoryStore implements IStore {
    * @returns {Promise<void>}
    */
   async saveLockedUtxo(lockedUtxo: ILockedUtxo): Promise<void> {
-    this.lockedUtxos.set(`${lockedUtxo.tx.tx_id}:${lockedUtxo.index}`, lockedUtxo);
+    const key = `${lockedUtxo.tx.tx_id}:${lockedUtxo.index}`;
+    if (this.lockedUtxos.get(key) === lockedUtxo) {
+      // Already scheduled
+      return;
+    }
+    this.lockedUtxos.set(key, lockedUtxo);
+    this.lockedUtxoSchedule.add(lockedUtxo);
+  }
+
+  /**
+   * Create an empty schedule for the locked utxos of this store.
+   * @returns {LockedUtxoSchedule}
+   */
+  createLockedUtxoSchedule(): LockedUtxoSchedule {
+    return new LockedUtxoSchedule(
+      lockedUtxo =>
+        this.lockedUtxos.get(`${lockedUtxo.tx.tx_id}:${lockedUtxo.index}`) === lockedUtxo
+    );
   }
 
   /**
@@ -912,6 +1234,50 @@ export class MemoryStore implements IStore {
     }
   }
 
+  /**
+   * Iterate over the locked utxos whose lock has expired.
+   * Only the utxos that can be unlocked are visited instead of all locked utxos.
+   *
+   * @param {Object} options
+   * @param {number} options.currentHeight The current height of the best chain
+   * @param {number} options.rewardLock The reward lock of the network
+   * @param {number} options.nowTs The current timestamp
+   * @returns {AsyncGenerator<ILockedUtxo>}
+   */
+  async *iterateUnlockableUtxos(options: {
+    currentHeight: number;
+    rewardLock: number;
+    nowTs: number;
+  }): AsyncGenerator<ILockedUtxo> {
+    const isLocked = (lockedUtxo: ILockedUtxo) =>
+      this.lockedUtxos.get(`${lockedUtxo.tx.tx_id}:${lockedUtxo.index}`) === lockedUtxo;
+    const unlockable = this.lockedUtxoSchedule.popUnlockable(options);
+    let next = 0;
+    try {
+      for (; next < unlockable.length; next++) {
+        if (isLocked(unlockable[next])) {
+          yield unlockable[next];
+        }
+      }
+    } finally {
+      // The iteration stopped early, e.g. the unlock of an utxo failed, so the utxos
+      // not visited or not unlocked go back to the schedule.
+      for (const lockedUtxo of unlockable.slice(next)) {
+        if (isLocked(lockedUtxo)) {
+          this.lockedUtxoSchedule.add(lockedUtxo, true);
+        }
+      }
+    }
+  }
+
+  /**
+   * Get the earliest timelock that will unlock an utxo, if any.
+   * @returns {Promise<number|null>}
+   */
+  async getNextUnlockTimestamp(): Promise<number | null> {
+    return this.lockedUtxoSchedule.nextTimelock();
+  }
+
   /**
    * Remove an utxo from the locked utxos if it became unlocked.
    *
@@ -1110,9 +1476,16 @@ export class MemoryStore implements IStore {
       this.tokens = new Map<string, ITokenData>();
       this.tokensMetadata = new Map<string, ITokenMetadata>();
       this.history = new Map<string, IHistoryTx>();
+      this.compactHistory?.clear();
       this.historyTs = [];
+      this.historyTsSorted = true;
+      this.tokenHistoryIndex = new TokenHistoryIndex();
+      this.txBalanceCache = new Map<string, Record<string, OutputValueType>>();
+      this.staleAddresses = new Set<string>();
       this.utxos = new Map<string, IUtxo>();
+      this.utxoIndex = new UtxoIndex();
       this.lockedUtxos = new Map<string, ILockedUtxo>();
+      this.lockedUtxoSchedule = this.createLockedUtxoSchedule();
     }
 
     if (cleanAddresses) {
@@ -1122,6 +1495,9 @@ export class MemoryStore implements IStore {
       this.addressesMetadata = new Map<string, IAddressMetadata>();
       this.seqnumMetadata = new Map<string, number>();
       this.walletData = { ...this.walletData, ...DEFAULT_ADDRESSES_WALLET_DATA };
+      this.tokenHistoryIndex = null;
+      this.txBalanceCache = new Map<string, Record<string, OutputValueType>>();
+      this.staleAddresses = new Set<string>();
     }
 
     if (cleanTokens) {
@@ -1143,7 +1519,9 @@ export class MemoryStore implements IStore {
     this.tokensMetadata = new Map<string, ITokenMetadata>();
     this.addressesMetadata = new Map<string, IAddressMetadata>();
     this.utxos = new Map<string, IUtxo>();
+    this.utxoIndex = new UtxoIndex();
     this.lockedUtxos = new Map<string, ILockedUtxo>();
+    this.lockedUtxoSchedule = this.createLockedUtxoSchedule();
   }
 
   /**
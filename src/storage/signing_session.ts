@@ -0,0 +1,221 @@
+/**
+ * Copyright (c) Hathor Labs and its affiliates.
+ *
+ * This source code is licensed under the MIT license found in the
+ * LICENSE file in the root directory of this source tree.
+ */
+
+import crypto from 'crypto';
+import { HDPrivateKey } from 'bitcore-lib';
+
+/**
+ * Default time in ms a signing session stays unlocked.
+ */
+export const SIGNING_SESSION_DEFAULT_TTL = 5 * 60 * 1000;
+
+/**
+ * Default number of derived child keys kept by a signing session.
+ */
+export const SIGNING_SESSION_DEFAULT_MAX_KEYS = 1000;
+
+export type SigningKeyChain = 'legacy' | 'spend';
+
+export interface ISigningSessionOptions {
+  /**
+   * Time in ms the session stays unlocked, counted from the unlock.
+   */
+  ttl?: number;
+  /**
+   * Maximum number of derived child keys kept on the session.
+   */
+  maxKeys?: number;
+}
+
+/**
+ * Overwrite the secret material of an HD private key.
+ * This is a best effort, copies made by the js engine or by string conversions cannot be erased.
+ *
+ * @param {HDPrivateKey} key The key to erase
+ */
+export function zeroizeHDPrivateKey(key: HDPrivateKey): void {
+  const buffers = (key as unknown as { _buffers?: Record<string, unknown> })._buffers ?? {};
+  for (const value of Object.values(buffers)) {
+    if (Buffer.isBuffer(value)) {
+      value.fill(0);
+    }
+  }
+  const words = (key.privateKey as unknown as { bn?: { words?: number[] } })?.bn?.words;
+  if (Array.isArray(words)) {
+    words.fill(0);
+  }
+}
+
+/**
+ * Decrypted signing keys of a wallet, kept for a bounded time.
+ *
+ * Unlocking the wallet keys requires decrypting them with the pin (PBKDF2) and parsing the
+ * HD keys, the session does this once and keeps the change path keys of the legacy and
+ * shielded spend chains along with the most recently used child keys, so signing a tx only
+ * costs the ECDSA signatures.
+ *
+ * The keys are only used when signing with the pin that unlocked them, the session keeps a
+ * salted hash of the pin to check it without the cost of decrypting the keys again.
+ *
+ * The keys are erased when the session is closed or expires.
+ */
+export class SigningSession {
+  legacyXpriv: HDPrivateKey | null;
+
+  spendXpriv: HDPrivateKey | null;
+
+  /**
+   * Map<`<chain>:<index>`, HDPrivateKey> in least recently used order.
+   */
+  childKeys: Map<string, HDPrivateKey>;
+
+  maxKeys: number;
+
+  expiresAt: number;
+
+  expireTimer: ReturnType<typeof setTimeout> | null;
+
+  pinSalt: Buffer;
+
+  pinHash: Buffer;
+
+  /**
+   * @param {HDPrivateKey|null} legacyXpriv Change path key of the legacy chain
+   * @param {HDPrivateKey|null} spendXpriv Change path key of the shielded spend chain
+   * @param {string} pinCode The pin used to unlock the keys
+   * @param {ISigningSessionOptions} [options]
+   */
+  constructor(
+    legacyXpriv: HDPrivateKey | null,
+    spendXpriv: HDPrivateKey | null,
+    pinCode: string,
+    {
+      ttl = SIGNING_SESSION_DEFAULT_TTL,
+      maxKeys = SIGNING_SESSION_DEFAULT_MAX_KEYS,
+    }: ISigningSessionOptions = {}
+  ) {
+    this.legacyXpriv = legacyXpriv;
+    this.spendXpriv = spendXpriv;
+    this.childKeys = new Map<string, HDPrivateKey>();
+    this.maxKeys = maxKeys;
+    this.pinSalt = crypto.randomBytes(16);
+    this.pinHash = this.hashPin(pinCode);
+    this.expiresAt = Date.now() + ttl;
+    this.expireTimer = setTimeout(() => this.close(), ttl);
+    // An unlocked session should not keep the process alive
+    if (typeof this.expireTimer === 'object' && this.expireTimer.unref) {
+      this.expireTimer.unref();
+    }
+  }
+
+  /**
+   * If the session keys are still available.
+   * @returns {boolean}
+   */
+  isActive(): boolean {
+    if (this.expireTimer !== null && Date.now() >= this.expiresAt) {
+      // The timer may not have run yet if the event loop is busy
+      this.close();
+    }
+    return this.expireTimer !== null;
+  }
+
+  /**
+   * Hash a pin with the salt of the session.
+   * @param {string} pinCode The pin
+   * @returns {Buffer}
+   */
+  hashPin(pinCode: string): Buffer {
+    return crypto.createHash('sha256').update(this.pinSalt).update(pinCode).digest();
+  }
+
+  /**
+   * Check if the pin is the one used to unlock the session keys.
+   * @param {string} pinCode The pin to check
+   * @returns {boolean}
+   */
+  checkPin(pinCode: string): boolean {
+    if (typeof pinCode !== 'string') {
+      return false;
+    }
+    return crypto.timingSafeEqual(this.hashPin(pinCode), this.pinHash);
+  }
+
+  /**
+   * Get the change path key of a chain.
+   *
+   * @param {SigningKeyChain} chain The key chain
+   * @returns {HDPrivateKey}
+   * @throws {Error} If the session is closed or does not have the chain key
+   */
+  getXpriv(chain: SigningKeyChain): HDPrivateKey {
+    if (!this.isActive()) {
+      throw new Error('Signing session is closed.');
+    }
+    const xpriv = chain === 'spend' ? this.spendXpriv : this.legacyXpriv;
+    if (!xpriv) {
+      throw new Error(
+        chain === 'spend'
+          ? 'Spend private key is not present on this wallet.'
+          : 'Private key is not present on this wallet.'
+      );
+    }
+    return xpriv;
+  }
+
+  /**
+   * Get the key of an address index, derived with the same derivation used to sign the
+   * inputs of each chain.
+   *
+   * @param {SigningKeyChain} chain The key chain
+   * @param {number} index The address index
+   * @returns {HDPrivateKey}
+   */
+  deriveChild(chain: SigningKeyChain, index: number): HDPrivateKey {
+    const xpriv = this.getXpriv(chain);
+    const cacheKey = `${chain}:${index}`;
+    let key = this.childKeys.get(cacheKey);
+    if (key) {
+      // Move to the most recently used position
+      this.childKeys.delete(cacheKey);
+    } else {
+      // Shielded keys use compliant derivation, legacy keys the non-compliant one.
+      key = chain === 'spend' ? xpriv.deriveChild(index) : xpriv.deriveNonCompliantChild(index);
+    }
+    this.childKeys.set(cacheKey, key);
+
+    // The key just derived is the most recently used, so it is never evicted here.
+    while (this.childKeys.size > Math.max(this.maxKeys, 1)) {
+      const [oldestKey, oldest] = this.childKeys.entries().next().value as [string, HDPrivateKey];
+      this.childKeys.delete(oldestKey);
+      zeroizeHDPrivateKey(oldest);
+    }
+    return key;
+  }
+
+  /**
+   * Erase the keys of the session.
+   */
+  close(): void {
+    if (this.expireTimer !== null) {
+      clearTimeout(this.expireTimer);
+      this.expireTimer = null;
+    }
+    for (const key of this.childKeys.values()) {
+      zeroizeHDPrivateKey(key);
+    }
+    this.childKeys.clear();
+    if (this.legacyXpriv) {
+      zeroizeHDPrivateKey(this.legacyXpriv);
+      this.legacyXpriv = null;
+    }
+    if (this.spendXpriv) {
+      zeroizeHDPrivateKey(this.spendXpriv);
+      this.spendXpriv = null;
+    }
+  }
+}
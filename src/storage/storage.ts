@@ -5,7 +5,7 @@
  * LICENSE file in the root directory of this source tree.
  */
 
-import { HDPublicKey } from 'bitcore-lib';
+import { HDPrivateKey, HDPublicKey } from 'bitcore-lib';
 import Input from '../models/input';
 import {
   ApiVersion,
@@ -41,14 +41,24 @@ import {
   AuthorityType,
   TokenVersion,
   IAddressChainOptions,
+  ISyncCheckpoint,
+  IStreamSyncCheckpoint,
+  IAddressDerivationPool,
+  IMiningBackend,
+  IAddressDerivationCache,
 } from '../types';
 import type { IShieldedCryptoProvider } from '../shielded/types';
 import transactionUtils from '../utils/transaction';
 import {
   processHistory as processHistoryUtil,
+  processMetadataChanged,
+  processNewTxBatch as processNewTxBatchUtil,
   processSingleTx as processSingleTxUtil,
   processUtxoUnlock,
+  revertTxEffects,
 } from '../utils/storage';
+import { TxEffectsJournal } from './tx_journal';
+import { ISigningSessionOptions, SigningSession } from './signing_session';
 import config, { Config } from '../config';
 import { decryptData, checkPassword } from '../utils/crypto';
 import FullNodeConnection from '../new/connection';
@@ -65,8 +75,22 @@ import {
   DEFAULT_NATIVE_TOKEN_CONFIG,
 } from '../constants';
 import { UninitializedWalletError } from '../errors';
+import { METRIC_NAMES, timeAsync } from '../metrics';
 import Transaction from '../models/transaction';
 
+/**
+ * Generic storage key of the sync checkpoint.
+ */
+export const SYNC_CHECKPOINT_KEY = 'wallet:sync:checkpoint';
+
+/**
+ * Generic storage key of the stream sync checkpoint.
+ */
+export const STREAM_SYNC_CHECKPOINT_KEY = 'wallet:sync:stream-checkpoint';
+
+// Max delay accepted by setTimeout
+const MAX_TIMER_DELAY = 2 ** 31 - 1;
+
 /**
  * Build a fresh address-metadata object.
  *
@@ -97,6 +121,14 @@ export class Storage implements IStorage {
 
   shieldedCryptoProvider?: IShieldedCryptoProvider;
 
+  derivationPool: IAddressDerivationPool | null;
+
+  addressCache: IAddressDerivationCache | null;
+
+  miningBackend: IMiningBackend | null;
+
+  signingSession: SigningSession | null;
+
   // See IStorage.shieldedDecodeSkippedTxIds — the "partial history" flag set by
   // processHistory when some owned shielded txs could not be decoded.
   shieldedDecodeSkippedTxIds?: string[] | null;
@@ -111,18 +143,41 @@ export class Storage implements IStorage {
    */
   utxoUnlockWait: Promise<void>;
 
+  /**
+   * Timer to unlock the timelocked utxos when the earliest timelock expires.
+   */
+  timelockUnlockTimer: ReturnType<typeof setTimeout> | null;
+
   logger: ILogger;
 
+  /**
+   * Effects of each processed tx, used to revert a single tx without processing the whole history.
+   */
+  txJournal: TxEffectsJournal;
+
+  /**
+   * Txs saved while resuming from a sync checkpoint, Map<txId, stored tx data before the sync>
+   * with null for the txs new to the store. Null when the changes are not tracked.
+   */
+  syncChanges: Map<string, Pick<IHistoryTx, 'is_voided' | 'first_block'> | null> | null;
+
   constructor(store: IStore) {
     this.store = store;
     this.utxosSelectedAsInput = new Map<string, boolean>();
     this.config = config;
     this.version = null;
     this.utxoUnlockWait = Promise.resolve();
+    this.timelockUnlockTimer = null;
     this.txSignFunc = null;
     this.shieldedCryptoProvider = undefined;
+    this.derivationPool = null;
+    this.addressCache = null;
+    this.miningBackend = null;
+    this.signingSession = null;
     this.shieldedDecodeSkippedTxIds = null;
     this.logger = getDefaultLogger();
+    this.txJournal = new TxEffectsJournal();
+    this.syncChanges = null;
   }
 
   /**
@@ -199,6 +254,30 @@ export class Storage implements IStorage {
     this.shieldedCryptoProvider = provider;
   }
 
+  /**
+   * Set the pool used to derive addresses during the sync.
+   * @param pool The derivation pool, or a null value to derive on the main thread
+   */
+  setDerivationPool(pool?: IAddressDerivationPool | null): void {
+    this.derivationPool = pool ?? null;
+  }
+
+  /**
+   * Set the cache of derived addresses consulted before deriving addresses.
+   * @param cache The address cache, or a null value to always derive
+   */
+  setAddressCache(cache?: IAddressDerivationCache | null): void {
+    this.addressCache = cache ?? null;
+  }
+
+  /**
+   * Set the backend used to mine the transactions locally.
+   * @param backend The mining backend, or a null value to use the tx mining service
+   */
+  setMiningBackend(backend?: IMiningBackend | null): void {
+    this.miningBackend = backend ?? null;
+  }
+
   /**
    * Get the shielded crypto provider, or throw if it has not been configured.
    * Confidential-transaction code paths require the provider; a missing one is a
@@ -227,6 +306,37 @@ export class Storage implements IStorage {
     return transactionUtils.getSignatureForTx(tx, this, pinCode);
   }
 
+  /**
+   * Unlock the signing keys of the wallet for a bounded time.
+   *
+   * The keys are decrypted once and kept with a cache of the derived child keys, so the
+   * signatures made while the session is active do not need to decrypt and derive the keys.
+   * Starting a session closes the previous one.
+   *
+   * @param {string} pinCode The pin code
+   * @param {ISigningSessionOptions} [options] Time to live and child key cache size
+   * @returns {Promise<void>}
+   */
+  async startSigningSession(pinCode: string, options?: ISigningSessionOptions): Promise<void> {
+    const accessData = await this._getValidAccessData();
+    const legacyXpriv = HDPrivateKey.fromString(await this.getMainXPrivKey(pinCode));
+    const spendXpriv = accessData.spendMainKey
+      ? HDPrivateKey.fromString(await this.getSpendXPrivKey(pinCode))
+      : null;
+    this.closeSigningSession();
+    this.signingSession = new SigningSession(legacyXpriv, spendXpriv, pinCode, options);
+  }
+
+  /**
+   * Close the signing session, erasing the unlocked keys.
+   */
+  closeSigningSession(): void {
+    if (this.signingSession) {
+      this.signingSession.close();
+      this.signingSession = null;
+    }
+  }
+
   /**
    * Return the deposit percentage as a float, for display purposes (wallet UI).
    * Deposit/withdraw amounts use {@link getTokenDepositPercentageFraction} for exact integer math.
@@ -365,6 +475,25 @@ export class Storage implements IStorage {
     await this.store.saveAddress(info);
   }
 
+  /**
+   * Save many addresses, with a single store call when the store has bulk writes.
+   *
+   * @param {IAddressInfo[]} infos The addresses to save
+   * @returns {Promise<void>}
+   */
+  async saveAddresses(infos: IAddressInfo[]): Promise<void> {
+    if (infos.length === 0) {
+      return;
+    }
+    if (this.store.saveAddresses) {
+      await this.store.saveAddresses(infos);
+      return;
+    }
+    for (const info of infos) {
+      await this.store.saveAddress(info);
+    }
+  }
+
   /**
    * Get the current address.
    *
@@ -416,14 +545,48 @@ export class Storage implements IStorage {
    * Iterate on the history of transactions that include the given token.
    *
    * @param {string|undefined} [tokenUid='00'] Token to fetch, defaults to HTR
+   * @param {Object} [options]
+   * @param {string} [options.cursor] Start after this tx id, i.e. the last tx of the previous page
+   * @param {number} [options.skip] Number of txs to skip
    * @returns {AsyncGenerator<IHistoryTx>}
    */
-  async *tokenHistory(tokenUid?: string): AsyncGenerator<IHistoryTx> {
-    for await (const tx of this.store.historyIter(tokenUid || NATIVE_TOKEN_UID)) {
+  async *tokenHistory(
+    tokenUid?: string,
+    options?: { cursor?: string; skip?: number }
+  ): AsyncGenerator<IHistoryTx> {
+    const uid = tokenUid || NATIVE_TOKEN_UID;
+    const iter = options ? this.store.historyIter(uid, options) : this.store.historyIter(uid);
+    for await (const tx of iter) {
       yield tx;
     }
   }
 
+  /**
+   * Get the cached balance of a tx for the wallet, if the store supports it.
+   *
+   * @param {string} txId The transaction id
+   * @returns {Promise<Record<string, OutputValueType> | null>}
+   */
+  async getCachedTxBalance(txId: string): Promise<Record<string, OutputValueType> | null> {
+    if (!this.store.getTxBalanceCache) {
+      return null;
+    }
+    return this.store.getTxBalanceCache(txId);
+  }
+
+  /**
+   * Cache the balance of a tx for the wallet, if the store supports it.
+   *
+   * @param {string} txId The transaction id
+   * @param {Record<string, OutputValueType>} balance Balance of each token on the tx
+   * @returns {Promise<void>}
+   */
+  async cacheTxBalance(txId: string, balance: Record<string, OutputValueType>): Promise<void> {
+    if (this.store.saveTxBalanceCache) {
+      await this.store.saveTxBalanceCache(txId, balance);
+    }
+  }
+
   /**
    * Fetch a transaction on the storage by it's id.
    *
@@ -458,6 +621,39 @@ export class Storage implements IStorage {
    * @returns {Promise<void>}
    */
   async addTx(tx: IHistoryTx): Promise<void> {
+    await this._prepareTxToSave(tx);
+    await this.store.saveTx(tx);
+  }
+
+  /**
+   * Add many transactions to storage, with a single store call when the store has
+   * bulk writes. The transactions are saved in order.
+   *
+   * @param {IHistoryTx[]} txs The transactions to add
+   * @returns {Promise<void>}
+   */
+  async addTxs(txs: IHistoryTx[]): Promise<void> {
+    if (txs.length === 0) {
+      return;
+    }
+    for (const tx of txs) {
+      await this._prepareTxToSave(tx);
+    }
+    if (this.store.saveTxs) {
+      await this.store.saveTxs(txs);
+      return;
+    }
+    for (const tx of txs) {
+      await this.store.saveTx(tx);
+    }
+  }
+
+  /**
+   * Prepare a transaction received from the fullnode to be saved.
+   * @param {IHistoryTx} tx The transaction, changed in place
+   * @internal
+   */
+  async _prepareTxToSave(tx: IHistoryTx): Promise<void> {
     // Normalize: convert base64-encoded confidential fields to hex in
     // tx.shielded_outputs[] (the fullnode delivers the transparent/shielded
     // split; this does not move or extract entries).
@@ -471,7 +667,12 @@ export class Storage implements IStorage {
     if (storedTx) {
       transactionUtils.restoreStoredShieldedData(tx, storedTx);
     }
-    await this.store.saveTx(tx);
+    if (this.syncChanges && !this.syncChanges.has(tx.tx_id)) {
+      this.syncChanges.set(
+        tx.tx_id,
+        storedTx && { is_voided: storedTx.is_voided, first_block: storedTx.first_block }
+      );
+    }
   }
 
   /**
@@ -479,10 +680,13 @@ export class Storage implements IStorage {
    * @returns {Promise<void>}
    */
   async processHistory(pinCode?: string): Promise<void> {
-    await this.store.preProcessHistory();
-    await processHistoryUtil(this, {
-      rewardLock: this.version?.reward_spend_min_blocks,
-      pinCode,
+    await timeAsync(METRIC_NAMES.PROCESS_HISTORY, async () => {
+      await this.store.preProcessHistory();
+      await processHistoryUtil(this, {
+        rewardLock: this.version?.reward_spend_min_blocks,
+        pinCode,
+      });
+      await this.scheduleTimelockUnlock();
     });
   }
 
@@ -491,15 +695,248 @@ export class Storage implements IStorage {
    * @returns {Promise<void>}
    */
   async processNewTx(tx: IHistoryTx, pinCode?: string): Promise<void> {
-    // Keep tx-timestamp index sorted
-    await this.store.preProcessHistory();
-    // Process the single tx we received
-    await processSingleTxUtil(this, tx, {
-      rewardLock: this.version?.reward_spend_min_blocks,
-      pinCode,
+    await timeAsync(METRIC_NAMES.PROCESS_NEW_TX, async () => {
+      // Keep tx-timestamp index sorted
+      await this.store.preProcessHistory();
+      // Process the single tx we received
+      await processSingleTxUtil(this, tx, {
+        rewardLock: this.version?.reward_spend_min_blocks,
+        pinCode,
+      });
+      await this.scheduleTimelockUnlock();
+    });
+  }
+
+  /**
+   * Process a batch of new transactions in a single pass.
+   *
+   * @param {IHistoryTx[]} txs The new transactions, in the order they should be applied
+   * @param {string} [pinCode] PIN code for shielded-output decryption
+   * @param {Function} [onTxError] Called with a tx that failed and its error, the rest of the
+   *   batch is still processed. When not given the error is thrown.
+   * @returns {Promise<void>}
+   */
+  async processNewTxBatch(
+    txs: IHistoryTx[],
+    pinCode?: string,
+    onTxError?: (tx: IHistoryTx, error: unknown) => void
+  ): Promise<void> {
+    await timeAsync(METRIC_NAMES.PROCESS_NEW_TX, async () => {
+      // Keep tx-timestamp index sorted
+      await this.store.preProcessHistory();
+      await processNewTxBatchUtil(this, txs, {
+        rewardLock: this.version?.reward_spend_min_blocks,
+        pinCode,
+        onTxError,
+      });
+      await this.scheduleTimelockUnlock();
+    });
+  }
+
+  /**
+   * Reprocess a transaction already processed, e.g. when its voided flag changed.
+   *
+   * Only the effects of this transaction and of the transactions depending on it (i.e.
+   * spending its outputs, directly or through other transactions) are reverted, then
+   * they are applied again in topological order.
+   * If the effects are unknown (i.e. it was never processed in this session) or a tx they
+   * spent from was processed before the journal started (e.g. on a resume from the sync
+   * checkpoint) the whole history is processed instead.
+   *
+   * @param {IHistoryTx} tx The updated transaction
+   * @param {string} [pinCode] PIN code for shielded-output decryption
+   * @returns {Promise<void>}
+   */
+  async reprocessTx(tx: IHistoryTx, pinCode?: string): Promise<void> {
+    if (!this.txJournal.has(tx.tx_id)) {
+      await this.processHistory(pinCode);
+      return;
+    }
+    const closure = this.txJournal.getDependantClosure(tx.tx_id);
+    // Dependants are reverted before the txs they spend from
+    for (const txId of [...closure].reverse()) {
+      if (!(await revertTxEffects(this, txId))) {
+        await this.processHistory(pinCode);
+        return;
+      }
+    }
+    for (const txId of closure) {
+      const closureTx = txId === tx.tx_id ? tx : await this.getTx(txId);
+      if (closureTx !== null) {
+        await this.processNewTx(closureTx, pinCode);
+      }
+    }
+  }
+
+  /**
+   * Start tracking the txs saved by a sync resuming from the sync checkpoint, so only
+   * them are processed by `processSyncChanges` instead of the whole history.
+   * Should only be called when `getSyncCheckpoint` returns a checkpoint, i.e. the
+   * metadata on the store was processed from the history on the store.
+   */
+  trackSyncChanges(): void {
+    this.syncChanges = new Map();
+  }
+
+  /**
+   * Process the txs saved since `trackSyncChanges` and stop tracking them.
+   *
+   * The new txs are processed in a single pass and the txs with a new first block have
+   * their utxos updated. The whole history is processed if the changes were not tracked
+   * or a tx changed its voided flag, since the effects of a tx processed before the restart
+   * cannot be reverted alone.
+   *
+   * @param {string} [pinCode] PIN code for shielded-output decryption
+   * @returns {Promise<void>}
+   */
+  async processSyncChanges(pinCode?: string): Promise<void> {
+    const changes = this.syncChanges;
+    this.syncChanges = null;
+    if (changes === null) {
+      await this.processHistory(pinCode);
+      return;
+    }
+
+    const newTxs: IHistoryTx[] = [];
+    const confirmedTxs: IHistoryTx[] = [];
+    for (const [txId, before] of changes) {
+      const tx = await this.getTx(txId);
+      if (tx === null) {
+        continue;
+      }
+      if (before === null) {
+        newTxs.push(tx);
+      } else if (before.is_voided !== tx.is_voided) {
+        await this.processHistory(pinCode);
+        return;
+      } else if ((before.first_block ?? null) !== (tx.first_block ?? null) && !tx.is_voided) {
+        confirmedTxs.push(tx);
+      }
+    }
+
+    // Chronological order, so a tx spending another new tx finds it processed
+    newTxs.sort((a, b) => a.timestamp - b.timestamp);
+    if (newTxs.length > 0) {
+      await this.processNewTxBatch(newTxs, pinCode);
+    }
+    for (const tx of confirmedTxs) {
+      await processMetadataChanged(this, tx);
+    }
+  }
+
+  /**
+   * Get the checkpoint saved when the last sync finished.
+   *
+   * The checkpoint is only returned if it matches the history on the store and the
+   * network of the storage, a store that lost or gained txs outside of a sync is not trusted.
+   * The caller should also check the checkpoint block is still on the best chain,
+   * see `isSyncCheckpointOnBestChain`.
+   *
+   * @returns {Promise<ISyncCheckpoint|null>} The checkpoint or null if there is no valid checkpoint
+   */
+  async getSyncCheckpoint(): Promise<ISyncCheckpoint | null> {
+    const checkpoint = (await this.store.getItem(SYNC_CHECKPOINT_KEY)) as ISyncCheckpoint | null;
+    if (!checkpoint) {
+      return null;
+    }
+    if (checkpoint.network !== this.config.getNetwork().name) {
+      return null;
+    }
+    if (checkpoint.historyCount !== (await this.store.historyCount())) {
+      return null;
+    }
+    return checkpoint;
+  }
+
+  /**
+   * Save a checkpoint with the current state of the store.
+   * Should be called when the history is fully synced and processed.
+   *
+   * The checkpoint is persisted with the next flush of the store.
+   *
+   * @param {string|null} [blockHash=null] Hash of the best chain block at the checkpoint height
+   * @param {Object} [anchor]
+   * @param {number} [anchor.height] Height of the checkpoint block, defaults to the current height
+   * @param {number} [anchor.timestamp] When the checkpoint block was requested, defaults to now
+   * @returns {Promise<void>}
+   */
+  async saveSyncCheckpoint(
+    blockHash: string | null = null,
+    { height, timestamp }: { height?: number; timestamp?: number } = {}
+  ): Promise<void> {
+    const checkpoint: ISyncCheckpoint = {
+      height: height ?? (await this.store.getCurrentHeight()),
+      historyCount: await this.store.historyCount(),
+      timestamp: timestamp ?? Math.floor(Date.now() / 1000),
+      network: this.config.getNetwork().name,
+      blockHash,
+    };
+    await this.store.setItem(SYNC_CHECKPOINT_KEY, checkpoint);
+  }
+
+  /**
+   * Remove the sync checkpoint and stop tracking the sync changes, so the history is
+   * processed again as a whole.
+   *
+   * @returns {Promise<void>}
+   */
+  async cleanSyncCheckpoint(): Promise<void> {
+    await this.store.setItem(SYNC_CHECKPOINT_KEY, null);
+    this.syncChanges = null;
+  }
+
+  /**
+   * Get the checkpoint of a stream sync that did not finish.
+   *
+   * The checkpoint is only returned if it matches the history on the store and the
+   * best chain did not go back past it, otherwise the stream should start over.
+   *
+   * @returns {Promise<IStreamSyncCheckpoint|null>} The checkpoint or null if there is no valid checkpoint
+   */
+  async getStreamSyncCheckpoint(): Promise<IStreamSyncCheckpoint | null> {
+    const checkpoint = (await this.store.getItem(
+      STREAM_SYNC_CHECKPOINT_KEY
+    )) as IStreamSyncCheckpoint | null;
+    if (!checkpoint || typeof checkpoint.timestamp !== 'number') {
+      return null;
+    }
+    if (checkpoint.historyCount !== (await this.store.historyCount())) {
+      return null;
+    }
+    if ((await this.store.getCurrentHeight()) < checkpoint.height) {
+      // A reorg may have voided txs of the addresses before the checkpoint
+      return null;
+    }
+    return checkpoint;
+  }
+
+  /**
+   * Save the progress of a stream sync along with the current state of the store.
+   * Should be called after the history of the streamed addresses is saved.
+   *
+   * @param {Omit<IStreamSyncCheckpoint, 'height' | 'historyCount' | 'timestamp'>} checkpoint The stream progress
+   * @returns {Promise<void>}
+   */
+  async saveStreamSyncCheckpoint(
+    checkpoint: Omit<IStreamSyncCheckpoint, 'height' | 'historyCount' | 'timestamp'>
+  ): Promise<void> {
+    await this.store.setItem(STREAM_SYNC_CHECKPOINT_KEY, {
+      ...checkpoint,
+      height: await this.store.getCurrentHeight(),
+      historyCount: await this.store.historyCount(),
+      timestamp: Math.floor(Date.now() / 1000),
     });
   }
 
+  /**
+   * Remove the stream sync checkpoint, should be called when the stream finishes.
+   *
+   * @returns {Promise<void>}
+   */
+  async cleanStreamSyncCheckpoint(): Promise<void> {
+    await this.store.setItem(STREAM_SYNC_CHECKPOINT_KEY, null);
+  }
+
   /**
    * Iterate on all tokens on the storage.
    *
@@ -571,7 +1008,13 @@ export class Storage implements IStorage {
   async unlockUtxos(height: number): Promise<void> {
     // Will wait for the previous execution to finish before starting the next one
     // This is to prevent multiple calls to this method to run in parallel and "double unlock" utxos
-    this.utxoUnlockWait = this.utxoUnlockWait.then(() => this.processLockedUtxos(height));
+    // A failed execution is logged so the next ones still run, the utxos not unlocked are
+    // visited again by them.
+    this.utxoUnlockWait = this.utxoUnlockWait
+      .then(() => this.processLockedUtxos(height))
+      .catch(err => {
+        this.logger.error('Error unlocking utxos:', err);
+      });
   }
 
   /**
@@ -879,21 +1322,65 @@ export class Storage implements IStorage {
   }
 
   /**
-   * Iterate over all locked utxos and unlock them if needed
+   * Iterate over the locked utxos and unlock them if needed
    * When a utxo is unlocked, the balances and metadatas are updated
    * and the utxo is removed from the locked utxos.
    *
+   * If the store keeps a schedule of the locked utxos only the utxos that unlock
+   * are visited, otherwise all locked utxos are checked.
+   *
    * @param {number} height The new height of the best chain
    */
   async processLockedUtxos(height: number): Promise<void> {
-    const nowTs = Math.floor(Date.now() / 1000);
-    for await (const lockedUtxo of this.store.iterateLockedUtxos()) {
-      await processUtxoUnlock(this, lockedUtxo, {
-        nowTs,
-        rewardLock: this.version?.reward_spend_min_blocks || 0,
-        currentHeight: height,
-      });
+    const options = {
+      nowTs: Math.floor(Date.now() / 1000),
+      rewardLock: this.version?.reward_spend_min_blocks || 0,
+      currentHeight: height,
+    };
+    const iter = this.store.iterateUnlockableUtxos
+      ? this.store.iterateUnlockableUtxos(options)
+      : this.store.iterateLockedUtxos();
+    for await (const lockedUtxo of iter) {
+      await processUtxoUnlock(this, lockedUtxo, options);
+    }
+    await this.scheduleTimelockUnlock();
+  }
+
+  /**
+   * Start a timer to unlock the timelocked utxos as soon as the earliest timelock
+   * expires, instead of waiting for the next block.
+   * Only available when the store keeps a schedule of the locked utxos.
+   *
+   * @returns {Promise<void>}
+   */
+  async scheduleTimelockUnlock(): Promise<void> {
+    if (!this.store.getNextUnlockTimestamp) {
+      return;
+    }
+    if (this.timelockUnlockTimer) {
+      clearTimeout(this.timelockUnlockTimer);
+      this.timelockUnlockTimer = null;
+    }
+    const timelock = await this.store.getNextUnlockTimestamp();
+    if (timelock === null) {
+      return;
     }
+    // The timelock is in seconds, setTimeout cannot wait more than 2^31-1 ms
+    // so far away timelocks will just schedule the timer again.
+    const delay = Math.min(Math.max(timelock * 1000 - Date.now(), 0), MAX_TIMER_DELAY);
+    const timer = setTimeout(() => {
+      this.timelockUnlockTimer = null;
+      this.getCurrentHeight()
+        .then(height => this.unlockUtxos(height))
+        .catch(err => {
+          this.logger.error('Error unlocking timelocked utxos:', err);
+        });
+    }, delay);
+    // The timer alone should not keep a nodejs process running
+    if (typeof timer === 'object' && timer.unref) {
+      timer.unref();
+    }
+    this.timelockUnlockTimer = timer;
   }
 
   /**
@@ -1126,9 +1613,17 @@ export class Storage implements IStorage {
       connection.removeMetricsHandlers();
     }
     this.version = null;
+    this.closeSigningSession();
+    if (this.timelockUnlockTimer) {
+      clearTimeout(this.timelockUnlockTimer);
+      this.timelockUnlockTimer = null;
+    }
     if (cleanStorage || cleanAddresses || cleanTokens) {
       await this.cleanStorage(cleanStorage, cleanAddresses, cleanTokens);
     }
+    if (this.store.flush) {
+      await this.store.flush();
+    }
   }
 
   /**
@@ -1144,6 +1639,15 @@ export class Storage implements IStorage {
     cleanAddresses: boolean = false,
     cleanTokens: boolean = false
   ): Promise<void> {
+    if (cleanHistory) {
+      // The checkpoint, journal and tracked changes describe the history being removed
+      await this.store.setItem(SYNC_CHECKPOINT_KEY, null);
+      this.txJournal.clear();
+      this.syncChanges = null;
+    }
+    if (cleanHistory || cleanAddresses) {
+      await this.cleanStreamSyncCheckpoint();
+    }
     return this.store.cleanStorage(cleanHistory, cleanAddresses, cleanTokens);
   }
 
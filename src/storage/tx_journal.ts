@@ -0,0 +1,225 @@
+/**
+ * Copyright (c) Hathor Labs and its affiliates.
+ *
+ * This source code is licensed under the MIT license found in the
+ * LICENSE file in the root directory of this source tree.
+ */
+
+import { IUtxo, OutputValueType } from '../types';
+
+/**
+ * Balance change of a single output or input on one address and token.
+ */
+export interface ITxBalanceEffect {
+  address: string;
+  token: string;
+  value: OutputValueType;
+  isAuthority: boolean;
+  isMint: boolean;
+  isMelt: boolean;
+}
+
+/**
+ * An output credited to the wallet by the tx.
+ */
+export interface ITxCreditEffect extends ITxBalanceEffect {
+  // On-chain index of the output
+  index: number;
+  // If the balance was credited as locked and it was not unlocked yet.
+  locked: boolean;
+  // The utxo that represents this output, saved while the output is unspent.
+  utxo: IUtxo;
+}
+
+/**
+ * An input spending an output of the wallet.
+ */
+export interface ITxDebitEffect extends ITxBalanceEffect {
+  // Output being spent
+  txId: string;
+  index: number;
+}
+
+/**
+ * Everything processing a tx changed on the store.
+ */
+export interface ITxEffects {
+  credits: ITxCreditEffect[];
+  debits: ITxDebitEffect[];
+  // Tokens and addresses that had `numTransactions` incremented by the tx
+  tokens: Set<string>;
+  addresses: Set<string>;
+}
+
+/**
+ * Journal of the effects each processed tx had on the store metadata.
+ *
+ * Processing a tx is additive (balances, counters and utxos), so undoing a tx
+ * requires knowing exactly what was added. With this journal a tx that gets
+ * voided or unvoided can be reverted and reapplied without replaying the whole
+ * history. The inputs are also indexed by the tx they spend, so the txs depending
+ * on a tx can be reverted and reapplied along with it.
+ *
+ * The journal is kept in memory and is rebuilt on every full history processing,
+ * a tx without an entry must be handled with a full `processHistory`.
+ */
+export class TxEffectsJournal {
+  /**
+   * Map<txId, ITxEffects>
+   */
+  effects: Map<string, ITxEffects>;
+
+  /**
+   * Reverse index of the debits on the journal.
+   * Map<spent txId, Set<spending txId>>
+   */
+  dependants: Map<string, Set<string>>;
+
+  constructor() {
+    this.effects = new Map<string, ITxEffects>();
+    this.dependants = new Map<string, Set<string>>();
+  }
+
+  /**
+   * Start recording the effects of a tx, discarding any previous record.
+   * @param {string} txId The tx being processed
+   * @returns {ITxEffects} The record to be filled while processing the tx
+   */
+  begin(txId: string): ITxEffects {
+    this.delete(txId);
+    const record: ITxEffects = {
+      credits: [],
+      debits: [],
+      tokens: new Set<string>(),
+      addresses: new Set<string>(),
+    };
+    this.effects.set(txId, record);
+    return record;
+  }
+
+  /**
+   * Check that we have the effects of a tx.
+   * @param {string} txId The tx id
+   * @returns {boolean}
+   */
+  has(txId: string): boolean {
+    return this.effects.has(txId);
+  }
+
+  /**
+   * Get the recorded effects of a tx.
+   * @param {string} txId The tx id
+   * @returns {ITxEffects|null}
+   */
+  get(txId: string): ITxEffects | null {
+    return this.effects.get(txId) ?? null;
+  }
+
+  /**
+   * Record an input of the tx spending an output of the wallet.
+   * @param {string} txId The tx being processed
+   * @param {ITxDebitEffect} debit The debit of the input
+   */
+  addDebit(txId: string, debit: ITxDebitEffect): void {
+    const record = this.effects.get(txId);
+    if (!record) {
+      return;
+    }
+    record.debits.push(debit);
+    let spending = this.dependants.get(debit.txId);
+    if (!spending) {
+      spending = new Set<string>();
+      this.dependants.set(debit.txId, spending);
+    }
+    spending.add(txId);
+  }
+
+  /**
+   * Remove the effects of a tx from the journal.
+   * @param {string} txId The tx id
+   */
+  delete(txId: string): void {
+    const record = this.effects.get(txId);
+    if (!record) {
+      return;
+    }
+    for (const debit of record.debits) {
+      const spending = this.dependants.get(debit.txId);
+      if (!spending) continue;
+      spending.delete(txId);
+      if (spending.size === 0) {
+        this.dependants.delete(debit.txId);
+      }
+    }
+    this.effects.delete(txId);
+  }
+
+  /**
+   * Find the credit of an output.
+   * @param {string} txId The tx id
+   * @param {number} index The on-chain index of the output
+   * @returns {ITxCreditEffect|null}
+   */
+  getCredit(txId: string, index: number): ITxCreditEffect | null {
+    const record = this.effects.get(txId);
+    if (!record) {
+      return null;
+    }
+    return record.credits.find(credit => credit.index === index) ?? null;
+  }
+
+  /**
+   * Check if other txs on the journal spent outputs of a tx.
+   * @param {string} txId The tx id
+   * @returns {boolean}
+   */
+  hasDependants(txId: string): boolean {
+    return this.dependants.has(txId);
+  }
+
+  /**
+   * Get a tx and all txs on the journal that depend on it, directly or through other
+   * txs, in topological order, i.e. every tx comes after the txs whose outputs it spent.
+   * @param {string} txId The tx id
+   * @returns {string[]} The tx ids, starting with `txId`
+   */
+  getDependantClosure(txId: string): string[] {
+    const spendingOf = (id: string) => (this.dependants.get(id) ?? new Set<string>()).values();
+    // Iterative depth-first search, the reversed post-order is a topological order.
+    const order: string[] = [];
+    const visited = new Set<string>([txId]);
+    const stack: [string, Iterator<string>][] = [[txId, spendingOf(txId)]];
+    while (stack.length > 0) {
+      const [current, spending] = stack[stack.length - 1];
+      const next = spending.next();
+      if (next.done) {
+        stack.pop();
+        order.push(current);
+      } else if (!visited.has(next.value)) {
+        visited.add(next.value);
+        stack.push([next.value, spendingOf(next.value)]);
+      }
+    }
+    return order.reverse();
+  }
+
+  /**
+   * Register that a locked output had its balance unlocked.
+   * @param {string} txId The tx id
+   * @param {number} index The on-chain index of the output
+   */
+  markUnlocked(txId: string, index: number): void {
+    const credit = this.getCredit(txId, index);
+    if (credit) {
+      credit.locked = false;
+    }
+  }
+
+  /**
+   * Remove all recorded effects.
+   */
+  clear(): void {
+    this.effects = new Map<string, ITxEffects>();
+    this.dependants = new Map<string, Set<string>>();
+  }
+}
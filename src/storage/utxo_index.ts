@@ -0,0 +1,424 @@
+/**
+ * Copyright (c) Hathor Labs and its affiliates.
+ *
+ * This source code is licensed under the MIT license found in the
+ * LICENSE file in the root directory of this source tree.
+ */
+
+import { IUtxo, OutputValueType } from '../types';
+
+/**
+ * Maximum number of levels of the skip list, enough for 2^32 utxos of a token.
+ */
+const MAX_LEVEL = 32;
+
+interface IUtxoIndexEntry {
+  key: string;
+  utxo: IUtxo;
+  // Value of the utxo when the entry was created, the entry position on the skip list.
+  value: OutputValueType;
+  // Insertion sequence, used to keep the insertion order between utxos with the same value.
+  seq: number;
+  // Creation counter of the entry, entries created after an iteration started are not yielded.
+  version: number;
+  // If the entry was removed, iterators holding it skip it and follow its links.
+  removed: boolean;
+  // Next entry on each level of the skip list.
+  next: (IUtxoIndexEntry | null)[];
+  // Previous entry on the first level of the skip list.
+  prev: IUtxoIndexEntry | null;
+}
+
+/**
+ * Utxos of a single token, kept in insertion order and sorted by value.
+ *
+ * The sorted order is a skip list keyed by (value, seq), so saving and removing an utxo is
+ * O(log n) and iterating on a range is O(log n) to find its start plus the utxos visited.
+ *
+ * Removed entries keep their links, so an iteration in progress continues from them to the
+ * entries still on the list without copying the range.
+ */
+class TokenUtxos {
+  /**
+   * Map<utxoid, IUtxoIndexEntry> in insertion order.
+   */
+  entries: Map<string, IUtxoIndexEntry>;
+
+  /**
+   * Sentinel before the first entry of the skip list.
+   */
+  head: IUtxoIndexEntry;
+
+  /**
+   * Last entry of the skip list, null when empty.
+   */
+  tail: IUtxoIndexEntry | null;
+
+  /**
+   * Number of levels in use on the skip list.
+   */
+  level: number;
+
+  /**
+   * Counter of created entries.
+   */
+  version: number;
+
+  constructor() {
+    this.entries = new Map<string, IUtxoIndexEntry>();
+    this.version = 0;
+    this.head = this.createEntry('', null as unknown as IUtxo, 0n, -Infinity, MAX_LEVEL);
+    this.tail = null;
+    this.level = 1;
+  }
+
+  get size(): number {
+    return this.entries.size;
+  }
+
+  createEntry(
+    key: string,
+    utxo: IUtxo,
+    value: OutputValueType,
+    seq: number,
+    levels: number
+  ): IUtxoIndexEntry {
+    return {
+      key,
+      utxo,
+      value,
+      seq,
+      version: this.version++,
+      removed: false,
+      next: new Array(levels).fill(null),
+      prev: null,
+    };
+  }
+
+  /**
+   * Random number of levels of a new entry, each level has half the entries of the one below.
+   */
+  // eslint-disable-next-line class-methods-use-this
+  randomLevels(): number {
+    let levels = 1;
+    while (levels < MAX_LEVEL && Math.random() < 0.5) {
+      levels++;
+    }
+    return levels;
+  }
+
+  /**
+   * Find the last entry on each level that comes before the given value and sequence.
+   * The head is returned for the levels without such an entry.
+   */
+  findPredecessors(value: OutputValueType, seq: number): IUtxoIndexEntry[] {
+    const update: IUtxoIndexEntry[] = new Array(this.level);
+    let node = this.head;
+    for (let l = this.level - 1; l >= 0; l--) {
+      let next = node.next[l];
+      while (next !== null && (next.value < value || (next.value === value && next.seq < seq))) {
+        node = next;
+        next = node.next[l];
+      }
+      update[l] = node;
+    }
+    return update;
+  }
+
+  /**
+   * Find the first entry that does not come before the given value and sequence.
+   */
+  lowerBound(value: OutputValueType, seq: number): IUtxoIndexEntry | null {
+    return this.findPredecessors(value, seq)[0].next[0];
+  }
+
+  /**
+   * Save an utxo, an utxo already saved with the same id is updated in place.
+   *
+   * @param {string} key The utxo id
+   * @param {IUtxo} utxo The utxo
+   * @param {number} seq Insertion sequence, only used if the utxo is new.
+   */
+  set(key: string, utxo: IUtxo, seq: number): void {
+    const current = this.entries.get(key);
+    if (current) {
+      this.unlink(current);
+    }
+    const entry = this.createEntry(
+      key,
+      utxo,
+      utxo.value,
+      current ? current.seq : seq,
+      this.randomLevels()
+    );
+    // Setting an existing key keeps its insertion order
+    this.entries.set(key, entry);
+    this.link(entry);
+  }
+
+  remove(key: string): IUtxoIndexEntry | null {
+    const entry = this.entries.get(key);
+    if (!entry) {
+      return null;
+    }
+    this.entries.delete(key);
+    this.unlink(entry);
+    return entry;
+  }
+
+  link(entry: IUtxoIndexEntry): void {
+    const levels = entry.next.length;
+    const update = this.findPredecessors(entry.value, entry.seq);
+    for (let l = this.level; l < levels; l++) {
+      update[l] = this.head;
+    }
+    this.level = Math.max(this.level, levels);
+    for (let l = 0; l < levels; l++) {
+      entry.next[l] = update[l].next[l];
+      update[l].next[l] = entry;
+    }
+    entry.prev = update[0] === this.head ? null : update[0];
+    if (entry.next[0] !== null) {
+      entry.next[0].prev = entry;
+    } else {
+      this.tail = entry;
+    }
+  }
+
+  /**
+   * Remove an entry from the skip list.
+   * The links of the entry are kept for the iterations holding it.
+   */
+  unlink(entry: IUtxoIndexEntry): void {
+    const update = this.findPredecessors(entry.value, entry.seq);
+    for (let l = 0; l < entry.next.length; l++) {
+      if (update[l].next[l] === entry) {
+        update[l].next[l] = entry.next[l];
+      }
+    }
+    if (entry.next[0] !== null) {
+      entry.next[0].prev = entry.prev;
+    } else {
+      this.tail = entry.prev;
+    }
+    entry.removed = true;
+    while (this.level > 1 && this.head.next[this.level - 1] === null) {
+      this.level--;
+    }
+  }
+
+  /**
+   * Iterate on the utxos ordered by value.
+   * Utxos with the same value are yielded in insertion order on both directions.
+   *
+   * Utxos saved during the iteration are not yielded and utxos removed during the iteration
+   * are skipped.
+   *
+   * @param {'asc'|'desc'} order Direction of the iteration
+   * @param {Object} bounds Only utxos with value inside the (exclusive) bounds are yielded.
+   */
+  *iterSorted(
+    order: 'asc' | 'desc',
+    { biggerThan, smallerThan }: { biggerThan?: OutputValueType; smallerThan?: OutputValueType }
+  ): Generator<IUtxo> {
+    const startVersion = this.version;
+    const isVisible = (entry: IUtxoIndexEntry) => !entry.removed && entry.version < startVersion;
+    // A zero bound is the same as no bound
+    const lower = biggerThan || null;
+    const upper = smallerThan || null;
+
+    if (order === 'asc') {
+      // First utxo with value > biggerThan
+      let entry = lower !== null ? this.lowerBound(lower, Infinity) : this.head.next[0];
+      while (entry !== null && (upper === null || entry.value < upper)) {
+        if (isVisible(entry)) {
+          yield entry.utxo;
+        }
+        entry = entry.next[0];
+      }
+      return;
+    }
+
+    // Last utxo with value < smallerThan
+    const end = upper !== null ? this.lowerBound(upper, -Infinity) : null;
+    let entry = end !== null ? end.prev : this.tail;
+    while (entry !== null && (lower === null || entry.value > lower)) {
+      // Walk back to the first utxo with the same value to keep the insertion order
+      const group: IUtxoIndexEntry[] = [entry];
+      let first: IUtxoIndexEntry = entry;
+      while (first.prev !== null && first.prev.value === entry.value) {
+        first = first.prev;
+        group.push(first);
+      }
+      for (let i = group.length - 1; i >= 0; i--) {
+        if (isVisible(group[i])) {
+          yield group[i].utxo;
+        }
+      }
+      entry = first.prev;
+    }
+  }
+}
+
+/**
+ * Secondary indexes of the utxo set.
+ *
+ * Fund utxos are indexed per token (in insertion order and sorted by value),
+ * authority utxos are kept separate per token and all utxos are also indexed
+ * per address. This allows the utxo selection to only visit candidate utxos
+ * instead of scanning and sorting the whole wallet.
+ */
+export class UtxoIndex {
+  /**
+   * Map<token, TokenUtxos> for fund utxos.
+   */
+  funds: Map<string, TokenUtxos>;
+
+  /**
+   * Map<token, Map<utxoid, IUtxo>> for authority utxos.
+   */
+  authorities: Map<string, Map<string, IUtxo>>;
+
+  /**
+   * Map<address, Map<utxoid, IUtxo>>
+   */
+  addresses: Map<string, Map<string, IUtxo>>;
+
+  seq: number;
+
+  constructor() {
+    this.funds = new Map<string, TokenUtxos>();
+    this.authorities = new Map<string, Map<string, IUtxo>>();
+    this.addresses = new Map<string, Map<string, IUtxo>>();
+    this.seq = 0;
+  }
+
+  /**
+   * Add an utxo to the indexes.
+   * When replacing an utxo with the same id, the replaced utxo should be passed so
+   * the indexes are updated in place, keeping the insertion order as it would on a Map.
+   *
+   * @param {string} key The utxo id, `<txId>:<index>`
+   * @param {IUtxo} utxo The utxo
+   * @param {IUtxo|null} [replaced] The utxo currently saved with the same id
+   */
+  add(key: string, utxo: IUtxo, replaced: IUtxo | null = null): void {
+    if (
+      replaced &&
+      (replaced.token !== utxo.token ||
+        replaced.address !== utxo.address ||
+        (replaced.authorities === 0n) !== (utxo.authorities === 0n))
+    ) {
+      // The utxo moved to other indexes
+      this.remove(key, replaced);
+    }
+
+    if (utxo.authorities === 0n) {
+      if (!this.funds.has(utxo.token)) {
+        this.funds.set(utxo.token, new TokenUtxos());
+      }
+      this.funds.get(utxo.token)!.set(key, utxo, this.seq++);
+    } else {
+      if (!this.authorities.has(utxo.token)) {
+        this.authorities.set(utxo.token, new Map<string, IUtxo>());
+      }
+      this.authorities.get(utxo.token)!.set(key, utxo);
+    }
+
+    if (!this.addresses.has(utxo.address)) {
+      this.addresses.set(utxo.address, new Map<string, IUtxo>());
+    }
+    this.addresses.get(utxo.address)!.set(key, utxo);
+  }
+
+  /**
+   * Remove an utxo from the indexes.
+   *
+   * @param {string} key The utxo id, `<txId>:<index>`
+   * @param {IUtxo} utxo The utxo saved with this id
+   */
+  remove(key: string, utxo: IUtxo): void {
+    if (utxo.authorities === 0n) {
+      const tokenUtxos = this.funds.get(utxo.token);
+      if (tokenUtxos) {
+        tokenUtxos.remove(key);
+        if (tokenUtxos.size === 0) {
+          this.funds.delete(utxo.token);
+        }
+      }
+    } else {
+      const authorityUtxos = this.authorities.get(utxo.token);
+      if (authorityUtxos) {
+        authorityUtxos.delete(key);
+        if (authorityUtxos.size === 0) {
+          this.authorities.delete(utxo.token);
+        }
+      }
+    }
+
+    const addressUtxos = this.addresses.get(utxo.address);
+    if (addressUtxos) {
+      addressUtxos.delete(key);
+      if (addressUtxos.size === 0) {
+        this.addresses.delete(utxo.address);
+      }
+    }
+  }
+
+  /**
+   * Iterate on the fund utxos of a token in insertion order.
+   * @param {string} token The token uid
+   */
+  *iterFunds(token: string): Generator<IUtxo> {
+    const tokenUtxos = this.funds.get(token);
+    if (!tokenUtxos) {
+      return;
+    }
+    for (const entry of tokenUtxos.entries.values()) {
+      yield entry.utxo;
+    }
+  }
+
+  /**
+   * Iterate on the fund utxos of a token ordered by value.
+   *
+   * @param {string} token The token uid
+   * @param {'asc'|'desc'} order Direction of the iteration
+   * @param {Object} bounds Only utxos with value inside the (exclusive) bounds are yielded.
+   */
+  *iterFundsByValue(
+    token: string,
+    order: 'asc' | 'desc',
+    bounds: { biggerThan?: OutputValueType; smallerThan?: OutputValueType } = {}
+  ): Generator<IUtxo> {
+    const tokenUtxos = this.funds.get(token);
+    if (!tokenUtxos) {
+      return;
+    }
+    yield* tokenUtxos.iterSorted(order, bounds);
+  }
+
+  /**
+   * Iterate on the authority utxos of a token in insertion order.
+   * @param {string} token The token uid
+   */
+  *iterAuthorities(token: string): Generator<IUtxo> {
+    const authorityUtxos = this.authorities.get(token);
+    if (!authorityUtxos) {
+      return;
+    }
+    yield* authorityUtxos.values();
+  }
+
+  /**
+   * Iterate on all utxos of an address in insertion order.
+   * @param {string} address The address in base58
+   */
+  *iterAddress(address: string): Generator<IUtxo> {
+    const addressUtxos = this.addresses.get(address);
+    if (!addressUtxos) {
+      return;
+    }
+    yield* addressUtxos.values();
+  }
+}
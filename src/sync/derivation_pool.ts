@@ -0,0 +1,409 @@
+/**
+ * Copyright (c) Hathor Labs and its affiliates.
+ *
+ * This source code is licensed under the MIT license found in the
+ * LICENSE file in the root directory of this source tree.
+ */
+import { HDPublicKey } from 'bitcore-lib';
+import Network from '../models/network';
+import {
+  IAddressDerivationPool,
+  IAddressInfo,
+  IMultisigData,
+  IShieldedAddressPair,
+} from '../types';
+import { prepareP2SHChangeNodes, buildP2SHRedeemScriptAtIndex } from '../utils/scripts';
+import {
+  publicKeyToP2PKH,
+  redeemScriptToP2SHAddress,
+  deriveShieldedAddressPair,
+} from '../utils/address';
+
+// Number of addresses derived by a single worker task.
+const DEFAULT_TASK_SIZE = 20;
+
+// Upper bound of workers spawned by default, each worker holds its own copy of the crypto libs.
+const MAX_DEFAULT_WORKERS = 4;
+
+export type DerivationTask =
+  | { kind: 'p2pkh'; startIndex: number; count: number; networkName: string; xpubkey: string }
+  | {
+      kind: 'p2sh';
+      startIndex: number;
+      count: number;
+      networkName: string;
+      multisigData: IMultisigData;
+    }
+  | {
+      kind: 'shielded';
+      startIndex: number;
+      count: number;
+      networkName: string;
+      scanXpub: string;
+      spendXpub: string;
+    };
+
+interface IDerivationJob {
+  task: DerivationTask;
+  resolve: (result: IAddressInfo[] | IShieldedAddressPair[]) => void;
+  reject: (err: Error) => void;
+}
+
+/**
+ * Derive the P2PKH addresses for the index range [startIndex, startIndex + count).
+ * The xpub is parsed once for the whole range.
+ */
+export function deriveP2PKHAddresses(
+  xpubkey: string,
+  startIndex: number,
+  count: number,
+  networkName: string
+): IAddressInfo[] {
+  const network = new Network(networkName);
+  const hdpubkey = new HDPublicKey(xpubkey);
+  const addresses: IAddressInfo[] = [];
+  for (let i = startIndex; i < startIndex + count; i++) {
+    const key = hdpubkey.deriveChild(i);
+    addresses.push({
+      base58: publicKeyToP2PKH(key.publicKey, network),
+      bip32AddressIndex: i,
+      publicKey: key.publicKey.toString('hex'),
+    });
+  }
+  return addresses;
+}
+
+/**
+ * Derive the multisig (P2SH) addresses for the index range [startIndex, startIndex + count).
+ * The participants xpubs are parsed once for the whole range.
+ */
+export function deriveP2SHAddresses(
+  multisigData: IMultisigData,
+  startIndex: number,
+  count: number,
+  networkName: string
+): IAddressInfo[] {
+  const network = new Network(networkName);
+  const changeNodes = prepareP2SHChangeNodes(multisigData.pubkeys);
+  const addresses: IAddressInfo[] = [];
+  for (let i = startIndex; i < startIndex + count; i++) {
+    const redeemScript = buildP2SHRedeemScriptAtIndex(changeNodes, multisigData.numSignatures, i);
+    addresses.push({
+      base58: redeemScriptToP2SHAddress(redeemScript, network),
+      bip32AddressIndex: i,
+    });
+  }
+  return addresses;
+}
+
+/**
+ * Derive the shielded address pairs for the index range [startIndex, startIndex + count).
+ * The scan and spend xpubs are parsed once for the whole range.
+ */
+export function deriveShieldedAddressPairs(
+  scanXpub: string,
+  spendXpub: string,
+  startIndex: number,
+  count: number,
+  networkName: string
+): IShieldedAddressPair[] {
+  const scanHdPub = new HDPublicKey(scanXpub);
+  const spendHdPub = new HDPublicKey(spendXpub);
+  const pairs: IShieldedAddressPair[] = [];
+  for (let i = startIndex; i < startIndex + count; i++) {
+    pairs.push(deriveShieldedAddressPair(scanHdPub, spendHdPub, i, networkName));
+  }
+  return pairs;
+}
+
+/**
+ * Run a derivation task on the current thread.
+ * This is also the entrypoint of the derivation workers.
+ */
+export function runDerivationTask(task: DerivationTask): IAddressInfo[] | IShieldedAddressPair[] {
+  switch (task.kind) {
+    case 'p2pkh':
+      return deriveP2PKHAddresses(task.xpubkey, task.startIndex, task.count, task.networkName);
+    case 'p2sh':
+      return deriveP2SHAddresses(task.multisigData, task.startIndex, task.count, task.networkName);
+    case 'shielded':
+      return deriveShieldedAddressPairs(
+        task.scanXpub,
+        task.spendXpub,
+        task.startIndex,
+        task.count,
+        task.networkName
+      );
+    default:
+      throw new Error('Unknown derivation task');
+  }
+}
+
+/**
+ * Load the node modules required to run the derivation workers.
+ * Returns null when they are not available (e.g. browser and react-native).
+ */
+function loadWorkerModules(): {
+  Worker: typeof import('worker_threads').Worker;
+  availableParallelism: () => number;
+  workerExists: (workerPath: string) => boolean;
+  defaultWorkerPath: string;
+} | null {
+  try {
+    /* eslint-disable global-require, @typescript-eslint/no-var-requires */
+    const { Worker } = require('worker_threads');
+    const os = require('os');
+    const fs = require('fs');
+    const path = require('path');
+    /* eslint-enable global-require, @typescript-eslint/no-var-requires */
+    return {
+      Worker,
+      availableParallelism: () =>
+        typeof os.availableParallelism === 'function'
+          ? os.availableParallelism()
+          : os.cpus().length,
+      workerExists: (workerPath: string) => fs.existsSync(workerPath),
+      defaultWorkerPath: path.join(__dirname, 'derivation_worker.js'),
+    };
+  } catch (err) {
+    return null;
+  }
+}
+
+/**
+ * Pool of `worker_threads` to derive addresses off the main event loop.
+ *
+ * Derivation requests are split in tasks of `taskSize` addresses which are derived in
+ * parallel by the workers, so the sync can derive the next batches of addresses while
+ * the other wallets on the process keep running.
+ *
+ * When worker threads are not available (browser, react-native or the compiled worker
+ * is missing) the pool derives the addresses on the current thread, yielding to the
+ * event loop between tasks.
+ */
+export class AddressDerivationPool implements IAddressDerivationPool {
+  size: number;
+
+  taskSize: number;
+
+  workerPath: string | null;
+
+  workers: import('worker_threads').Worker[];
+
+  idleWorkers: import('worker_threads').Worker[];
+
+  /**
+   * Map<worker, job running on the worker>
+   */
+  running: Map<import('worker_threads').Worker, IDerivationJob>;
+
+  pending: IDerivationJob[];
+
+  isParallel: boolean;
+
+  modules: ReturnType<typeof loadWorkerModules>;
+
+  /**
+   * @param {Object} [options]
+   * @param {number} [options.size] Number of workers, defaults to the available cores minus one
+   *                                (at most 4).
+   * @param {number} [options.taskSize=20] Number of addresses derived by each task.
+   * @param {string} [options.workerPath] Path of the compiled worker script.
+   */
+  constructor({
+    size,
+    taskSize = DEFAULT_TASK_SIZE,
+    workerPath,
+  }: { size?: number; taskSize?: number; workerPath?: string } = {}) {
+    this.modules = loadWorkerModules();
+    this.workerPath = workerPath ?? this.modules?.defaultWorkerPath ?? null;
+    this.taskSize = taskSize;
+    this.workers = [];
+    this.idleWorkers = [];
+    this.running = new Map();
+    this.pending = [];
+
+    const defaultSize = this.modules
+      ? Math.min(MAX_DEFAULT_WORKERS, this.modules.availableParallelism() - 1)
+      : 0;
+    this.size = Math.max(0, size ?? defaultSize);
+    this.isParallel =
+      this.size > 0 &&
+      this.modules !== null &&
+      this.workerPath !== null &&
+      this.modules.workerExists(this.workerPath);
+  }
+
+  /**
+   * Derive P2PKH addresses.
+   *
+   * @param {string} xpubkey The xpub of the wallet (at the change level)
+   * @param {number} startIndex The first index to derive
+   * @param {number} count The number of addresses to derive
+   * @param {string} networkName The network name
+   * @returns {Promise<IAddressInfo[]>}
+   */
+  async deriveP2PKH(
+    xpubkey: string,
+    startIndex: number,
+    count: number,
+    networkName: string
+  ): Promise<IAddressInfo[]> {
+    return this.run<IAddressInfo>({ kind: 'p2pkh', startIndex, count, networkName, xpubkey });
+  }
+
+  /**
+   * Derive multisig (P2SH) addresses.
+   *
+   * @param {IMultisigData} multisigData The multisig data of the wallet
+   * @param {number} startIndex The first index to derive
+   * @param {number} count The number of addresses to derive
+   * @param {string} networkName The network name
+   * @returns {Promise<IAddressInfo[]>}
+   */
+  async deriveP2SH(
+    multisigData: IMultisigData,
+    startIndex: number,
+    count: number,
+    networkName: string
+  ): Promise<IAddressInfo[]> {
+    return this.run<IAddressInfo>({
+      kind: 'p2sh',
+      startIndex,
+      count,
+      networkName,
+      multisigData: { pubkeys: multisigData.pubkeys, numSignatures: multisigData.numSignatures },
+    });
+  }
+
+  /**
+   * Derive shielded address pairs.
+   *
+   * @param {string} scanXpub The scan xpub of the wallet
+   * @param {string} spendXpub The spend xpub of the wallet
+   * @param {number} startIndex The first index to derive
+   * @param {number} count The number of pairs to derive
+   * @param {string} networkName The network name
+   * @returns {Promise<IShieldedAddressPair[]>}
+   */
+  async deriveShieldedPairs(
+    scanXpub: string,
+    spendXpub: string,
+    startIndex: number,
+    count: number,
+    networkName: string
+  ): Promise<IShieldedAddressPair[]> {
+    return this.run<IShieldedAddressPair>({
+      kind: 'shielded',
+      startIndex,
+      count,
+      networkName,
+      scanXpub,
+      spendXpub,
+    });
+  }
+
+  /**
+   * Stop all workers, pending derivations are rejected.
+   */
+  async terminate(): Promise<void> {
+    const jobs = [...this.pending, ...this.running.values()];
+    this.pending = [];
+    this.running.clear();
+    for (const job of jobs) {
+      job.reject(new Error('Derivation pool terminated'));
+    }
+    const workers = this.workers;
+    this.workers = [];
+    this.idleWorkers = [];
+    await Promise.all(workers.map(worker => worker.terminate()));
+  }
+
+  /**
+   * Split the task in chunks of `taskSize` addresses and derive them concurrently.
+   */
+  private async run<T>(task: DerivationTask): Promise<T[]> {
+    const tasks: DerivationTask[] = [];
+    const stopIndex = task.startIndex + task.count;
+    for (let start = task.startIndex; start < stopIndex; start += this.taskSize) {
+      const count = Math.min(this.taskSize, stopIndex - start);
+      tasks.push({ ...task, startIndex: start, count });
+    }
+    const results = await Promise.all(tasks.map(t => this.schedule(t)));
+    return (results as T[][]).flat();
+  }
+
+  private schedule(task: DerivationTask): Promise<IAddressInfo[] | IShieldedAddressPair[]> {
+    if (!this.isParallel) {
+      // Yield to the event loop so each task runs on its own macrotask
+      return new Promise((resolve, reject) => {
+        setTimeout(() => {
+          try {
+            resolve(runDerivationTask(task));
+          } catch (err) {
+            reject(err);
+          }
+        }, 0);
+      });
+    }
+    return new Promise((resolve, reject) => {
+      this.pending.push({ task, resolve, reject });
+      this.dispatch();
+    });
+  }
+
+  private dispatch(): void {
+    while (this.pending.length > 0) {
+      const worker = this.idleWorkers.pop() ?? this.spawnWorker();
+      if (!worker) {
+        return;
+      }
+      const job = this.pending.shift()!;
+      this.running.set(worker, job);
+      // A worker running a derivation keeps the process alive until the result arrives
+      worker.ref();
+      worker.postMessage(job.task);
+    }
+  }
+
+  private spawnWorker(): import('worker_threads').Worker | null {
+    if (this.workers.length >= this.size) {
+      return null;
+    }
+    const worker = new this.modules!.Worker(this.workerPath!);
+    worker.on('message', (message: { result?: IAddressInfo[]; error?: string }) => {
+      const job = this.running.get(worker);
+      this.running.delete(worker);
+      this.idleWorkers.push(worker);
+      // Idle workers should not keep the process alive
+      worker.unref();
+      if (job) {
+        if (message.error !== undefined) {
+          job.reject(new Error(message.error));
+        } else {
+          job.resolve(message.result!);
+        }
+      }
+      this.dispatch();
+    });
+    worker.on('error', (err: Error) => {
+      this.removeWorker(worker, err);
+    });
+    worker.on('exit', () => {
+      this.removeWorker(worker, new Error('Derivation worker exited'));
+    });
+    this.workers.push(worker);
+    return worker;
+  }
+
+  private removeWorker(worker: import('worker_threads').Worker, err: Error): void {
+    const job = this.running.get(worker);
+    this.running.delete(worker);
+    this.workers = this.workers.filter(w => w !== worker);
+    this.idleWorkers = this.idleWorkers.filter(w => w !== worker);
+    if (job) {
+      job.reject(err);
+    }
+    this.dispatch();
+  }
+}
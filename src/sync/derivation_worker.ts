@@ -0,0 +1,24 @@
+/**
+ * Copyright (c) Hathor Labs and its affiliates.
+ *
+ * This source code is licensed under the MIT license found in the
+ * LICENSE file in the root directory of this source tree.
+ */
+
+/**
+ * Entrypoint of the AddressDerivationPool workers.
+ * Each message is a derivation task and is answered with its result or error message.
+ */
+import { parentPort } from 'worker_threads';
+import { DerivationTask, runDerivationTask } from './derivation_pool';
+
+if (parentPort) {
+  const port = parentPort;
+  port.on('message', (task: DerivationTask) => {
+    try {
+      port.postMessage({ result: runDerivationTask(task) });
+    } catch (err) {
+      port.postMessage({ error: err instanceof Error ? err.message : String(err) });
+    }
+  });
+}
@@ -4,12 +4,13 @@
  * This source code is licensed under the MIT license found in the
  * LICENSE file in the root directory of this source tree.
  */
-import PromiseQueue from '../models/promise_queue';
+import SyncScheduler from './scheduler';
+import { SYNC_SCHEDULER_CONCURRENCY } from '../constants';
 
-const MAX_CONCURRENT_LOAD_TASKS = 3;
-
-const GLL = new PromiseQueue();
-GLL.concurrent = MAX_CONCURRENT_LOAD_TASKS;
+/**
+ * Scheduler of the wallets that were not given one, shared by all of them.
+ */
+const GLL = new SyncScheduler({ concurrency: SYNC_SCHEDULER_CONCURRENCY });
 
 export default GLL;
 
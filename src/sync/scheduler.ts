@@ -0,0 +1,320 @@
+/**
+ * Copyright (c) Hathor Labs and its affiliates.
+ *
+ * This source code is licensed under the MIT license found in the
+ * LICENSE file in the root directory of this source tree.
+ */
+import EventEmitter from 'events';
+import PromiseQueue from '../models/promise_queue';
+import { SYNC_SCHEDULER_CONCURRENCY, SYNC_SCHEDULER_CPU_WINDOW } from '../constants';
+import { ISyncSchedulerOptions, ISyncTaskOptions } from '../types';
+
+type SyncTask<T> = (options?: { signal?: AbortSignal }) => PromiseLike<T> | T;
+
+interface ISyncJob {
+  owner: unknown;
+  run: () => Promise<void>;
+}
+
+interface IOwnerState {
+  queued: number;
+  running: number;
+  // Order in which the owner last started a task, 0 if it didn't start any.
+  lastStart: number;
+}
+
+/**
+ * Get the CPU time used by the process in ms, or null when the runtime doesn't report it.
+ */
+function getCpuTime(): number | null {
+  if (typeof process === 'undefined' || typeof process.cpuUsage !== 'function') {
+    return null;
+  }
+  const { user, system } = process.cpuUsage();
+  return (user + system) / 1000;
+}
+
+/**
+ * Runs the wallet sync tasks with a limited concurrency.
+ *
+ * - Tasks with a higher priority start first.
+ * - Tasks of the same priority take turns between their owners, the owner that waited the
+ *   longest since its last task starts next, and each owner runs at most `maxTasksPerOwner`
+ *   tasks at a time. So a wallet with a big history does not delay the sync of the other
+ *   wallets sharing the scheduler.
+ * - With a `cpuBudget`, new tasks wait while the process CPU usage is over the budget.
+ *
+ * SyncScheduler is also an EventEmitter for the events:
+ * - job_start: When a task starts running.
+ * - finished_job: When a task finishes.
+ * - idle: When all tasks are done and there are no more tasks to run.
+ */
+export class SyncScheduler extends EventEmitter {
+  #concurrency: number = SYNC_SCHEDULER_CONCURRENCY;
+
+  maxTasksPerOwner: number;
+
+  cpuBudget: number | null;
+
+  cpuWindow: number;
+
+  /**
+   * Map<priority, Map<owner, tasks>>
+   */
+  #queues: Map<number, Map<unknown, ISyncJob[]>>;
+
+  // Priorities with tasks queued, from the highest.
+  #priorities: number[];
+
+  // State of the owners with tasks queued or running.
+  #owners: Map<unknown, IOwnerState>;
+
+  #startCount: number;
+
+  #jobsRunning: number;
+
+  #jobsQueued: number;
+
+  #cpuSample: { at: number; cpuTime: number } | null;
+
+  #cpuLoad: number;
+
+  #retryTimer: ReturnType<typeof setTimeout> | null;
+
+  /**
+   * @param {ISyncSchedulerOptions} [options]
+   */
+  constructor({
+    concurrency = SYNC_SCHEDULER_CONCURRENCY,
+    maxTasksPerOwner = 1,
+    cpuBudget = null,
+    cpuWindow = SYNC_SCHEDULER_CPU_WINDOW,
+  }: ISyncSchedulerOptions = {}) {
+    super();
+    this.maxTasksPerOwner = Math.max(1, maxTasksPerOwner);
+    this.cpuBudget = cpuBudget;
+    this.cpuWindow = cpuWindow;
+    this.#queues = new Map();
+    this.#priorities = [];
+    this.#owners = new Map();
+    this.#startCount = 0;
+    this.#jobsRunning = 0;
+    this.#jobsQueued = 0;
+    this.#cpuSample = null;
+    this.#cpuLoad = 0;
+    this.#retryTimer = null;
+    this.concurrency = concurrency;
+  }
+
+  /**
+   * Getter for how many tasks can run at the same time.
+   */
+  public get concurrency() {
+    return this.#concurrency;
+  }
+
+  /**
+   * Setter for how many tasks can run at the same time.
+   */
+  public set concurrency(value: number) {
+    if (value < 1) {
+      throw new Error('Cannot have less than 1 job running.');
+    }
+    this.#concurrency = value;
+    this.processQueue();
+  }
+
+  /**
+   * Getter for how many tasks are currently running.
+   */
+  public get jobsRunning() {
+    return this.#jobsRunning;
+  }
+
+  /**
+   * Getter for how many tasks are waiting to run.
+   */
+  public get size() {
+    return this.#jobsQueued;
+  }
+
+  /**
+   * Stop the timer waiting for the CPU usage to go under the budget, so there are no hanging tasks.
+   * Queued tasks start when another task finishes or is added.
+   */
+  stopBackgroundTask() {
+    if (this.#retryTimer) {
+      clearTimeout(this.#retryTimer);
+      this.#retryTimer = null;
+    }
+  }
+
+  /**
+   * Add a new task, the returned promise resolves when the task resolves.
+   *
+   * @param task The underlying job to run.
+   * @param options.priority The task priority, the higher it is the sooner the task will run.
+   * @param options.owner The owner of the task, e.g. the wallet syncing.
+   * @param options.signal The `AbortSignal` that can be used to abort the task from the caller.
+   */
+  async add<T>(task: SyncTask<T>, options: ISyncTaskOptions = {}): Promise<T> {
+    const priority = options.priority ?? 0;
+    // Tasks without an owner don't share the per owner limit with any other task
+    const owner = options.owner ?? {};
+    const { signal } = options;
+
+    return new Promise<T>((resolve, reject) => {
+      const run = async () => {
+        try {
+          // Throw if the operation was aborted and don't run.
+          signal?.throwIfAborted();
+
+          let operation = Promise.resolve(task({ signal }));
+          // This does not abort internally the task, it has to also manage the abort signal.
+          if (signal) {
+            operation = Promise.race([operation, PromiseQueue.throwOnAbort(signal)]);
+          }
+          resolve(await operation);
+        } catch (error: unknown) {
+          reject(error);
+        }
+      };
+
+      let queue = this.#queues.get(priority);
+      if (!queue) {
+        queue = new Map();
+        this.#queues.set(priority, queue);
+        this.#priorities.push(priority);
+        this.#priorities.sort((a, b) => b - a);
+      }
+      const ownerJobs = queue.get(owner);
+      if (ownerJobs) {
+        ownerJobs.push({ owner, run });
+      } else {
+        queue.set(owner, [{ owner, run }]);
+      }
+      const ownerState = this.#owners.get(owner);
+      if (ownerState) {
+        ownerState.queued++;
+      } else {
+        this.#owners.set(owner, { queued: 1, running: 0, lastStart: 0 });
+      }
+      this.#jobsQueued++;
+      this.processQueue();
+    });
+  }
+
+  /**
+   * Start tasks until the concurrency limit, the CPU budget or the owner limits are reached.
+   */
+  processQueue(): void {
+    while (this.#jobsQueued > 0 && this.#jobsRunning < this.#concurrency) {
+      // At least one task runs regardless of the CPU usage, so the sync always progresses
+      if (this.#jobsRunning > 0 && this.#isOverCpuBudget()) {
+        this.#scheduleRetry();
+        return;
+      }
+      const job = this.#popNextJob();
+      if (!job) {
+        // All queued tasks belong to owners at their limit
+        return;
+      }
+      this.#start(job);
+    }
+  }
+
+  /**
+   * Remove the next job to run from the queues.
+   * Priorities are checked from the highest, inside each priority the owner that started a
+   * task the longest time ago goes first.
+   */
+  #popNextJob(): ISyncJob | null {
+    for (const priority of this.#priorities) {
+      const queue = this.#queues.get(priority)!;
+      let next: { jobs: ISyncJob[]; state: IOwnerState } | null = null;
+      for (const [owner, jobs] of queue) {
+        const state = this.#owners.get(owner)!;
+        if (state.running >= this.maxTasksPerOwner) {
+          continue;
+        }
+        if (next === null || state.lastStart < next.state.lastStart) {
+          next = { jobs, state };
+        }
+      }
+      if (next !== null) {
+        const job = next.jobs.shift()!;
+        if (next.jobs.length === 0) {
+          queue.delete(job.owner);
+          if (queue.size === 0) {
+            this.#queues.delete(priority);
+            this.#priorities = this.#priorities.filter(p => p !== priority);
+          }
+        }
+        this.#jobsQueued--;
+        return job;
+      }
+    }
+    return null;
+  }
+
+  #start(job: ISyncJob): void {
+    const state = this.#owners.get(job.owner)!;
+    state.queued--;
+    state.running++;
+    this.#startCount++;
+    state.lastStart = this.#startCount;
+    this.#jobsRunning++;
+    this.emit('job_start');
+    job.run().finally(() => {
+      this.#jobsRunning--;
+      state.running--;
+      if (state.running === 0 && state.queued === 0) {
+        this.#owners.delete(job.owner);
+      }
+      this.emit('finished_job');
+      this.processQueue();
+      if (this.#jobsRunning === 0 && this.#jobsQueued === 0) {
+        this.emit('idle');
+      }
+    });
+  }
+
+  /**
+   * Check if the CPU usage measured on the last window is over the budget.
+   */
+  #isOverCpuBudget(): boolean {
+    if (this.cpuBudget === null) {
+      return false;
+    }
+    const cpuTime = getCpuTime();
+    if (cpuTime === null) {
+      return false;
+    }
+    const now = Date.now();
+    if (this.#cpuSample === null) {
+      this.#cpuSample = { at: now, cpuTime };
+      return false;
+    }
+    const elapsed = now - this.#cpuSample.at;
+    if (elapsed >= this.cpuWindow) {
+      this.#cpuLoad = (cpuTime - this.#cpuSample.cpuTime) / elapsed;
+      this.#cpuSample = { at: now, cpuTime };
+    }
+    return this.#cpuLoad > this.cpuBudget;
+  }
+
+  /**
+   * Try to start the queued tasks again after the CPU usage is measured on a new window.
+   */
+  #scheduleRetry(): void {
+    if (this.#retryTimer) {
+      return;
+    }
+    this.#retryTimer = setTimeout(() => {
+      this.#retryTimer = null;
+      this.processQueue();
+    }, this.cpuWindow);
+  }
+}
+
+export default SyncScheduler;
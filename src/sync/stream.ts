@@ -15,14 +15,26 @@ import {
   IAddressInfo,
   ILogger,
   IMultisigData,
+  IAddressDerivationPool,
+  IAddressDerivationCache,
+  IShieldedAddressPair,
   WalletType,
 } from '../types';
 import Network from '../models/network';
 import Queue from '../models/queue';
 import { IHistoryTxSchema } from '../schemas';
 import { prepareP2SHChangeNodes, buildP2SHRedeemScriptAtIndex } from '../utils/scripts';
-import { redeemScriptToP2SHAddress, deriveShieldedAddressFromStorage } from '../utils/address';
+import { redeemScriptToP2SHAddress } from '../utils/address';
 import transactionUtils from '../utils/transaction';
+import {
+  deriveP2PKHAddresses,
+  deriveP2SHAddresses,
+  deriveShieldedAddressPairs,
+} from './derivation_pool';
+import { getP2PKHChainKey, getP2SHChainKey, getShieldedChainKey } from '../storage/address_cache';
+import { refreshHistorySince } from '../utils/storage';
+import { SyncCheckpointTooOldError } from '../errors';
+import { METRIC_NAMES, getMetrics } from '../metrics';
 /* eslint max-classes-per-file: ["error", 2] */
 
 const QUEUE_GRACEFUL_SHUTDOWN_LIMIT = 10000;
@@ -30,7 +42,8 @@ const QUEUE_GRACEFUL_SHUTDOWN_LIMIT = 10000;
 // Multisig (P2SH) streaming tuning. P2SH derivation is several times slower than P2PKH (one BIP32
 // child derivation per participant), so the P2PKH defaults (40/batch, 600 window) let the client
 // derive far ahead of the fullnode and block the Node event loop. Smaller values keep each
-// synchronous chunk short so the headless server stays responsive. Applied in StreamManager.setupStream().
+// synchronous chunk short so the headless server stays responsive. Applied in StreamManager.setupStream()
+// unless the storage has a parallel derivation pool, which derives off the main thread.
 const MULTISIG_ADDRESSES_PER_MESSAGE = 5;
 const MULTISIG_MAX_WINDOW_SIZE = 30;
 
@@ -164,6 +177,7 @@ class StreamStatsManager {
     this.q = queue;
     this.qTimer = setInterval(() => {
       this.logger.debug(`[*] queue_size: ${queue.size()}`);
+      getMetrics().setGauge(METRIC_NAMES.STREAM_QUEUE_SIZE, queue.size());
     }, this.sampleInterval);
   }
 
@@ -198,17 +212,25 @@ class StreamStatsManager {
    * This also manages the inTimer, which calculates the rate of received items.
    */
   recv() {
+    this.scheduleInRate();
+    this.recvCounter += 1;
+    getMetrics().incrementCounter(METRIC_NAMES.STREAM_EVENTS_RECEIVED);
+  }
+
+  /**
+   * Start the inTimer if it is not running, it logs the in_rate and restarts itself.
+   */
+  private scheduleInRate() {
     if (!this.inTimer) {
       this.inTimer = setTimeout(() => {
         this.logger.debug(
           `[+] => in_rate: ${(1000 * this.recvCounter) / this.sampleInterval} items/s`
         );
         this.inTimer = undefined;
-        this.recvCounter = -1;
-        this.recv();
+        this.recvCounter = 0;
+        this.scheduleInRate();
       }, this.sampleInterval);
     }
-    this.recvCounter += 1;
   }
 
   /**
@@ -216,17 +238,25 @@ class StreamStatsManager {
    * This also manages the outTimer, which calculates the rate of processed items.
    */
   proc() {
+    this.scheduleOutRate();
+    this.procCounter += 1;
+    getMetrics().incrementCounter(METRIC_NAMES.STREAM_EVENTS_PROCESSED);
+  }
+
+  /**
+   * Start the outTimer if it is not running, it logs the out_rate and restarts itself.
+   */
+  private scheduleOutRate() {
     if (!this.outTimer) {
       this.outTimer = setTimeout(() => {
         this.logger.debug(
           `[+] <= out_rate: ${(1000 * this.procCounter) / this.sampleInterval} items/s`
         );
         this.outTimer = undefined;
-        this.procCounter = -1;
-        this.proc();
+        this.procCounter = 0;
+        this.scheduleOutRate();
       }, this.sampleInterval);
     }
-    this.procCounter += 1;
   }
 
   /**
@@ -364,6 +394,11 @@ export class StreamManager extends AbortController {
 
   UI_UPDATE_INTERVAL = 500;
 
+  /**
+   * Maximum number of queued items saved on the storage at once.
+   */
+  PROCESS_BATCH_SIZE = 100;
+
   storage: IStorage;
 
   connection: FullNodeConnection;
@@ -372,6 +407,26 @@ export class StreamManager extends AbortController {
 
   multisigData?: IMultisigData;
 
+  derivationPool: IAddressDerivationPool | null;
+
+  addressCache: IAddressDerivationCache | null;
+
+  /**
+   * Address cache key of the wallet addresses.
+   */
+  chainKey: string;
+
+  /**
+   * Batch of addresses being loaded ahead of the stream window from the address cache
+   * or the derivation pool.
+   */
+  nextBatch: { startIndex: number; count: number; promise: Promise<[number, string][]> } | null;
+
+  /**
+   * First batch of addresses, loaded during the stream setup.
+   */
+  firstBatch: [number, string][] | null;
+
   gapLimit: number;
 
   network: string;
@@ -380,6 +435,16 @@ export class StreamManager extends AbortController {
 
   lastReceivedIndex: number;
 
+  /**
+   * Last address index with its history fully saved on the storage.
+   */
+  lastProcessedIndex: number;
+
+  /**
+   * Index of the last address received from the stream, its history may not be complete yet.
+   */
+  lastStreamedIndex: number;
+
   canUpdateUI: boolean;
 
   foundAnyTx: boolean;
@@ -424,10 +489,17 @@ export class StreamManager extends AbortController {
     this.connection = connection;
     this.xpubkey = '';
     this.multisigData = undefined;
+    this.derivationPool = null;
+    this.addressCache = null;
+    this.chainKey = '';
+    this.nextBatch = null;
+    this.firstBatch = null;
     this.gapLimit = 0;
     this.network = '';
     this.lastLoadedIndex = startIndex - 1;
     this.lastReceivedIndex = -1;
+    this.lastProcessedIndex = startIndex - 1;
+    this.lastStreamedIndex = -1;
     this.canUpdateUI = true;
     this.mode = mode;
     this.errorMessage = null;
@@ -463,6 +535,8 @@ export class StreamManager extends AbortController {
     this.xpubkey = xpubkey;
     this.gapLimit = gapLimit;
     this.network = this.storage.config.getNetwork().name;
+    this.derivationPool = this.storage.derivationPool ?? null;
+    this.addressCache = this.storage.addressCache ?? null;
 
     const walletType = await this.storage.getWalletType();
     if (walletType === WalletType.MULTISIG) {
@@ -474,9 +548,54 @@ export class StreamManager extends AbortController {
       }
       this.multisigData = accessData.multisigData;
 
-      // P2SH derivation is heavier, so multisig streams use a smaller batch and window.
-      this.ADDRESSES_PER_MESSAGE = MULTISIG_ADDRESSES_PER_MESSAGE;
-      this.MAX_WINDOW_SIZE = MULTISIG_MAX_WINDOW_SIZE;
+      // P2SH derivation is heavier, so multisig streams use a smaller batch and window
+      // unless the derivation runs on the worker threads of the pool.
+      if (!this.derivationPool?.isParallel) {
+        this.ADDRESSES_PER_MESSAGE = MULTISIG_ADDRESSES_PER_MESSAGE;
+        this.MAX_WINDOW_SIZE = MULTISIG_MAX_WINDOW_SIZE;
+      }
+    }
+
+    this.chainKey = this.multisigData
+      ? getP2SHChainKey(this.multisigData, this.network)
+      : getP2PKHChainKey(this.xpubkey, this.network);
+
+    const checkpoint = await this.storage.getStreamSyncCheckpoint();
+    if (
+      checkpoint &&
+      checkpoint.mode === this.mode &&
+      checkpoint.chainKey === this.chainKey &&
+      checkpoint.lastProcessedIndex > this.lastProcessedIndex
+    ) {
+      // A previous stream was aborted, the addresses up to the checkpoint already have their
+      // history saved so the stream restarts after them.
+      this.logger.info(
+        `Resuming stream sync after address ${checkpoint.lastProcessedIndex} (seq ${checkpoint.lastProcSeq})`
+      );
+      const { lastProcessedIndex, lastLoadedIndex } = this;
+      this.lastProcessedIndex = checkpoint.lastProcessedIndex;
+      this.lastLoadedIndex = checkpoint.lastProcessedIndex;
+      try {
+        await this.refreshSyncedHistory(checkpoint.timestamp);
+      } catch (err) {
+        if (!(err instanceof SyncCheckpointTooOldError)) {
+          throw err;
+        }
+        // The stream sends the history of all addresses again
+        this.logger.info(`${err.message}, restarting the stream sync`);
+        this.lastProcessedIndex = lastProcessedIndex;
+        this.lastLoadedIndex = lastLoadedIndex;
+        await this.storage.cleanStreamSyncCheckpoint();
+      }
+    }
+
+    if (this.mode === HistorySyncMode.MANUAL_STREAM_WS) {
+      if (this.addressCache || this.derivationPool) {
+        this.firstBatch = await this.loadBatch(
+          this.lastLoadedIndex + 1,
+          this.ADDRESSES_PER_MESSAGE
+        );
+      }
     }
 
     // Make sure this is the only stream running on this connection
@@ -504,6 +623,26 @@ export class StreamManager extends AbortController {
     );
   }
 
+  /**
+   * Catch up on the changes to the addresses synced before the checkpoint.
+   *
+   * The stream does not send them again, so the txs received while the stream was stopped and
+   * the changes on the txs already saved (e.g. `spent_by`, `is_voided` and `first_block`) are
+   * loaded from the address history api before the stream resumes. Only the synced addresses
+   * on txs since the checkpoint or on unconfirmed txs are fetched, see `refreshHistorySince`.
+   *
+   * @param {number} since Timestamp in seconds of when the checkpoint was saved
+   */
+  async refreshSyncedHistory(since: number) {
+    const isSynced = (address: IAddressInfo) =>
+      address.bip32AddressIndex <= this.lastProcessedIndex;
+    for await (const gotTx of refreshHistorySince(this.storage, since, isSynced)) {
+      if (gotTx) {
+        this.foundAnyTx = true;
+      }
+    }
+  }
+
   /**
    * Abort the stream with an error.
    */
@@ -524,6 +663,74 @@ export class StreamManager extends AbortController {
     return loadAddressesCPUIntensive(startIndex, count, this.xpubkey, this.network);
   }
 
+  /**
+   * Get a batch of addresses from the address cache, deriving the batch when it is not
+   * fully cached. The derivation runs on the derivation pool if the stream has one.
+   */
+  async fetchBatch(startIndex: number, count: number): Promise<[number, string][]> {
+    const toBatch = (addresses: IAddressInfo[]) =>
+      addresses.map(addr => [addr.bip32AddressIndex, addr.base58] as [number, string]);
+
+    if (this.addressCache) {
+      const cached = await this.addressCache.getAddresses(this.chainKey, startIndex, count);
+      if (cached.size === count) {
+        return toBatch(Array.from(cached.values()));
+      }
+    }
+
+    let addresses: IAddressInfo[];
+    if (this.multisigData) {
+      addresses = this.derivationPool
+        ? await this.derivationPool.deriveP2SH(this.multisigData, startIndex, count, this.network)
+        : deriveP2SHAddresses(this.multisigData, startIndex, count, this.network);
+    } else {
+      addresses = this.derivationPool
+        ? await this.derivationPool.deriveP2PKH(this.xpubkey, startIndex, count, this.network)
+        : deriveP2PKHAddresses(this.xpubkey, startIndex, count, this.network);
+    }
+    if (this.addressCache) {
+      await this.addressCache.saveAddresses(this.chainKey, addresses);
+    }
+    return toBatch(addresses);
+  }
+
+  /**
+   * Start loading a batch of addresses so it is ready when the stream window allows
+   * sending it.
+   */
+  prefetchBatch(startIndex: number, count: number): void {
+    if (
+      (!this.derivationPool && !this.addressCache) ||
+      this.signal.aborted ||
+      this.hasReceivedEndStream
+    ) {
+      return;
+    }
+    const promise = this.fetchBatch(startIndex, count);
+    // Errors are handled when the batch is used, this avoids an unhandled rejection
+    // if the stream ends before that.
+    promise.catch(() => {});
+    this.nextBatch = { startIndex, count, promise };
+  }
+
+  /**
+   * Get a batch of addresses, using the batch loaded ahead if available.
+   * When the stream has an address cache or derivation pool the following batch is prefetched
+   * while the stream is running.
+   */
+  async loadBatch(startIndex: number, count: number): Promise<[number, string][]> {
+    if (!this.derivationPool && !this.addressCache) {
+      return this.deriveBatch(startIndex, count);
+    }
+    const promise =
+      this.nextBatch?.startIndex === startIndex && this.nextBatch.count === count
+        ? this.nextBatch.promise
+        : this.fetchBatch(startIndex, count);
+    this.nextBatch = null;
+    this.prefetchBatch(startIndex + count, count);
+    return promise;
+  }
+
   /**
    * Generate the next batch of addresses to send to the fullnode.
    * The batch will generate `ADDRESSES_PER_MESSAGE` addresses and send them to the fullnode.
@@ -546,8 +753,12 @@ export class StreamManager extends AbortController {
       }
 
       try {
-        // This part is sync so that we block the main loop during the generation of the batch
-        const batch = this.deriveBatch(this.lastLoadedIndex + 1, this.ADDRESSES_PER_MESSAGE);
+        // Without an address cache or derivation pool this part is sync so that we block the main
+        // loop during the generation of the batch, otherwise the batch was loaded ahead.
+        const batch = await this.loadBatch(this.lastLoadedIndex + 1, this.ADDRESSES_PER_MESSAGE);
+        if (this.signal.aborted) {
+          return;
+        }
         this.lastLoadedIndex += this.ADDRESSES_PER_MESSAGE;
         this.connection.sendManualStreamingHistory(
           this.streamId,
@@ -618,49 +829,26 @@ export class StreamManager extends AbortController {
         // Abort processing the queue
         break;
       }
-      const item = this.itemQueue.dequeue();
+      const items: IStreamItem[] = [];
+      while (items.length < this.PROCESS_BATCH_SIZE) {
+        const item = this.itemQueue.dequeue();
+        if (!item) {
+          break;
+        }
+        items.push(item);
+      }
       this.ack();
-      if (!item) {
+      if (items.length === 0) {
         // Queue is empty
         this.stats.queueEmpty();
         break;
       }
-      this.lastProcSeq = item.seq;
-      if (isStreamItemAddress(item)) {
-        const addr = item.address;
-        const alreadyExists = await this.storage.isAddressMine(addr.base58);
-        if (!alreadyExists) {
-          await this.storage.saveAddress(addr);
-        }
-        // Generate shielded address pair at the same index (if keys are available).
-        // Wrapped in try/catch so derivation failures don't crash the queue.
-        try {
-          const shieldedResult = await deriveShieldedAddressFromStorage(
-            addr.bip32AddressIndex,
-            this.storage
-          );
-          if (shieldedResult) {
-            if (!(await this.storage.isAddressMine(shieldedResult.shieldedAddress.base58))) {
-              await this.storage.saveAddress(shieldedResult.shieldedAddress);
-            }
-            if (!(await this.storage.isAddressMine(shieldedResult.spendAddress.base58))) {
-              await this.storage.saveAddress(shieldedResult.spendAddress);
-            }
-          }
-        } catch (e) {
-          this.logger.error(
-            'Failed to derive shielded address at index',
-            addr.bip32AddressIndex,
-            e
-          );
-        }
-      } else if (isStreamItemVertex(item)) {
-        // Wire ingress: strip untrusted decode-only shielded fields (addTx
-        // restores the wallet's own decoded data from storage).
-        transactionUtils.clearUntrustedShieldedData(item.vertex);
-        await this.storage.addTx(item.vertex);
+      this.lastProcSeq = items[items.length - 1].seq;
+      await this.processItems(items);
+      for (let i = 0; i < items.length; i++) {
+        this.stats.proc();
       }
-      this.stats.proc();
+      await this.saveCheckpoint(items);
 
       /**
        * This promise will resolve after the JS task queue current run.
@@ -676,6 +864,139 @@ export class StreamManager extends AbortController {
     this.isProcessingQueue = false;
   }
 
+  /**
+   * Save a batch of stream items on the storage.
+   *
+   * The new addresses of the batch, along with the shielded pair of each index, are saved
+   * before the transactions, so the transactions of the batch find all of them.
+   *
+   * @param {IStreamItem[]} items The items in the order they were received
+   */
+  async processItems(items: IStreamItem[]) {
+    const addresses: IAddressInfo[] = [];
+    const txs: IHistoryTx[] = [];
+    // Addresses already checked on this batch
+    const checked = new Set<string>();
+    const addAddress = async (info: IAddressInfo) => {
+      if (checked.has(info.base58)) {
+        return;
+      }
+      checked.add(info.base58);
+      if (!(await this.storage.isAddressMine(info.base58))) {
+        addresses.push(info);
+      }
+    };
+
+    // Generate the shielded address pairs at the same indexes (if keys are available).
+    // Derivation failures are logged so they don't crash the queue.
+    const indexes: number[] = [];
+    for (const item of items) {
+      if (isStreamItemAddress(item)) {
+        indexes.push(item.address.bip32AddressIndex);
+      }
+    }
+    let shieldedPairs = new Map<number, IShieldedAddressPair>();
+    try {
+      shieldedPairs = await this.getShieldedPairs(indexes);
+    } catch (e) {
+      this.logger.error('Failed to derive shielded addresses at indexes', indexes, e);
+    }
+
+    for (const item of items) {
+      if (isStreamItemAddress(item)) {
+        const addr = item.address;
+        await addAddress(addr);
+        const pair = shieldedPairs.get(addr.bip32AddressIndex);
+        if (pair) {
+          await addAddress(pair.shieldedAddress);
+          await addAddress(pair.spendAddress);
+        }
+      } else if (isStreamItemVertex(item)) {
+        // Wire ingress: strip untrusted decode-only shielded fields (addTxs
+        // restores the wallet's own decoded data from storage).
+        transactionUtils.clearUntrustedShieldedData(item.vertex);
+        txs.push(item.vertex);
+      }
+    }
+
+    await this.storage.saveAddresses(addresses);
+    await this.storage.addTxs(txs);
+  }
+
+  /**
+   * Get the shielded address pairs of the indexes from the address cache or derive them,
+   * on the derivation pool if the stream has one.
+   * The span between the first and last indexes is derived at once.
+   *
+   * @param {number[]} indexes The address indexes
+   * @returns {Promise<Map<number, IShieldedAddressPair>>} The pairs per index, empty when the
+   * wallet has no shielded keys
+   */
+  async getShieldedPairs(indexes: number[]): Promise<Map<number, IShieldedAddressPair>> {
+    const pairs = new Map<number, IShieldedAddressPair>();
+    if (indexes.length === 0) {
+      return pairs;
+    }
+    const scanXpub = await this.storage.getScanXPubKey();
+    const spendXpub = await this.storage.getSpendXPubKey();
+    if (!scanXpub || !spendXpub) {
+      return pairs;
+    }
+    const first = Math.min(...indexes);
+    const span = Math.max(...indexes) - first + 1;
+    const chainKey = getShieldedChainKey(scanXpub, spendXpub, this.network);
+    if (this.addressCache) {
+      const cached = await this.addressCache.getShieldedPairs(chainKey, first, span);
+      if (indexes.every(index => cached.has(index))) {
+        return cached;
+      }
+    }
+    const derived = this.derivationPool
+      ? await this.derivationPool.deriveShieldedPairs(
+          scanXpub,
+          spendXpub,
+          first,
+          span,
+          this.network
+        )
+      : deriveShieldedAddressPairs(scanXpub, spendXpub, first, span, this.network);
+    if (this.addressCache) {
+      await this.addressCache.saveShieldedPairs(chainKey, derived);
+    }
+    for (const pair of derived) {
+      pairs.set(pair.shieldedAddress.bip32AddressIndex, pair);
+    }
+    return pairs;
+  }
+
+  /**
+   * Save the stream progress after a batch of items is saved on the storage.
+   *
+   * The fullnode sends the history of an address right after the address, so when an
+   * address is processed the address received before it has its history saved.
+   *
+   * @param {IStreamItem[]} items The items just processed
+   */
+  async saveCheckpoint(items: IStreamItem[]) {
+    let processedIndex = this.lastProcessedIndex;
+    for (const item of items) {
+      if (isStreamItemAddress(item)) {
+        processedIndex = Math.max(processedIndex, this.lastStreamedIndex);
+        this.lastStreamedIndex = item.address.bip32AddressIndex;
+      }
+    }
+    if (processedIndex <= this.lastProcessedIndex) {
+      return;
+    }
+    this.lastProcessedIndex = processedIndex;
+    await this.storage.saveStreamSyncCheckpoint({
+      mode: this.mode,
+      chainKey: this.chainKey,
+      lastProcessedIndex: this.lastProcessedIndex,
+      lastProcSeq: this.lastProcSeq,
+    });
+  }
+
   addTx(seq: number, tx: IHistoryTx) {
     this.stats.recv();
     this.foundAnyTx = true;
@@ -744,7 +1065,7 @@ export class StreamManager extends AbortController {
         this.connection.sendManualStreamingHistory(
           this.streamId,
           this.lastLoadedIndex + 1,
-          this.deriveBatch(this.lastLoadedIndex + 1, this.ADDRESSES_PER_MESSAGE),
+          this.firstBatch ?? this.deriveBatch(this.lastLoadedIndex + 1, this.ADDRESSES_PER_MESSAGE),
           true,
           this.gapLimit
         );
@@ -902,6 +1223,10 @@ export async function streamSyncHistory(
 
     // Graceful shutdown and cleanup.
     await manager.shutdown();
+    if (manager.hasReceivedEndStream) {
+      // The stream finished, the next sync starts from the first address.
+      await manager.storage.cleanStreamSyncCheckpoint();
+    }
 
     if (manager.foundAnyTx && shouldProcessHistory) {
       await manager.storage.processHistory(pinCode);
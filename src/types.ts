@@ -15,6 +15,9 @@ import type {
   IShieldedOutput,
   IDataShieldedOutput,
 } from './shielded/types';
+import type { TxEffectsJournal } from './storage/tx_journal';
+import type { ISigningSessionOptions, SigningSession } from './storage/signing_session';
+import type { MineTxSuccessData } from './wallet/types';
 
 /**
  * Token version used to identify the type of token during the token creation process.
@@ -44,6 +47,22 @@ export function getDefaultLogger(): ILogger {
   return console as ILogger;
 }
 
+/**
+ * Labels of a metric sample, e.g. `{ method: 'get', status: '200' }`.
+ */
+export type MetricLabels = Record<string, string>;
+
+/**
+ * Metrics interface called by the lib on its hot paths (history processing, utxo
+ * selection, address derivation, signing, mining and network latency).
+ * Durations are observed in seconds.
+ */
+export interface IMetrics {
+  incrementCounter: (name: string, value?: number, labels?: MetricLabels) => void;
+  setGauge: (name: string, value: number, labels?: MetricLabels) => void;
+  observeHistogram: (name: string, value: number, labels?: MetricLabels) => void;
+}
+
 export type OutputValueType = bigint;
 
 export interface ITxSignatureData {
@@ -633,6 +652,47 @@ export interface IWalletData {
   scanPolicyData: AddressScanPolicyData;
 }
 
+/**
+ * Progress marker saved when the wallet finishes a sync.
+ * Persistent stores keep it so a restarted wallet knows the restored history
+ * was fully processed up to this point.
+ */
+export interface ISyncCheckpoint {
+  // Best chain height when the checkpoint block was requested
+  height: number;
+  // Number of txs in the history when the checkpoint was saved
+  historyCount: number;
+  // Timestamp (in seconds) of when the checkpoint block was requested, txs changed since
+  // then are synced again when resuming
+  timestamp: number;
+  // Name of the network of the history
+  network: string;
+  // Hash of the best chain block at `height`, used to detect a reorg past the checkpoint
+  blockHash: string | null;
+}
+
+/**
+ * Progress marker of a stream sync that did not finish yet.
+ * An aborted stream restarts after the last address with its history saved
+ * instead of from the first address.
+ */
+export interface IStreamSyncCheckpoint {
+  // Stream mode that saved the checkpoint
+  mode: HistorySyncMode;
+  // Address cache key of the streamed addresses, identifies the wallet keys and network
+  chainKey: string;
+  // Last address index with its history fully saved
+  lastProcessedIndex: number;
+  // Seq of the last processed event of the stream that saved the checkpoint
+  lastProcSeq: number;
+  // Best chain height when the checkpoint was saved
+  height: number;
+  // Number of txs in the history when the checkpoint was saved
+  historyCount: number;
+  // Timestamp (in seconds) of when the checkpoint was saved
+  timestamp: number;
+}
+
 export interface IEncryptedData {
   data: string;
   hash: string;
@@ -647,6 +707,110 @@ export interface IMultisigData {
   numSignatures: number;
 }
 
+export interface IShieldedAddressPair {
+  shieldedAddress: IAddressInfo;
+  spendAddress: IAddressInfo;
+}
+
+/**
+ * Progress of a local mining.
+ */
+export interface IMiningProgress {
+  // Number of nonces tested.
+  hashes: number;
+  // Estimated seconds to solve the proof of work.
+  estimation: number;
+}
+
+/**
+ * Solves the proof of work of transactions instead of the tx mining service.
+ * See LocalMiner.
+ */
+export interface IMiningBackend {
+  // Transactions with a greater weight are mined by the tx mining service.
+  maxWeight: number;
+  mine(
+    tx: Transaction,
+    onProgress?: (progress: IMiningProgress) => void
+  ): Promise<MineTxSuccessData>;
+  terminate(): Promise<void>;
+}
+
+/**
+ * Derives batches of wallet addresses, possibly off the main thread.
+ * See AddressDerivationPool.
+ */
+export interface IAddressDerivationPool {
+  // If the derivation runs on other threads, the sync can use bigger batches when this is set.
+  isParallel: boolean;
+  deriveP2PKH(
+    xpubkey: string,
+    startIndex: number,
+    count: number,
+    networkName: string
+  ): Promise<IAddressInfo[]>;
+  deriveP2SH(
+    multisigData: IMultisigData,
+    startIndex: number,
+    count: number,
+    networkName: string
+  ): Promise<IAddressInfo[]>;
+  deriveShieldedPairs(
+    scanXpub: string,
+    spendXpub: string,
+    startIndex: number,
+    count: number,
+    networkName: string
+  ): Promise<IShieldedAddressPair[]>;
+  terminate(): Promise<void>;
+}
+
+/**
+ * Options of the scheduler running the wallet sync tasks.
+ * See SyncScheduler.
+ */
+export interface ISyncSchedulerOptions {
+  // Maximum number of tasks running at the same time.
+  concurrency?: number;
+  // Maximum number of tasks of the same owner (e.g. a wallet) running at the same time.
+  maxTasksPerOwner?: number;
+  // Fraction of a CPU core the process may be using for new tasks to start, e.g. 0.8.
+  // At least one task is always allowed to run. Ignored on runtimes without `process.cpuUsage`.
+  cpuBudget?: number | null;
+  // Time in ms of the window the CPU usage is measured on.
+  cpuWindow?: number;
+}
+
+/**
+ * Options of a task added to the SyncScheduler.
+ */
+export interface ISyncTaskOptions {
+  // The higher the priority the sooner the task runs.
+  priority?: number;
+  // Tasks of the same priority take turns between owners, so no owner starves the others.
+  owner?: unknown;
+  signal?: AbortSignal;
+}
+
+/**
+ * Cache of derived addresses shared by wallets, keyed by derivation chain.
+ * See MemoryAddressCache and FileAddressCache.
+ */
+export interface IAddressDerivationCache {
+  getAddresses(
+    chainKey: string,
+    startIndex: number,
+    count: number
+  ): Promise<Map<number, IAddressInfo>>;
+  saveAddresses(chainKey: string, addresses: IAddressInfo[]): Promise<void>;
+  getShieldedPairs(
+    chainKey: string,
+    startIndex: number,
+    count: number
+  ): Promise<Map<number, IShieldedAddressPair>>;
+  saveShieldedPairs(chainKey: string, pairs: IShieldedAddressPair[]): Promise<void>;
+}
+
 export interface IUtxoFilterOptions {
   token?: string; // default to HTR
   authorities?: OutputValueType; // default to 0 (funds)
@@ -682,6 +846,22 @@ export interface IUtxoSelectionOptions {
   utxoSelectionMethod?: UtxoSelectionAlgorithm;
 }
 
+export interface IBranchAndBoundOptions {
+  // Maximum number of nodes visited by the search
+  maxTries?: number;
+  // Maximum time in ms spent on the search
+  timeLimit?: number;
+}
+
+export interface IUtxoConsolidationPlanOptions {
+  // Utxos with a value smaller than this are merged
+  dustThreshold: OutputValueType;
+  // Minimum number of dust utxos worth a consolidation
+  minUtxos?: number;
+  // Maximum number of utxos merged, defaults to the maximum number of inputs
+  maxUtxos?: number;
+}
+
 export interface IFillTxOptions {
   changeAddress?: string;
   skipAuthorities?: boolean;
@@ -735,7 +915,10 @@ export interface IStore {
    *   `processHistory` to replay txs chronologically so a tx that spends a
    *   previous tx's UTXO finds it already saved.
    */
-  historyIter(tokenUid?: string, options?: { order?: 'asc' | 'desc' }): AsyncGenerator<IHistoryTx>;
+  historyIter(
+    tokenUid?: string,
+    options?: { order?: 'asc' | 'desc'; cursor?: string; skip?: number }
+  ): AsyncGenerator<IHistoryTx>;
   saveTx(tx: IHistoryTx): Promise<void>;
   getTx(txId: string): Promise<IHistoryTx | null>;
   historyCount(): Promise<number>;
@@ -758,6 +941,14 @@ export interface IStore {
   getUtxo(utxoId: IUtxoId): Promise<IUtxo | null>;
   saveLockedUtxo(lockedUtxo: ILockedUtxo): Promise<void>;
   iterateLockedUtxos(): AsyncGenerator<ILockedUtxo>;
+  // Stores that keep the locked utxos ordered by unlock height and time can visit only
+  // the utxos that unlock instead of all locked utxos.
+  iterateUnlockableUtxos?(options: {
+    currentHeight: number;
+    rewardLock: number;
+    nowTs: number;
+  }): AsyncGenerator<ILockedUtxo>;
+  getNextUnlockTimestamp?(): Promise<number | null>;
   unlockUtxo(lockedUtxo: ILockedUtxo): Promise<void>;
   deleteUtxo(utxoId: IUtxo): Promise<void>;
 
@@ -797,6 +988,17 @@ export interface IStore {
     cleanTokens?: boolean
   ): Promise<void>;
   cleanMetadata(): Promise<void>;
+
+  // Persistent stores write any pending change to the backing medium.
+  flush?(): Promise<void>;
+
+  // Cache of the balance of each tx for the wallet, invalidated by the store.
+  getTxBalanceCache?(txId: string): Promise<Record<string, OutputValueType> | null>;
+  saveTxBalanceCache?(txId: string, balance: Record<string, OutputValueType>): Promise<void>;
+
+  // Bulk writes, stores without them have each item saved with saveAddress/saveTx.
+  saveAddresses?(infos: IAddressInfo[]): Promise<void>;
+  saveTxs?(txs: IHistoryTx[]): Promise<void>;
 }
 
 export interface IStorage {
@@ -820,6 +1022,16 @@ export interface IStorage {
   // condition to silently default around.
   getShieldedCryptoProvider(): IShieldedCryptoProvider;
 
+  // Optional pool to derive addresses off the main thread during the sync.
+  derivationPool?: IAddressDerivationPool | null;
+  setDerivationPool(pool?: IAddressDerivationPool | null): void;
+  // Optional cache of derived addresses consulted before deriving.
+  addressCache?: IAddressDerivationCache | null;
+  setAddressCache(cache?: IAddressDerivationCache | null): void;
+  // Optional backend to mine the transactions locally.
+  miningBackend?: IMiningBackend | null;
+  setMiningBackend(backend?: IMiningBackend | null): void;
+
   setApiVersion(version: ApiVersion): void;
   getDecimalPlaces(): number;
   saveNativeToken(): Promise<void>;
@@ -829,6 +1041,10 @@ export interface IStorage {
   hasTxSignatureMethod(): boolean;
   setTxSignatureMethod(txSign: EcdsaTxSign | null): void;
   getTxSignatures(tx: Transaction, pinCode: string): Promise<ITxSignatureData>;
+  // Keys unlocked by startSigningSession, used to sign until closed or expired.
+  signingSession?: SigningSession | null;
+  startSigningSession(pinCode: string, options?: ISigningSessionOptions): Promise<void>;
+  closeSigningSession(): void;
 
   // Address methods
   getAllAddresses(opts?: IAddressChainOptions): AsyncGenerator<IAddressInfo & IAddressMetadata>;
@@ -836,21 +1052,49 @@ export interface IStorage {
   getAddressAtIndex(index: number, opts?: IAddressChainOptions): Promise<IAddressInfo | null>;
   getAddressPubkey(index: number): Promise<string>;
   saveAddress(info: IAddressInfo): Promise<void>;
+  saveAddresses(infos: IAddressInfo[]): Promise<void>;
   isAddressMine(base58: string): Promise<boolean>;
   getCurrentAddress(markAsUsed?: boolean, opts?: IAddressChainOptions): Promise<string>;
   getChangeAddress(options?: { changeAddress?: null | string }): Promise<string>;
 
   // Transaction methods
   txHistory(): AsyncGenerator<IHistoryTx>;
-  tokenHistory(tokenUid?: string): AsyncGenerator<IHistoryTx>;
+  tokenHistory(
+    tokenUid?: string,
+    options?: { cursor?: string; skip?: number }
+  ): AsyncGenerator<IHistoryTx>;
+  getCachedTxBalance(txId: string): Promise<Record<string, OutputValueType> | null>;
+  cacheTxBalance(txId: string, balance: Record<string, OutputValueType>): Promise<void>;
   getTx(txId: string): Promise<IHistoryTx | null>;
   getSpentTxs(inputs: Input[]): AsyncGenerator<{ tx: IHistoryTx; input: Input; index: number }>;
   addTx(tx: IHistoryTx): Promise<void>;
+  addTxs(txs: IHistoryTx[]): Promise<void>;
   // pinCode is threaded so the scan-key derivation can decrypt wallet-owned
   // shielded outputs while (re)processing the history.
   processHistory(pinCode?: string): Promise<void>;
   processNewTx(tx: IHistoryTx, pinCode?: string): Promise<void>;
+  processNewTxBatch(
+    txs: IHistoryTx[],
+    pinCode?: string,
+    onTxError?: (tx: IHistoryTx, error: unknown) => void
+  ): Promise<void>;
+  reprocessTx(tx: IHistoryTx, pinCode?: string): Promise<void>;
+  // Effects of the processed txs, when available a single tx can be reverted.
+  txJournal?: TxEffectsJournal;
   getUtxo(utxoId: IUtxoId): Promise<IUtxo | null>;
+  trackSyncChanges(): void;
+  processSyncChanges(pinCode?: string): Promise<void>;
+  getSyncCheckpoint(): Promise<ISyncCheckpoint | null>;
+  saveSyncCheckpoint(
+    blockHash?: string | null,
+    anchor?: { height?: number; timestamp?: number }
+  ): Promise<void>;
+  cleanSyncCheckpoint(): Promise<void>;
+  getStreamSyncCheckpoint(): Promise<IStreamSyncCheckpoint | null>;
+  saveStreamSyncCheckpoint(
+    checkpoint: Omit<IStreamSyncCheckpoint, 'height' | 'historyCount' | 'timestamp'>
+  ): Promise<void>;
+  cleanStreamSyncCheckpoint(): Promise<void>;
 
   // Tokens
   addToken(data: ITokenData): Promise<void>;
@@ -874,6 +1118,7 @@ export interface IStorage {
   utxoSelectedAsInputIter(): AsyncGenerator<IUtxoId>;
   unlockUtxos(height: number): Promise<void>;
   processLockedUtxos(height: number): Promise<void>;
+  scheduleTimelockUnlock(): Promise<void>;
 
   // Wallet operations
   getAccessData(): Promise<IWalletAccessData | null>;
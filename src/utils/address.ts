@@ -19,6 +19,7 @@ import { hexToBuffer } from './buffer';
 import { IMultisigData, IStorage, IAddressInfo } from '../types';
 import { createP2SHRedeemScript } from './scripts';
 import { deriveShieldedAddress } from './shieldedAddress';
+import { METRIC_NAMES, startTimer } from '../metrics';
 
 /**
  * Parse address and return its OUTPUT SCRIPT type.
@@ -91,14 +92,17 @@ export function deriveAddressFromXPubP2PKH(
   index: number,
   networkName: string
 ): IAddressInfo {
+  const stopTimer = startTimer(METRIC_NAMES.ADDRESS_DERIVATION, { type: 'p2pkh' });
   const network = new Network(networkName);
   const hdpubkey = new HDPublicKey(xpubkey);
   const key = hdpubkey.deriveChild(index);
-  return {
+  const addressInfo = {
     base58: publicKeyToP2PKH(key.publicKey, network),
     bip32AddressIndex: index,
     publicKey: key.publicKey.toString('hex'),
   };
+  stopTimer();
+  return addressInfo;
 }
 
 export async function deriveAddressP2PKH(index: number, storage: IStorage): Promise<IAddressInfo> {
@@ -131,16 +135,19 @@ export function deriveAddressFromDataP2SH(
   index: number,
   networkName: string
 ): IAddressInfo {
+  const stopTimer = startTimer(METRIC_NAMES.ADDRESS_DERIVATION, { type: 'p2sh' });
   const network = new Network(networkName);
   const redeemScript = createP2SHRedeemScript(
     multisigData.pubkeys,
     multisigData.numSignatures,
     index
   );
-  return {
+  const addressInfo = {
     base58: redeemScriptToP2SHAddress(redeemScript, network),
     bip32AddressIndex: index,
   };
+  stopTimer();
+  return addressInfo;
 }
 
 /**
@@ -8,6 +8,18 @@
 import { z } from 'zod';
 import { getDefaultLogger } from '../types';
 
+/**
+ * Matches a JSON number with enough digits to be an unsafe integer, `Number.MAX_SAFE_INTEGER`
+ * has 16 digits. Digits inside strings (e.g. hashes) are skipped, as a number value can only
+ * start the text or follow `:`, `,` or `[`.
+ */
+const UNSAFE_INTEGER_CANDIDATE_REGEX = /(?:^|[:,[])\s*-?\d{16}/;
+
+/**
+ * Matches a JSON number without fraction or exponent.
+ */
+const INTEGER_LITERAL_REGEX = /^-?\d+$/;
+
 /**
  * An object equivalent to the native global JSON, providing `parse()` and `stringify()` functions with compatible signatures, except
  * for the `reviver` and `replacer` parameters that are not supported to prevent accidental override of the custom BigInt behavior.
@@ -18,6 +30,11 @@ import { getDefaultLogger } from '../types';
 export const JSONBigInt = {
   /* eslint-disable @typescript-eslint/no-explicit-any */
   parse(text: string): any {
+    if (!UNSAFE_INTEGER_CANDIDATE_REGEX.test(text)) {
+      // No number in the text can be an unsafe integer, so the reviver would keep all of them.
+      // Most payloads (e.g. websocket messages) take this path and skip the reviver entirely.
+      return JSON.parse(text);
+    }
     // @ts-expect-error TypeScript hasn't been updated with the `context` argument from Node v22.
     return JSON.parse(text, this.bigIntReviver);
   },
@@ -32,6 +49,17 @@ export const JSONBigInt = {
       return value;
     }
 
+    if (Number.isSafeInteger(value) || !Number.isInteger(value)) {
+      // Safe integers and doubles are kept as Numbers, an unsafe integer
+      // literal is never parsed to a safe integer.
+      return value;
+    }
+
+    if (!INTEGER_LITERAL_REGEX.test(context.source)) {
+      // A large double written with a fraction or exponent, for example '1e20'.
+      return value;
+    }
+
     try {
       const bigIntValue = BigInt(context.source);
       if (bigIntValue < Number.MIN_SAFE_INTEGER || bigIntValue > Number.MAX_SAFE_INTEGER) {
@@ -121,22 +149,25 @@ export function parseSchema<T>(data: unknown, schema: ZodSchema<T>): T {
  * If parsing fails, it logs the error and throws.
  */
 export function parseJsonBigInt<T>(text: string, schema: ZodSchema<T>): T {
-  const jsonSchema = z
-    .string()
-    .transform((str, ctx) => {
-      try {
-        return JSONBigInt.parse(str);
-      } catch (e) {
-        ctx.addIssue({
-          code: z.ZodIssueCode.custom,
-          message: `Could not parse with JSONBigInt. Error: ${e}`,
-        });
-        return z.NEVER;
-      }
-    })
-    .pipe(schema);
+  // The text is parsed directly instead of piping a new string schema into `schema`,
+  // which would create the zod schema chain again for every call.
+  let data: unknown;
+  try {
+    data = JSONBigInt.parse(text);
+  } catch (e) {
+    const error = new z.ZodError([
+      {
+        code: z.ZodIssueCode.custom,
+        message: `Could not parse with JSONBigInt. Error: ${e}`,
+        path: [],
+      },
+    ]);
+    const logger = getDefaultLogger();
+    logger.error(`error: ${error.message}\ncaused by input: ${JSONBigInt.stringify(text)}`);
+    throw error;
+  }
 
-  return parseSchema(text, jsonSchema);
+  return parseSchema(data, schema);
 }
 
 /**
@@ -0,0 +1,102 @@
+/**
+ * Copyright (c) Hathor Labs and its affiliates.
+ *
+ * This source code is licensed under the MIT license found in the
+ * LICENSE file in the root directory of this source tree.
+ */
+
+import crypto from 'crypto';
+import type Transaction from '../models/transaction';
+
+/**
+ * Proof of work helpers used to mine transactions locally.
+ *
+ * @module PoW
+ */
+
+/**
+ * Number of nonces available, the nonce of a transaction is serialized in 4 bytes.
+ */
+export const NONCE_SPACE_SIZE = 2 ** 32;
+
+/**
+ * Range of nonces to search, the end is not included.
+ */
+export interface INonceSearchTask {
+  /**
+   * Hex of the funds hash followed by the graph and headers hash of the transaction.
+   */
+  prefix: string;
+  /**
+   * Hex of the target, as 32 big endian bytes.
+   */
+  target: string;
+  start: number;
+  end: number;
+}
+
+/**
+ * Get the proof of work target of a weight.
+ * A transaction hash is valid when it's lower than the target, as in hathor-core.
+ *
+ * @param {number} weight Transaction weight
+ * @returns {Buffer} The target as 32 big endian bytes
+ */
+export function getPowTarget(weight: number): Buffer {
+  // hathor-core: int(2**(256 - weight) - 1), the subtraction is lost in the float precision
+  const target = BigInt(Math.floor(2 ** (256 - weight)));
+  const maxTarget = (1n << 256n) - 1n;
+  const hex = (target > maxTarget ? maxTarget : target).toString(16);
+  return Buffer.from(hex.padStart(64, '0'), 'hex');
+}
+
+/**
+ * Get the data hashed before the nonce, the funds hash followed by the graph and headers hash.
+ * The transaction hash is the double sha256 of this prefix and the nonce.
+ *
+ * @param {Transaction} tx Transaction with the parents and timestamp it will be mined with
+ * @returns {Buffer}
+ */
+export function getPowPrefix(tx: Transaction): Buffer {
+  return Buffer.concat([tx.getFundsHash(), tx.getGraphAndHeadersHash()]);
+}
+
+/**
+ * Search a nonce that solves the proof of work.
+ * The sha256 state of the prefix is computed once and copied for each nonce.
+ *
+ * @param {INonceSearchTask} task Range of nonces to search
+ * @returns {number|null} The first nonce found in the range, or null if there is none
+ */
+export function searchNonce(task: INonceSearchTask): number | null {
+  const prefix = Buffer.from(task.prefix, 'hex');
+  const target = Buffer.from(task.target, 'hex');
+  const base = crypto.createHash('sha256');
+  base.update(prefix);
+  // Hash implementations without copy (e.g. browser polyfills) hash the prefix every time
+  const canCopy = typeof base.copy === 'function';
+
+  // The nonce is serialized in 16 bytes, the 4 bytes nonce after 12 zero bytes
+  const nonceBytes = Buffer.alloc(16);
+  for (let nonce = task.start; nonce < task.end; nonce++) {
+    nonceBytes.writeUInt32BE(nonce, 12);
+    const part1 = canCopy ? base.copy() : crypto.createHash('sha256').update(prefix);
+    part1.update(nonceBytes);
+    const hash = crypto.createHash('sha256').update(part1.digest()).digest().reverse();
+    if (hash.compare(target) < 0) {
+      return nonce;
+    }
+  }
+  return null;
+}
+
+/**
+ * Check if the transaction hash solves the proof of work of its weight.
+ *
+ * @param {Transaction} tx Transaction with the nonce set
+ * @returns {boolean}
+ */
+export function verifyPow(tx: Transaction): boolean {
+  const hash = Buffer.from(tx.calculateHash(), 'hex');
+  return hash.compare(getPowTarget(tx.weight)) < 0;
+}
@@ -16,20 +16,24 @@ import {
   IHistoryTx,
   IBalance,
   ILockedUtxo,
+  IUtxo,
   IPrecalculatedAddress,
   IPrecalculatedShieldedAddress,
+  IShieldedAddressPair,
   isGapLimitScanPolicy,
   IScanPolicyLoadAddresses,
   isIndexLimitScanPolicy,
   SCANNING_POLICY,
   HistorySyncMode,
   HistorySyncFunction,
+  ISyncCheckpoint,
   WalletType,
   ITokenData,
   TokenVersion,
   OutputValueType,
 } from '../types';
 import walletApi from '../api/wallet';
+import txApi from '../api/txApi';
 import helpers from './helpers';
 import transactionUtils from './transaction';
 import {
@@ -38,20 +42,41 @@ import {
   deriveShieldedAddressPair,
   getAddressFromPubkey,
 } from './address';
-import { processShieldedOutputs } from '../shielded/processing';
+import {
+  processShieldedOutputs,
+  rewindShieldedOutputsBatch,
+  ShieldedRewindContext,
+  SHIELDED_REWIND_WINDOW_SIZE,
+} from '../shielded/processing';
+import {
+  deriveP2PKHAddresses,
+  deriveP2SHAddresses,
+  deriveShieldedAddressPairs,
+} from '../sync/derivation_pool';
+import {
+  getP2PKHChainKey,
+  getP2SHChainKey,
+  getShieldedChainKey,
+} from '../storage/address_cache';
 import { xpubStreamSyncHistory, manualStreamSyncHistory } from '../sync/stream';
 import {
   NATIVE_TOKEN_UID,
   MAX_ADDRESSES_GET,
   LOAD_WALLET_MAX_RETRY,
   LOAD_WALLET_RETRY_SLEEP,
+  LOAD_WALLET_MAX_RETRY_SLEEP,
+  LOAD_WALLET_HISTORY_CONCURRENCY,
+  SYNC_CHECKPOINT_TIMESTAMP_MARGIN,
+  SYNC_CHECKPOINT_PAGE_SIZE,
+  SYNC_CHECKPOINT_MAX_PAGES,
   CREATE_TOKEN_TX_VERSION,
   ON_CHAIN_BLUEPRINTS_VERSION,
 } from '../constants';
 import { AddressHistorySchema, GeneralTokenInfoSchema } from '../api/schemas/wallet';
 import CreateTokenTransaction from '../models/create_token_transaction';
 import { getDefaultAddressMeta } from '../storage/storage';
-import { AddressError, ShieldedDecodeSystemicError } from '../errors';
+import { ITxBalanceEffect } from '../storage/tx_journal';
+import { AddressError, ShieldedDecodeSystemicError, SyncCheckpointTooOldError } from '../errors';
 
 /**
  * Get history sync method for a given mode
@@ -85,6 +110,129 @@ export async function getSupportedSyncMode(storage: IStorage): Promise<HistorySy
   return [];
 }
 
+/**
+ * Get the missing indexes of a range from the address cache, derive the indexes not cached
+ * and save them on the cache.
+ * The span between the first and last indexes not cached is derived at once, on the
+ * derivation pool if the storage has one.
+ *
+ * @param {number[]} indexes Sorted indexes to get
+ * @param {Function} getCached Get the cached entries of a range, when the storage has a cache
+ * @param {Function} derive Derive the entries of a range
+ * @param {Function} saveCached Save derived entries, when the storage has a cache
+ * @param {Function} getIndex Get the BIP32 index of an entry
+ * @returns {Promise<Map<number, T>>}
+ */
+async function getOrDeriveRange<T>(
+  indexes: number[],
+  getCached: ((first: number, span: number) => Promise<Map<number, T>>) | null,
+  derive: (first: number, span: number) => Promise<T[]> | T[],
+  saveCached: ((entries: T[]) => Promise<void>) | null,
+  getIndex: (entry: T) => number
+): Promise<Map<number, T>> {
+  if (indexes.length === 0) {
+    return new Map<number, T>();
+  }
+  const first = indexes[0];
+  const result = getCached
+    ? await getCached(first, indexes[indexes.length - 1] - first + 1)
+    : new Map<number, T>();
+  const notCached = indexes.filter(i => !result.has(i));
+  if (notCached.length > 0) {
+    const derived = await derive(notCached[0], notCached[notCached.length - 1] - notCached[0] + 1);
+    for (const entry of derived) {
+      result.set(getIndex(entry), entry);
+    }
+    if (saveCached) {
+      await saveCached(derived);
+    }
+  }
+  return result;
+}
+
+/**
+ * Get the addresses of the range that are not on storage yet from the storage address cache
+ * or derive them in batches, using the storage derivation pool if set.
+ *
+ * @param {number} startIndex Index to start loading addresses
+ * @param {number} count Number of addresses to load
+ * @param {IStorage} storage The storage with the address cache or derivation pool
+ * @returns {Promise<Object>} The legacy addresses and shielded pairs per index
+ */
+async function deriveMissingAddresses(
+  startIndex: number,
+  count: number,
+  storage: IStorage
+): Promise<{ legacy: Map<number, IAddressInfo>; shielded: Map<number, IShieldedAddressPair> }> {
+  const pool = storage.derivationPool ?? null;
+  const cache = storage.addressCache ?? null;
+  const accessData = await storage.getAccessData();
+  if (accessData === null) {
+    return { legacy: new Map(), shielded: new Map() };
+  }
+  const scanXpub = await storage.getScanXPubKey();
+  const spendXpub = await storage.getSpendXPubKey();
+  const networkName = storage.config.getNetwork().name;
+
+  const missingLegacy: number[] = [];
+  const missingShielded: number[] = [];
+  for (let i = startIndex; i < startIndex + count; i++) {
+    if ((await storage.getAddressAtIndex(i)) === null) {
+      missingLegacy.push(i);
+    }
+    if (scanXpub && spendXpub) {
+      const existing = await storage.getAddressAtIndex(i, { legacy: false });
+      if (!(existing?.addressType === 'shielded' && existing.ctMappingAddress)) {
+        missingShielded.push(i);
+      }
+    }
+  }
+
+  const { xpubkey, multisigData } = accessData;
+  const isP2PKH = (await storage.getWalletType()) === WalletType.P2PKH;
+  if (!isP2PKH && !multisigData && missingLegacy.length > 0) {
+    throw new Error('No multisig data');
+  }
+  let legacyKey = '';
+  if (isP2PKH) {
+    legacyKey = getP2PKHChainKey(xpubkey, networkName);
+  } else if (multisigData) {
+    legacyKey = getP2SHChainKey(multisigData, networkName);
+  }
+  const legacyPromise = getOrDeriveRange<IAddressInfo>(
+    missingLegacy,
+    cache && ((first, span) => cache.getAddresses(legacyKey, first, span)),
+    (first, span) => {
+      if (isP2PKH) {
+        return pool
+          ? pool.deriveP2PKH(xpubkey, first, span, networkName)
+          : deriveP2PKHAddresses(xpubkey, first, span, networkName);
+      }
+      return pool
+        ? pool.deriveP2SH(multisigData!, first, span, networkName)
+        : deriveP2SHAddresses(multisigData!, first, span, networkName);
+    },
+    cache && (entries => cache.saveAddresses(legacyKey, entries)),
+    entry => entry.bip32AddressIndex
+  );
+
+  const shieldedKey =
+    scanXpub && spendXpub ? getShieldedChainKey(scanXpub, spendXpub, networkName) : '';
+  const shieldedPromise = getOrDeriveRange<IShieldedAddressPair>(
+    missingShielded,
+    cache && ((first, span) => cache.getShieldedPairs(shieldedKey, first, span)),
+    (first, span) =>
+      pool
+        ? pool.deriveShieldedPairs(scanXpub!, spendXpub!, first, span, networkName)
+        : deriveShieldedAddressPairs(scanXpub!, spendXpub!, first, span, networkName),
+    cache && (entries => cache.saveShieldedPairs(shieldedKey, entries)),
+    entry => entry.shieldedAddress.bip32AddressIndex
+  );
+
+  const [legacy, shielded] = await Promise.all([legacyPromise, shieldedPromise]);
+  return { legacy, shielded };
+}
+
 /**
  * Derive requested addresses (if not already loaded), save them on storage then return them.
  * @param {number} startIndex Index to start loading addresses
@@ -111,6 +259,13 @@ export async function loadAddresses(
   const spendHdPub = hasShieldedKeys ? new HDPublicKey(spendXpub) : null;
   const networkName = storage.config.getNetwork().name;
 
+  // With an address cache or derivation pool the missing addresses are fetched from the cache
+  // or derived ahead in batches, the loop below only derives one by one what was not.
+  const derived =
+    storage.addressCache || storage.derivationPool
+      ? await deriveMissingAddresses(startIndex, count, storage)
+      : null;
+
   for (let i = startIndex; i < stopIndex; i++) {
     const storageAddr = await storage.getAddressAtIndex(i);
     if (storageAddr !== null) {
@@ -119,7 +274,9 @@ export async function loadAddresses(
     } else {
       // derive legacy address at index i
       let address: IAddressInfo;
-      if ((await storage.getWalletType()) === 'p2pkh') {
+      if (derived?.legacy.has(i)) {
+        address = derived.legacy.get(i)!;
+      } else if ((await storage.getWalletType()) === 'p2pkh') {
         address = await deriveAddressP2PKH(i, storage);
       } else {
         address = await deriveAddressP2SH(i, storage);
@@ -153,12 +310,9 @@ export async function loadAddresses(
         // exact same pair, and the isAddressMine guards below make the saves
         // idempotent — whichever half already exists is skipped and the missing
         // half is filled in.
-        const { shieldedAddress, spendAddress } = deriveShieldedAddressPair(
-          scanHdPub!,
-          spendHdPub!,
-          i,
-          networkName
-        );
+        const { shieldedAddress, spendAddress } =
+          derived?.shielded.get(i) ??
+          deriveShieldedAddressPair(scanHdPub!, spendHdPub!, i, networkName);
         if (!(await storage.isAddressMine(shieldedAddress.base58))) {
           await storage.saveAddress(shieldedAddress);
         }
@@ -308,11 +462,32 @@ export async function apiSyncHistory(
   let itCount = count;
   let foundAnyTx = false;
 
-  while (true) {
-    const addresses = await loadAddresses(itStartIndex, itCount, storage);
+  // Chunks of addresses waiting to have their history loaded
+  const addressesChunks: string[][] = [];
+  const loadWindow = async (windowStart: number, windowCount: number) => {
+    const addresses = await loadAddresses(windowStart, windowCount, storage);
     // subscribe to addresses
     connection.subscribeAddresses(addresses);
-    for await (const gotTx of loadAddressHistory(addresses, storage)) {
+    addressesChunks.push(...chunk(addresses, MAX_ADDRESSES_GET));
+  };
+  // The scanning policy is checked after each chunk is saved, so the next window of addresses
+  // is loaded and requested while the current window is still being fetched.
+  // The used address indexes only grow during the sync, so a window loaded early would also
+  // be loaded once the current window is done.
+  let extendWindow = Promise.resolve();
+  const onChunkLoaded = async () => {
+    extendWindow = extendWindow.then(async () => {
+      const loadMoreAddresses = await checkScanningPolicy(storage);
+      if (loadMoreAddresses !== null) {
+        await loadWindow(loadMoreAddresses.nextIndex, loadMoreAddresses.count);
+      }
+    });
+    await extendWindow;
+  };
+
+  while (true) {
+    await loadWindow(itStartIndex, itCount);
+    for await (const gotTx of loadChunksHistory(addressesChunks, storage, { onChunkLoaded })) {
       if (gotTx) {
         // This will signal we have found a transaction when syncing the history
         foundAnyTx = true;
@@ -345,91 +520,358 @@ export async function apiSyncHistory(
  *
  * @param {stringp[]} addresses List of addresses to load history
  * @param {IStorage} storage The storage to load the addresses
+ * @param {boolean} [saveTxs=true] If the transactions found should be saved on storage
+ * @param {number} [concurrency] Number of chunks being fetched at the same time
  * @returns {AsyncGenerator<boolean>} If we found any transaction in the history
  */
 export async function* loadAddressHistory(
   addresses: string[],
   storage: IStorage,
-  saveTxs: boolean = true
+  saveTxs: boolean = true,
+  concurrency: number = LOAD_WALLET_HISTORY_CONCURRENCY
+): AsyncGenerator<boolean> {
+  yield* loadChunksHistory(chunk(addresses, MAX_ADDRESSES_GET), storage, { saveTxs, concurrency });
+}
+
+/**
+ * Fetch the tx history of chunks of addresses, up to `concurrency` chunks at the same time.
+ *
+ * Chunks added to `addressesChunks` while the history is being loaded are also fetched.
+ * Yields once for each chunk loaded, in the order they finish.
+ *
+ * @param {string[][]} addressesChunks Chunks of addresses, consumed as they are fetched
+ * @param {IStorage} storage The storage to save the transactions
+ * @param {Object} [options]
+ * @param {boolean} [options.saveTxs=true] If the transactions found should be saved on storage
+ * @param {number} [options.concurrency] Number of chunks being fetched at the same time
+ * @param {() => Promise<void>} [options.onChunkLoaded] Called after the history of a chunk is saved
+ * @returns {AsyncGenerator<boolean>} If we found any transaction in the history
+ */
+async function* loadChunksHistory(
+  addressesChunks: string[][],
+  storage: IStorage,
+  {
+    saveTxs = true,
+    concurrency = LOAD_WALLET_HISTORY_CONCURRENCY,
+    onChunkLoaded,
+  }: { saveTxs?: boolean; concurrency?: number; onChunkLoaded?: () => Promise<void> } = {}
 ): AsyncGenerator<boolean> {
   let foundAnyTx = false;
-  // chunkify addresses
-  const addressesChunks = chunk(addresses, MAX_ADDRESSES_GET);
+  // Result of the chunks loaded and not yet yielded
+  const loaded: boolean[] = [];
+  let failure: { error: unknown } | null = null;
+  let running = 0;
+  let wakeUp: (() => void) | null = null;
+
+  const startNext = () => {
+    while (failure === null && running < Math.max(concurrency, 1) && addressesChunks.length > 0) {
+      const addrs = addressesChunks.shift()!;
+      running++;
+      (async () => {
+        try {
+          const gotTx = await fetchAddressesHistory(addrs, storage, saveTxs);
+          if (onChunkLoaded) {
+            await onChunkLoaded();
+          }
+          loaded.push(gotTx);
+        } catch (e) {
+          if (failure === null) {
+            failure = { error: e };
+          }
+        } finally {
+          running--;
+          startNext();
+          if (wakeUp) {
+            wakeUp();
+            wakeUp = null;
+          }
+        }
+      })();
+    }
+  };
+
+  startNext();
+  while (true) {
+    if (loaded.length > 0) {
+      if (loaded.shift()) {
+        foundAnyTx = true;
+      }
+      // Signal that we have more data to update the UI
+      yield foundAnyTx;
+      continue;
+    }
+    if (running === 0) {
+      break;
+    }
+    await new Promise<void>(resolve => {
+      wakeUp = resolve;
+    });
+  }
+  // Only fails after the requests already running finish, so they do not save txs later
+  if (failure !== null) {
+    throw (failure as { error: unknown }).error;
+  }
+}
+
+/**
+ * Fetch and save the tx history of a chunk of addresses, going through all pages.
+ * Failed requests are retried with an exponential backoff.
+ *
+ * @param {string[]} addresses Chunk with at most `MAX_ADDRESSES_GET` addresses
+ * @param {IStorage} storage The storage to save the transactions
+ * @param {boolean} saveTxs If the transactions found should be saved on storage
+ * @returns {Promise<boolean>} If we found any transaction in the history
+ */
+async function fetchAddressesHistory(
+  addresses: string[],
+  storage: IStorage,
+  saveTxs: boolean
+): Promise<boolean> {
+  let foundAnyTx = false;
+  let hasMore = true;
+  let firstHash: string | null = null;
+  let addrsToSearch = addresses;
   let retryCount = 0;
 
-  for (let i = 0; i < addressesChunks.length; i++) {
-    let hasMore = true;
-    let firstHash: string | null = null;
-    let addrsToSearch = addressesChunks[i];
+  while (hasMore === true) {
+    let response: AxiosResponse<AddressHistorySchema>;
+    try {
+      response = await walletApi.getAddressHistoryForAwait(addrsToSearch, firstHash);
+    } catch (e: unknown) {
+      if (!axios.isAxiosError(e)) {
+        // We only treat AxiosError
+        throw e;
+      }
+      const err = e as AxiosError;
+      // We will retry the request that fails with client timeout
+      // in this request error we don't have the response because
+      // the client closed the connection
+      //
+      // There are some error reports about it (https://github.com/axios/axios/issues/2716)
+      // Besides that, there are some problems happening in newer axios versions (https://github.com/axios/axios/issues/2710)
+      // One user that opened a PR for axios said he is checking the timeout error with the message includes condition
+      // https://github.com/axios/axios/pull/2874#discussion_r403753852
+      if (
+        err.code === 'ECONNABORTED' &&
+        err.response === undefined &&
+        err.message.toLowerCase().includes('timeout')
+      ) {
+        // in this case we retry
+        continue;
+      }
 
-    while (hasMore === true) {
-      let response: AxiosResponse<AddressHistorySchema>;
-      try {
-        response = await walletApi.getAddressHistoryForAwait(addrsToSearch, firstHash);
-      } catch (e: unknown) {
-        if (!axios.isAxiosError(e)) {
-          // We only treat AxiosError
-          throw e;
-        }
-        const err = e as AxiosError;
-        // We will retry the request that fails with client timeout
-        // in this request error we don't have the response because
-        // the client closed the connection
-        //
-        // There are some error reports about it (https://github.com/axios/axios/issues/2716)
-        // Besides that, there are some problems happening in newer axios versions (https://github.com/axios/axios/issues/2710)
-        // One user that opened a PR for axios said he is checking the timeout error with the message includes condition
-        // https://github.com/axios/axios/pull/2874#discussion_r403753852
-        if (
-          err.code === 'ECONNABORTED' &&
-          err.response === undefined &&
-          err.message.toLowerCase().includes('timeout')
-        ) {
-          // in this case we retry
-          continue;
-        }
+      if (retryCount > LOAD_WALLET_MAX_RETRY) {
+        throw e;
+      }
 
-        if (retryCount > LOAD_WALLET_MAX_RETRY) {
-          throw e;
-        }
+      await helpers.sleep(
+        Math.min(LOAD_WALLET_RETRY_SLEEP * 2 ** retryCount, LOAD_WALLET_MAX_RETRY_SLEEP)
+      );
+      retryCount++;
+      continue;
+    }
+    // Request has succeeded, reset retry count
+    retryCount = 0;
+    const result = response.data;
 
-        retryCount++;
-        await helpers.sleep(LOAD_WALLET_RETRY_SLEEP);
-        continue;
+    if (!result.success) {
+      throw new Error(result.message);
+    }
+    for (const tx of result.history) {
+      foundAnyTx = true;
+      if (saveTxs) {
+        // Wire ingress: never trust decode-only shielded fields off the
+        // address-history response; addTx restores them from our own
+        // storage and processHistory re-derives the rest via ECDH rewind.
+        transactionUtils.clearUntrustedShieldedData(tx);
+        await storage.addTx(tx);
       }
-      // Request has succeeded, reset retry count
-      retryCount = 0;
-      const result = response.data;
-
-      if (result.success) {
-        for (const tx of result.history) {
-          foundAnyTx = true;
-          if (saveTxs) {
-            // Wire ingress: never trust decode-only shielded fields off the
-            // address-history response; addTx restores them from our own
-            // storage and processHistory re-derives the rest via ECDH rewind.
-            transactionUtils.clearUntrustedShieldedData(tx);
-            await storage.addTx(tx);
-          }
+    }
+    hasMore = result.has_more;
+    if (hasMore) {
+      // prepare next page parameters
+      firstHash = result.first_hash || null;
+      const addrIndex = addrsToSearch.indexOf(result.first_address || '');
+      if (addrIndex === -1) {
+        throw Error('Invalid address returned from the server.');
+      }
+      addrsToSearch = addrsToSearch.slice(addrIndex);
+    }
+  }
+  return foundAnyTx;
+}
+
+/**
+ * Get the hash of the best chain block at a height.
+ *
+ * @param {number} height The block height
+ * @returns {Promise<string|null>} The block hash or null if the full node did not return it
+ */
+export async function getBestChainBlockHash(height: number): Promise<string | null> {
+  const response = await new Promise<{ success: boolean; block?: { tx_id?: string } }>(
+    (resolve, reject) => {
+      txApi.getBlockAtHeight(height, resolve).catch(reject);
+    }
+  );
+  if (!response.success || !response.block?.tx_id) {
+    return null;
+  }
+  return response.block.tx_id;
+}
+
+/**
+ * Check that the block of a sync checkpoint is still on the best chain.
+ *
+ * A reorg past the checkpoint may have voided txs confirmed before it, so the history
+ * on storage cannot be trusted and should be synced again.
+ *
+ * @param {ISyncCheckpoint} checkpoint The checkpoint
+ * @returns {Promise<boolean>}
+ */
+export async function isSyncCheckpointOnBestChain(checkpoint: ISyncCheckpoint): Promise<boolean> {
+  if (!checkpoint.blockHash) {
+    return false;
+  }
+  return (await getBestChainBlockHash(checkpoint.height)) === checkpoint.blockHash;
+}
+
+/**
+ * Get the addresses of the wallet on the inputs and outputs of a tx from the tx list api.
+ *
+ * @param {IStorage} storage The storage instance
+ * @param tx The tx as returned by the tx list api
+ * @returns {Promise<string[]>}
+ */
+async function getWalletAddressesOfListedTx(
+  storage: IStorage,
+  tx: {
+    inputs?: { decoded?: { address?: string | null } }[];
+    outputs?: { decoded?: { address?: string | null } }[];
+    shielded_outputs?: { decoded?: { address?: string | null } }[];
+  }
+): Promise<string[]> {
+  const addresses: string[] = [];
+  for (const io of [...(tx.inputs ?? []), ...(tx.outputs ?? []), ...(tx.shielded_outputs ?? [])]) {
+    const address = io.decoded?.address;
+    if (address && (await storage.isAddressMine(address))) {
+      addresses.push(address);
+    }
+  }
+  return addresses;
+}
+
+/**
+ * Get the addresses of the wallet on the txs and blocks with a timestamp from `since` on.
+ *
+ * The txs and blocks are listed from the newest to the oldest, so the number of requests
+ * depends on the activity of the network since the timestamp and not on the wallet history.
+ * At most SYNC_CHECKPOINT_MAX_PAGES pages of each are listed.
+ *
+ * @throws {SyncCheckpointTooOldError} When there are more txs or blocks since the timestamp
+ * @param {IStorage} storage The storage instance
+ * @param {number} since Timestamp in seconds
+ * @returns {Promise<Set<string>>}
+ */
+export async function getAddressesChangedSince(
+  storage: IStorage,
+  since: number
+): Promise<Set<string>> {
+  const addresses = new Set<string>();
+  for (const type of ['block', 'tx']) {
+    let reference: { timestamp: number; hash: string } | null = null;
+    for (let page = 0; ; page++) {
+      if (page >= SYNC_CHECKPOINT_MAX_PAGES) {
+        throw new SyncCheckpointTooOldError(
+          `More than ${SYNC_CHECKPOINT_MAX_PAGES} pages of ${type}s since ${since}`
+        );
+      }
+      const ref = reference;
+      const response = await new Promise<{
+        success?: boolean;
+        message?: string;
+        transactions: {
+          tx_id?: string;
+          hash?: string;
+          timestamp: number;
+          inputs?: { decoded?: { address?: string | null } }[];
+          outputs?: { decoded?: { address?: string | null } }[];
+        }[];
+        has_more: boolean;
+      }>((resolve, reject) => {
+        txApi
+          .getTransactions(
+            type,
+            SYNC_CHECKPOINT_PAGE_SIZE,
+            ref?.timestamp ?? null,
+            ref?.hash ?? null,
+            ref ? 'next' : null,
+            resolve
+          )
+          .catch(reject);
+      });
+      if (response.success === false) {
+        throw new Error(response.message);
+      }
+      let reachedSince = false;
+      for (const tx of response.transactions) {
+        if (tx.timestamp < since) {
+          reachedSince = true;
+          break;
         }
-        hasMore = result.has_more;
-        if (hasMore) {
-          // prepare next page parameters
-          firstHash = result.first_hash || null;
-          const addrIndex = addrsToSearch.indexOf(result.first_address || '');
-          if (addrIndex === -1) {
-            throw Error('Invalid address returned from the server.');
-          }
-          addrsToSearch = addrsToSearch.slice(addrIndex);
-        } else {
-          // Signal that we have more data to update the UI
-          yield foundAnyTx;
+        for (const address of await getWalletAddressesOfListedTx(storage, tx)) {
+          addresses.add(address);
         }
-      } else {
-        throw new Error(result.message);
       }
+      const last = response.transactions[response.transactions.length - 1];
+      if (reachedSince || !response.has_more || !last) {
+        break;
+      }
+      reference = { timestamp: last.timestamp, hash: (last.tx_id ?? last.hash)! };
     }
   }
+  return addresses;
+}
+
+/**
+ * Fetch again the history of the wallet addresses which may have changed since a timestamp.
+ *
+ * These are the addresses on the txs and blocks since the timestamp (minus a margin, since a tx
+ * can reach the full node after its timestamp) and the addresses on the txs of the history
+ * without a first block, which may have been confirmed or voided since. The history of the
+ * other addresses is kept as is.
+ *
+ * @param {IStorage} storage The storage instance
+ * @param {number} since Timestamp in seconds, usually the timestamp of a checkpoint
+ * @param {(address: IAddressInfo) => boolean} [filter] Only refresh the addresses accepted
+ * @returns {AsyncGenerator<boolean>} If we found any transaction in the history
+ * @throws {SyncCheckpointTooOldError} Before fetching any history, when there is too much
+ * network activity since the timestamp
+ */
+export async function* refreshHistorySince(
+  storage: IStorage,
+  since: number,
+  filter?: (address: IAddressInfo) => boolean
+): AsyncGenerator<boolean> {
+  const candidates = await getAddressesChangedSince(
+    storage,
+    since - SYNC_CHECKPOINT_TIMESTAMP_MARGIN
+  );
+  for await (const tx of storage.txHistory()) {
+    if (tx.first_block || tx.is_voided) {
+      continue;
+    }
+    for (const address of await getWalletAddressesOfListedTx(storage, tx)) {
+      candidates.add(address);
+    }
+  }
+  const addresses: string[] = [];
+  for (const address of candidates) {
+    const info = await storage.store.getAddress(address);
+    if (info && (!filter || filter(info))) {
+      addresses.push(address);
+    }
+  }
+  yield* loadAddressHistory(addresses, storage);
 }
 
 /**
@@ -607,6 +1049,8 @@ export async function processHistory(
   const { store } = storage;
   // We have an additive method to update metadata so we need to clean the current metadata before processing.
   await store.cleanMetadata();
+  // The journal is rebuilt as each tx is processed below
+  storage.txJournal?.clear();
 
   const nowTs = Math.floor(Date.now() / 1000);
   const currentHeight = await store.getCurrentHeight();
@@ -628,13 +1072,23 @@ export async function processHistory(
   // outputs (to_json_extended), so a spend seen during the walk leaves the
   // parent's UTXO unsaved rather than resurrected.
   const skippedTxIds: string[] = [];
-  for await (const tx of store.historyIter(undefined, { order: 'asc' })) {
+  // Shielded outputs are rewound in windows of txs before the txs are processed,
+  // unlocking the scan xpriv once for the whole walk (see rewindShieldedOutputsBatch).
+  const shieldedContext =
+    storage.shieldedCryptoProvider && pinCode !== undefined
+      ? new ShieldedRewindContext(storage, pinCode)
+      : undefined;
+  const windowSize = shieldedContext ? SHIELDED_REWIND_WINDOW_SIZE : 1;
+  let txWindow: IHistoryTx[] = [];
+
+  const processTx = async (tx: IHistoryTx) => {
     try {
       const processedData = await processNewTx(storage, tx, {
         rewardLock,
         nowTs,
         currentHeight,
         pinCode,
+        shieldedContext,
       });
       legacyMaxIndexUsed = Math.max(legacyMaxIndexUsed, processedData.legacyMaxAddressIndex);
       shieldedMaxIndexUsed = Math.max(shieldedMaxIndexUsed, processedData.shieldedMaxAddressIndex);
@@ -664,6 +1118,39 @@ export async function processHistory(
         e
       );
     }
+  };
+
+  const processWindow = async () => {
+    if (shieldedContext && storage.shieldedCryptoProvider) {
+      const decodedTxs = await rewindShieldedOutputsBatch(
+        storage,
+        txWindow,
+        storage.shieldedCryptoProvider,
+        shieldedContext
+      );
+      // Persist the in-place decoded fields, the per-tx processing below only
+      // saves the txs it decodes itself.
+      for (const tx of decodedTxs) {
+        await store.saveTx(tx);
+      }
+    }
+    // Applied in chronological order, as the txs came from the store.
+    for (const tx of txWindow) {
+      await processTx(tx);
+    }
+    txWindow = [];
+  };
+
+  try {
+    for await (const tx of store.historyIter(undefined, { order: 'asc' })) {
+      txWindow.push(tx);
+      if (txWindow.length >= windowSize) {
+        await processWindow();
+      }
+    }
+    await processWindow();
+  } finally {
+    shieldedContext?.close();
   }
 
   // Update wallet data
@@ -692,61 +1179,129 @@ export async function processSingleTx(
   storage: IStorage,
   tx: IHistoryTx,
   { rewardLock, pinCode }: { rewardLock?: number; pinCode?: string } = {}
+): Promise<void> {
+  await processNewTxBatch(storage, [tx], { rewardLock, pinCode });
+}
+
+/**
+ * Process a batch of new transactions in a single pass.
+ * The current height is read and the wallet data is updated once for the whole batch and
+ * the shielded outputs of the batch are rewound together, unlocking the scan xpriv once.
+ *
+ * @param {IStorage} storage Storage instance.
+ * @param {IHistoryTx[]} txs The new transactions, in the order they should be applied
+ * @param {Object} [options]
+ * @param {number} [options.rewardLock] The reward lock of the network
+ * @param {string} [options.pinCode] PIN code for shielded-output decryption
+ * @param {Function} [options.onTxError] Called with a tx that failed and its error, the
+ *   rest of the batch is still processed. When not given the error is thrown.
+ * @returns {Promise<void>}
+ */
+export async function processNewTxBatch(
+  storage: IStorage,
+  txs: IHistoryTx[],
+  {
+    rewardLock,
+    pinCode,
+    onTxError,
+  }: {
+    rewardLock?: number;
+    pinCode?: string;
+    onTxError?: (tx: IHistoryTx, error: unknown) => void;
+  } = {}
 ): Promise<void> {
   const { store } = storage;
   const nowTs = Math.floor(Date.now() / 1000);
   const currentHeight = await store.getCurrentHeight();
 
   const tokens = new Set<string>();
-  const processedData = await processNewTx(storage, tx, {
-    rewardLock,
-    nowTs,
-    currentHeight,
-    pinCode,
-  });
-  const legacyMaxIndexUsed = processedData.legacyMaxAddressIndex;
-  const shieldedMaxIndexUsed = processedData.shieldedMaxAddressIndex;
-  for (const token of processedData.tokens) {
-    tokens.add(token);
-  }
-
-  // A voided tx does not actually spend its inputs (processNewTx above skipped
-  // it for the same reason), so it must NOT delete their UTXOs. Deleting them
-  // for a tx that arrives already-voided (e.g. a mempool double-spend conflict)
-  // would drop a still-spendable UTXO while its balance is still counted,
-  // breaking coin selection until a full reload. The voided-flip case restores
-  // UTXOs via a full processHistory (see onNewTx).
-  for (const input of tx.inputs) {
-    if (tx.is_voided) break;
-    const origTx = await storage.getTx(input.tx_id);
-    if (!origTx) {
-      // The tx being spent is not from the wallet.
-      continue;
+  let legacyMaxIndexUsed = -1;
+  let shieldedMaxIndexUsed = -1;
+  // A single tx is rewound by processNewTx, there is no scan key to share.
+  const shieldedContext =
+    txs.length > 1 && storage.shieldedCryptoProvider && pinCode !== undefined
+      ? new ShieldedRewindContext(storage, pinCode)
+      : undefined;
+
+  const processTx = async (tx: IHistoryTx) => {
+    const processedData = await processNewTx(storage, tx, {
+      rewardLock,
+      nowTs,
+      currentHeight,
+      pinCode,
+      shieldedContext,
+    });
+    legacyMaxIndexUsed = Math.max(legacyMaxIndexUsed, processedData.legacyMaxAddressIndex);
+    shieldedMaxIndexUsed = Math.max(shieldedMaxIndexUsed, processedData.shieldedMaxAddressIndex);
+    for (const token of processedData.tokens) {
+      tokens.add(token);
     }
 
-    // Validate that `input.index` (an absolute on-chain index spanning the
-    // transparent then shielded outputs, SEPARATED model) points at a real
-    // output of the parent — via the arithmetic resolver, not a positional
-    // `outputs[index]` read that would wrongly reject a shielded index
-    // >= outputs.length. We only need the existence check here; the UTXO itself
-    // is fetched by key below.
-    const resolved = transactionUtils.resolveSpentOutput(origTx, input.index);
-    if (!resolved) {
-      throw new Error('Spending an unexistent output');
+    // A voided tx does not actually spend its inputs (processNewTx above skipped
+    // it for the same reason), so it must NOT delete their UTXOs. Deleting them
+    // for a tx that arrives already-voided (e.g. a mempool double-spend conflict)
+    // would drop a still-spendable UTXO while its balance is still counted,
+    // breaking coin selection until a full reload. The voided-flip case restores
+    // UTXOs via storage.reprocessTx (see onNewTx).
+    for (const input of tx.inputs) {
+      if (tx.is_voided) break;
+      const origTx = await storage.getTx(input.tx_id);
+      if (!origTx) {
+        // The tx being spent is not from the wallet.
+        continue;
+      }
+
+      // Validate that `input.index` (an absolute on-chain index spanning the
+      // transparent then shielded outputs, SEPARATED model) points at a real
+      // output of the parent — via the arithmetic resolver, not a positional
+      // `outputs[index]` read that would wrongly reject a shielded index
+      // >= outputs.length. We only need the existence check here; the UTXO itself
+      // is fetched by key below.
+      const resolved = transactionUtils.resolveSpentOutput(origTx, input.index);
+      if (!resolved) {
+        throw new Error('Spending an unexistent output');
+      }
+
+      // Delete the spent UTXO — transparent or shielded alike — keyed by its
+      // absolute on-chain index {input.tx_id, input.index}, the same key both are
+      // saved under. The store only holds UTXOs this wallet owns (every saveUtxo is
+      // gated on isAddressMine), so a non-null getUtxo IS the ownership check — and
+      // it deletes the real stored record rather than one reconstructed from the
+      // output. If the output isn't ours (or was already removed) getUtxo returns
+      // undefined and there is nothing to delete. Removing it stops the selector
+      // from re-offering a spent UTXO ("input already spent" on the next send).
+      const spentUtxo = await storage.getUtxo({ txId: input.tx_id, index: input.index });
+      if (spentUtxo) {
+        await store.deleteUtxo(spentUtxo);
+      }
     }
+  };
 
-    // Delete the spent UTXO — transparent or shielded alike — keyed by its
-    // absolute on-chain index {input.tx_id, input.index}, the same key both are
-    // saved under. The store only holds UTXOs this wallet owns (every saveUtxo is
-    // gated on isAddressMine), so a non-null getUtxo IS the ownership check — and
-    // it deletes the real stored record rather than one reconstructed from the
-    // output. If the output isn't ours (or was already removed) getUtxo returns
-    // undefined and there is nothing to delete. Removing it stops the selector
-    // from re-offering a spent UTXO ("input already spent" on the next send).
-    const spentUtxo = await storage.getUtxo({ txId: input.tx_id, index: input.index });
-    if (spentUtxo) {
-      await store.deleteUtxo(spentUtxo);
+  try {
+    if (shieldedContext && storage.shieldedCryptoProvider) {
+      const decodedTxs = await rewindShieldedOutputsBatch(
+        storage,
+        txs,
+        storage.shieldedCryptoProvider,
+        shieldedContext
+      );
+      // Persist the in-place decoded fields, processNewTx only saves the txs it decodes itself.
+      for (const tx of decodedTxs) {
+        await store.saveTx(tx);
+      }
     }
+    for (const tx of txs) {
+      try {
+        await processTx(tx);
+      } catch (e) {
+        if (!onTxError) {
+          throw e;
+        }
+        onTxError(tx, e);
+      }
+    }
+  } finally {
+    shieldedContext?.close();
   }
 
   // Update wallet data in the store
@@ -977,6 +1532,20 @@ async function updateWalletMetadataFromProcessedTxData(
   await _updateTokensData(storage, tokens);
 }
 
+/**
+ * Get a balance with all values zeroed.
+ * @returns {IBalance}
+ */
+function getEmptyBalance(): IBalance {
+  return {
+    tokens: { unlocked: 0n, locked: 0n },
+    authorities: {
+      mint: { unlocked: 0n, locked: 0n },
+      melt: { unlocked: 0n, locked: 0n },
+    },
+  };
+}
+
 /**
  * Process a new transaction, adding or creating the metadata for the addresses and tokens involved.
  * Will update relevant wallet data and utxos.
@@ -989,6 +1558,7 @@ async function updateWalletMetadataFromProcessedTxData(
  * @param {number} [options.nowTs] The current timestamp
  * @param {number} [options.currentHeight] The current height of the best chain
  * @param {string} [options.pinCode] PIN code for shielded-output decryption
+ * @param {ShieldedRewindContext} [options.shieldedContext] Scan keys shared by the txs of a sync
  * @returns {Promise<{ legacyMaxAddressIndex: number, shieldedMaxAddressIndex: number, tokens: Set<string> }>}
  */
 export async function processNewTx(
@@ -999,22 +1569,19 @@ export async function processNewTx(
     nowTs,
     currentHeight,
     pinCode,
-  }: { rewardLock?: number; nowTs?: number; currentHeight?: number; pinCode?: string } = {}
+    shieldedContext,
+  }: {
+    rewardLock?: number;
+    nowTs?: number;
+    currentHeight?: number;
+    pinCode?: string;
+    shieldedContext?: ShieldedRewindContext;
+  } = {}
 ): Promise<{
   legacyMaxAddressIndex: number;
   shieldedMaxAddressIndex: number;
   tokens: Set<string>;
 }> {
-  function getEmptyBalance(): IBalance {
-    return {
-      tokens: { unlocked: 0n, locked: 0n },
-      authorities: {
-        mint: { unlocked: 0n, locked: 0n },
-        melt: { unlocked: 0n, locked: 0n },
-      },
-    };
-  }
-
   const { store } = storage;
 
   if (tx.is_voided && tx.nc_id && tx.first_block && tx.nc_seqnum != null) {
@@ -1040,6 +1607,10 @@ export async function processNewTx(
     }
   }
 
+  // Record what this tx changes on the store so it can be reverted later without
+  // reprocessing the whole history (e.g. when the tx is voided).
+  const effects = storage.txJournal ? storage.txJournal.begin(tx.tx_id) : null;
+
   // We ignore voided transactions
   if (tx.is_voided)
     return {
@@ -1170,24 +1741,39 @@ export async function processNewTx(
       addressMeta.balance.get(output.token)!.tokens.unlocked += output.value;
     }
 
-    // Add utxo to the storage if unspent
-    // This is idempotent so it's safe to call it multiple times
-    if (output.spent_by == null) {
-      await store.saveUtxo({
-        txId: tx.tx_id,
-        index: onChainIndex,
-        type: tx.version,
-        authorities: isAuthority ? output.value : 0n,
+    const utxo: IUtxo = {
+      txId: tx.tx_id,
+      index: onChainIndex,
+      type: tx.version,
+      authorities: isAuthority ? output.value : 0n,
+      address,
+      token: output.token,
+      value: output.value,
+      timelock: output.decoded.timelock || null,
+      height: tx.height || null,
+      // Preserve the shielded marker + blinding factors so a later unshield
+      // send can recompute the excess blinding factor. Dropping these makes
+      // the fullnode reject the unshield tx.
+      ...(isShielded ? shieldedUtxoSaveFields(output) : {}),
+    };
+    if (effects) {
+      effects.credits.push({
         address,
         token: output.token,
         value: output.value,
-        timelock: output.decoded.timelock || null,
-        height: tx.height || null,
-        // Preserve the shielded marker + blinding factors so a later unshield
-        // send can recompute the excess blinding factor. Dropping these makes
-        // the fullnode reject the unshield tx.
-        ...(isShielded ? shieldedUtxoSaveFields(output) : {}),
+        isAuthority,
+        isMint,
+        isMelt,
+        index: onChainIndex,
+        locked: isLocked,
+        utxo,
       });
+    }
+
+    // Add utxo to the storage if unspent
+    // This is idempotent so it's safe to call it multiple times
+    if (output.spent_by == null) {
+      await store.saveUtxo(utxo);
       if (isLocked) {
         // We will save this utxo on the index of locked utxos
         // So that later when it becomes unlocked we can update the balances with processUtxoUnlock
@@ -1220,7 +1806,8 @@ export async function processNewTx(
         storage,
         tx,
         storage.shieldedCryptoProvider,
-        pinCode
+        pinCode,
+        shieldedContext
       );
       if (decoded.length > 0) {
         // Persist the in-place decoded fields so later reads (getTxBalance,
@@ -1239,6 +1826,8 @@ export async function processNewTx(
       //   - the RELOAD caller (processHistory) skips ONLY this typed error and
       //     rethrows everything else — so a store/nano failure still fails loud
       //     instead of being swallowed as a silent per-tx skip.
+      // Nothing was applied for this tx, so there are no effects to revert.
+      storage.txJournal?.delete(tx.tx_id);
       storage.logger.error(
         'Unexpected error processing shielded outputs for tx',
         tx.tx_id,
@@ -1270,6 +1859,7 @@ export async function processNewTx(
     );
   }
 
+  let enrichedInputs = false;
   for (const input of tx.inputs) {
     // Enrich a bare shielded input from the parent tx's decoded shielded output
     // so the balance debit below treats it like a transparent input. The
@@ -1295,6 +1885,7 @@ export async function processNewTx(
           input.token = so.token!;
           input.token_data = so.token_data ?? 0;
           input.decoded = so.decoded;
+          enrichedInputs = true;
         }
       }
     }
@@ -1351,12 +1942,33 @@ export async function processNewTx(
     txTokens.add(input.token);
     txAddresses.add(input.decoded.address);
 
+    const isInputMint = transactionUtils.isMint({
+      value: input.value,
+      token_data: input.token_data,
+    });
+    const isInputMelt = transactionUtils.isMelt({
+      value: input.value,
+      token_data: input.token_data,
+    });
+    if (effects) {
+      storage.txJournal?.addDebit(tx.tx_id, {
+        address: input.decoded.address,
+        token: input.token,
+        value: input.value,
+        isAuthority,
+        isMint: isInputMint,
+        isMelt: isInputMelt,
+        txId: input.tx_id,
+        index: input.index,
+      });
+    }
+
     if (isAuthority) {
-      if (transactionUtils.isMint({ value: input.value, token_data: input.token_data })) {
+      if (isInputMint) {
         tokenMeta.balance.authorities.mint.unlocked -= 1n;
         addressMeta.balance.get(input.token)!.authorities.mint.unlocked -= 1n;
       }
-      if (transactionUtils.isMelt({ value: input.value, token_data: input.token_data })) {
+      if (isInputMelt) {
         tokenMeta.balance.authorities.melt.unlocked -= 1n;
         addressMeta.balance.get(input.token)!.authorities.melt.unlocked -= 1n;
       }
@@ -1370,6 +1982,12 @@ export async function processNewTx(
     await store.editAddressMeta(input.decoded.address, addressMeta);
   }
 
+  if (enrichedInputs) {
+    // Persist the enriched inputs, the tx may be a copy rebuilt by the store
+    // (e.g. a MemoryStore with `compactHistory`) and not the stored object.
+    await store.saveTx(tx);
+  }
+
   // Nano contract and ocb transactions have the address used to sign the tx
   // and we must consider this to the address metadata
   // The IHistoryTx object has data from the full node that doesn't have the headers
@@ -1425,6 +2043,10 @@ export async function processNewTx(
     addressMeta.numTransactions += 1;
     await store.editAddressMeta(address, addressMeta);
   }
+  if (effects) {
+    effects.tokens = new Set(txTokens);
+    effects.addresses = new Set(txAddresses);
+  }
 
   return {
     legacyMaxAddressIndex: legacyMaxIndexUsed,
@@ -1433,6 +2055,126 @@ export async function processNewTx(
   };
 }
 
+/**
+ * Add (or remove, with a negative sign) the balance of a journaled output or input
+ * on the address and token metadata.
+ */
+async function applyBalanceEffect(
+  storage: IStorage,
+  effect: ITxBalanceEffect,
+  { locked, sign }: { locked: boolean; sign: bigint }
+): Promise<void> {
+  const { store } = storage;
+  const addressMeta = (await store.getAddressMeta(effect.address)) ?? getDefaultAddressMeta();
+  const tokenMeta = (await store.getTokenMeta(effect.token)) ?? {
+    numTransactions: 0,
+    balance: getEmptyBalance(),
+  };
+  if (!addressMeta.balance.has(effect.token)) {
+    addressMeta.balance.set(effect.token, getEmptyBalance());
+  }
+  const field = locked ? 'locked' : 'unlocked';
+  for (const balance of [tokenMeta.balance, addressMeta.balance.get(effect.token)!]) {
+    if (effect.isAuthority) {
+      if (effect.isMint) {
+        balance.authorities.mint[field] += sign;
+      }
+      if (effect.isMelt) {
+        balance.authorities.melt[field] += sign;
+      }
+    } else {
+      balance.tokens[field] += sign * effect.value;
+    }
+  }
+  await store.editTokenMeta(effect.token, tokenMeta);
+  await store.editAddressMeta(effect.address, addressMeta);
+}
+
+/**
+ * Revert the changes processing a tx made on the store, using the effects recorded
+ * on the storage journal by `processNewTx`.
+ *
+ * Balances and tx counters are subtracted, the utxos created by the tx are removed
+ * and the utxos it spent are restored (unless they were spent by another tx).
+ *
+ * A tx with outputs spent by other processed txs is not reverted, the txs spending
+ * them must be reverted first (see `TxEffectsJournal.getDependantClosure`).
+ *
+ * @param {IStorage} storage Storage instance.
+ * @param {string} txId The tx to revert
+ * @returns {Promise<boolean>} If the tx was reverted, false means the effects of the tx or
+ * of a tx it spent from are not on the journal, or other txs spent its outputs.
+ */
+export async function revertTxEffects(storage: IStorage, txId: string): Promise<boolean> {
+  const journal = storage.txJournal;
+  const effects = journal?.get(txId);
+  if (!journal || !effects || journal.hasDependants(txId)) {
+    return false;
+  }
+  const { store } = storage;
+  const tx = await store.getTx(txId);
+
+  // A valid parent without a record was processed before the journal started (e.g. the
+  // history was restored from a sync checkpoint), its utxo could not be restored.
+  for (const debit of effects.debits) {
+    if (journal.has(debit.txId)) continue;
+    const parentTx = await store.getTx(debit.txId);
+    if (parentTx && !parentTx.is_voided) {
+      return false;
+    }
+  }
+
+  for (const credit of effects.credits) {
+    await applyBalanceEffect(storage, credit, { locked: credit.locked, sign: -1n });
+    const utxo = await store.getUtxo({ txId, index: credit.index });
+    if (utxo) {
+      await store.deleteUtxo(utxo);
+    }
+    if (credit.locked && tx) {
+      await store.unlockUtxo({ tx, index: credit.index });
+    }
+    if (await storage.isUtxoSelectedAsInput({ txId, index: credit.index })) {
+      await storage.utxoSelectAsInput({ txId, index: credit.index }, false);
+    }
+  }
+
+  for (const debit of effects.debits) {
+    await applyBalanceEffect(storage, debit, { locked: false, sign: 1n });
+    // Restore the spent utxo from the record of the tx that created it.
+    // A parent without a record is voided (or not on the history) and has no utxo to restore.
+    const parentCredit = journal.getCredit(debit.txId, debit.index);
+    const parentTx = parentCredit ? await store.getTx(debit.txId) : null;
+    if (!parentCredit || !parentTx || parentTx.is_voided) {
+      continue;
+    }
+    const spentBy = transactionUtils.resolveSpentOutput(parentTx, debit.index)?.output.spent_by;
+    if (spentBy != null && spentBy !== txId) {
+      // Spent by another tx
+      continue;
+    }
+    await store.saveUtxo(parentCredit.utxo);
+    if (parentCredit.locked) {
+      await store.saveLockedUtxo({ tx: parentTx, index: debit.index });
+    }
+  }
+
+  for (const token of effects.tokens) {
+    const tokenMeta = await store.getTokenMeta(token);
+    if (tokenMeta === null) continue;
+    tokenMeta.numTransactions -= 1;
+    await store.editTokenMeta(token, tokenMeta);
+  }
+  for (const address of effects.addresses) {
+    const addressMeta = await store.getAddressMeta(address);
+    if (addressMeta === null) continue;
+    addressMeta.numTransactions -= 1;
+    await store.editAddressMeta(address, addressMeta);
+  }
+
+  journal.delete(txId);
+  return true;
+}
+
 /**
  * Process locked utxo and update the balances.
  * If the utxo is still locked nothing is done.
@@ -1454,16 +2196,6 @@ export async function processUtxoUnlock(
     currentHeight,
   }: { rewardLock?: number; nowTs?: number; currentHeight?: number } = {}
 ): Promise<void> {
-  function getEmptyBalance(): IBalance {
-    return {
-      tokens: { unlocked: 0n, locked: 0n },
-      authorities: {
-        mint: { unlocked: 0n, locked: 0n },
-        melt: { unlocked: 0n, locked: 0n },
-      },
-    };
-  }
-
   const { store } = storage;
 
   const { tx } = lockedUtxo;
@@ -1552,6 +2284,7 @@ export async function processUtxoUnlock(
   await store.editAddressMeta(output.decoded.address, addressMeta);
   // Remove utxo from locked utxos so that it is not processed again
   await store.unlockUtxo(lockedUtxo);
+  storage.txJournal?.markUnlocked(tx.tx_id, lockedUtxo.index);
 }
 
 /**
@@ -63,6 +63,7 @@ import ScriptData from '../models/script_data';
 import { parseScript } from './scripts';
 import helpers from './helpers';
 import { getAddressFromPubkey } from './address';
+import { METRIC_NAMES, startTimer } from '../metrics';
 import txApi from '../api/txApi';
 import { FullNodeTxApiResponse, transactionApiSchema } from '../api/schemas/txApi';
 import tokenUtils from './tokens';
@@ -392,11 +393,15 @@ const transaction = {
    *   an OCB pubkey needs it; 'spend' only when a shielded-spend input is present. This matters for
    *   a passkey signer, where each resolver call may be a biometric ceremony — an all-shielded tx
    *   with no nano/OCB header never triggers the 'legacy' prompt.
+   * @param deriveKey Optional resolver of the key of an address index, used instead of deriving
+   *   it from the chain xpriv (e.g. a signing session with the derived keys cached). It must
+   *   derive the same keys: compliant derivation on 'spend', non-compliant on 'legacy'.
    */
   async signTxInputs(
     tx: Transaction,
     storage: IStorage,
-    getXpriv: (chain: 'legacy' | 'spend') => Promise<HDPrivateKey>
+    getXpriv: (chain: 'legacy' | 'spend') => Promise<HDPrivateKey>,
+    deriveKey?: (chain: 'legacy' | 'spend', index: number) => HDPrivateKey
   ): Promise<ITxSignatureData> {
     // Lazily load each key chain (see getXpriv doc). Cache the first fetch so a chain used by
     // many inputs still resolves it only once.
@@ -448,7 +453,12 @@ const transaction = {
       }
 
       let derivedKey;
-      if (addressInfo.addressType === 'shielded-spend') {
+      if (deriveKey) {
+        derivedKey = deriveKey(
+          addressInfo.addressType === 'shielded-spend' ? 'spend' : 'legacy',
+          addressInfo.bip32AddressIndex
+        );
+      } else if (addressInfo.addressType === 'shielded-spend') {
         // Use spend key chain (m/44'/280'/2'/0) for shielded UTXO inputs.
         // Shielded keys use compliant derivation (deriveChild), per #1132 — must match how the
         // shielded-spend addresses are derived, or signatures fail on-chain.
@@ -490,8 +500,9 @@ const transaction = {
         // The nano contract address or OCB pubkey are not from our wallet.
         return { inputSignatures: signatures, ncCallerSignature };
       }
-      const legacyXpriv = await getLegacyXpriv();
-      const xpriv = legacyXpriv.deriveNonCompliantChild(addressInfo.bip32AddressIndex);
+      const xpriv = deriveKey
+        ? deriveKey('legacy', addressInfo.bip32AddressIndex)
+        : (await getLegacyXpriv()).deriveNonCompliantChild(addressInfo.bip32AddressIndex);
 
       if (tx.isNanoContract()) {
         // Nano contract
@@ -521,6 +532,25 @@ const transaction = {
     storage: IStorage,
     pinCode: string
   ): Promise<ITxSignatureData> {
+    const session = storage.signingSession;
+    // The session keys are only used with the pin that unlocked them, a wrong pin goes
+    // through the key decryption below and fails as it would without a session.
+    if (session?.isActive() && session.checkPin(pinCode)) {
+      try {
+        // The keys were already unlocked, only the ECDSA signatures are computed.
+        return await this.signTxInputs(
+          tx,
+          storage,
+          async chain => session.getXpriv(chain),
+          (chain, index) => session.deriveChild(chain, index)
+        );
+      } catch (err) {
+        if (session.isActive()) {
+          throw err;
+        }
+        // The session expired while signing, the keys are decrypted with the pin instead.
+      }
+    }
     return this.signTxInputs(tx, storage, async chain =>
       HDPrivateKey.fromString(
         chain === 'spend'
@@ -560,6 +590,7 @@ const transaction = {
    * @returns The transaction object updated with the signatures.
    */
   async signTransaction(tx: Transaction, storage: IStorage, pinCode: string): Promise<Transaction> {
+    const stopTimer = startTimer(METRIC_NAMES.SIGN_TX);
     const signatures = await storage.getTxSignatures(tx, pinCode);
     for (const sigData of signatures.inputSignatures) {
       const input = tx.inputs[sigData.inputIndex];
@@ -579,6 +610,7 @@ const transaction = {
       // eslint-disable-next-line no-param-reassign
       (tx as OnChainBlueprint).signature = signatures.ncCallerSignature;
     }
+    stopTimer();
     return tx;
   },
 
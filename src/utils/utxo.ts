@@ -6,16 +6,26 @@
  */
 
 import {
+  IBranchAndBoundOptions,
   IStorage,
   IUtxo,
+  IUtxoConsolidationPlanOptions,
   IUtxoFilterOptions,
   OutputValueType,
   UtxoSelectionAlgorithm,
 } from '../types';
+import { METRIC_NAMES, startTimer } from '../metrics';
+import {
+  MAX_INPUTS,
+  UTXO_BNB_MAX_TRIES,
+  UTXO_BNB_TIME_LIMIT,
+  UTXO_CONSOLIDATION_MIN_UTXOS,
+} from '../constants';
 
 export enum UtxoSelection {
   FAST = 'fast',
   BEST = 'best',
+  BRANCH_AND_BOUND = 'branch_and_bound',
 }
 
 /**
@@ -30,6 +40,8 @@ export function getAlgorithmFromEnum(algorithm: UtxoSelection): UtxoSelectionAlg
       return fastUtxoSelection;
     case UtxoSelection.BEST:
       return bestUtxoSelection;
+    case UtxoSelection.BRANCH_AND_BOUND:
+      return branchAndBoundUtxoSelection;
     default:
       throw new Error(`Unknown algorithm ${algorithm}`);
   }
@@ -50,6 +62,7 @@ export async function fastUtxoSelection(
   token: string,
   amount: OutputValueType
 ): Promise<{ utxos: IUtxo[]; amount: OutputValueType; available?: OutputValueType }> {
+  const stopTimer = startTimer(METRIC_NAMES.UTXO_SELECTION, { algorithm: UtxoSelection.FAST });
   const utxos: IUtxo[] = [];
   let utxosAmount = 0n;
 
@@ -66,6 +79,7 @@ export async function fastUtxoSelection(
     utxosAmount += utxo.value;
     utxos.push(utxo);
   }
+  stopTimer();
 
   if (utxosAmount < amount) {
     // Not enough funds to fill the amount required.
@@ -95,6 +109,7 @@ export async function bestUtxoSelection(
   token: string,
   amount: OutputValueType
 ): Promise<{ utxos: IUtxo[]; amount: OutputValueType; available?: OutputValueType }> {
+  const stopTimer = startTimer(METRIC_NAMES.UTXO_SELECTION, { algorithm: UtxoSelection.BEST });
   const utxos: IUtxo[] = [];
   let utxosAmount = 0n;
   let selectedUtxo: IUtxo | null = null;
@@ -114,6 +129,7 @@ export async function bestUtxoSelection(
   for await (const utxo of storage.selectUtxos(options)) {
     // storage ensures the utxo can be used
     if (utxo.value === amount) {
+      stopTimer();
       return {
         utxos: [utxo],
         amount,
@@ -145,6 +161,7 @@ export async function bestUtxoSelection(
       }
     }
   }
+  stopTimer();
 
   if (selectedUtxo !== null) {
     return {
@@ -171,3 +188,198 @@ export async function bestUtxoSelection(
     amount: utxosAmount,
   };
 }
+
+/**
+ * Search the `count` values with the smallest sum that fills the amount.
+ *
+ * Each value is either taken or skipped, dropping the branches that cannot fill the amount or
+ * cannot beat the best selection found so far. The search starts from the `count` biggest
+ * values and stops on an exact match or when it runs out of tries or time.
+ *
+ * @param values The values to choose from, in descending order
+ * @param amount The amount to fill, the `count` biggest values must fill it
+ * @param count The number of values to take
+ * @param maxTries Maximum number of nodes to visit
+ * @param deadline Timestamp in ms to stop the search
+ * @returns The indexes of the values selected and whether the whole tree was searched
+ */
+function searchSelection(
+  values: bigint[],
+  amount: bigint,
+  count: number,
+  maxTries: number,
+  deadline: number
+): { indexes: number[]; complete: boolean } {
+  const total = values.length;
+  // prefix[i] is the sum of the i biggest values
+  const prefix: bigint[] = [0n];
+  for (const value of values) {
+    prefix.push(prefix[prefix.length - 1] + value);
+  }
+
+  let best = values.slice(0, count).map((_, i) => i);
+  let bestExcess = prefix[count] - amount;
+  const chosen: number[] = [];
+  let sum = 0n;
+  let index = 0;
+  let tries = 0;
+
+  while (bestExcess > 0n) {
+    tries++;
+    if (tries > maxTries || (tries % 1000 === 0 && Date.now() > deadline)) {
+      return { indexes: best, complete: false };
+    }
+
+    const missing = count - chosen.length;
+    let backtrack = false;
+    if (missing === 0) {
+      if (sum >= amount && sum - amount < bestExcess) {
+        best = [...chosen];
+        bestExcess = sum - amount;
+      }
+      backtrack = true;
+    } else if (
+      // Not enough values left
+      total - index < missing ||
+      // The biggest values left cannot fill the amount
+      sum + prefix[index + missing] - prefix[index] < amount ||
+      // The smallest values left cannot beat the best selection
+      sum + prefix[total] - prefix[total - missing] - amount >= bestExcess
+    ) {
+      backtrack = true;
+    }
+
+    if (!backtrack) {
+      chosen.push(index);
+      sum += values[index];
+      index++;
+      continue;
+    }
+    if (chosen.length === 0) {
+      break;
+    }
+    // Skip the last value taken, along with the values equal to it since taking them
+    // instead would only repeat the same sums
+    const last = chosen.pop()!;
+    sum -= values[last];
+    index = last + 1;
+    while (index < total && values[index] === values[last]) {
+      index++;
+    }
+  }
+  return { indexes: best, complete: true };
+}
+
+/**
+ * Select utxos to fill the amount required with the smallest transaction.
+ *
+ * The transaction weight grows with its size and each input is bigger than the change output,
+ * so this selects the smallest number of inputs that fills the amount and, among those, the
+ * selection with the smallest change, preferring an exact match that needs no change output.
+ * The branch-and-bound search is bounded by `maxTries` and `timeLimit`, when it runs out the
+ * best selection found so far is used, which is never worse than the biggest utxos selected
+ * by `fastUtxoSelection` the search starts from.
+ * Obs: this will iterate on all available utxos to choose the best suited selection.
+ * Obs: Does not work with authority utxos.
+ *
+ * @param {IStorage} storage The wallet storage to select the utxos
+ * @param {string} token The token uid to select the utxos
+ * @param {OutputValueType} amount The target amount of tokens required
+ * @param {IBranchAndBoundOptions} [options] Limits of the search
+ * @returns {Promise<{ utxos: IUtxo[], amount: OutputValueType, available?: OutputValueType }>}
+ */
+export async function branchAndBoundUtxoSelection(
+  storage: IStorage,
+  token: string,
+  amount: OutputValueType,
+  { maxTries = UTXO_BNB_MAX_TRIES, timeLimit = UTXO_BNB_TIME_LIMIT }: IBranchAndBoundOptions = {}
+): Promise<{ utxos: IUtxo[]; amount: OutputValueType; available?: OutputValueType }> {
+  const stopTimer = startTimer(METRIC_NAMES.UTXO_SELECTION, {
+    algorithm: UtxoSelection.BRANCH_AND_BOUND,
+  });
+  const options: IUtxoFilterOptions = {
+    token,
+    authorities: 0n,
+    only_available_utxos: true,
+    order_by_value: 'desc',
+  };
+  const candidates: IUtxo[] = [];
+  for await (const utxo of storage.selectUtxos(options)) {
+    candidates.push(utxo);
+  }
+
+  // The biggest utxos give the smallest number of inputs that fills the amount
+  let count = 0;
+  let available = 0n;
+  while (count < candidates.length && available < amount) {
+    available += candidates[count].value;
+    count++;
+  }
+  if (available < amount) {
+    stopTimer();
+    // Not enough funds to fill the amount required.
+    return {
+      utxos: [],
+      amount: 0n,
+      available,
+    };
+  }
+
+  const { indexes } = searchSelection(
+    candidates.map(utxo => utxo.value),
+    amount,
+    count,
+    maxTries,
+    Date.now() + timeLimit
+  );
+  stopTimer();
+
+  const utxos = indexes.map(i => candidates[i]);
+  return {
+    utxos,
+    amount: utxos.reduce((acc, utxo) => acc + utxo.value, 0n),
+  };
+}
+
+/**
+ * Plan the consolidation of the dust utxos of a token, the utxos smaller than `dustThreshold`.
+ * The smallest utxos are merged first, so the following transactions need fewer inputs.
+ * Obs: only transparent utxos are merged, the consolidation spends them as transparent inputs.
+ *
+ * @param {IStorage} storage The wallet storage to select the utxos
+ * @param {string} token The token uid of the utxos to merge
+ * @param {IUtxoConsolidationPlanOptions} options
+ * @returns {Promise<{ utxos: IUtxo[], amount: OutputValueType } | null>} The utxos to merge and
+ * their total amount, or null when there are fewer than `minUtxos` dust utxos
+ */
+export async function planUtxoConsolidation(
+  storage: IStorage,
+  token: string,
+  {
+    dustThreshold,
+    minUtxos = UTXO_CONSOLIDATION_MIN_UTXOS,
+    maxUtxos = storage.version?.max_number_inputs || MAX_INPUTS,
+  }: IUtxoConsolidationPlanOptions
+): Promise<{ utxos: IUtxo[]; amount: OutputValueType } | null> {
+  const options: IUtxoFilterOptions = {
+    token,
+    authorities: 0n,
+    only_available_utxos: true,
+    amount_smaller_than: dustThreshold,
+    max_utxos: maxUtxos,
+    order_by_value: 'asc',
+    shielded: false,
+  };
+  const utxos: IUtxo[] = [];
+  let amount = 0n;
+  for await (const utxo of storage.selectUtxos(options)) {
+    utxos.push(utxo);
+    amount += utxo.value;
+  }
+
+  // Merging a single utxo would only create another one
+  if (utxos.length < Math.max(minUtxos, 2)) {
+    return null;
+  }
+  return { utxos, amount };
+}
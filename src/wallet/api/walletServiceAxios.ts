@@ -9,6 +9,8 @@ import axios from 'axios';
 import { TIMEOUT } from '../../constants';
 import HathorWalletServiceWallet from '../wallet';
 import config from '../../config';
+import { getKeepAliveAgents, IKeepAliveAgents } from '../../api/requestPool';
+import { addRequestMetrics } from '../../api/axiosWrapper';
 
 /**
  * Method that creates an axios instance
@@ -37,7 +39,7 @@ export const axiosInstance = async (
     baseURL: string;
     validateStatus: (status) => boolean;
     timeout: number;
-  } = {
+  } & Partial<IKeepAliveAgents> = {
     baseURL: config.getWalletServiceBaseUrl(),
     timeout,
     // `validateStatus` defines whether to resolve or reject the promise for a given
@@ -49,6 +51,8 @@ export const axiosInstance = async (
     headers: {
       'Content-Type': 'application/json',
     },
+    // Requests to the wallet service share the open connections
+    ...getKeepAliveAgents(config.getWalletServiceBaseUrl()),
   };
 
   if (needsAuth) {
@@ -57,7 +61,9 @@ export const axiosInstance = async (
     defaultOptions.headers.Authorization = `Bearer ${wallet.getAuthToken()}`;
   }
 
-  return axios.create(defaultOptions);
+  const instance = axios.create(defaultOptions);
+  addRequestMetrics(instance);
+  return instance;
 };
 
 export default axiosInstance;
@@ -0,0 +1,305 @@
+/**
+ * Copyright (c) Hathor Labs and its affiliates.
+ *
+ * This source code is licensed under the MIT license found in the
+ * LICENSE file in the root directory of this source tree.
+ */
+
+import txApi from '../api/txApi';
+import { LOCAL_MINING_MAX_WEIGHT } from '../constants';
+import Transaction from '../models/transaction';
+import { IMiningBackend, IMiningProgress } from '../types';
+import {
+  INonceSearchTask,
+  NONCE_SPACE_SIZE,
+  getPowPrefix,
+  getPowTarget,
+  searchNonce,
+} from '../utils/pow';
+import { MineTxSuccessData } from './types';
+
+// Number of nonces searched by a single worker task.
+const DEFAULT_TASK_SIZE = 2 ** 16;
+
+interface INonceSearchJob {
+  task: INonceSearchTask;
+  resolve: (nonce: number | null) => void;
+  reject: (err: Error) => void;
+}
+
+/**
+ * Load the node modules required to run the mining workers.
+ * Returns null when they are not available (e.g. browser and react-native).
+ */
+function loadWorkerModules(): {
+  Worker: typeof import('worker_threads').Worker;
+  availableParallelism: () => number;
+  workerExists: (workerPath: string) => boolean;
+  defaultWorkerPath: string;
+} | null {
+  try {
+    /* eslint-disable global-require, @typescript-eslint/no-var-requires */
+    const { Worker } = require('worker_threads');
+    const os = require('os');
+    const fs = require('fs');
+    const path = require('path');
+    /* eslint-enable global-require, @typescript-eslint/no-var-requires */
+    return {
+      Worker,
+      availableParallelism: () =>
+        typeof os.availableParallelism === 'function'
+          ? os.availableParallelism()
+          : os.cpus().length,
+      workerExists: (workerPath: string) => fs.existsSync(workerPath),
+      defaultWorkerPath: path.join(__dirname, 'localMinerWorker.js'),
+    };
+  } catch (err) {
+    return null;
+  }
+}
+
+/**
+ * Request the parents a new transaction should confirm to the full node.
+ */
+async function getTxParents(): Promise<string[]> {
+  const response = await new Promise<{ success: boolean; tx_parents?: string[] }>(
+    (resolve, reject) => {
+      txApi.getTxParents(resolve).catch(reject);
+    }
+  );
+  if (!response.success || !response.tx_parents) {
+    throw new Error('Could not get the parents of the transaction.');
+  }
+  return response.tx_parents;
+}
+
+/**
+ * Get the proof of work prefix of the transaction mined with the given parents and timestamp.
+ * The transaction is restored before returning.
+ */
+function getPrefixAt(tx: Transaction, parents: string[], timestamp: number): string {
+  const original = { parents: tx.parents, timestamp: tx.timestamp };
+  /* eslint-disable no-param-reassign */
+  try {
+    tx.parents = parents;
+    tx.timestamp = timestamp;
+    return getPowPrefix(tx).toString('hex');
+  } finally {
+    tx.parents = original.parents;
+    tx.timestamp = original.timestamp;
+  }
+  /* eslint-enable no-param-reassign */
+}
+
+/**
+ * Mining backend that solves the proof of work on the local machine.
+ *
+ * The nonce space is split in tasks of `taskSize` nonces searched in parallel by
+ * `worker_threads`, so low weight transactions (e.g. on privnets and testnets with
+ * low weight constants) are mined without the round trips to the tx mining service.
+ *
+ * When worker threads are not available (browser, react-native or the compiled worker
+ * is missing) the nonces are searched on the current thread, yielding to the event loop
+ * between tasks.
+ */
+export class LocalMiner implements IMiningBackend {
+  size: number;
+
+  taskSize: number;
+
+  maxWeight: number;
+
+  workerPath: string | null;
+
+  workers: import('worker_threads').Worker[];
+
+  idleWorkers: import('worker_threads').Worker[];
+
+  /**
+   * Map<worker, job running on the worker>
+   */
+  running: Map<import('worker_threads').Worker, INonceSearchJob>;
+
+  pending: INonceSearchJob[];
+
+  isParallel: boolean;
+
+  modules: ReturnType<typeof loadWorkerModules>;
+
+  /**
+   * @param {Object} [options]
+   * @param {number} [options.size] Number of workers, defaults to the available cores minus one.
+   * @param {number} [options.taskSize] Number of nonces searched by each task.
+   * @param {number} [options.maxWeight] Transactions with a greater weight are not mined locally.
+   * @param {string} [options.workerPath] Path of the compiled worker script.
+   */
+  constructor({
+    size,
+    taskSize = DEFAULT_TASK_SIZE,
+    maxWeight = LOCAL_MINING_MAX_WEIGHT,
+    workerPath,
+  }: { size?: number; taskSize?: number; maxWeight?: number; workerPath?: string } = {}) {
+    this.modules = loadWorkerModules();
+    this.workerPath = workerPath ?? this.modules?.defaultWorkerPath ?? null;
+    this.taskSize = taskSize;
+    this.maxWeight = maxWeight;
+    this.workers = [];
+    this.idleWorkers = [];
+    this.running = new Map();
+    this.pending = [];
+
+    const defaultSize = this.modules ? this.modules.availableParallelism() - 1 : 0;
+    this.size = Math.max(0, size ?? defaultSize);
+    this.isParallel =
+      this.size > 0 &&
+      this.modules !== null &&
+      this.workerPath !== null &&
+      this.modules.workerExists(this.workerPath);
+  }
+
+  /**
+   * Solve the proof of work of a transaction.
+   * The transaction is not changed, the result should be applied by the caller.
+   *
+   * When the transaction has no parents they are requested to the full node.
+   *
+   * @param {Transaction} tx Transaction to mine, with its weight set
+   * @param {(progress: IMiningProgress) => void} [onProgress] Called after each task
+   * @returns {Promise<MineTxSuccessData>}
+   */
+  async mine(
+    tx: Transaction,
+    onProgress?: (progress: IMiningProgress) => void
+  ): Promise<MineTxSuccessData> {
+    const parents = tx.parents.length > 0 ? [...tx.parents] : await getTxParents();
+    const target = getPowTarget(tx.weight).toString('hex');
+    const expectedHashes = 2 ** tx.weight;
+    const startedAt = Date.now();
+    let hashes = 0;
+    let timestamp = Math.max(tx.timestamp ?? 0, Math.floor(Date.now() / 1000));
+
+    for (;;) {
+      const prefix = getPrefixAt(tx, parents, timestamp);
+      let next = 0;
+      let found = null as number | null;
+
+      // Each runner keeps one task in flight, so all workers are busy
+      const runTasks = async () => {
+        while (found === null && next < NONCE_SPACE_SIZE) {
+          const start = next;
+          const end = Math.min(start + this.taskSize, NONCE_SPACE_SIZE);
+          next = end;
+          const nonce = await this.schedule({ prefix, target, start, end });
+          hashes += nonce === null ? end - start : nonce - start + 1;
+          if (nonce !== null && found === null) {
+            found = nonce;
+          }
+          if (onProgress) {
+            const hashrate = hashes / Math.max((Date.now() - startedAt) / 1000, 0.001);
+            const estimation = Math.max(0, (expectedHashes - hashes) / hashrate);
+            onProgress({ hashes, estimation });
+          }
+        }
+      };
+      await Promise.all(Array.from({ length: Math.max(1, this.size) }, runTasks));
+
+      if (found !== null) {
+        return { nonce: found, parents, timestamp, weight: tx.weight };
+      }
+      // No nonce solves this timestamp, the next one changes the graph hash
+      timestamp += 1;
+    }
+  }
+
+  /**
+   * Stop all workers, pending searches are rejected.
+   */
+  async terminate(): Promise<void> {
+    const jobs = [...this.pending, ...this.running.values()];
+    this.pending = [];
+    this.running.clear();
+    for (const job of jobs) {
+      job.reject(new Error('Local miner terminated'));
+    }
+    const workers = this.workers;
+    this.workers = [];
+    this.idleWorkers = [];
+    await Promise.all(workers.map(worker => worker.terminate()));
+  }
+
+  private schedule(task: INonceSearchTask): Promise<number | null> {
+    if (!this.isParallel) {
+      // Yield to the event loop so each task runs on its own macrotask
+      return new Promise((resolve, reject) => {
+        setTimeout(() => {
+          try {
+            resolve(searchNonce(task));
+          } catch (err) {
+            reject(err);
+          }
+        }, 0);
+      });
+    }
+    return new Promise((resolve, reject) => {
+      this.pending.push({ task, resolve, reject });
+      this.dispatch();
+    });
+  }
+
+  private dispatch(): void {
+    while (this.pending.length > 0) {
+      const worker = this.idleWorkers.pop() ?? this.spawnWorker();
+      if (!worker) {
+        return;
+      }
+      const job = this.pending.shift()!;
+      this.running.set(worker, job);
+      // A worker running a mining job keeps the process alive until the result arrives
+      worker.ref();
+      worker.postMessage(job.task);
+    }
+  }
+
+  private spawnWorker(): import('worker_threads').Worker | null {
+    if (this.workers.length >= this.size) {
+      return null;
+    }
+    const worker = new this.modules!.Worker(this.workerPath!);
+    worker.on('message', (message: { result?: number | null; error?: string }) => {
+      const job = this.running.get(worker);
+      this.running.delete(worker);
+      this.idleWorkers.push(worker);
+      // Idle workers should not keep the process alive
+      worker.unref();
+      if (job) {
+        if (message.error !== undefined) {
+          job.reject(new Error(message.error));
+        } else {
+          job.resolve(message.result ?? null);
+        }
+      }
+      this.dispatch();
+    });
+    worker.on('error', (err: Error) => {
+      this.removeWorker(worker, err);
+    });
+    worker.on('exit', () => {
+      this.removeWorker(worker, new Error('Mining worker exited'));
+    });
+    this.workers.push(worker);
+    return worker;
+  }
+
+  private removeWorker(worker: import('worker_threads').Worker, err: Error): void {
+    const job = this.running.get(worker);
+    this.running.delete(worker);
+    this.workers = this.workers.filter(w => w !== worker);
+    this.idleWorkers = this.idleWorkers.filter(w => w !== worker);
+    if (job) {
+      job.reject(err);
+    }
+    this.dispatch();
+  }
+}
+
+export default LocalMiner;
@@ -0,0 +1,24 @@
+/**
+ * Copyright (c) Hathor Labs and its affiliates.
+ *
+ * This source code is licensed under the MIT license found in the
+ * LICENSE file in the root directory of this source tree.
+ */
+
+/**
+ * Entrypoint of the LocalMiner workers.
+ * Each message is a nonce search task and is answered with the nonce found or error message.
+ */
+import { parentPort } from 'worker_threads';
+import { INonceSearchTask, searchNonce } from '../utils/pow';
+
+if (parentPort) {
+  const port = parentPort;
+  port.on('message', (task: INonceSearchTask) => {
+    try {
+      port.postMessage({ result: searchNonce(task) });
+    } catch (err) {
+      port.postMessage({ error: err instanceof Error ? err.message : String(err) });
+    }
+  });
+}
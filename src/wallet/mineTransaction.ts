@@ -10,7 +10,9 @@ import { MIN_POLLING_INTERVAL } from '../constants';
 import { MineTxError } from '../errors';
 import Transaction from '../models/transaction';
 import txMiningApi from '../api/txMining';
+import { IMiningBackend } from '../types';
 import { MineTxSuccessData } from './types';
+import { METRIC_NAMES, startTimer } from '../metrics';
 
 // Error to be shown in case of no miners connected
 const noMinersError = 'There are no miners to resolve the proof of work of this transaction.';
@@ -33,6 +35,9 @@ const rateLimitExceededError =
  * - Update mining time estimation from time to time;
  * - Get back mining response;
  *
+ * If a mining backend is set, transactions up to its `maxWeight` are mined by it
+ * instead, falling back to the tx mining service if it fails.
+ *
  * It emits the following events:
  * 'job-submitted': after job was submitted;
  * 'estimation-updated': after getting the job status;
@@ -59,7 +64,16 @@ class MineTransaction extends EventEmitter {
   // Maximum number of mining retries
   private maxTxMiningRetries: number;
 
-  constructor(transaction: Transaction, options = { maxTxMiningRetries: 3 }) {
+  // Backend to mine the transaction locally
+  private miningBackend: IMiningBackend | null;
+
+  constructor(
+    transaction: Transaction,
+    {
+      maxTxMiningRetries = 3,
+      miningBackend = null,
+    }: { maxTxMiningRetries?: number; miningBackend?: IMiningBackend | null } = {}
+  ) {
     super();
 
     this.transaction = transaction;
@@ -71,7 +85,8 @@ class MineTransaction extends EventEmitter {
     // Counter of number of attempts to mine the transaction.
     this.countTxMiningAttempts = 0;
     // Maximum number of retries if mining timeouts.
-    this.maxTxMiningRetries = options.maxTxMiningRetries;
+    this.maxTxMiningRetries = maxTxMiningRetries;
+    this.miningBackend = miningBackend;
 
     // Promise that resolves when push tx finishes with success
     // or rejects in case of an error
@@ -182,12 +197,67 @@ class MineTransaction extends EventEmitter {
     }, poll_time);
   }
 
+  /**
+   * Mine the transaction with the mining backend.
+   * Emits the same events as the tx mining service jobs, without a job ID.
+   * If the backend fails the job is submitted to the tx mining service.
+   */
+  mineLocally() {
+    let lastUpdate: number | null = null;
+    this.miningBackend!.mine(this.transaction, ({ estimation }) => {
+      this.estimation = estimation;
+      if (lastUpdate === null) {
+        // The estimation is known once the hashrate is measured by the first task
+        lastUpdate = Date.now();
+        this.emit('job-submitted', { estimation, jobID: null });
+      } else if (Date.now() - lastUpdate >= MIN_POLLING_INTERVAL * 1000) {
+        // Keep the same pace as the job status polling
+        lastUpdate = Date.now();
+        this.emit('estimation-updated', { jobID: null, estimation });
+      }
+    }).then(
+      data => {
+        this.emit('job-done', { jobID: null });
+        this.emit('success', data);
+      },
+      err => {
+        // eslint-disable-next-line no-console
+        console.error(err);
+        this.submitJob();
+      }
+    );
+  }
+
+  /**
+   * If the transaction should be mined with the mining backend.
+   */
+  shouldMineLocally(): boolean {
+    return (
+      this.miningBackend !== null &&
+      this.transaction.weight > 0 &&
+      this.transaction.weight <= this.miningBackend.maxWeight
+    );
+  }
+
   /**
    * Start object (submit job)
    */
   start() {
+    // Time from the start until the mining finishes, including retries
+    let stopTimer: ReturnType<typeof startTimer> | null = startTimer(METRIC_NAMES.MINING_WAIT);
+    const onDone = (labels?: { status: string }) => {
+      stopTimer?.(labels);
+      stopTimer = null;
+    };
+    this.once('success', () => onDone());
+    this.once('error', () => onDone({ status: 'error' }));
+    this.once('unexpected-error', () => onDone({ status: 'error' }));
     this.emit('mining-started');
-    this.submitJob();
+    if (this.shouldMineLocally()) {
+      this.mineLocally();
+    } else {
+      this.submitJob();
+    }
   }
 }
 
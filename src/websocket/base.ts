@@ -8,6 +8,7 @@
 import { EventEmitter } from 'events';
 import _WebSocket from 'isomorphic-ws';
 import { ILogger, getDefaultLogger } from '../types';
+import { METRIC_NAMES, getMetrics } from '../metrics';
 
 export const DEFAULT_WS_OPTIONS = {
   wsURL: 'wss://node1.mainnet.hathor.network/v1a/',
@@ -244,6 +245,7 @@ abstract class BaseWebSocket extends EventEmitter {
     if (this.latestPingDate) {
       const dt = (new Date().getTime() - this.latestPingDate.getTime()) / 1000;
       this.latestRTT = dt;
+      getMetrics().observeHistogram(METRIC_NAMES.WEBSOCKET_RTT, dt);
       this.latestPingDate = null;
     }
     this.clearPongTimeoutTimer();